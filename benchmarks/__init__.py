@@ -0,0 +1,6 @@
+"""
+Пакет с микробенчмарками и нагрузочными тестами производительности.
+Запуск отдельного бенчмарка: `python -m benchmarks.<имя_модуля>`.
+Весь набор с сохранением и сравнением результатов: `python -m benchmarks.suite`
+(внешние сервисы заменяются локальными из benchmarks.fakes, сеть не нужна).
+"""
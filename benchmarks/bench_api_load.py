@@ -0,0 +1,227 @@
+"""
+Нагрузочный тест API (server.run_bot): тысячи клиентов опрашивают /api/status
+и изредка запускают и останавливают пары.
+
+Сервер запускается отдельным процессом с заменителями биржи, Redis
+и PostgreSQL (benchmarks.fakes), клиенты — в процессе бенчмарка. Каждый
+клиент отправляет запрос раз в `--interval` секунд по своему расписанию;
+если сервер не успевает, достигнутая частота запросов будет ниже целевой:
+
+    python -m benchmarks.bench_api_load --clients 2000 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from managers.metrics_manager import HistogramChild
+
+from .fakes import make_pairs
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _LoadStats:
+    """Задержки и ошибки запросов по видам (status, command)."""
+
+    def __init__(self):
+        self.latency = {"status": HistogramChild(), "command": HistogramChild()}
+        self.errors = {"status": 0, "command": 0}
+
+    def to_dict(self, elapsed: float) -> dict[str, float]:
+        results = {}
+        for kind, histogram in self.latency.items():
+            results[f"{kind}_requests"] = histogram.count
+            results[f"{kind}_requests_per_sec"] = histogram.count / elapsed
+            results[f"{kind}_errors"] = self.errors[kind]
+            results[f"{kind}_p50_ms"] = histogram.percentile(50) * 1000
+            results[f"{kind}_p99_ms"] = histogram.percentile(99) * 1000
+            results[f"{kind}_max_ms"] = histogram.max * 1000
+        return results
+
+
+async def _client(
+    http: httpx.AsyncClient,
+    pairs: list[str],
+    rng: random.Random,
+    stats: _LoadStats,
+    deadline: float,
+    interval: float,
+    command_ratio: float,
+):
+    """Один клиент: запрос раз в `interval` секунд до `deadline`."""
+    perf_counter = time.perf_counter
+    # Клиенты стартуют вразнобой, чтобы не приходить одной пачкой
+    next_at = perf_counter() + rng.uniform(0, interval)
+    while True:
+        await asyncio.sleep(max(0.0, next_at - perf_counter()))
+        if perf_counter() >= deadline:
+            return
+        if rng.random() < command_ratio:
+            kind = "command"
+            action = rng.choice(("start", "stop"))
+            request = http.post(f"/api/pairs/{rng.choice(pairs)}/{action}")
+        else:
+            kind = "status"
+            request = http.get("/api/status")
+        started = perf_counter()
+        try:
+            response = await request
+            if response.status_code != 200:
+                stats.errors[kind] += 1
+        except httpx.HTTPError:
+            stats.errors[kind] += 1
+        stats.latency[kind].observe(perf_counter() - started)
+        next_at += interval
+
+
+async def _wait_ready(
+    http: httpx.AsyncClient, server: subprocess.Popen, timeout: float
+):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API server exited with code {server.returncode}")
+        try:
+            if (await http.get("/health/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("API server did not become ready")
+
+
+async def run(
+    clients: int = 1000,
+    duration: float = 10.0,
+    interval: float = 1.0,
+    command_ratio: float = 0.01,
+    pairs: int = 50,
+    connections: int = 200,
+    stream_rate: float = 20.0,
+    seed: int = 42,
+) -> dict[str, float]:
+    """Запускает сервер с заменителями, подает нагрузку и возвращает замеры."""
+    port = _free_port()
+    symbols = make_pairs(pairs)
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    limits = httpx.Limits(
+        max_connections=connections, max_keepalive_connections=connections
+    )
+    with tempfile.TemporaryDirectory() as workdir:
+        # Сервер пишет логи в свой рабочий каталог
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.fakes",
+                f"--port={port}",
+                f"--pairs={pairs}",
+                f"--rate={stream_rate}",
+            ],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30.0
+            ) as http:
+                await _wait_ready(http, server, timeout=60.0)
+                # Половина пар работает с начала, чтобы статусы и движки были нагружены
+                for pair in symbols[::2]:
+                    await http.post(f"/api/pairs/{pair}/start")
+
+                stats = _LoadStats()
+                rng = random.Random(seed)
+                started = time.perf_counter()
+                deadline = started + duration
+                cpu_started = time.process_time()
+                await asyncio.gather(
+                    *(
+                        _client(
+                            http,
+                            symbols,
+                            random.Random(rng.random()),
+                            stats,
+                            deadline,
+                            interval,
+                            command_ratio,
+                        )
+                        for _ in range(clients)
+                    )
+                )
+                # Запросы, отправленные до deadline, могут завершиться позже
+                elapsed = time.perf_counter() - started
+                client_cpu = time.process_time() - cpu_started
+                engine = (await http.get("/api/engine")).json()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    results = {
+        "clients": clients,
+        "target_requests_per_sec": clients / interval,
+        **stats.to_dict(elapsed),
+        "generator_cpu_percent": client_cpu / elapsed * 100,
+        "running_pairs": len(engine),
+        "engine_max_latency_ms": max(
+            (e["max_latency_ms"] for e in engine.values()), default=0.0
+        ),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="Период запросов клиента, сек"
+    )
+    parser.add_argument(
+        "--command-ratio", type=float, default=0.01, help="Доля команд start/stop"
+    )
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument(
+        "--stream-rate",
+        type=float,
+        default=20.0,
+        help="Событий биржи в секунду на пару",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            args.clients,
+            args.duration,
+            args.interval,
+            args.command_ratio,
+            args.pairs,
+            args.connections,
+            args.stream_rate,
+        )
+    )
+    for key, value in results.items():
+        print(f"{key:>28}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
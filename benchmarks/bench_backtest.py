@@ -0,0 +1,101 @@
+"""
+Бенчмарк бэктеста: прогон суток тиков одной пары через стратегию и перебор
+сетки параметров в пуле процессов.
+
+Если файла тиков нет, его можно сгенерировать (случайное блуждание цены):
+
+    python -m benchmarks.bench_backtest --generate ticks.bin
+    python -m benchmarks.bench_backtest ticks.bin
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from managers.archive_manager import KIND_BOOK, KIND_TRADE, TICK_DTYPE
+from server.backtest import run_backtest, run_sweep, write_ticks
+
+# Сетка 5 x 5 x 4 = 100 точек
+SWEEP_GRID = {
+    "entry_bps": [2.0, 4.0, 6.0, 8.0, 10.0],
+    "take_profit_bps": [4.0, 6.0, 8.0, 12.0, 16.0],
+    "stop_loss_bps": [8.0, 15.0, 25.0, 40.0],
+}
+
+
+def generate_ticks(
+    path: Path, events: int = 2_000_000, chunk: int = 500_000, seed: int = 42
+):
+    """
+    Генерирует синтетические сутки: 2 млн событий, половина сделок и половина
+    обновлений лучших цен. Пишется кусками, чтобы не держать все в памяти.
+    """
+    rng = np.random.default_rng(seed)
+    tick = 0.01
+    mid = 150.0
+    start_ms = 1_700_000_000_000
+    step_ms = 86_400_000 / events
+    path.unlink(missing_ok=True)
+    for offset in range(0, events, chunk):
+        n = min(chunk, events - offset)
+        steps = rng.choice((-1, 0, 0, 0, 1), size=n) * tick
+        mids = np.maximum(mid + np.cumsum(steps), tick * 100)
+        mid = float(mids[-1])
+        ticks = np.zeros(n, dtype=TICK_DTYPE)
+        ticks["time"] = start_ms + ((offset + np.arange(n)) * step_ms).astype(np.int64)
+        is_book = rng.random(n) < 0.5
+        ticks["kind"] = np.where(is_book, KIND_BOOK, KIND_TRADE)
+        half_spread = tick * rng.integers(1, 3, size=n) / 2
+        ticks["bid"] = np.where(is_book, mids - half_spread, 0.0)
+        ticks["ask"] = np.where(is_book, mids + half_spread, 0.0)
+        ticks["bid_qty"] = np.where(is_book, rng.uniform(1, 500, size=n), 0.0)
+        ticks["ask_qty"] = np.where(is_book, rng.uniform(1, 500, size=n), 0.0)
+        ticks["price"] = np.where(
+            is_book, 0.0, mids + half_spread * rng.choice((-1, 1), size=n)
+        )
+        ticks["qty"] = np.where(is_book, 0.0, rng.uniform(1, 1000, size=n))
+        write_ticks(path, ticks)
+
+
+def run(path: Path, processes: int | None = None) -> dict[str, float]:
+    """Замеряет один прогон и перебор сетки SWEEP_GRID."""
+    single = run_backtest(path, "KASUSDT")
+    started = time.perf_counter()
+    results = run_sweep(path, "KASUSDT", SWEEP_GRID, processes=processes)
+    sweep_seconds = time.perf_counter() - started
+    return {
+        "events": single["events"],
+        "single_run_sec": single["seconds"],
+        "events_per_sec": single["events"] / single["seconds"],
+        "sweep_points": len(results),
+        "sweep_processes": processes or os.cpu_count() or 1,
+        "sweep_sec": sweep_seconds,
+        "best_pnl": results[0]["pnl"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", type=Path)
+    parser.add_argument("--generate", type=Path, help="Сгенерировать файл тиков")
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_ticks(args.generate, args.events)
+        print(f"Generated {args.events:,} events into {args.generate}")
+        return
+    if args.path is None:
+        parser.error("path to a ticks file is required")
+
+    results = run(args.path, args.processes)
+    for key, value in results.items():
+        print(f"{key:>16}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Бенчмарк индикаторов ScalpingManager: сверка живого и пакетного режимов
+и стоимость обновления на событие.
+
+Сверка прогоняет одни и те же события через PairIndicators (живой режим)
+и compute_indicators (векторный) и требует совпадения всех индикаторов
+на каждом событии (в тестах ту же сверку выполняет
+tests/unit/test_scalping_manager.py). Нагрузка живого режима моделирует
+воркер с `--pairs` парами и суммарным потоком `--rate` событий в секунду:
+
+    python -m benchmarks.bench_indicators --events 500000 --pairs 200 --rate 1000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from managers.archive_manager import KIND_TRADE
+from managers.scalping_manager import (
+    INDICATOR_FIELDS,
+    PairIndicators,
+    compute_indicators,
+    replay_indicators,
+)
+from server.backtest import open_ticks
+
+from .bench_backtest import generate_ticks
+
+# Допуски сверки: значения в ценах и б.п., накопленная погрешность float
+PARITY_RTOL = 1e-9
+PARITY_ATOL = 1e-6
+
+
+def check_parity(ticks: np.ndarray) -> dict[str, float]:
+    """
+    Сравнивает живой и пакетный режимы. Возвращает максимальное расхождение
+    по каждому индикатору; при расхождении сверх допусков бросает AssertionError.
+    """
+    live = replay_indicators(ticks)
+    batch = compute_indicators(ticks)
+    assert np.array_equal(live["time"], batch["time"])
+    errors = {}
+    for name in INDICATOR_FIELDS:
+        if not np.allclose(live[name], batch[name], rtol=PARITY_RTOL, atol=PARITY_ATOL):
+            bad = int(np.argmax(np.abs(live[name] - batch[name])))
+            raise AssertionError(
+                f"{name} differs at event {bad}: live={live[name][bad]!r}, "
+                f"batch={batch[name][bad]!r}"
+            )
+        errors[name] = float(np.max(np.abs(live[name] - batch[name]), initial=0.0))
+    return errors
+
+
+def _live_cost(ticks: np.ndarray, pairs: int) -> float:
+    """Время обновления на событие (мкс), события раздаются парам по кругу."""
+    indicators = [PairIndicators() for _ in range(pairs)]
+    rows = list(
+        zip(
+            ticks["time"].tolist(),
+            ticks["kind"].tolist(),
+            ticks["price"].tolist(),
+            ticks["qty"].tolist(),
+            ticks["bid"].tolist(),
+            ticks["bid_qty"].tolist(),
+            ticks["ask"].tolist(),
+            ticks["ask_qty"].tolist(),
+        )
+    )
+    started = time.perf_counter()
+    for i, (t, kind, price, qty, bid, bid_qty, ask, ask_qty) in enumerate(rows):
+        pair = indicators[i % pairs]
+        if kind == KIND_TRADE:
+            pair.on_trade(price, qty, t)
+        else:
+            pair.on_book(bid, bid_qty, ask, ask_qty, t)
+    return (time.perf_counter() - started) / len(rows) * 1e6
+
+
+def run(ticks: np.ndarray, pairs: int = 200, rate: float = 1000) -> dict[str, float]:
+    """Сверка режимов и стоимость живого и пакетного расчета."""
+    errors = check_parity(ticks)
+    live_us = _live_cost(ticks, pairs)
+    started = time.perf_counter()
+    compute_indicators(ticks)
+    batch_sec = time.perf_counter() - started
+    return {
+        "events": len(ticks),
+        "indicators": len(INDICATOR_FIELDS),
+        "max_parity_error": max(errors.values()),
+        "live_us_per_event": live_us,
+        # Доля одного ядра, которую займут индикаторы при заданном потоке
+        "live_cpu_percent": live_us * rate / 1e6 * 100,
+        "batch_ns_per_event": batch_sec / len(ticks) * 1e9,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", type=Path, help="Файл тиков (TICK_DTYPE)")
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=1000)
+    args = parser.parse_args()
+
+    if args.path is not None:
+        ticks = np.array(open_ticks(args.path))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ticks.bin"
+            generate_ticks(path, args.events, chunk=min(args.events, 500_000))
+            ticks = np.array(open_ticks(path))
+
+    for key, value in run(ticks, args.pairs, args.rate).items():
+        print(f"{key:>20}: {value:,.6g}")
+
+
+if __name__ == "__main__":
+    main()
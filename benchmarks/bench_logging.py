@@ -0,0 +1,82 @@
+"""
+Бенчмарк стоимости логирования на горячем пути (на один тик) в профилях dev и prod.
+
+На каждый тик цикл делает то же, что типичный код пары: одно DEBUG-сообщение
+с деталями тика и одно повторяющееся INFO-сообщение. В dev сообщения
+форматируются f-строкой (как в остальном коде), в prod — скобочными
+аргументами, которые не форматируются при выключенном уровне, а повторяющееся
+сообщение закрыто LogThrottle.
+
+    python -m benchmarks.bench_logging --ticks 200000
+"""
+
+import argparse
+import tempfile
+import time
+
+from loguru import logger
+
+from managers.loguru_manager import LogThrottle, setup_logger
+
+
+def _baseline(ticks: int) -> float:
+    started = time.perf_counter()
+    price = 100.0
+    for i in range(ticks):
+        price += 0.01 if i & 1 else -0.01
+    return time.perf_counter() - started
+
+
+def _dev_loop(ticks: int) -> float:
+    pair = "KASUSDT"
+    started = time.perf_counter()
+    price = 100.0
+    for i in range(ticks):
+        price += 0.01 if i & 1 else -0.01
+        logger.debug(f"{pair}: tick #{i} price={price:.2f}")
+        logger.info(f"{pair}: state updated")
+    return time.perf_counter() - started
+
+
+def _prod_loop(ticks: int) -> float:
+    pair = "KASUSDT"
+    throttle = LogThrottle(interval=1.0)
+    started = time.perf_counter()
+    price = 100.0
+    with logger.contextualize(pair=pair):
+        for i in range(ticks):
+            price += 0.01 if i & 1 else -0.01
+            logger.debug("{}: tick #{} price={:.2f}", pair, i, price)
+            if throttle.allow():
+                logger.info("{}: state updated (+{} skipped)", pair, throttle.skipped)
+    return time.perf_counter() - started
+
+
+def run(ticks: int = 200_000) -> dict[str, float]:
+    """Возвращает стоимость логирования на тик (мкс) в каждом профиле."""
+    baseline = _baseline(ticks)
+    results = {}
+    for profile, loop in (("dev", _dev_loop), ("prod", _prod_loop)):
+        with tempfile.TemporaryDirectory() as log_dir:
+            setup_logger("bench", profile=profile, log_dir=log_dir, console=False)
+            started = time.perf_counter()
+            elapsed = loop(ticks)
+            # remove() дожидается записи очереди приемников: полная стоимость
+            logger.remove()
+            total = time.perf_counter() - started
+        results[f"{profile}_call_us_per_tick"] = (elapsed - baseline) / ticks * 1e6
+        results[f"{profile}_total_us_per_tick"] = (total - baseline) / ticks * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticks", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for key, value in run(args.ticks).items():
+        print(f"{key:>24}: {value:,.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Микробенчмарки: настройка логгера (setup_logger) и сериализация перечислений
+и статусов пар — то, что выполняется на каждый запрос /api/status
+и на каждую рассылку потока статусов.
+
+    python -m benchmarks.bench_micro --pairs 200
+"""
+
+import argparse
+import json
+import tempfile
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from managers.loguru_manager import setup_logger
+from server.status_stream import StatusBroadcaster
+from shared.enums import BotStatus, NotificationPriority
+
+from .fakes import make_pairs
+
+
+def _time_us(function) -> float:
+    """Время одного вызова (мкс): лучший из трех замеров по ~0.2 с."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number * 1e6
+
+
+def _setup_logger_us(profile: str) -> float:
+    with tempfile.TemporaryDirectory() as log_dir:
+
+        def setup():
+            setup_logger("bench", profile=profile, log_dir=log_dir, console=False)
+
+        # setup_logger дорогой (создает приемники и потоки): небольшое число повторов
+        elapsed = min(timeit.Timer(setup).repeat(repeat=3, number=5)) / 5
+        logger.remove()
+    return elapsed * 1e6
+
+
+def run(pairs: int = 200) -> dict[str, float]:
+    """Возвращает время операций в микросекундах."""
+    symbols = make_pairs(pairs)
+    statuses = {
+        pair: BotStatus.RUNNING if i % 2 else BotStatus.STOPPED
+        for i, pair in enumerate(symbols)
+    }
+    raw_statuses = {pair: status.value for pair, status in statuses.items()}
+    broadcaster = StatusBroadcaster()
+    broadcaster.reset(statuses)
+
+    results = {
+        "setup_logger_dev_us": _setup_logger_us("dev"),
+        "setup_logger_prod_us": _setup_logger_us("prod"),
+        "enum_parse_us": _time_us(lambda: BotStatus("Running")),
+        "enum_value_us": _time_us(lambda: BotStatus.RUNNING.value),
+        "priority_rank_us": _time_us(lambda: NotificationPriority.LOW.rank),
+        # Путь ответа /api/status: jsonable_encoder + JSONResponse (как в FastAPI)
+        "status_response_us": _time_us(
+            lambda: JSONResponse(jsonable_encoder(statuses)).body
+        ),
+        "status_json_enum_us": _time_us(lambda: json.dumps(statuses)),
+        "status_json_str_us": _time_us(lambda: json.dumps(raw_statuses)),
+        "status_snapshot_us": _time_us(broadcaster.snapshot_message),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", type=int, default=200)
+    args = parser.parse_args()
+
+    for key, value in run(args.pairs).items():
+        print(f"{key:>24}: {value:,.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Микробенчмарк стакана: воспроизводит записанный поток diff-обновлений
+(<symbol>@depth биржи) и измеряет скорость их применения.
+
+Запись — файл JSON Lines, по одному сообщению потока на строку, первой строкой
+идет снапшот REST /depth. Если файла нет, его можно сгенерировать:
+
+    python -m benchmarks.bench_orderbook --generate depth.jsonl
+    python -m benchmarks.bench_orderbook depth.jsonl
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from managers.orderbook_manager import OrderBook, parse_depth_update
+
+
+def generate_recording(
+    path: Path, updates: int = 200_000, levels_per_update: int = 10, seed: int = 42
+):
+    """Генерирует синтетическую запись потока обновлений стакана со случайным блужданием цены."""
+    rng = random.Random(seed)
+    tick = 0.0001
+    mid = 0.15
+    with path.open("w") as f:
+        snapshot = {
+            "lastUpdateId": 1000,
+            "bids": [[f"{mid - tick * i:.4f}", "100"] for i in range(1, 1001)],
+            "asks": [[f"{mid + tick * i:.4f}", "100"] for i in range(1, 1001)],
+        }
+        f.write(json.dumps(snapshot) + "\n")
+
+        update_id = 1001
+        for _ in range(updates):
+            mid = max(tick * 100, mid + rng.choice((-tick, 0.0, 0.0, tick)))
+            bids, asks = [], []
+            for _ in range(levels_per_update):
+                offset = tick * int(rng.expovariate(0.1) + 1)
+                qty = "0" if rng.random() < 0.2 else f"{rng.uniform(1, 500):.2f}"
+                if rng.random() < 0.5:
+                    bids.append([f"{mid - offset:.4f}", qty])
+                else:
+                    asks.append([f"{mid + offset:.4f}", qty])
+            last_id = update_id + len(bids) + len(asks) - 1
+            message = {
+                "e": "depthUpdate",
+                "E": update_id,
+                "s": "KASUSDT",
+                "U": update_id,
+                "u": last_id,
+                "b": bids,
+                "a": asks,
+            }
+            f.write(json.dumps(message) + "\n")
+            update_id = last_id + 1
+
+
+def run(path: Path, max_levels: int = 1000) -> dict[str, float]:
+    """Воспроизводит запись и возвращает результаты замеров."""
+    with path.open() as f:
+        snapshot = json.loads(f.readline())
+        raw_messages = f.readlines()
+
+    started = time.perf_counter()
+    diffs = [parse_depth_update(json.loads(line)) for line in raw_messages]
+    parse_seconds = time.perf_counter() - started
+    level_updates = sum(len(d["bids"]) + len(d["asks"]) for d in diffs)
+
+    book = OrderBook("KASUSDT", max_levels=max_levels)
+    book.apply_snapshot(snapshot)
+    apply_diff = book.apply_diff
+    started = time.perf_counter()
+    for diff in diffs:
+        apply_diff(diff)
+    apply_seconds = time.perf_counter() - started
+
+    queries = 100_000
+    started = time.perf_counter()
+    for _ in range(queries):
+        book.best_bid()
+        book.best_ask()
+        book.spread()
+        book.vwap_for_size("BUY", 500.0)
+    query_seconds = time.perf_counter() - started
+
+    return {
+        "diffs": len(diffs),
+        "level_updates": level_updates,
+        "diffs_per_sec": len(diffs) / apply_seconds,
+        "level_updates_per_sec": level_updates / apply_seconds,
+        "parse_us_per_diff": parse_seconds / len(diffs) * 1e6,
+        "query_us": query_seconds / queries * 1e6,
+        "bid_levels": len(book.bids),
+        "ask_levels": len(book.asks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recording", type=Path, help="Файл с записью потока (JSONL)")
+    parser.add_argument(
+        "--generate", action="store_true", help="Сгенерировать синтетическую запись"
+    )
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--max-levels", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_recording(args.recording, updates=args.updates)
+        print(f"Recording written to {args.recording}")
+        return
+
+    results = run(args.recording, max_levels=args.max_levels)
+    for key, value in results.items():
+        print(f"{key:>24}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Синтетический драйвер тиков для событийных движков пар TradingBot.
+
+Запускает `--pairs` пар в режиме наблюдения (без ордеров) и подает им
+события через publish_market_event с суммарной частотой `--rate` событий
+в секунду, как это делает WebsocketManager. Измеряет достигнутую частоту,
+задержку от получения события до обработки циклом пары, схлопывание
+событий и задержку event loop. Логирование настраивается профилем prod,
+как в рабочих процессах.
+
+С `--misbehave` первая пара либо падает на каждом событии (crash), либо
+блокирует event loop на `--block-ms` (block); задержка считается только
+по остальным парам и показывает, насколько они страдают от соседа:
+
+    python -m benchmarks.bench_pair_engine --pairs 200 --rate 20000 --duration 10
+    python -m benchmarks.bench_pair_engine --misbehave block --block-ms 100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from loguru import logger
+
+from managers.loguru_manager import setup_logger
+from managers.metrics_manager import LOOP_LAG, HistogramChild, LoopMonitor
+from server.bot_logic import PAIR_EVENT_LATENCY, TradingBot
+from server.pair_engine import MarketEvent
+from server.supervisor import LoopWatchdog, TaskSupervisor
+from shared.enums import MarketEventType
+
+from .fakes import make_pairs
+
+# Период, с которым драйвер отдает пачку событий (как чтение из сокета)
+DRIVER_INTERVAL = 0.001
+
+
+def _merge(histograms: list[HistogramChild]) -> HistogramChild:
+    """Сводная гистограмма по нескольким дочерним метрикам."""
+    merged = HistogramChild()
+    for histogram in histograms:
+        merged.count += histogram.count
+        merged.sum += histogram.sum
+        merged.max = max(merged.max, histogram.max)
+        for index, count in enumerate(histogram.counts):
+            merged.counts[index] += count
+    return merged
+
+
+def _lag_snapshot() -> HistogramChild:
+    return _merge([LOOP_LAG.labels()])
+
+
+def _diff(after: HistogramChild, before: HistogramChild) -> HistogramChild:
+    """Измерения, добавленные между двумя снимками гистограммы."""
+    delta = HistogramChild()
+    delta.count = after.count - before.count
+    delta.sum = after.sum - before.sum
+    delta.max = after.max
+    delta.counts = [a - b for a, b in zip(after.counts, before.counts)]
+    return delta
+
+
+async def _drive(
+    bot: TradingBot, pairs: list[str], rate: float, duration: float, seed: int
+) -> int:
+    """Подает события пачками раз в DRIVER_INTERVAL; возвращает число событий."""
+    rng = random.Random(seed)
+    prices = {pair: 100.0 + i for i, pair in enumerate(pairs)}
+    publish = bot.publish_market_event
+    perf_counter = time.perf_counter
+    sent = 0
+    index = 0
+    started = perf_counter()
+    next_at = started
+    while (now := perf_counter()) - started < duration:
+        # Пачка на все время с прошлого шага: при отставании драйвер догоняет
+        count = int(rate * (now - started)) - sent
+        time_ms = int(time.time() * 1000)
+        for _ in range(count):
+            pair = pairs[index % len(pairs)]
+            index += 1
+            price = prices[pair] = prices[pair] * (1 + rng.choice((-1e-4, 0.0, 1e-4)))
+            if index & 1:
+                event = MarketEvent(
+                    MarketEventType.TICK, {"price": price, "qty": 1.0, "time": time_ms}
+                )
+            else:
+                event = MarketEvent(
+                    MarketEventType.BOOK,
+                    {
+                        "bid": price - 0.01,
+                        "bid_qty": 10.0,
+                        "ask": price + 0.01,
+                        "ask_qty": 10.0,
+                        "time": time_ms,
+                    },
+                )
+            publish(pair, event)
+        sent += count
+        next_at += DRIVER_INTERVAL
+        await asyncio.sleep(max(0.0, next_at - perf_counter()))
+    return sent
+
+
+def _misbehave(bot: TradingBot, pair: str, mode: str, block_ms: float):
+    """Подменяет обработку событий одной пары: падение или блокировка loop."""
+    process = bot._process_market_update
+
+    def crash(current: str, state):
+        if current == pair:
+            raise RuntimeError("injected failure")
+        process(current, state)
+
+    def block(current: str, state):
+        if current == pair:
+            time.sleep(block_ms / 1000)
+        process(current, state)
+
+    bot._process_market_update = crash if mode == "crash" else block
+
+
+async def run(
+    pairs: int = 200,
+    rate: float = 20_000,
+    duration: float = 5.0,
+    seed: int = 42,
+    misbehave: str = "none",
+    block_ms: float = 100.0,
+    block_limit: int = 3,
+) -> dict[str, float]:
+    """Запускает пары, подает события и возвращает замеры."""
+    with tempfile.TemporaryDirectory() as log_dir:
+        setup_logger("bench", profile="prod", log_dir=log_dir, console=False)
+        try:
+            return await _run(
+                pairs, rate, duration, seed, misbehave, block_ms, block_limit
+            )
+        finally:
+            logger.remove()
+
+
+async def _run(
+    pairs: int,
+    rate: float,
+    duration: float,
+    seed: int,
+    misbehave: str,
+    block_ms: float,
+    block_limit: int,
+) -> dict[str, float]:
+    symbols = make_pairs(pairs)
+    os.environ["TRADING_PAIRS"] = ",".join(symbols)
+    bot = TradingBot(
+        supervisor=TaskSupervisor(min_delay=0.1, max_delay=1.0, max_failures=0),
+        watchdog=LoopWatchdog(block_limit=block_limit),
+    )
+    for pair in symbols:
+        bot.start_for_pair(pair)
+    # Задержку считаем по парам, которые ведут себя нормально
+    healthy = symbols
+    if misbehave != "none":
+        _misbehave(bot, symbols[0], misbehave, block_ms)
+        healthy = symbols[1:]
+    monitor = LoopMonitor(interval=0.01)
+    monitor.start()
+    lag_before = _lag_snapshot()
+    latency_before = _merge([PAIR_EVENT_LATENCY.labels(pair) for pair in healthy])
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    sent = await _drive(bot, symbols, rate, duration, seed)
+    # Даем циклам пар разобрать оставшиеся события
+    await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    await monitor.stop()
+    lag = _diff(_lag_snapshot(), lag_before)
+    latency = _diff(
+        _merge([PAIR_EVENT_LATENCY.labels(pair) for pair in healthy]), latency_before
+    )
+    engines = bot.get_engine_stats()
+    supervised = bot.get_supervisor_stats()["pairs"]
+    for pair in symbols:
+        bot.stop_for_pair(pair)
+    await asyncio.sleep(0)
+
+    processed = sum(e["processed_events"] for e in engines.values())
+    iterations = sum(e["iterations"] for e in engines.values())
+    return {
+        "pairs": pairs,
+        "target_events_per_sec": rate,
+        "events_per_sec": sent / elapsed,
+        "processed_events": processed,
+        "dropped_events": sum(e["dropped_events"] for e in engines.values()),
+        "coalesced_ratio": 1 - iterations / processed if processed else 0.0,
+        "event_latency_p50_ms": latency.percentile(50) * 1000,
+        "event_latency_p99_ms": latency.percentile(99) * 1000,
+        "loop_lag_p99_ms": lag.percentile(99) * 1000,
+        "cpu_us_per_event": cpu / sent * 1e6 if sent else 0.0,
+        "restarts": sum(p["restarts"] for p in supervised.values()),
+        "loop_blocks": sum(p.get("blocks", 0) for p in supervised.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument(
+        "--rate", type=float, default=20_000, help="Событий в секунду на все пары"
+    )
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--misbehave", choices=("none", "crash", "block"), default="none"
+    )
+    parser.add_argument(
+        "--block-ms", type=float, default=100.0, help="Блокировка loop за итерацию"
+    )
+    parser.add_argument(
+        "--block-limit",
+        type=int,
+        default=3,
+        help="Блокировок подряд до остановки пары (0 — не останавливать)",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            args.pairs,
+            args.rate,
+            args.duration,
+            misbehave=args.misbehave,
+            block_ms=args.block_ms,
+            block_limit=args.block_limit,
+        )
+    )
+    for key, value in results.items():
+        print(f"{key:>24}: {value:,.3f}")
+
+
+if __name__ == "__main__":
+    main()
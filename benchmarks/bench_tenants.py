@@ -0,0 +1,160 @@
+"""
+Нагрузочный тест многопользовательского режима (server.tenants).
+
+Подключает `--users` пользователей по `--pairs-per-user` пар к общим
+движкам `--symbols` символов и измеряет:
+
+- память на простаивающего пользователя (без позиций и ордеров) — прирост
+  по tracemalloc при добавлении пользователей к уже работающим символам,
+  включая разбор конфигурации;
+- время загрузки и горячей перезагрузки конфигурации;
+- стоимость обработки одного обновления рынка в пересчете на пользователя.
+
+Бюджет памяти IDLE_USER_MEMORY_BUDGET проверяет tests/unit/test_tenants.py;
+здесь память измеряется на большем числе пользователей и сравнивается
+с базовым прогоном benchmarks.suite.
+
+    python -m benchmarks.bench_tenants --users 10000 --symbols 50
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from loguru import logger
+
+from managers.loguru_manager import setup_logger
+from server.bot_logic import TradingBot
+from server.pair_engine import PairMarketState
+from server.tenants import IDLE_USER_MEMORY_BUDGET, IDLE_USER_PAIRS, TenantManager
+
+from .fakes import make_pairs
+
+# Пользователей на одном символе для замера обработки обновления рынка
+FANOUT_USERS = 1000
+
+
+def _users(
+    start: int, count: int, symbols: list[str], pairs_per_user: int
+) -> dict[str, dict]:
+    """Конфигурация пользователей user{start}..: пары по кругу, три набора параметров."""
+    return {
+        f"user{i}": {
+            "pairs": [
+                symbols[(i * 7 + k * 13) % len(symbols)] for k in range(pairs_per_user)
+            ],
+            "params": {"entry_bps": 5 + i % 3},
+        }
+        for i in range(start, start + count)
+    }
+
+
+def _idle_user_bytes(
+    tenants: TenantManager, users: dict[str, dict], extra: dict[str, dict]
+) -> float:
+    """Прирост памяти на пользователя при добавлении `extra` к `users`."""
+    raw = json.dumps({**users, **extra})
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tenants.apply(tenants.parse(json.loads(raw)))
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(extra)
+
+
+def _fanout_ns_per_user(bot: TradingBot, users: int, repeat: int = 200) -> float:
+    """Время обработки обновления рынка символом с `users` пользователями."""
+    pair = "FANOUTUSDT"
+    for i in range(users):
+        bot.set_strategy(pair, f"fanout{i}", bot.strategy_params)
+    state = PairMarketState(pair)
+    state.apply_book(100.0, 1.0, 100.01, 1.0, 0)
+    # Постоянная цена: стратегии обновляют EMA, но не выставляют ордера
+    started = time.perf_counter()
+    for _ in range(repeat):
+        bot._process_market_update(pair, state)
+    elapsed = time.perf_counter() - started
+    for i in range(users):
+        bot.remove_strategy(pair, f"fanout{i}")
+    return elapsed / repeat / users * 1e9
+
+
+async def run(
+    users: int = 10_000, symbols: int = 50, pairs_per_user: int = IDLE_USER_PAIRS
+) -> dict[str, float]:
+    """Подключает пользователей к боту в режиме наблюдения и возвращает замеры."""
+    with tempfile.TemporaryDirectory() as log_dir:
+        setup_logger("bench", profile="prod", log_dir=log_dir, console=False)
+        try:
+            return await _run(users, symbols, pairs_per_user)
+        finally:
+            logger.remove()
+
+
+async def _run(users: int, symbols: int, pairs_per_user: int) -> dict[str, float]:
+    names = make_pairs(symbols)
+    os.environ["TRADING_PAIRS"] = names[0]
+    bot = TradingBot()
+    tenants = TenantManager(bot)
+
+    # Первая половина пользователей запускает символы, вторая — простаивающие
+    # пользователи на уже работающих символах, по ним считается память
+    half = users // 2
+    config = _users(0, half, names, pairs_per_user)
+    started = time.perf_counter()
+    tenants.apply(tenants.parse(config))
+    load = time.perf_counter() - started
+    extra = _users(half, users - half, names, pairs_per_user)
+    idle_bytes = _idle_user_bytes(tenants, config, extra)
+    config.update(extra)
+
+    # Горячая перезагрузка: у 10% пользователей меняются параметры
+    for i, user in enumerate(config.values()):
+        if i % 10 == 0:
+            user["params"] = {"ema_period": 50}
+    started = time.perf_counter()
+    changes = tenants.apply(tenants.parse(config))
+    reload = time.perf_counter() - started
+
+    fanout = _fanout_ns_per_user(bot, FANOUT_USERS)
+    stats = tenants.get_stats()
+    tenants.apply({})
+    await asyncio.sleep(0)
+
+    return {
+        "users": stats["users"],
+        "symbols": stats["symbols"],
+        "strategies": stats["strategies"],
+        "param_sets": stats["param_sets"],
+        "idle_user_bytes": idle_bytes,
+        "target_idle_user_bytes": IDLE_USER_MEMORY_BUDGET,
+        "load_us_per_user": load / half * 1e6,
+        "reload_ms": reload * 1000,
+        "reload_updated": changes["updated"],
+        "fanout_ns_per_user": fanout,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--pairs-per-user", type=int, default=IDLE_USER_PAIRS)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.users, args.symbols, args.pairs_per_user))
+    for key, value in results.items():
+        print(f"{key:>24}: {value:,.3f}")
+
+
+if __name__ == "__main__":
+    main()
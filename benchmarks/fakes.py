@@ -0,0 +1,426 @@
+"""
+Локальные заменители внешних сервисов для бенчмарков: биржа (REST и WebSocket),
+Redis и PostgreSQL. С ними нагрузочные тесты запускаются offline на одной машине.
+
+- FakeExchange — состояние биржи в памяти и обработчик запросов Binance Spot,
+  которые делает ExchangeClient (подключается через транспорт httpx).
+- FakeMarketStream — WebSocket-сервер combined streams: принимает SUBSCRIBE
+  и рассылает синтетические сделки, лучшие цены и обновления стакана.
+- Redis — fakeredis в памяти процесса (RedisManager принимает готовый клиент).
+- FakeDatabase — DatabaseManager без PostgreSQL: строки копятся в памяти.
+
+Сервер API с заменителями запускается отдельным процессом (его использует
+benchmarks.bench_api_load):
+
+    python -m benchmarks.fakes --port 8765 --pairs 50 --rate 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any
+from urllib.parse import parse_qs
+
+import httpx
+import websockets
+
+import managers.database_manager as database_manager
+import managers.exchange_manager as exchange_manager
+import managers.redis_manager as redis_manager
+
+
+def make_pairs(count: int) -> list[str]:
+    """Синтетические символы пар: PAIR000USDT, PAIR001USDT, ..."""
+    return [f"PAIR{i:03d}USDT" for i in range(count)]
+
+
+class FakeExchange:
+    """
+    Биржа в памяти: цены пар (случайное блуждание), ордера и сделки аккаунта.
+    MARKET-ордера исполняются сразу, LIMIT остаются открытыми до отмены.
+    """
+
+    def __init__(self, pairs: list[str], seed: int = 42):
+        self._rng = random.Random(seed)
+        self.prices = {pair: 100.0 + i for i, pair in enumerate(pairs)}
+        # Последний ID обновления стакана пары (общий для REST-снапшота и потока)
+        self.update_ids = dict.fromkeys(pairs, 1000)
+        self.orders: dict[int, dict[str, Any]] = {}
+        self.trades: list[dict[str, Any]] = []
+        self._next_order_id = 1
+        self.requests = 0
+
+    def step(self, pair: str) -> float:
+        """Сдвигает цену пары на один тик и возвращает ее."""
+        price = self.prices[pair] * (1 + self._rng.choice((-1e-4, 0.0, 1e-4)))
+        self.prices[pair] = price
+        return price
+
+    # --- REST ---
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Обработчик httpx.MockTransport в формате ответов Binance Spot."""
+        self.requests += 1
+        params = {k: v[0] for k, v in parse_qs(request.url.query.decode()).items()}
+        route = (request.method, request.url.path)
+        handler = self._routes.get(route)
+        if handler is None:
+            return httpx.Response(404, json={"code": -1, "msg": "Unknown endpoint."})
+        status, body = handler(self, params)
+        return httpx.Response(status, json=body)
+
+    def _exchange_info(self, params):
+        symbols = [
+            {
+                "symbol": pair,
+                "status": "TRADING",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": "0.00010000"},
+                    {"filterType": "LOT_SIZE", "stepSize": "0.00100000"},
+                ],
+            }
+            for pair in self.prices
+            if params.get("symbol", pair) == pair
+        ]
+        return 200, {"symbols": symbols}
+
+    def _depth(self, params):
+        pair = params["symbol"]
+        mid = self.prices[pair]
+        levels = min(int(params.get("limit", 100)), 100)
+        return 200, {
+            "lastUpdateId": self.update_ids[pair],
+            "bids": [[f"{mid - 0.01 * i:.4f}", "10"] for i in range(1, levels + 1)],
+            "asks": [[f"{mid + 0.01 * i:.4f}", "10"] for i in range(1, levels + 1)],
+        }
+
+    def _ticker(self, params):
+        pair = params["symbol"]
+        return 200, {"symbol": pair, "price": f"{self.prices[pair]:.4f}"}
+
+    def _account(self, params):
+        return 200, {"balances": [{"asset": "USDT", "free": "100000", "locked": "0"}]}
+
+    def _place_order(self, params):
+        pair = params["symbol"]
+        order_id = self._next_order_id
+        self._next_order_id += 1
+        qty = params["quantity"]
+        order = {
+            "symbol": pair,
+            "orderId": order_id,
+            "clientOrderId": params.get("newClientOrderId", f"fake-{order_id}"),
+            "side": params["side"],
+            "type": params["type"],
+            "origQty": qty,
+            "price": params.get("price", "0"),
+            "status": "NEW",
+            "executedQty": "0",
+            "cummulativeQuoteQty": "0",
+        }
+        if params["type"] == "MARKET":
+            price = self.prices[pair]
+            order.update(
+                status="FILLED",
+                executedQty=qty,
+                cummulativeQuoteQty=f"{float(qty) * price:f}",
+            )
+            self.trades.append(
+                {
+                    "symbol": pair,
+                    "id": len(self.trades) + 1,
+                    "orderId": order_id,
+                    "price": f"{price:f}",
+                    "qty": qty,
+                    "quoteQty": order["cummulativeQuoteQty"],
+                    "commission": "0",
+                    "commissionAsset": "BNB",
+                    "time": int(time.time() * 1000),
+                }
+            )
+        self.orders[order_id] = order
+        return 200, {"symbol": pair, "orderId": order_id}
+
+    def _find_order(self, params) -> dict[str, Any] | None:
+        if "orderId" in params:
+            return self.orders.get(int(params["orderId"]))
+        client_order_id = params.get("origClientOrderId")
+        for order in self.orders.values():
+            if order["clientOrderId"] == client_order_id:
+                return order
+        return None
+
+    def _get_order(self, params):
+        order = self._find_order(params)
+        if order is None:
+            return 400, {"code": -2013, "msg": "Order does not exist."}
+        return 200, order
+
+    def _cancel_order(self, params):
+        order = self._find_order(params)
+        if order is None or order["status"] not in ("NEW", "PARTIALLY_FILLED"):
+            return 400, {"code": -2011, "msg": "Unknown order sent."}
+        order["status"] = "CANCELED"
+        return 200, {**order, "origClientOrderId": order["clientOrderId"]}
+
+    def _open_orders(self, params):
+        symbol = params.get("symbol")
+        return 200, [
+            order
+            for order in self.orders.values()
+            if order["status"] in ("NEW", "PARTIALLY_FILLED")
+            and (symbol is None or order["symbol"] == symbol)
+        ]
+
+    def _cancel_open_orders(self, params):
+        _, orders = self._open_orders(params)
+        for order in orders:
+            order["status"] = "CANCELED"
+        return 200, [{**o, "origClientOrderId": o["clientOrderId"]} for o in orders]
+
+    def _my_trades(self, params):
+        from_id = int(params.get("fromId", 0))
+        trades = [
+            t
+            for t in self.trades
+            if t["symbol"] == params["symbol"] and t["id"] >= from_id
+        ]
+        return 200, trades[: int(params.get("limit", 500))]
+
+    def _listen_key(self, params):
+        return 200, {"listenKey": "fake-listen-key"}
+
+    _routes = {
+        ("GET", "/api/v3/exchangeInfo"): _exchange_info,
+        ("GET", "/api/v3/depth"): _depth,
+        ("GET", "/api/v3/ticker/price"): _ticker,
+        ("GET", "/api/v3/account"): _account,
+        ("POST", "/api/v3/order"): _place_order,
+        ("GET", "/api/v3/order"): _get_order,
+        ("DELETE", "/api/v3/order"): _cancel_order,
+        ("GET", "/api/v3/openOrders"): _open_orders,
+        ("DELETE", "/api/v3/openOrders"): _cancel_open_orders,
+        ("GET", "/api/v3/myTrades"): _my_trades,
+        ("POST", "/api/v3/userDataStream"): _listen_key,
+        ("PUT", "/api/v3/userDataStream"): _listen_key,
+    }
+
+
+class FakeMarketStream:
+    """
+    WebSocket-сервер в формате combined streams Binance. Каждому соединению
+    рассылаются события подписанных потоков: `rate` событий в секунду на пару
+    (сделки, лучшие цены и обновления стакана по очереди).
+    """
+
+    # Период рассылки пачек событий, в секундах
+    TICK_INTERVAL = 0.01
+
+    def __init__(self, exchange: FakeExchange, rate: float = 10.0):
+        self.exchange = exchange
+        self.rate = rate
+        self.messages_sent = 0
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запускает сервер и возвращает его адрес для EXCHANGE_WS_URL."""
+        self._server = await websockets.serve(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://{host}:{port}/stream"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        streams: set[str] = set()
+        sender = asyncio.create_task(self._send_events(ws, streams))
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                if request.get("method") == "SUBSCRIBE":
+                    streams.update(request["params"])
+                elif request.get("method") == "UNSUBSCRIBE":
+                    streams.difference_update(request["params"])
+                await ws.send(json.dumps({"result": None, "id": request.get("id")}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+
+    async def _send_events(self, ws, streams: set[str]):
+        per_tick = self.rate * self.TICK_INTERVAL
+        credit = 0.0
+        channels = ("trade", "bookTicker", "depth@100ms")
+        counter = 0
+        while True:
+            await asyncio.sleep(self.TICK_INTERVAL)
+            credit += per_tick
+            count, credit = int(credit), credit - int(credit)
+            pairs = {stream.split("@", 1)[0].upper() for stream in streams}
+            pairs &= self.exchange.prices.keys()
+            messages = []
+            for pair in pairs:
+                for _ in range(count):
+                    channel = channels[counter % len(channels)]
+                    counter += 1
+                    stream = f"{pair.lower()}@{channel}"
+                    if stream in streams:
+                        messages.append(self._event(pair, channel, stream))
+            try:
+                for message in messages:
+                    await ws.send(message)
+            except websockets.ConnectionClosed:
+                return
+            self.messages_sent += len(messages)
+
+    def _event(self, pair: str, channel: str, stream: str) -> str:
+        price = self.exchange.step(pair)
+        now = int(time.time() * 1000)
+        if channel == "trade":
+            data = {"e": "trade", "s": pair, "p": f"{price:.4f}", "q": "1.0", "T": now}
+        elif channel == "bookTicker":
+            data = {
+                "s": pair,
+                "b": f"{price - 0.01:.4f}",
+                "B": "10",
+                "a": f"{price + 0.01:.4f}",
+                "A": "10",
+            }
+        else:
+            first = self.exchange.update_ids[pair] + 1
+            self.exchange.update_ids[pair] = first + 1
+            data = {
+                "e": "depthUpdate",
+                "E": now,
+                "s": pair,
+                "U": first,
+                "u": first + 1,
+                "b": [[f"{price - 0.01:.4f}", "12"]],
+                "a": [[f"{price + 0.01:.4f}", "8"]],
+            }
+        return json.dumps({"stream": stream, "data": data})
+
+
+class FakeDatabase(database_manager.DatabaseManager):
+    """DatabaseManager без PostgreSQL: исполнения и сделки копятся в памяти."""
+
+    async def start(self):
+        self.fills = _MemoryBuffer("fills", database_manager.FILL_COLUMNS)
+        self.deals = _MemoryBuffer("deals", database_manager.DEAL_COLUMNS)
+
+    async def close(self):
+        pass
+
+    async def init_schema(self):
+        pass
+
+    async def get_deal_history(self, user_id: str, limit: int = 50, cursor=None):
+        rows = [dict(zip(self.deals.columns, row)) for row in self.deals.rows]
+        rows = [row for row in rows if row["user_id"] == user_id]
+        return rows[:limit], None
+
+
+class _MemoryBuffer:
+    """Заменитель CopyBuffer: те же методы записи и метрики, строки в списке."""
+
+    def __init__(self, table: str, columns: tuple[str, ...]):
+        self.table = table
+        self.columns = columns
+        self.rows: list[tuple] = []
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.rows_dropped = 0
+
+    async def add(self, row: tuple):
+        self.rows.append(row)
+
+    def add_nowait(self, row: tuple):
+        self.rows.append(row)
+
+    async def close(self):
+        pass
+
+    @property
+    def rows_written(self) -> int:
+        return len(self.rows)
+
+    @property
+    def pending_rows(self) -> int:
+        return 0
+
+
+def install_stand_ins(exchange: FakeExchange):
+    """
+    Подменяет классы менеджеров, которые сервер импортирует при инициализации:
+    REST-клиент биржи ходит в FakeExchange, Redis — fakeredis, база — FakeDatabase.
+    Вызывается до старта сервера API в процессе бенчмарка.
+    """
+    import fakeredis
+
+    redis_server = fakeredis.FakeServer()
+    transport = httpx.MockTransport(exchange.handle)
+
+    class LocalExchangeClient(exchange_manager.ExchangeClient):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("transport", transport)
+            super().__init__(*args, **kwargs)
+
+    class LocalRedisManager(redis_manager.RedisManager):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault(
+                "client",
+                fakeredis.FakeAsyncRedis(server=redis_server, decode_responses=True),
+            )
+            super().__init__(*args, **kwargs)
+
+    exchange_manager.ExchangeClient = LocalExchangeClient
+    redis_manager.RedisManager = LocalRedisManager
+    database_manager.DatabaseManager = FakeDatabase
+
+
+async def serve_api(
+    port: int, pairs: int = 50, rate: float = 20.0, host: str = "127.0.0.1"
+):
+    """Запускает сервер API (server.run_bot) с заменителями внешних сервисов."""
+    import uvicorn
+
+    exchange = FakeExchange(make_pairs(pairs))
+    stream = FakeMarketStream(exchange, rate)
+    os.environ.update(
+        EXCHANGE_WS_URL=await stream.start(host),
+        TRADING_PAIRS=",".join(exchange.prices),
+        REDIS_URL="redis://stand-in",
+        DB_URL="postgresql://stand-in",
+        LOG_PROFILE=os.getenv("LOG_PROFILE", "prod"),
+    )
+    install_stand_ins(exchange)
+
+    from server.run_bot import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on")
+    )
+    try:
+        await server.serve()
+    finally:
+        await stream.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument(
+        "--rate", type=float, default=20.0, help="Событий в секунду на пару"
+    )
+    args = parser.parse_args()
+    asyncio.run(serve_api(args.port, args.pairs, args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Набор бенчмарков производительности с сохранением результатов в JSON
+и проверкой регрессий относительно базового прогона.
+
+Все бенчмарки работают offline на одной машине: внешние сервисы заменены
+локальными (benchmarks.fakes), входные данные генерируются с фиксированным seed.
+С `--baseline` результаты сравниваются с сохраненными, и при ухудшении
+любой метрики сверх порога набор завершается с кодом 1:
+
+    python -m benchmarks.suite --save bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+    python -m benchmarks.suite micro pair_engine --quick
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import (
+    bench_api_load,
+    bench_indicators,
+    bench_logging,
+    bench_micro,
+    bench_orderbook,
+    bench_pair_engine,
+    bench_tenants,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Единицы, для которых меньшее значение лучше (часть имени метрики: p99_ms, cpu_us_per_event)
+_LOWER_IS_BETTER = {"ns", "us", "ms", "seconds", "percent", "bytes"}
+
+
+def _orderbook(quick: bool) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "depth.jsonl"
+        bench_orderbook.generate_recording(path, updates=20_000 if quick else 200_000)
+        return bench_orderbook.run(path)
+
+
+def _indicators(quick: bool) -> dict[str, float]:
+    import numpy as np
+
+    from server.backtest import open_ticks
+
+    events = 100_000 if quick else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ticks.bin"
+        bench_indicators.generate_ticks(path, events, chunk=events)
+        ticks = np.array(open_ticks(path))
+    return bench_indicators.run(ticks)
+
+
+BENCHMARKS: dict[str, Callable[[bool], dict[str, float]]] = {
+    "micro": lambda quick: bench_micro.run(),
+    "logging": lambda quick: bench_logging.run(50_000 if quick else 200_000),
+    "orderbook": _orderbook,
+    "indicators": _indicators,
+    "pair_engine": lambda quick: asyncio.run(
+        bench_pair_engine.run(duration=2.0 if quick else 10.0)
+    ),
+    "api_load": lambda quick: asyncio.run(
+        bench_api_load.run(
+            clients=200 if quick else 2000, duration=5.0 if quick else 20.0
+        )
+    ),
+    "tenants": lambda quick: asyncio.run(
+        bench_tenants.run(users=2000 if quick else 10_000)
+    ),
+}
+
+
+def metric_direction(name: str) -> int:
+    """
+    1 — чем больше, тем лучше (…_per_sec), -1 — чем меньше, тем лучше
+    (время, доля CPU), 0 — метрика не сравнивается (счетчики, параметры).
+    """
+    tokens = name.split("_")
+    if name.startswith("target_"):
+        return 0
+    if "per" in tokens and tokens[-1] == "sec":
+        return 1
+    if _LOWER_IS_BETTER.intersection(tokens):
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Возвращает описания метрик, ухудшившихся сильнее порога."""
+    regressions = []
+    for bench, metrics in results["results"].items():
+        before_metrics = baseline.get("results", {}).get(bench, {})
+        for name, after in metrics.items():
+            before = before_metrics.get(name)
+            direction = metric_direction(name)
+            if before is None or not direction or before <= 0:
+                continue
+            change = (after - before) / before * direction
+            if change < -threshold:
+                regressions.append(
+                    f"{bench}.{name}: {before:,.4g} -> {after:,.4g} "
+                    f"({change * 100:+.0f}%)"
+                )
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=PROJECT_ROOT,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run(names: list[str], quick: bool = False) -> dict:
+    """Выполняет бенчмарки по очереди и возвращает результаты с описанием среды."""
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        started = time.perf_counter()
+        results[name] = BENCHMARKS[name](quick)
+        print(f"  done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"Бенчмарки (по умолчанию все): {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument("--quick", action="store_true", help="Уменьшенные объемы")
+    parser.add_argument("--save", help="Сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Допустимое ухудшение (0.2 = 20%%)"
+    )
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.benchmarks or list(BENCHMARKS), args.quick)
+    for bench, metrics in results["results"].items():
+        print(f"\n{bench}:")
+        for key, value in metrics.items():
+            print(f"  {key:>28}: {value:,.4g}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("meta", {}).get("quick") != args.quick:
+            print("\nWarning: baseline was run with a different --quick setting.")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nPerformance regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            raise SystemExit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
 """
 Основной файл клиентского GUI-приложения на Kivy.
+
+Список пар построен на RecycleView: виджеты создаются только для видимых строк
+и переиспользуются при прокрутке, поэтому сотни пар не нагружают UI-поток.
+Обновления статусов и цен копятся и применяются один раз за кадр (Clock trigger),
+причем меняются только поля, значения которых действительно изменились.
+
+До первого кадра импортируется только Kivy/KivyMD. Сетевые библиотеки (httpx,
+websockets) и настройка логгера загружаются после отрисовки окна, причем
+импорт идет в отдельном потоке, чтобы не задерживать кадры.
 """
 
 import asyncio
+import importlib
+import json
+import random
+
 from kivy.utils import platform
 
 from kivy.config import Config
@@ -13,23 +26,40 @@ if platform in ("win", "linux", "macosx"):
     Config.set("graphics", "width", "1024")
     Config.set("graphics", "height", "720")
 
-import httpx
 from kivy.clock import Clock, mainthread
 from kivy.lang import Builder
-from kivy.properties import StringProperty
+from kivy.properties import BooleanProperty, StringProperty
+from kivy.uix.recycleview import RecycleView
 from loguru import logger
 from kivymd.app import MDApp
 from kivymd.uix.boxlayout import MDBoxLayout
-
-# Импорт и настройка нашего логгера
-from managers.loguru_manager import setup_logger
 from shared.enums import BotStatus
 
+# Модули, импорт которых откладывается до первого кадра
+DEFERRED_IMPORTS = ("httpx", "websockets", "managers.loguru_manager")
+# Статусы, при которых пару можно остановить (перезапуск после падения — тоже работа)
+ACTIVE_STATUSES = (BotStatus.RUNNING, BotStatus.RESTARTING)
+
 
 class PairWidget(MDBoxLayout):
-    """Виджет для управления одной торговой парой. Его вид описан в .kv файле."""
+    """
+    Строка списка для управления одной торговой парой. Его вид описан в .kv файле.
+    Экземпляры переиспользуются RecycleView: состояние строки целиком задается
+    свойствами из словаря данных списка.
+    """
 
     pair_symbol = StringProperty("")
+    status = StringProperty(BotStatus.UNKNOWN.value)
+    price = StringProperty("")
+    is_running = BooleanProperty(False)
+
+
+class PairList(RecycleView):
+    """Виртуализированный список пар (строки PairWidget)."""
+
+    def visible_pairs(self) -> set[str]:
+        """Пары строк, которые сейчас отрисованы на экране."""
+        return {self.data[index]["pair_symbol"] for index in self.view_adapter.views}
 
 
 class MainWidget(MDBoxLayout):
@@ -48,7 +78,23 @@ class ScalpEXApp(MDApp):
         """Инициализирует приложение и задает URL сервера."""
         super().__init__(**kwargs)
         self.server_url = "http://127.0.0.1:8000"
-        self.http_client = httpx.AsyncClient(timeout=5)
+        self.stream_url = "ws://127.0.0.1:8000/ws/status"
+        # Создается после первого кадра (см. start_async_tasks)
+        self.http_client = None
+        # Состояние push-потока статусов
+        self._stream_connected = False
+        self._stream_epoch: str | None = None
+        self._stream_version: int | None = None
+        self._statuses: dict[str, str] = {}
+        self._stream_ws = None
+        # Индекс строки списка по паре
+        self._rows: dict[str, int] = {}
+        # Изменения строк, накопленные до следующего кадра: пара -> поля
+        self._pending_rows: dict[str, dict] = {}
+        self._apply_rows_trigger = Clock.create_trigger(self._apply_pending_rows)
+        # Пары, цены которых запрошены у сервера (видимые строки)
+        self._watched: set[str] = set()
+        self._watch_trigger = Clock.create_trigger(self._update_watch, 0.25)
 
     def build(self):
         """Стандартный метод Kivy для создания корневого виджета приложения."""
@@ -69,7 +115,6 @@ class ScalpEXApp(MDApp):
         Вызывается один раз при старте приложения.
         Этот метод НЕ вызывается при горячей перезагрузке.
         """
-        self.pair_widgets = {}
         # Используем Clock.schedule_once, чтобы гарантировать, что виджеты будут
         # созданы и доступны в self.root.ids перед тем, как мы к ним обратимся.
         # Это каноничный способ решения "гонки состояний" в Kivy.
@@ -82,14 +127,37 @@ class ScalpEXApp(MDApp):
         # Теперь, когда GUI готов, мы можем безопасно запускать задачи,
         # которые будут с ним взаимодействовать.
         self.update_status("Подключение к серверу...")
+        asyncio.create_task(self._start_background())
+
+    async def _start_background(self):
+        """Загружает отложенные модули в отдельном потоке и запускает фоновые задачи."""
+        for module in DEFERRED_IMPORTS:
+            await asyncio.to_thread(importlib.import_module, module)
+        # Модули уже загружены: импорт ниже лишь берет их из sys.modules
+        import httpx
+        from managers.loguru_manager import setup_logger
+
+        # Логгер настраивается только здесь, в основном процессе приложения.
+        # Дочерние процессы (созданные Loguru с enqueue=True) не запускают
+        # приложение и не инициализируют логгер повторно, что предотвращает deadlock.
+        setup_logger("client")
+        self.http_client = httpx.AsyncClient(timeout=5)
         asyncio.create_task(self.fetch_pairs())
+        asyncio.create_task(self.status_stream_loop())
         asyncio.create_task(self.status_update_loop())
 
     async def fetch_pairs(self):
         """Запрашивает список доступных пар с сервера и строит для них виджеты."""
+        import httpx
+
         self.update_status("Загрузка списка торговых пар...")
         try:
             response = await self.http_client.get(f"{self.server_url}/api/pairs")
+            # Сервер принимает соединения раньше, чем готов: ждем готовности
+            while response.status_code == 503:
+                self.update_status("Сервер запускается...")
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                response = await self.http_client.get(f"{self.server_url}/api/pairs")
             response.raise_for_status()  # Вызовет исключение для кодов 4xx/5xx
             if response.status_code == 200:
                 pairs = response.json().get("pairs", [])
@@ -102,34 +170,113 @@ class ScalpEXApp(MDApp):
 
     @mainthread
     def build_pair_widgets(self, pairs: list[str]):
-        """Создает и добавляет виджеты для каждой пары в GUI."""
+        """Заполняет список пар. Виджеты строк RecycleView создает сам."""
         # Используем self.root, так как KivyMD Hot Reload может менять его
-        layout = self.root.ids.pairs_layout
-        if not layout:
-            logger.error("Cannot build pair widgets, 'pairs_layout' not found in root.")
+        pair_list = self.root.ids.pairs_list
+        if not pair_list:
+            logger.error("Cannot build pair widgets, 'pairs_list' not found in root.")
             return
 
-        layout.clear_widgets()
-        self.pair_widgets.clear()
-
-        for pair in pairs:
-            widget = PairWidget(pair_symbol=pair)
-            self.pair_widgets[pair] = widget
-            layout.add_widget(widget)
+        self._rows = {pair: index for index, pair in enumerate(pairs)}
+        self._pending_rows.clear()
+        pair_list.data = [
+            {
+                "pair_symbol": pair,
+                "status": self._statuses.get(pair, BotStatus.UNKNOWN.value),
+                "price": "",
+                "is_running": self._statuses.get(pair) in ACTIVE_STATUSES,
+            }
+            for pair in pairs
+        ]
+        pair_list.bind(scroll_y=self._watch_trigger, height=self._watch_trigger)
+        self._watch_trigger()
 
         if pairs:
             self.update_status("Пары загружены. Готов к работе.")
         else:
             self.update_status("Не удалось загрузить пары. Проверьте сервер.")
 
+    async def status_stream_loop(self):
+        """
+        Поддерживает WebSocket-подписку на статусы с сервера.
+        После обрыва переподключается с задержкой и продолжает поток с последней версии.
+        """
+        import websockets
+
+        delay = 1.0
+        while True:
+            url = self.stream_url
+            if self._stream_epoch is not None:
+                url += f"?since={self._stream_version}&epoch={self._stream_epoch}"
+            try:
+                async with websockets.connect(url, ping_interval=20) as ws:
+                    self._stream_connected = True
+                    self._stream_ws = ws
+                    delay = 1.0
+                    logger.info("Status stream connected.")
+                    # Новое соединение не знает видимых пар: сообщаем их заново
+                    self._watched = set()
+                    self._watch_trigger()
+                    async for raw in ws:
+                        try:
+                            applied = self._apply_stream_message(json.loads(raw))
+                        except (ValueError, KeyError, TypeError) as e:
+                            # Битый кадр пропускаем: если это была дельта, разрыв
+                            # версий обнаружится на следующей и поток переоткроется
+                            logger.warning(f"Malformed status stream frame: {e!r}")
+                            continue
+                        if not applied:
+                            # Пропущены дельты: переподключаемся для их получения
+                            break
+            except (OSError, websockets.WebSocketException) as e:
+                logger.warning(f"Status stream unavailable: {e!r}")
+            self._stream_connected = False
+            self._stream_ws = None
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, 30.0)
+
+    def _apply_stream_message(self, message: dict) -> bool:
+        """
+        Применяет сообщение потока статусов.
+        Возвращает False, если обнаружен разрыв версий и поток нужно переоткрыть.
+        """
+        message_type = message.get("type")
+        if message_type == "snapshot":
+            self._stream_epoch = message["epoch"]
+            self._statuses = dict(message["statuses"])
+        elif message_type == "delta":
+            if message["version"] != self._stream_version + 1:
+                return False
+            self._statuses.update(message["changes"])
+        elif message_type == "heartbeat":
+            return message["version"] == self._stream_version
+        elif message_type == "notification":
+            self.update_status(message["text"])
+            return True
+        elif message_type == "prices":
+            for pair, price in message["prices"].items():
+                self._queue_row_update(pair, price=f"{price:.8g}")
+            return True
+        else:
+            return True
+        self._stream_version = message["version"]
+        self.update_pair_statuses(dict(self._statuses))
+        return True
+
     async def status_update_loop(self):
-        """Бесконечный цикл для периодического обновления статусов."""
+        """
+        Резервный цикл опроса статусов. Работает только тогда,
+        когда push-поток статусов недоступен.
+        """
         while True:
-            await self.fetch_status()
+            if not self._stream_connected:
+                await self.fetch_status()
             await asyncio.sleep(3)  # Пауза между запросами
 
     async def fetch_status(self):
         """Запрашивает и обновляет статус всех пар с сервера."""
+        import httpx
+
         try:
             response = await self.http_client.get(
                 f"{self.server_url}/api/status", timeout=2
@@ -142,25 +289,67 @@ class ScalpEXApp(MDApp):
             self.update_pair_statuses({})
             logger.warning("Could not fetch status, server unavailable.")
 
-    @mainthread
     def update_pair_statuses(self, statuses: dict[str, str]):
-        """Обновляет статусы виджетов пар."""
-        for pair, widget in self.pair_widgets.items():
-            status_text = statuses.get(pair, BotStatus.UNKNOWN)
-            widget.ids.pair_status_label.text = status_text
+        """Ставит в очередь кадра новые статусы пар (цвет и кнопки задает .kv)."""
+        for pair in self._rows:
+            status_text = statuses.get(pair, BotStatus.UNKNOWN.value)
+            status_text = getattr(status_text, "value", status_text)
+            self._queue_row_update(
+                pair,
+                status=status_text,
+                is_running=status_text in ACTIVE_STATUSES,
+            )
 
-            is_running = status_text == BotStatus.RUNNING
+    def _queue_row_update(self, pair: str, **fields):
+        """Запоминает изменения строки; все изменения применяются в следующем кадре."""
+        if pair not in self._rows:
+            return
+        self._pending_rows.setdefault(pair, {}).update(fields)
+        self._apply_rows_trigger()
 
-            # Обновляем цвет статуса для наглядности
-            if is_running:
-                widget.ids.pair_status_label.theme_text_color = "Custom"
-                widget.ids.pair_status_label.text_color = self.theme_cls.primaryColor
-            else:
-                widget.ids.pair_status_label.theme_text_color = "Secondary"
+    def _apply_pending_rows(self, _dt=None):
+        """
+        Применяет накопленные изменения строк одним проходом. Данные списка
+        обновляются на месте (без пересборки RecycleView), а отрисованным
+        строкам присваиваются только изменившиеся свойства.
+        """
+        pending, self._pending_rows = self._pending_rows, {}
+        if not self.root:
+            return
+        pair_list = self.root.ids.pairs_list
+        for pair, fields in pending.items():
+            index = self._rows[pair]
+            row = pair_list.data[index]
+            changed = {key: value for key, value in fields.items() if row[key] != value}
+            if not changed:
+                continue
+            row.update(changed)
+            view = pair_list.view_adapter.get_visible_view(index)
+            if view is not None:
+                for key, value in changed.items():
+                    setattr(view, key, value)
+
+    def _update_watch(self, _dt=None):
+        """Сообщает серверу видимые пары, чтобы получать только их цены."""
+        if not self.root or self._stream_ws is None:
+            return
+        visible = self.root.ids.pairs_list.visible_pairs()
+        if visible == self._watched:
+            return
+        self._watched = visible
+        message = json.dumps({"type": "watch", "pairs": sorted(visible)})
+        asyncio.create_task(self._send_stream_message(message))
 
-            # Включаем/выключаем кнопки в зависимости от статуса
-            widget.ids.start_button.disabled = is_running
-            widget.ids.stop_button.disabled = not is_running
+    async def _send_stream_message(self, message: str):
+        import websockets
+
+        ws = self._stream_ws
+        if ws is None:
+            return
+        try:
+            await ws.send(message)
+        except websockets.WebSocketException as e:
+            logger.warning(f"Failed to send to status stream: {e!r}")
 
     @mainthread
     def update_status(self, text: str):
@@ -180,6 +369,8 @@ class ScalpEXApp(MDApp):
 
     async def _send_command(self, endpoint: str):
         """Асинхронно выполняет POST-запрос на сервер."""
+        import httpx
+
         try:
             response = await self.http_client.post(f"{self.server_url}{endpoint}")
             response.raise_for_status()
@@ -192,11 +383,13 @@ class ScalpEXApp(MDApp):
             logger.error(f"Command failed for endpoint {endpoint}: {e}")
             self.update_status("Ошибка: Сервер недоступен")
         finally:
-            # После отправки команды сразу запрашиваем свежий статус
-            await asyncio.sleep(
-                0.5
-            )  # Небольшая задержка, чтобы сервер успел обработать
-            await self.fetch_status()
+            # Если push-поток работает, новый статус придет сам.
+            # Иначе сразу запрашиваем свежий статус.
+            if not self._stream_connected:
+                await asyncio.sleep(
+                    0.5
+                )  # Небольшая задержка, чтобы сервер успел обработать
+                await self.fetch_status()
 
 
 async def run_app(app: MDApp):
@@ -208,16 +401,14 @@ async def run_app(app: MDApp):
     for task in asyncio.all_tasks(loop=asyncio.get_running_loop()):
         if task is not asyncio.current_task():
             task.cancel()
-    # Корректно закрываем http-клиент
-    await app.http_client.aclose()
+    # Корректно закрываем http-клиент (если приложение успело его создать)
+    if app.http_client is not None:
+        await app.http_client.aclose()
     logger.info("Cleanup complete.")
 
 
 if __name__ == "__main__":
-    # Настраиваем логгер здесь, внутри защищенного блока.
-    # Это гарантирует, что дочерние процессы (созданные Loguru с enqueue=True)
-    # не будут пытаться повторно инициализировать логгер, предотвращая deadlock.
-    setup_logger("client")
+    # Логгер настраивается после первого кадра (ScalpEXApp._start_background)
     try:
         asyncio.run(run_app(ScalpEXApp()))
     except (KeyboardInterrupt, asyncio.CancelledError):
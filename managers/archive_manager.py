@@ -0,0 +1,478 @@
+"""
+Модуль архива рыночных данных.
+
+Отвечает за:
+- Запись всех полученных сделок, лучших цен и diff-обновлений стакана по парам
+  (MarketRecorder — такой же потребитель WebsocketManager, как бот и стаканы).
+- Чтение архива по паре и диапазону времени (MarketArchive) без копирования:
+  данные отдаются как numpy-представления memory-mapped файлов.
+
+Формат архива — колоночный, только дозапись, записи фиксированной ширины:
+
+    <root>/<PAIR>/<YYYYMMDD>/<table>/<column>.bin
+    <root>/<PAIR>/<YYYYMMDD>/<table>/index.bin
+
+Таблица `ticks` — сделки и лучшие цены (TICK_DTYPE), таблица `depth` — уровни
+diff-обновлений стакана, по строке на уровень (DEPTH_DTYPE). Сегменты суточные
+(UTC). Время внутри сегмента не убывает, а разреженный индекс хранит время
+каждой INDEX_STRIDE-й строки, поэтому поиск диапазона читает лишь пару блоков
+колонки времени, а не весь файл.
+
+Запись идет пачками в фоновом потоке и никогда не блокирует event loop.
+Очередь пачек ограничена: если диск не успевает, новые пачки отбрасываются
+с учетом в метриках, и память процесса не растет.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+# Виды событий таблицы ticks
+KIND_TRADE = 0
+KIND_BOOK = 1
+
+# Сделка (заполнены price/qty) или обновление лучших цен (bid/ask и объемы)
+TICK_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("kind", "u1"),
+        ("price", "<f8"),
+        ("qty", "<f8"),
+        ("bid", "<f8"),
+        ("bid_qty", "<f8"),
+        ("ask", "<f8"),
+        ("ask_qty", "<f8"),
+    ]
+)
+# Один уровень diff-обновления стакана; side: 1 — bid, -1 — ask
+DEPTH_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("first_id", "<i8"),
+        ("last_id", "<i8"),
+        ("side", "i1"),
+        ("price", "<f8"),
+        ("qty", "<f8"),
+    ]
+)
+TABLES: dict[str, np.dtype] = {"ticks": TICK_DTYPE, "depth": DEPTH_DTYPE}
+
+INDEX_DTYPE = np.dtype([("time", "<i8"), ("row", "<i8")])
+INDEX_STRIDE = 4096
+DAY_MS = 86_400_000
+# 9999-12-31 23:59:59.999 UTC
+_MAX_TIME_MS = 253_402_300_799_999
+
+
+def day_of(time_ms: int) -> str:
+    """Имя суточного сегмента (UTC) для времени в миллисекундах."""
+    return datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc).strftime("%Y%m%d")
+
+
+class _Segment:
+    """Открытые на дозапись файлы одной таблицы одного суточного сегмента."""
+
+    def __init__(self, path: Path, dtype: np.dtype):
+        path.mkdir(parents=True, exist_ok=True)
+        self.dtype = dtype
+        sizes = [
+            (
+                (path / f"{name}.bin").stat().st_size
+                if (path / f"{name}.bin").exists()
+                else 0
+            )
+            for name in dtype.names
+        ]
+        # После аварийной остановки колонки могут быть разной длины:
+        # обрезаем все до числа полностью записанных строк
+        self.rows = min(
+            size // dtype[name].itemsize for size, name in zip(sizes, dtype.names)
+        )
+        self._files = {}
+        for name in dtype.names:
+            file = open(path / f"{name}.bin", "ab")
+            file.truncate(self.rows * dtype[name].itemsize)
+            self._files[name] = file
+        self._index = open(path / "index.bin", "ab")
+        self._restore_index(path)
+
+    def _restore_index(self, path: Path):
+        """
+        Приводит индекс к числу строк колонок. Метки блоков, которые не успели
+        записать до остановки (колонки уже сброшены на диск), восстанавливаются
+        по колонке времени.
+        """
+        expected = -(-self.rows // INDEX_STRIDE)
+        index_rows = min(
+            (path / "index.bin").stat().st_size // INDEX_DTYPE.itemsize, expected
+        )
+        self._index.truncate(index_rows * INDEX_DTYPE.itemsize)
+        if index_rows == expected:
+            return
+        times = np.memmap(
+            path / "time.bin", dtype=self.dtype["time"], mode="r", shape=(self.rows,)
+        )
+        marks = np.arange(index_rows * INDEX_STRIDE, self.rows, INDEX_STRIDE)
+        index = np.empty(len(marks), dtype=INDEX_DTYPE)
+        index["time"] = times[marks]
+        index["row"] = marks
+        del times
+        index.tofile(self._index)
+        self._index.flush()
+
+    def append(self, batch: np.ndarray):
+        """
+        Дописывает строки во все колонки и отмечает новые блоки в индексе.
+        Если запись прервалась на середине, уже дописанные части откатываются,
+        и колонки остаются одной длины.
+        """
+        try:
+            self._append(batch)
+        except BaseException:
+            self._rollback()
+            raise
+        self.rows += len(batch)
+
+    def _append(self, batch: np.ndarray):
+        for name, file in self._files.items():
+            batch[name].tofile(file)
+            file.flush()
+        first = -(-self.rows // INDEX_STRIDE) * INDEX_STRIDE
+        marks = np.arange(first, self.rows + len(batch), INDEX_STRIDE)
+        if len(marks):
+            index = np.empty(len(marks), dtype=INDEX_DTYPE)
+            index["time"] = batch["time"][marks - self.rows]
+            index["row"] = marks
+            index.tofile(self._index)
+            self._index.flush()
+
+    def _rollback(self):
+        """Обрезает колонки и индекс до последней целиком записанной пачки."""
+        for name, file in self._files.items():
+            try:
+                file.truncate(self.rows * self.dtype[name].itemsize)
+            except OSError as e:
+                # Длины колонок выровняет открытие сегмента после перезапуска
+                logger.error(f"Failed to roll back archive column {file.name}: {e!r}")
+        try:
+            self._index.truncate(-(-self.rows // INDEX_STRIDE) * INDEX_DTYPE.itemsize)
+        except OSError as e:
+            logger.error(f"Failed to roll back archive index {self._index.name}: {e!r}")
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+        self._index.close()
+
+
+class MarketRecorder:
+    """
+    Потребитель рыночных данных, записывающий их в архив.
+
+    События складываются в предвыделенные буферы пар прямо в event loop
+    (без аллокаций на сообщение), полные буферы уходят в очередь фонового
+    потока записи.
+    """
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        batch_size: int = 4096,
+        max_pending_batches: int = 256,
+        flush_interval: float = 1.0,
+        max_open_segments: int = 64,
+    ):
+        """
+        :param root: Каталог архива (по умолчанию из переменной окружения MARKET_ARCHIVE_DIR).
+        :param batch_size: Размер буфера пары (строк), после заполнения он уходит на запись.
+        :param max_pending_batches: Максимум пачек в очереди записи (ограничивает память).
+        :param flush_interval: Период принудительной отправки неполных буферов, в секундах.
+        :param max_open_segments: Сколько сегментов держать открытыми одновременно.
+        """
+        self.root = Path(root or os.getenv("MARKET_ARCHIVE_DIR", "market_data"))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._max_open_segments = max_open_segments
+        # (пара, таблица) -> [буфер, число заполненных строк, время последней строки]
+        self._buffers: dict[tuple[str, str], list] = {}
+        self._queue: queue.Queue[tuple[str, str, np.ndarray] | None] = queue.Queue(
+            maxsize=max_pending_batches
+        )
+        self._segments: OrderedDict[tuple[str, str, str], _Segment] = OrderedDict()
+        self._thread: threading.Thread | None = None
+        self._task: asyncio.Task | None = None
+
+        # --- Метрики ---
+        self.recorded_rows = 0
+        self.dropped_rows = 0
+        self.written_rows = 0
+        self.written_batches = 0
+        self.write_errors = 0
+
+    def start(self):
+        """Запускает поток записи и периодическую отправку неполных буферов."""
+        self._thread = threading.Thread(
+            target=self._writer_loop, name="market-recorder", daemon=True
+        )
+        self._thread.start()
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"MarketRecorder started, archive at {self.root}.")
+
+    async def close(self):
+        """Сбрасывает буферы, дожидается записи очереди и закрывает файлы."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+        if self._thread is not None:
+            await asyncio.to_thread(self._queue.put, None)
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        logger.info("MarketRecorder closed.")
+
+    # --- Прием событий (event loop) ---
+
+    def _buffer(self, pair: str, table: str) -> list:
+        buffer = self._buffers.get((pair, table))
+        if buffer is None:
+            buffer = [np.empty(self.batch_size, dtype=TABLES[table]), 0, 0]
+            self._buffers[(pair, table)] = buffer
+        return buffer
+
+    def _event_time(self, buffer: list, data: dict) -> int:
+        # Событие может прийти без времени биржи; время в сегменте не убывает
+        time_ms = data.get("time") or int(time.time() * 1000)
+        if time_ms < buffer[2]:
+            time_ms = buffer[2]
+        buffer[2] = time_ms
+        return time_ms
+
+    def on_market_event(self, pair: str, event: MarketEvent):
+        """Потребитель WebsocketManager: добавляет событие в буфер пары."""
+        data = event.data
+        if event.type is MarketEventType.DEPTH:
+            buffer = self._buffer(pair, "depth")
+            time_ms = self._event_time(buffer, data)
+            first_id, last_id = data["first_id"], data["last_id"]
+            for side, levels in ((1, data["bids"]), (-1, data["asks"])):
+                for price, qty in levels:
+                    self._append(
+                        pair,
+                        "depth",
+                        buffer,
+                        (time_ms, first_id, last_id, side, price, qty),
+                    )
+            return
+
+        buffer = self._buffer(pair, "ticks")
+        time_ms = self._event_time(buffer, data)
+        if event.type is MarketEventType.TICK:
+            row = (time_ms, KIND_TRADE, data["price"], data.get("qty", 0.0), 0, 0, 0, 0)
+        else:
+            row = (
+                time_ms,
+                KIND_BOOK,
+                0.0,
+                0.0,
+                data["bid"],
+                data.get("bid_qty", 0.0),
+                data["ask"],
+                data.get("ask_qty", 0.0),
+            )
+        self._append(pair, "ticks", buffer, row)
+
+    def _append(self, pair: str, table: str, buffer: list, row: tuple):
+        array, count = buffer[0], buffer[1]
+        array[count] = row
+        buffer[1] = count + 1
+        self.recorded_rows += 1
+        if buffer[1] == self.batch_size:
+            self._submit(pair, table, buffer)
+
+    def _submit(self, pair: str, table: str, buffer: list):
+        """Отдает заполненную часть буфера потоку записи и заводит новый буфер."""
+        batch = buffer[0][: buffer[1]]
+        buffer[0] = np.empty(self.batch_size, dtype=TABLES[table])
+        buffer[1] = 0
+        try:
+            self._queue.put_nowait((pair, table, batch))
+        except queue.Full:
+            self.dropped_rows += len(batch)
+
+    def flush(self):
+        """Отправляет на запись все неполные буферы."""
+        for (pair, table), buffer in self._buffers.items():
+            if buffer[1]:
+                self._submit(pair, table, buffer)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    # --- Запись (фоновый поток) ---
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            pair, table, batch = item
+            try:
+                self._write(pair, table, batch)
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Failed to archive {table} of {pair}: {e!r}")
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def _write(self, pair: str, table: str, batch: np.ndarray):
+        # Пачка может пересекать полночь: делим ее по суткам
+        days = batch["time"] // DAY_MS
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        for part in np.split(batch, bounds):
+            segment = self._segment(pair, day_of(int(part["time"][0])), table)
+            segment.append(part)
+        self.written_rows += len(batch)
+        self.written_batches += 1
+
+    def _segment(self, pair: str, day: str, table: str) -> _Segment:
+        key = (pair, day, table)
+        segment = self._segments.get(key)
+        if segment is not None:
+            self._segments.move_to_end(key)
+            return segment
+        if len(self._segments) >= self._max_open_segments:
+            _, oldest = self._segments.popitem(last=False)
+            oldest.close()
+        segment = _Segment(self.root / pair / day / table, TABLES[table])
+        self._segments[key] = segment
+        return segment
+
+    def get_stats(self) -> dict[str, int]:
+        """Возвращает метрики записи архива."""
+        return {
+            "recorded_rows": self.recorded_rows,
+            "written_rows": self.written_rows,
+            "written_batches": self.written_batches,
+            "dropped_rows": self.dropped_rows,
+            "write_errors": self.write_errors,
+            "pending_batches": self._queue.qsize(),
+            "open_segments": len(self._segments),
+        }
+
+
+class MarketArchive:
+    """Чтение архива: memory-mapped numpy-представления по паре и времени."""
+
+    def __init__(self, root: str | Path | None = None):
+        """
+        :param root: Каталог архива (по умолчанию из переменной окружения MARKET_ARCHIVE_DIR).
+        """
+        self.root = Path(root or os.getenv("MARKET_ARCHIVE_DIR", "market_data"))
+
+    def pairs(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def days(self, pair: str) -> list[str]:
+        path = self.root / pair
+        if not path.exists():
+            return []
+        return sorted(p.name for p in path.iterdir() if p.is_dir())
+
+    def open_segment(
+        self, pair: str, day: str, table: str = "ticks"
+    ) -> tuple[dict[str, np.ndarray], np.ndarray]:
+        """
+        Отображает колонки сегмента в память. Возвращает колонки и индекс.
+        Число строк — по самой короткой колонке, поэтому сегмент, в который
+        идет запись, читается согласованно.
+        """
+        dtype = TABLES[table]
+        path = self.root / pair / day / table
+        rows = min(
+            (
+                (path / f"{name}.bin").stat().st_size // dtype[name].itemsize
+                if (path / f"{name}.bin").exists()
+                else 0
+            )
+            for name in dtype.names
+        )
+        if not rows:
+            return {name: np.empty(0, dtype=dtype[name]) for name in dtype.names}, (
+                np.empty(0, dtype=INDEX_DTYPE)
+            )
+        columns = {
+            name: np.memmap(
+                path / f"{name}.bin", dtype=dtype[name], mode="r", shape=(rows,)
+            )
+            for name in dtype.names
+        }
+        index_rows = min(
+            (path / "index.bin").stat().st_size // INDEX_DTYPE.itemsize,
+            -(-rows // INDEX_STRIDE),
+        )
+        index = (
+            np.memmap(
+                path / "index.bin", dtype=INDEX_DTYPE, mode="r", shape=(index_rows,)
+            )
+            if index_rows
+            else np.empty(0, dtype=INDEX_DTYPE)
+        )
+        return columns, index
+
+    @staticmethod
+    def _locate(times: np.ndarray, index: np.ndarray, time_ms: int) -> int:
+        """Первая строка со временем >= time_ms; читает только один блок колонки."""
+        block = int(np.searchsorted(index["time"], time_ms, side="left"))
+        lo = int(index["row"][block - 1]) if block > 0 else 0
+        hi = int(index["row"][block]) + 1 if block < len(index) else len(times)
+        return lo + int(np.searchsorted(times[lo:hi], time_ms, side="left"))
+
+    def read(
+        self,
+        pair: str,
+        start_ms: int,
+        end_ms: int,
+        table: str = "ticks",
+        chunk_size: int | None = None,
+    ) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Выдает строки пары с временем в [start_ms, end_ms) кусками — словарями
+        колонок. Куски являются представлениями memmap, без копирования данных.
+        """
+        # Границы обрезаются до диапазона, представимого datetime
+        first_day = day_of(min(max(start_ms, 0), _MAX_TIME_MS))
+        last_day = day_of(min(max(end_ms - 1, start_ms, 0), _MAX_TIME_MS))
+        for day in self.days(pair):
+            if not first_day <= day <= last_day:
+                continue
+            columns, index = self.open_segment(pair, day, table)
+            times = columns["time"]
+            if not len(times):
+                continue
+            lo = self._locate(times, index, start_ms)
+            hi = self._locate(times, index, end_ms)
+            step = chunk_size or max(hi - lo, 1)
+            for start in range(lo, hi, step):
+                stop = min(start + step, hi)
+                yield {name: column[start:stop] for name, column in columns.items()}
@@ -0,0 +1,441 @@
+"""
+Модуль для работы с базой данных PostgreSQL.
+
+Отвечает за:
+- Общий пул соединений asyncpg. Запросы вынесены в константы модуля, поэтому
+  asyncpg подготавливает каждый из них один раз на соединение (statement cache).
+- Массовую запись исполнений (fills) и сделок (deals) через COPY: строки копятся
+  в ограниченном буфере и сбрасываются пачками по размеру или по времени.
+  Если PostgreSQL не успевает, буфер заполняется и писатели ждут (backpressure).
+  Исполнения — учетные записи, поэтому они ждут места в буфере; отбрасываются
+  (с учетом в метрике) только исполнения сверх лимита ожидающих. Строки, которые база отвергает (ошибки данных), отсеиваются делением
+  пачки пополам, остальные строки пачки записываются.
+- Постраничное чтение истории сделок по keyset-курсору вместо OFFSET.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+import asyncpg
+from loguru import logger
+
+from managers.loguru_manager import LogThrottle
+from managers.metrics_manager import REGISTRY
+
+if TYPE_CHECKING:
+    from managers.order_manager import Order
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    trade_id          BIGINT,
+    exchange_order_id BIGINT,
+    client_order_id   TEXT NOT NULL,
+    deal_id           BIGINT,
+    symbol            TEXT NOT NULL,
+    side              TEXT NOT NULL,
+    price             DOUBLE PRECISION NOT NULL,
+    qty               DOUBLE PRECISION NOT NULL,
+    commission        DOUBLE PRECISION NOT NULL DEFAULT 0,
+    commission_asset  TEXT,
+    executed_at       TIMESTAMPTZ NOT NULL,
+    user_id           TEXT
+);
+CREATE INDEX IF NOT EXISTS fills_deal_idx ON fills (deal_id);
+
+CREATE TABLE IF NOT EXISTS deals (
+    id          BIGSERIAL PRIMARY KEY,
+    user_id     TEXT NOT NULL,
+    symbol      TEXT NOT NULL,
+    side        TEXT NOT NULL,
+    qty         DOUBLE PRECISION NOT NULL,
+    entry_price DOUBLE PRECISION NOT NULL,
+    exit_price  DOUBLE PRECISION,
+    pnl         DOUBLE PRECISION,
+    opened_at   TIMESTAMPTZ NOT NULL,
+    closed_at   TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deals_user_history_idx
+    ON deals (user_id, closed_at DESC, id DESC);
+"""
+
+FILL_COLUMNS = (
+    "trade_id",
+    "exchange_order_id",
+    "client_order_id",
+    "deal_id",
+    "symbol",
+    "side",
+    "price",
+    "qty",
+    "commission",
+    "commission_asset",
+    "executed_at",
+    "user_id",
+)
+DEAL_COLUMNS = (
+    "user_id",
+    "symbol",
+    "side",
+    "qty",
+    "entry_price",
+    "exit_price",
+    "pnl",
+    "opened_at",
+    "closed_at",
+)
+
+DB_ROWS_DROPPED = REGISTRY.counter(
+    "scalpex_db_rows_dropped",
+    "Rows dropped by database write buffers (buffer overflow or rejected data)",
+    ("table", "reason"),
+)
+
+# Ошибки, при которых повтор той же пачки бесполезен: база отвергает сами строки
+DATA_ERRORS = (
+    asyncpg.DataError,
+    asyncpg.IntegrityConstraintViolationError,
+)
+
+DEAL_HISTORY_FIRST_PAGE = """
+SELECT id, symbol, side, qty, entry_price, exit_price, pnl, opened_at, closed_at
+FROM deals
+WHERE user_id = $1
+ORDER BY closed_at DESC, id DESC
+LIMIT $2
+"""
+DEAL_HISTORY_NEXT_PAGE = """
+SELECT id, symbol, side, qty, entry_price, exit_price, pnl, opened_at, closed_at
+FROM deals
+WHERE user_id = $1 AND (closed_at, id) < ($3, $4)
+ORDER BY closed_at DESC, id DESC
+LIMIT $2
+"""
+
+
+class CopyBuffer:
+    """
+    Ограниченный буфер строк одной таблицы, сбрасываемый в PostgreSQL через COPY.
+
+    Сброс происходит, когда набралось `batch_size` строк или прошло
+    `flush_interval` секунд. Если буфер заполнен до `max_rows` (база не успевает),
+    `add` ждет, пока сброс освободит место, а `add_nowait` отбрасывает строку.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        table: str,
+        columns: tuple[str, ...],
+        batch_size: int = 5000,
+        max_rows: int = 50_000,
+        flush_interval: float = 0.5,
+    ):
+        self._pool = pool
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+
+        self._rows: list[tuple] = []
+        self._flush_requested = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._task: asyncio.Task | None = None
+
+        # --- Метрики ---
+        self.rows_written = 0
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.rows_dropped = 0
+        self._overflow_log = LogThrottle(5.0)
+
+    def start(self):
+        """Запускает фоновый цикл сброса."""
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Останавливает цикл и сбрасывает оставшиеся строки."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._rows:
+            await self.flush()
+
+    async def add(self, row: tuple):
+        """Добавляет строку; ждет освобождения места, если буфер заполнен."""
+        while len(self._rows) >= self.max_rows:
+            self._has_space.clear()
+            self._flush_requested.set()
+            await self._has_space.wait()
+        self.add_nowait(row)
+
+    def add_nowait(self, row: tuple):
+        """
+        Добавляет строку без ожидания (из синхронных обработчиков). Если буфер
+        заполнен, строка отбрасывается: пока база недоступна, память не растет.
+        """
+        if len(self._rows) >= self.max_rows:
+            self.rows_dropped += 1
+            DB_ROWS_DROPPED.labels(self.table, "overflow").inc()
+            self._flush_requested.set()
+            if self._overflow_log.allow():
+                logger.error(
+                    f"{self.table} write buffer is full ({self.max_rows} rows), "
+                    f"row dropped (+{self._overflow_log.skipped} more)."
+                )
+            return
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._flush_requested.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            while self._rows:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"COPY into {self.table} failed: {e!r}. Retrying.")
+                    await asyncio.sleep(1)
+                    break
+                if len(self._rows) < self.batch_size:
+                    break
+
+    async def flush(self):
+        """Записывает одну пачку строк через COPY."""
+        batch = self._rows[: self.batch_size]
+        del self._rows[: self.batch_size]
+        if len(self._rows) < self.max_rows:
+            self._has_space.set()
+        if not batch:
+            return
+        try:
+            await self._copy(batch)
+        except DATA_ERRORS as e:
+            # Повтор не поможет: отсеиваем отвергнутые строки, остальные пишем
+            self.failed_batches += 1
+            logger.error(f"COPY into {self.table} rejected a batch: {e!r}.")
+            await self._copy_valid_rows(batch)
+            return
+        except BaseException as e:
+            # Возвращаем пачку в начало буфера, чтобы не потерять строки
+            # (в том числе при отмене задачи посреди COPY)
+            self._rows[:0] = batch
+            if not isinstance(e, asyncio.CancelledError):
+                self.failed_batches += 1
+            raise
+        self.rows_written += len(batch)
+        self.batches_written += 1
+
+    async def _copy(self, rows: list[tuple]):
+        async with self._pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                self.table, records=rows, columns=self.columns
+            )
+
+    async def _copy_valid_rows(self, batch: list[tuple]):
+        """Пишет отвергнутую пачку половинами, пока ошибка не сузится до одной строки."""
+        # Стек частей: следующей пишется последняя, порядок строк сохраняется
+        parts = _halves(batch)
+        while parts:
+            part = parts.pop()
+            try:
+                await self._copy(part)
+            except DATA_ERRORS as e:
+                if len(part) > 1:
+                    parts += _halves(part)
+                    continue
+                self.rows_dropped += 1
+                DB_ROWS_DROPPED.labels(self.table, "rejected").inc()
+                logger.error(
+                    f"{self.table} row rejected and dropped: {part[0]!r} ({e!r})"
+                )
+                continue
+            except BaseException:
+                # Незаписанные части возвращаются в буфер в исходном порядке
+                self._rows[:0] = [
+                    row for rest in (part, *reversed(parts)) for row in rest
+                ]
+                raise
+            self.rows_written += len(part)
+
+    @property
+    def pending_rows(self) -> int:
+        return len(self._rows)
+
+
+def _halves(rows: list[tuple]) -> list[list[tuple]]:
+    middle = len(rows) // 2
+    return [rows[middle:], rows[:middle]] if middle else [rows]
+
+
+class DatabaseManager:
+    """Асинхронный менеджер PostgreSQL: пул, буферизованная запись и чтение истории."""
+
+    # Сколько секунд при остановке ждать исполнения, не поместившиеся в буфер
+    FILL_WRITE_CLOSE_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        dsn: str | None = None,
+        min_size: int = 2,
+        max_size: int = 10,
+        max_fill_waiters: int = 10_000,
+    ):
+        """
+        :param dsn: Строка подключения (по умолчанию из переменной окружения DB_URL).
+        :param min_size: Минимальный размер пула соединений.
+        :param max_size: Максимальный размер пула соединений.
+        :param max_fill_waiters: Сколько исполнений может ждать места в заполненном
+            буфере; сверх лимита исполнения отбрасываются, чтобы не росла память.
+        """
+        dsn = dsn or os.getenv("DB_URL", "")
+        # Допускаем DSN в формате SQLAlchemy (postgresql+asyncpg://)
+        self._dsn = dsn.replace("postgresql+asyncpg://", "postgresql://")
+        self._min_size = min_size
+        self._max_size = max_size
+        self.pool: asyncpg.Pool | None = None
+        self.fills: CopyBuffer | None = None
+        self.deals: CopyBuffer | None = None
+        # Исполнения, ждущие места в буфере (ссылки держим, чтобы задачи не собрал GC)
+        self._fill_writes: set[asyncio.Task] = set()
+        self._max_fill_waiters = max_fill_waiters
+
+    async def start(self):
+        """Создает пул соединений и запускает буферы записи."""
+        self.pool = await asyncpg.create_pool(
+            self._dsn,
+            min_size=self._min_size,
+            max_size=self._max_size,
+            command_timeout=30,
+        )
+        self.fills = CopyBuffer(self.pool, "fills", FILL_COLUMNS)
+        self.deals = CopyBuffer(self.pool, "deals", DEAL_COLUMNS, batch_size=500)
+        self.fills.start()
+        self.deals.start()
+        logger.info("DatabaseManager started.")
+
+    async def close(self):
+        """Дожидается исполнений в очереди, сбрасывает буферы и закрывает пул."""
+        if self._fill_writes:
+            # Цикл сброса еще работает: исполнения получат место по мере записи
+            _, pending = await asyncio.wait(
+                self._fill_writes, timeout=self.FILL_WRITE_CLOSE_TIMEOUT
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.error(
+                    f"{len(pending)} fills were not written before shutdown: "
+                    f"the database did not accept them in time."
+                )
+        for buffer in (self.fills, self.deals):
+            if buffer is not None:
+                await buffer.close()
+        if self.pool is not None:
+            await self.pool.close()
+        logger.info("DatabaseManager closed.")
+
+    async def init_schema(self):
+        """Создает таблицы и индексы, если их еще нет."""
+        async with self.pool.acquire() as conn:
+            await conn.execute(SCHEMA)
+
+    # --- Запись ---
+
+    async def add_fill(self, row: tuple):
+        """Добавляет исполнение (в порядке FILL_COLUMNS) в буфер записи."""
+        await self.fills.add(row)
+
+    async def add_deal(self, row: tuple):
+        """Добавляет закрытую сделку (в порядке DEAL_COLUMNS) в буфер записи."""
+        await self.deals.add(row)
+
+    def on_fill(self, order: "Order", fill: dict[str, Any]):
+        """
+        Слушатель исполнений OrderManager: ставит исполнение в буфер записи.
+        Если буфер заполнен, исполнение ждет места в отдельной задаче; если
+        ожидающих уже max_fill_waiters, исполнение отбрасывается.
+        """
+        executed_at = (
+            datetime.fromtimestamp(fill["time"] / 1000, tz=timezone.utc)
+            if fill.get("time")
+            else datetime.now(timezone.utc)
+        )
+        row = (
+            fill.get("trade_id"),
+            order.exchange_order_id,
+            order.client_order_id,
+            order.deal_id,
+            order.symbol,
+            order.side,
+            fill["price"],
+            fill["qty"],
+            fill.get("commission", 0.0),
+            fill.get("commission_asset"),
+            executed_at,
+            order.user_id,
+        )
+        if len(self._fill_writes) >= self._max_fill_waiters:
+            # База давно не принимает записи: add_nowait учтет и залогирует потерю
+            self.fills.add_nowait(row)
+            return
+        task = asyncio.create_task(self.fills.add(row))
+        self._fill_writes.add(task)
+        task.add_done_callback(self._fill_writes.discard)
+
+    # --- Чтение ---
+
+    async def get_deal_history(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: tuple[datetime, int] | None = None,
+    ) -> tuple[list[asyncpg.Record], tuple[datetime, int] | None]:
+        """
+        Возвращает страницу истории сделок пользователя (новые сначала).
+
+        :param cursor: Курсор из предыдущего вызова; None — первая страница.
+        :return: Строки страницы и курсор следующей страницы (None, если страниц больше нет).
+        """
+        async with self.pool.acquire() as conn:
+            if cursor is None:
+                rows = await conn.fetch(DEAL_HISTORY_FIRST_PAGE, user_id, limit)
+            else:
+                rows = await conn.fetch(
+                    DEAL_HISTORY_NEXT_PAGE, user_id, limit, cursor[0], cursor[1]
+                )
+        next_cursor = (
+            (rows[-1]["closed_at"], rows[-1]["id"]) if len(rows) == limit else None
+        )
+        return rows, next_cursor
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """Возвращает метрики буферов записи."""
+        stats = {
+            buffer.table: {
+                "pending_rows": buffer.pending_rows,
+                "rows_written": buffer.rows_written,
+                "batches_written": buffer.batches_written,
+                "failed_batches": buffer.failed_batches,
+                "rows_dropped": buffer.rows_dropped,
+            }
+            for buffer in (self.fills, self.deals)
+            if buffer is not None
+        }
+        if "fills" in stats:
+            stats["fills"]["waiting_rows"] = len(self._fill_writes)
+        return stats
@@ -0,0 +1,581 @@
+"""
+Модуль для взаимодействия с REST API биржи (Binance Spot).
+
+Отвечает за:
+- Единый пул HTTP/2-соединений с keep-alive для всех пар и пользователей воркера.
+- Соблюдение лимитов биржи: token bucket по весу запросов и по числу ордеров,
+  синхронизируемый с заголовками X-MBX-USED-WEIGHT-* из ответов биржи.
+- Объединение одинаковых одновременных GET-запросов (тикер, балансы, стакан).
+- Кэширование статических метаданных символов (exchangeInfo) с TTL; по ним
+  цена и количество ордера приводятся к сетке символа (tickSize, stepSize),
+  а ордера меньше minQty/minNotional отклоняются без запроса к бирже.
+  Метаданные запрашиваются по символу; устаревшая запись отдается сразу
+  и обновляется в фоне, чтобы выставление ордера не ждало метаданных.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, Decimal
+from typing import Any
+from urllib.parse import urlencode
+
+import httpx
+from loguru import logger
+
+from managers.metrics_manager import REGISTRY
+
+DEFAULT_REST_URL = "https://api.binance.com"
+
+EXCHANGE_REQUEST_TIME = REGISTRY.histogram(
+    "scalpex_exchange_request_seconds",
+    "Exchange REST request duration",
+    ("method", "path", "status"),
+)
+
+
+class ExchangeAPIError(Exception):
+    """Биржа вернула ошибку в ответ на запрос."""
+
+    def __init__(self, status_code: int, code: int | None, message: str):
+        super().__init__(f"HTTP {status_code}, code {code}: {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+class ExchangeRateLimitError(ExchangeAPIError):
+    """Превышен лимит запросов биржи (HTTP 429) или IP временно заблокирован (418)."""
+
+
+class InvalidOrderError(ValueError):
+    """Ордер не проходит фильтры символа (после округления к сетке) и не отправляется."""
+
+
+class TokenBucket:
+    """
+    Асинхронный ограничитель частоты по алгоритму token bucket.
+
+    Поддерживает резерв: запрос с `reserve > 0` ждет, пока в корзине не останется
+    больше `reserve` токенов. Так низкоприоритетные запросы не съедают запас,
+    нужный для срочных (например, выставления ордеров).
+    """
+
+    def __init__(self, capacity: float, period: float):
+        """
+        :param capacity: Максимальное число токенов (лимит за период).
+        :param period: Период полного восстановления корзины, в секундах.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+    @property
+    def available(self) -> float:
+        """Текущее количество доступных токенов."""
+        self._refill()
+        return self._tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0, reserve: float = 0.0):
+        """Ждет, пока в корзине появятся `tokens` токенов сверх `reserve`, и забирает их."""
+        tokens = min(tokens, self.capacity)
+        reserve = min(reserve, self.capacity - tokens)
+        while True:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            self._refill()
+            if self._tokens - tokens >= reserve:
+                self._tokens -= tokens
+                return
+            await asyncio.sleep((tokens + reserve - self._tokens) / self.rate)
+
+    def sync_used(self, used: float):
+        """Корректирует корзину по фактически израсходованному лимиту, который сообщила биржа."""
+        self._refill()
+        self._tokens = min(self._tokens, self.capacity - used)
+
+    def block_for(self, seconds: float):
+        """Запрещает выдачу токенов на указанное время (после 429/418 от биржи)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+def _filter_step(
+    info: dict[str, Any] | None, filter_type: str, key: str
+) -> Decimal | None:
+    """Шаг сетки из фильтра символа (None, если фильтра нет или шаг нулевой)."""
+    for item in (info or {}).get("filters", ()):
+        if item.get("filterType") == filter_type:
+            step = Decimal(item.get(key, "0"))
+            return step.normalize() if step > 0 else None
+    return None
+
+
+def _filter_value(
+    info: dict[str, Any] | None, filter_types: tuple[str, ...], key: str
+) -> Decimal:
+    """Минимум из фильтра символа (0, если фильтра нет)."""
+    for item in (info or {}).get("filters", ()):
+        if item.get("filterType") in filter_types:
+            return Decimal(item.get(key, "0"))
+    return Decimal(0)
+
+
+def format_decimal(
+    value: float, step: Decimal | None = None, rounding=ROUND_HALF_EVEN
+) -> str:
+    """
+    Форматирует число для параметра запроса: без экспоненты и без округления
+    до 6 знаков, как f"{value:f}". С `step` значение приводится к кратному шагу.
+    """
+    number = Decimal(repr(value))
+    if step is not None:
+        number = (number / step).to_integral_value(rounding) * step
+        number = number.quantize(step)
+    return format(number, "f")
+
+
+class ExchangeClient:
+    """
+    Асинхронный клиент REST API биржи с учетом лимитов.
+
+    Один экземпляр рассчитан на весь процесс: он держит общий пул соединений
+    и общие лимитеры, поэтому все пары и пользователи воркера делят один бюджет
+    запросов и не получают бан за 429.
+    """
+
+    # Лимиты Binance Spot: вес запросов за минуту и число ордеров за 10 секунд
+    REQUEST_WEIGHT_LIMIT = 6000
+    ORDER_LIMIT_10S = 100
+    # Доля веса, которую GET-запросы оставляют про запас для торговых запросов
+    WEIGHT_RESERVE_RATIO = 0.1
+    # Вес запросов состояния аккаунта (по ним планирует бюджет сверка ордеров)
+    OPEN_ORDERS_WEIGHT = 6
+    OPEN_ORDERS_ALL_WEIGHT = 80
+    ORDER_WEIGHT = 4
+    MY_TRADES_WEIGHT = 20
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        api_secret: str | None = None,
+        metadata_ttl: float = 3600.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        :param base_url: Адрес REST API биржи (для тестов — адрес локального мок-сервера).
+        :param api_key: API-ключ для подписанных запросов.
+        :param api_secret: Секрет для подписи запросов HMAC-SHA256.
+        :param metadata_ttl: Время жизни кэша метаданных символов, в секундах.
+        :param transport: Альтернативный транспорт httpx (например, для тестов).
+        """
+        self.base_url = base_url or os.getenv("EXCHANGE_REST_URL", DEFAULT_REST_URL)
+        self._api_key = api_key or os.getenv("BINANCE_API_KEY", "")
+        self._api_secret = (api_secret or os.getenv("BINANCE_API_SECRET", "")).encode()
+        self._metadata_ttl = metadata_ttl
+
+        headers = {"X-MBX-APIKEY": self._api_key} if self._api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=transport is None,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=50, max_keepalive_connections=20, keepalive_expiry=60
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            transport=transport,
+        )
+
+        self.weight_limiter = TokenBucket(self.REQUEST_WEIGHT_LIMIT, period=60)
+        self.order_limiter = TokenBucket(self.ORDER_LIMIT_10S, period=10)
+        self._weight_reserve = self.REQUEST_WEIGHT_LIMIT * self.WEIGHT_RESERVE_RATIO
+
+        # Выполняющиеся GET-запросы: (path, params) -> задача
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._exchange_info: dict[str, Any] | None = None
+        self._exchange_info_expires_at = 0.0
+        # Метаданные символов и время (monotonic), после которого запись устаревает
+        self._symbols: dict[str, dict[str, Any]] = {}
+        self._symbols_expire_at: dict[str, float] = {}
+        # Фоновые обновления метаданных символов: symbol -> задача
+        self._symbol_refreshes: dict[str, asyncio.Task] = {}
+
+        # --- Метрики клиента ---
+        self.requests_sent = 0
+        self.coalesced_requests = 0
+        self.rate_limit_hits = 0
+
+    async def close(self):
+        """Останавливает фоновые обновления метаданных и закрывает пул соединений."""
+        for task in self._symbol_refreshes.values():
+            task.cancel()
+        await asyncio.gather(*self._symbol_refreshes.values(), return_exceptions=True)
+        await self._client.aclose()
+
+    # --- Низкоуровневые запросы ---
+
+    def _sign(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Добавляет к параметрам метку времени и подпись HMAC-SHA256."""
+        params = {**params, "timestamp": int(time.time() * 1000), "recvWindow": 5000}
+        query = urlencode(params)
+        params["signature"] = hmac.new(
+            self._api_secret, query.encode(), hashlib.sha256
+        ).hexdigest()
+        return params
+
+    def _update_limits(self, headers: httpx.Headers):
+        """Синхронизирует лимитеры с заголовками использованного лимита."""
+        used_weight = headers.get("x-mbx-used-weight-1m")
+        if used_weight is not None:
+            self.weight_limiter.sync_used(float(used_weight))
+        order_count = headers.get("x-mbx-order-count-10s")
+        if order_count is not None:
+            self.order_limiter.sync_used(float(order_count))
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        weight: int = 1,
+        signed: bool = False,
+        priority: bool = False,
+        is_order: bool = False,
+    ) -> Any:
+        """
+        Выполняет запрос к бирже с учетом лимитов и разбором ошибок.
+
+        :param priority: Торговый запрос: может использовать резерв веса.
+        :param is_order: Запрос расходует лимит на число ордеров.
+        """
+        if is_order:
+            await self.order_limiter.acquire(1)
+        if priority:
+            await self.weight_limiter.acquire(weight)
+        else:
+            await self.weight_limiter.acquire(weight, reserve=self._weight_reserve)
+
+        params = params or {}
+        if signed:
+            params = self._sign(params)
+        self.requests_sent += 1
+        started = time.perf_counter()
+        response = await self._client.request(method, path, params=params)
+        EXCHANGE_REQUEST_TIME.labels(method, path, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+        self._update_limits(response.headers)
+
+        if response.status_code in (418, 429):
+            self.rate_limit_hits += 1
+            retry_after = float(response.headers.get("retry-after", "60"))
+            self.weight_limiter.block_for(retry_after)
+            if is_order:
+                self.order_limiter.block_for(retry_after)
+            logger.error(
+                f"Exchange rate limit hit ({response.status_code}) on {path}, "
+                f"backing off for {retry_after}s."
+            )
+            raise ExchangeRateLimitError(response.status_code, None, response.text)
+        if response.is_error:
+            try:
+                body = response.json()
+                code, message = body.get("code"), body.get("msg", response.text)
+            except ValueError:
+                code, message = None, response.text
+            raise ExchangeAPIError(response.status_code, code, message)
+        return response.json()
+
+    async def _get_coalesced(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        weight: int = 1,
+        signed: bool = False,
+        priority: bool = False,
+    ) -> Any:
+        """
+        GET-запрос, объединяемый с идентичными одновременными запросами:
+        все вызывающие получают результат одного HTTP-запроса.
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._request(
+                    "GET", path, params, weight=weight, signed=signed, priority=priority
+                )
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_requests += 1
+        # shield: отмена одного из ожидающих не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    # --- Рыночные данные и метаданные ---
+
+    async def get_exchange_info(self) -> dict[str, Any]:
+        """Возвращает метаданные биржи (правила символов), кэшируя их на `metadata_ttl`."""
+        if (
+            self._exchange_info is None
+            or time.monotonic() >= self._exchange_info_expires_at
+        ):
+            info = await self._get_coalesced("/api/v3/exchangeInfo", weight=20)
+            self._exchange_info = info
+            self._store_symbols(info)
+            self._exchange_info_expires_at = time.monotonic() + self._metadata_ttl
+        return self._exchange_info
+
+    async def get_symbol_info(self, symbol: str) -> dict[str, Any] | None:
+        """
+        Возвращает метаданные символа (фильтры цены и лота) из кэша.
+        Символ без записи запрашивается сразу, устаревшая запись отдается
+        как есть и обновляется в фоне.
+        """
+        info = self._symbols.get(symbol)
+        if info is None:
+            # Первый ордер по символу ждет метаданные: запрос на торговом пути
+            await self._fetch_symbol_info(symbol, priority=True)
+            return self._symbols.get(symbol)
+        if (
+            time.monotonic() >= self._symbols_expire_at[symbol]
+            and symbol not in self._symbol_refreshes
+        ):
+            task = asyncio.create_task(self._refresh_symbol_info(symbol))
+            self._symbol_refreshes[symbol] = task
+            task.add_done_callback(lambda _: self._symbol_refreshes.pop(symbol, None))
+        return info
+
+    async def _fetch_symbol_info(self, symbol: str, priority: bool = False):
+        info = await self._get_coalesced(
+            "/api/v3/exchangeInfo", {"symbol": symbol}, weight=20, priority=priority
+        )
+        self._store_symbols(info)
+
+    async def _refresh_symbol_info(self, symbol: str):
+        try:
+            await self._fetch_symbol_info(symbol)
+        except Exception as e:
+            # Правила символов меняются редко: до следующей попытки работаем со старыми
+            logger.warning(f"Failed to refresh metadata of {symbol}: {e!r}")
+            self._symbols_expire_at[symbol] = time.monotonic() + min(
+                60.0, self._metadata_ttl
+            )
+
+    def _store_symbols(self, info: dict[str, Any]):
+        expires_at = time.monotonic() + self._metadata_ttl
+        for item in info.get("symbols", ()):
+            self._symbols[item["symbol"]] = item
+            self._symbols_expire_at[item["symbol"]] = expires_at
+
+    async def get_ticker(self, symbol: str) -> dict[str, Any]:
+        """Последняя цена по символу."""
+        return await self._get_coalesced(
+            "/api/v3/ticker/price", {"symbol": symbol}, weight=2
+        )
+
+    async def get_depth(self, symbol: str, limit: int = 1000) -> dict[str, Any]:
+        """Снапшот стакана (используется для синхронизации OrderBookManager)."""
+        if limit <= 100:
+            weight = 5
+        elif limit <= 500:
+            weight = 25
+        elif limit <= 1000:
+            weight = 50
+        else:
+            weight = 250
+        return await self._get_coalesced(
+            "/api/v3/depth", {"symbol": symbol, "limit": limit}, weight=weight
+        )
+
+    # --- Аккаунт и ордера ---
+
+    async def get_balances(self) -> dict[str, Any]:
+        """Информация об аккаунте, включая балансы."""
+        return await self._get_coalesced("/api/v3/account", weight=20, signed=True)
+
+    async def get_open_orders(self, symbol: str | None = None) -> list[dict[str, Any]]:
+        """Открытые ордера по символу или (без символа) по всем символам сразу."""
+        if symbol is None:
+            return await self._get_coalesced(
+                "/api/v3/openOrders", weight=self.OPEN_ORDERS_ALL_WEIGHT, signed=True
+            )
+        return await self._get_coalesced(
+            "/api/v3/openOrders",
+            {"symbol": symbol},
+            weight=self.OPEN_ORDERS_WEIGHT,
+            signed=True,
+        )
+
+    async def get_order(
+        self,
+        symbol: str,
+        order_id: int | None = None,
+        client_order_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Состояние ордера (в том числе завершенного) по ID биржи или клиентскому ID."""
+        params: dict[str, Any] = {"symbol": symbol}
+        if order_id is not None:
+            params["orderId"] = order_id
+        if client_order_id:
+            params["origClientOrderId"] = client_order_id
+        return await self._get_coalesced(
+            "/api/v3/order", params, weight=self.ORDER_WEIGHT, signed=True
+        )
+
+    async def get_my_trades(
+        self,
+        symbol: str,
+        from_id: int | None = None,
+        start_time: int | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        """
+        Сделки аккаунта по символу, начиная с ID сделки `from_id`
+        или с момента `start_time` (мс).
+        """
+        params: dict[str, Any] = {"symbol": symbol, "limit": limit}
+        if from_id is not None:
+            params["fromId"] = from_id
+        elif start_time is not None:
+            params["startTime"] = start_time
+        return await self._get_coalesced(
+            "/api/v3/myTrades", params, weight=self.MY_TRADES_WEIGHT, signed=True
+        )
+
+    async def _format_order(
+        self, symbol: str, quantity: float, price: float | None
+    ) -> tuple[str, str | None]:
+        info = await self.get_symbol_info(symbol)
+        quantity_str = format_decimal(
+            quantity, _filter_step(info, "LOT_SIZE", "stepSize"), ROUND_DOWN
+        )
+        aligned = Decimal(quantity_str)
+        min_qty = _filter_value(info, ("LOT_SIZE",), "minQty")
+        if aligned <= 0 or aligned < min_qty:
+            raise InvalidOrderError(
+                f"{symbol} order quantity {quantity!r} is {quantity_str} on the lot "
+                f"grid, below the minimum {format(min_qty.normalize(), 'f')}"
+            )
+        if price is None:
+            return quantity_str, None
+        price_str = format_decimal(
+            price, _filter_step(info, "PRICE_FILTER", "tickSize")
+        )
+        min_notional = _filter_value(info, ("NOTIONAL", "MIN_NOTIONAL"), "minNotional")
+        if aligned * Decimal(price_str) < min_notional:
+            raise InvalidOrderError(
+                f"{symbol} order value {quantity_str} x {price_str} is below "
+                f"the minimum notional {format(min_notional.normalize(), 'f')}"
+            )
+        return quantity_str, price_str
+
+    async def align_order(
+        self, symbol: str, quantity: float, price: float | None = None
+    ) -> tuple[float, float | None]:
+        """Количество и цена ордера в том виде, в каком их получит биржа."""
+        quantity_str, price_str = await self._format_order(symbol, quantity, price)
+        return float(quantity_str), None if price_str is None else float(price_str)
+
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,
+        order_type: str,
+        quantity: float,
+        price: float | None = None,
+        client_order_id: str | None = None,
+        time_in_force: str | None = "GTC",
+    ) -> dict[str, Any]:
+        """
+        Выставляет ордер. Запросы на выставление никогда не объединяются.
+        Количество округляется вниз до stepSize, цена — до ближайшего tickSize символа.
+
+        :raises InvalidOrderError: Ордер после округления меньше minQty или minNotional.
+        """
+        quantity_str, price_str = await self._format_order(symbol, quantity, price)
+        params: dict[str, Any] = {
+            "symbol": symbol,
+            "side": side,
+            "type": order_type,
+            "quantity": quantity_str,
+            "newOrderRespType": "ACK",
+        }
+        if price_str is not None:
+            params["price"] = price_str
+            if time_in_force:
+                params["timeInForce"] = time_in_force
+        if client_order_id:
+            params["newClientOrderId"] = client_order_id
+        return await self._request(
+            "POST",
+            "/api/v3/order",
+            params,
+            weight=1,
+            signed=True,
+            priority=True,
+            is_order=True,
+        )
+
+    async def cancel_order(
+        self,
+        symbol: str,
+        order_id: int | None = None,
+        client_order_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Отменяет ордер по ID биржи или клиентскому ID."""
+        params: dict[str, Any] = {"symbol": symbol}
+        if order_id is not None:
+            params["orderId"] = order_id
+        if client_order_id:
+            params["origClientOrderId"] = client_order_id
+        return await self._request(
+            "DELETE", "/api/v3/order", params, weight=1, signed=True, priority=True
+        )
+
+    async def cancel_open_orders(self, symbol: str) -> list[dict[str, Any]]:
+        """Отменяет все открытые ордера по символу одним запросом."""
+        return await self._request(
+            "DELETE",
+            "/api/v3/openOrders",
+            {"symbol": symbol},
+            weight=1,
+            signed=True,
+            priority=True,
+        )
+
+    async def create_listen_key(self) -> str:
+        """Создает listenKey для потока пользовательских событий (ордера, балансы)."""
+        response = await self._request("POST", "/api/v3/userDataStream", weight=2)
+        return response["listenKey"]
+
+    async def keepalive_listen_key(self, listen_key: str):
+        """Продлевает жизнь listenKey (биржа закрывает поток через 60 минут без продления)."""
+        await self._request(
+            "PUT", "/api/v3/userDataStream", {"listenKey": listen_key}, weight=2
+        )
+
+    def get_stats(self) -> dict[str, float | int]:
+        """Возвращает метрики клиента и остаток лимитов."""
+        return {
+            "requests_sent": self.requests_sent,
+            "coalesced_requests": self.coalesced_requests,
+            "rate_limit_hits": self.rate_limit_hits,
+            "weight_available": round(self.weight_limiter.available, 1),
+            "orders_available": round(self.order_limiter.available, 1),
+        }
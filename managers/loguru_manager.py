@@ -5,24 +5,226 @@
 - Конфигурацию "приемников" (sinks) для вывода логов в файлы, консоль, Sentry.
 - Установку единого формата логов для всех компонентов системы.
 - Обогащение логов контекстной информацией (например, user_id, deal_id).
+
+Профили логирования (переменная окружения LOG_PROFILE):
+- dev (по умолчанию) — цветная консоль и подробный файл (DEBUG, diagnose).
+- prod — для торгового горячего пути: уровень INFO, без diagnose/backtrace,
+  JSON Lines с контекстом (pair, order_id, deal_id), ограничение частоты
+  повторяющихся сообщений и запись из ограниченной очереди в фоновом потоке.
+  При переполнении очереди отбрасываются самые старые записи.
+
+В горячем пути сообщения передаются со скобочными аргументами, а не f-строкой:
+`logger.debug("{} filled at {}", pair, price)`. Тогда при выключенном уровне
+строка вообще не форматируется. Повторяющиеся на каждом тике сообщения
+включенного уровня дополнительно закрываются LogThrottle: запись loguru
+создается до фильтров приемников, и даже подавленное сообщение стоит микросекунды.
 """
 
-import sys
+import json
 import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
 from pathlib import Path
 
 from loguru import logger
 
+# Поля контекста, попадающие в JSON-запись (задаются через bind/contextualize)
+CONTEXT_FIELDS = ("pair", "order_id", "deal_id", "user_id")
+
+
+class RateLimitFilter:
+    """
+    Фильтр loguru, ограничивающий частоту сообщений каждой строки кода.
+
+    Не больше `max_per_interval` сообщений одного места вызова за `interval`
+    секунд. Число подавленных сообщений добавляется в поле `field` первой
+    записи следующего окна. Запись общая для всех приемников, поэтому у фильтра
+    каждого приемника свое поле. Сообщение с `logger.bind(sample=N)`
+    пропускается только каждое N-е. Ошибки (ERROR и выше) не ограничиваются.
+    """
+
+    def __init__(
+        self,
+        max_per_interval: int = 20,
+        interval: float = 1.0,
+        field: str = "suppressed",
+    ):
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.field = field
+        # (модуль, строка) -> [начало окна, выведено, подавлено, всего]
+        self._sites: dict[tuple[str, int], list] = {}
+
+    def __call__(self, record: dict) -> bool:
+        if record["level"].no >= 40:
+            return True
+        key = (record["name"], record["line"])
+        site = self._sites.get(key)
+        now = time.monotonic()
+        if site is None:
+            site = self._sites[key] = [now, 0, 0, 0]
+        site[3] += 1
+        sample = record["extra"].get("sample")
+        if sample and site[3] % sample:
+            return False
+        if now - site[0] >= self.interval:
+            if site[2]:
+                record["extra"][self.field] = site[2]
+            site[0], site[1], site[2] = now, 0, 0
+        if site[1] >= self.max_per_interval:
+            site[2] += 1
+            return False
+        site[1] += 1
+        return True
+
+
+class LogThrottle:
+    """
+    Дешевая проверка перед вызовом логгера для сообщений на каждом тике:
+
+        if throttle.allow():
+            logger.info("{}: state updated (+{} skipped)", pair, throttle.skipped)
+    """
+
+    __slots__ = ("interval", "_next_at", "skipped", "_skipped")
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._next_at = 0.0
+        # Сколько сообщений пропущено перед последним разрешенным
+        self.skipped = 0
+        self._skipped = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_at:
+            self._skipped += 1
+            return False
+        self._next_at = now + self.interval
+        self.skipped, self._skipped = self._skipped, 0
+        return True
+
+
+class JsonLinesSink:
+    """
+    Приемник loguru, пишущий JSON Lines из фонового потока.
+
+    В вызывающем потоке запись лишь кладется в ограниченную очередь (deque с
+    maxlen): логирование не блокирует event loop на диске, а при переполнении
+    вытесняются самые старые записи. Файл ротируется по размеру, хранятся
+    последние `retention` ротированных файлов.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_queue: int = 10_000,
+        max_bytes: int = 10 * 1024 * 1024,
+        retention: int = 10,
+        suppressed_field: str = "suppressed",
+    ):
+        """
+        :param suppressed_field: Поле, в которое RateLimitFilter этого приемника
+            записывает число подавленных сообщений.
+        """
+        self._path = path
+        self._max_bytes = max_bytes
+        self._retention = retention
+        self._suppressed_field = suppressed_field
+        self._queue: deque[dict] = deque(maxlen=max_queue)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.dropped = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, message):
+        record = message.record
+        extra = record["extra"]
+        entry = {
+            "ts": record["time"].timestamp(),
+            "level": record["level"].name,
+            "msg": record["message"],
+            "src": f"{record['name']}:{record['function']}:{record['line']}",
+        }
+        for field in CONTEXT_FIELDS:
+            value = extra.get(field)
+            if value is not None:
+                entry[field] = value
+        suppressed = extra.get(self._suppressed_field)
+        if suppressed is not None:
+            entry["suppressed"] = suppressed
+        if record["exception"] is not None:
+            entry["exc"] = repr(record["exception"].value)
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(entry)
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped or self._queue:
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self):
+        queue, file = self._queue, self._file
+        lines = []
+        while queue:
+            lines.append(json.dumps(queue.popleft(), default=str))
+        if not lines:
+            return
+        if self.dropped:
+            lines.append(json.dumps({"level": "WARNING", "dropped": self.dropped}))
+            self.dropped = 0
+        file.write("\n".join(lines) + "\n")
+        file.flush()
+        if file.tell() >= self._max_bytes:
+            self._rotate()
 
-def setup_logger(process_name: str = "app"):
+    def _rotate(self):
+        self._file.close()
+        self._path.rename(
+            self._path.with_name(f"{self._path.stem}_{time.time_ns()}.jsonl")
+        )
+        self._file = open(self._path, "a", encoding="utf-8")
+        # Метка времени в имени одной длины: сортировка по имени — по возрасту
+        rotated = sorted(self._path.parent.glob(f"{self._path.stem}_*.jsonl"))
+        for old in rotated[: max(len(rotated) - self._retention, 0)]:
+            old.unlink(missing_ok=True)
+
+    def stop(self):
+        """Дописывает очередь и закрывает файл (вызывается loguru при remove)."""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._file.close()
+
+
+def setup_logger(
+    process_name: str = "app",
+    profile: str | None = None,
+    log_dir: str | Path = "logs",
+    console: bool = True,
+):
     """
     Настраивает логгер Loguru для всего приложения (клиент и сервер).
 
     :param process_name: Имя процесса ('client', 'server'), используется для имени файла лога.
+    :param profile: Профиль 'dev' или 'prod' (по умолчанию из переменной окружения LOG_PROFILE).
+    :param log_dir: Каталог файлов логов.
+    :param console: Выводить ли логи в консоль.
     - Удаляет стандартные обработчики.
-    - Добавляет цветной вывод в консоль (уровень INFO и выше).
-    - Добавляет запись всех логов (уровень DEBUG и выше) в файл с ротацией.
+    - Добавляет вывод в консоль (уровень INFO и выше).
+    - Добавляет запись логов в файл: подробный с ротацией (dev) или JSON Lines (prod).
     """
+    profile = (profile or os.getenv("LOG_PROFILE", "dev")).lower()
     logger.remove()  # Удаляем все предыдущие обработчики для чистоты
 
     # --- Прямая настройка стандартных логгеров ---
@@ -43,19 +245,25 @@ def setup_logger(process_name: str = "app"):
     )
 
     # Создаем папку для логов, если ее нет
-    log_dir = Path("logs")
+    log_dir = Path(log_dir)
     log_dir.mkdir(exist_ok=True)
 
+    if profile == "prod":
+        _setup_prod(process_name, log_dir, console)
+        logger.info(f"Logger for '{process_name}' configured with 'prod' profile.")
+        return
+
     # Настройка вывода в консоль
-    logger.add(
-        sys.stderr,
-        level="INFO",
-        format=console_format,
-        colorize=True,
-        # enqueue=False (по умолчанию). Для консоли клиента на Windows
-        # использование enqueue=True может приводить к deadlock при запуске.
-        # Поэтому оставляем синхронный вывод в консоль.
-    )
+    if console:
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            format=console_format,
+            colorize=True,
+            # enqueue=False (по умолчанию). Для консоли клиента на Windows
+            # использование enqueue=True может приводить к deadlock при запуске.
+            # Поэтому оставляем синхронный вывод в консоль.
+        )
 
     # Настройка вывода в файл
     logger.add(
@@ -70,3 +278,44 @@ def setup_logger(process_name: str = "app"):
     )
 
     logger.info(f"Logger for '{process_name}' has been successfully configured.")
+
+
+def _console_format(record: dict) -> str:
+    """Формат консоли prod с числом подавленных фильтром консоли сообщений."""
+    suffix = (
+        " (+{extra[console_suppressed]} suppressed)"
+        if "console_suppressed" in record["extra"]
+        else ""
+    )
+    return (
+        "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{line} - {message}"
+        + suffix
+        + "\n{exception}"
+    )
+
+
+def _setup_prod(process_name: str, log_dir: Path, console: bool):
+    """Профиль prod: INFO, без diagnose, ограничение частоты и JSON Lines."""
+    rate_limit = int(os.getenv("LOG_RATE_LIMIT", "20"))
+    if console:
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            format=_console_format,
+            colorize=False,
+            filter=RateLimitFilter(rate_limit, field="console_suppressed"),
+            backtrace=False,
+            diagnose=False,
+        )
+    logger.add(
+        JsonLinesSink(
+            log_dir / f"{process_name}.jsonl",
+            max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            retention=int(os.getenv("LOG_RETENTION_FILES", "10")),
+        ),
+        level="INFO",
+        format="{message}",
+        filter=RateLimitFilter(rate_limit),
+        backtrace=False,
+        diagnose=False,
+    )
@@ -0,0 +1,412 @@
+"""
+Модуль метрик процесса в формате Prometheus.
+
+Отвечает за:
+- Счетчики, gauge и гистограммы, в которые пишут TradingBot, менеджеры и API.
+  Запись — простое изменение атрибута без блокировок (все записи идут из
+  потока event loop, а чтение при выгрузке терпимо к гонкам), поэтому метрики
+  можно оставлять включенными на каждом тике.
+- Гистограммы в стиле HDR: лог-линейные корзины (16 на каждую степень двойки)
+  с относительной погрешностью ~3% от 0.5 мкс до 256 с. Индекс корзины
+  вычисляется за O(1) через math.frexp; значения больше 256 с попадают
+  только в корзину le="+Inf".
+- Текстовую выгрузку для эндпоинта /metrics (в API) и минимальный HTTP-сервер
+  метрик для процессов без веб-фреймворка (воркеры).
+- Монитор event loop: задержку (lag) цикла и обнаружение медленных колбэков,
+  блокирующих loop, со стеком виновника.
+
+Метрики модуля объявляются один раз на уровне модуля через REGISTRY:
+
+    ORDER_ACK = REGISTRY.histogram("scalpex_order_ack_seconds", "Submit to ACK latency")
+    ORDER_ACK.observe(0.012)
+"""
+
+import asyncio
+import math
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+
+from loguru import logger
+
+# Границы гистограммы: 2**_MIN_EXP ... 2**_MAX_EXP секунд
+_MIN_EXP = -20
+_MAX_EXP = 8
+_SUB_BUCKETS = 16
+_BUCKETS = (_MAX_EXP - _MIN_EXP) * _SUB_BUCKETS
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class CounterChild:
+    """Монотонно растущий счетчик одной комбинации меток."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class GaugeChild:
+    """Текущее значение одной комбинации меток (или функция, читаемая при выгрузке)."""
+
+    __slots__ = ("value", "_function")
+
+    def __init__(self):
+        self.value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Значение будет вычисляться вызовом функции при каждой выгрузке."""
+        self._function = function
+
+    def get(self) -> float:
+        return self._function() if self._function is not None else self.value
+
+
+class HistogramChild:
+    """Лог-линейная гистограмма одной комбинации меток."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Добавляет одно измерение (в секундах или других единицах > 0)."""
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        if value <= 0.0:
+            self.counts[0] += 1
+            return
+        # Корзина (нижняя, верхняя]: значение на границе попадает в корзину
+        # с этой верхней границей, как того требует le в Prometheus
+        mantissa, exponent = math.frexp(value)
+        index = (exponent - _MIN_EXP - 1) * _SUB_BUCKETS + (
+            math.ceil((mantissa - 0.5) * 2 * _SUB_BUCKETS) - 1
+        )
+        if index < 0:
+            index = 0
+        elif index >= _BUCKETS:
+            # Больше 2**_MAX_EXP: значение учитывается только в count (le="+Inf")
+            return
+        self.counts[index] += 1
+
+    @staticmethod
+    def bucket_upper_bound(index: int) -> float:
+        octave, sub = divmod(index, _SUB_BUCKETS)
+        return (0.5 + (sub + 1) / (2 * _SUB_BUCKETS)) * 2.0 ** (octave + _MIN_EXP + 1)
+
+    def percentile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает q-й процентиль."""
+        if not self.count:
+            return 0.0
+        threshold = self.count * q / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float | int]:
+        """Сводка в миллисекундах."""
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+    def cumulative_octaves(self) -> list[tuple[float, int]]:
+        """Накопленные счетчики на границах степеней двойки (для выгрузки le)."""
+        result = []
+        cumulative = 0
+        for octave in range(_MAX_EXP - _MIN_EXP):
+            start = octave * _SUB_BUCKETS
+            cumulative += sum(self.counts[start : start + _SUB_BUCKETS])
+            result.append((2.0 ** (octave + _MIN_EXP + 1), cumulative))
+        return result
+
+
+class Metric:
+    """Семейство метрик с именем, описанием и набором меток."""
+
+    kind = ""
+    child_class: type = CounterChild
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+        # Метрика без меток сама ведет себя как единственный дочерний элемент
+        self._default = self.labels() if not labelnames else None
+
+    def labels(self, *values: str):
+        """
+        Возвращает дочернюю метрику для значений меток. На горячем пути
+        результат стоит сохранить, чтобы не искать его в словаре каждый раз.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self.child_class()
+        return child
+
+    def remove(self, *values: str):
+        """Удаляет дочернюю метрику (например, остановленной пары)."""
+        self._children.pop(values, None)
+
+    def collect(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._samples(_format_labels(self.labelnames, values), child))
+        return lines
+
+    def _samples(self, labels: str, child) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+    child_class = CounterChild
+
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+
+    def _samples(self, labels: str, child: CounterChild) -> list[str]:
+        return [f"{self.name}_total{labels} {_format_value(child.value)}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    child_class = GaugeChild
+
+    def set(self, value: float):
+        self._default.value = value
+
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+
+    def dec(self, amount: float = 1):
+        self._default.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+    def _samples(self, labels: str, child: GaugeChild) -> list[str]:
+        return [f"{self.name}{labels} {_format_value(float(child.get()))}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    child_class = HistogramChild
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def summary(self) -> dict[str, float | int]:
+        return self._default.summary()
+
+    def _samples(self, labels: str, child: HistogramChild) -> list[str]:
+        inner = labels[1:-1] + "," if labels else ""
+        lines = [
+            f'{self.name}_bucket{{{inner}le="{_format_value(bound)}"}} {count}'
+            for bound, count in child.cumulative_octaves()
+        ]
+        lines.append(f'{self.name}_bucket{{{inner}le="+Inf"}} {child.count}')
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def _get_or_create(
+        self, cls: type, name: str, documentation: str, labelnames: tuple[str, ...]
+    ):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, tuple(labelnames))
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered differently.")
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр процесса
+REGISTRY = MetricsRegistry()
+
+LOOP_LAG = REGISTRY.histogram(
+    "scalpex_event_loop_lag_seconds", "Delay of event loop wakeups past schedule"
+)
+SLOW_CALLBACKS = REGISTRY.counter(
+    "scalpex_slow_callbacks", "Callbacks that blocked the event loop too long"
+)
+
+
+class LoopMonitor:
+    """
+    Монитор event loop.
+
+    Задача-зонд просыпается каждые `interval` секунд и записывает, насколько
+    позже положенного она проснулась (lag). Сторожевой поток следит за отметкой
+    зонда: если loop не отвечает дольше `slow_callback_threshold`, значит его
+    блокирует синхронный код. Поток снимает стек потока loop и логирует место,
+    где тот застрял.
+    """
+
+    def __init__(self, interval: float = 0.1, slow_callback_threshold: float = 0.25):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Запускает зонд в текущем event loop и сторожевой поток."""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._probe())
+        self._stopped.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        interval = self.interval
+        while True:
+            scheduled = loop.time() + interval
+            await asyncio.sleep(interval)
+            LOOP_LAG.observe(max(loop.time() - scheduled, 0.0))
+            self._beat = time.monotonic()
+
+    def _watch(self):
+        reported_beat = None
+        check_every = self.slow_callback_threshold / 2
+        while not self._stopped.wait(check_every):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.slow_callback_threshold or beat == reported_beat:
+                continue
+            # Одно предупреждение на одну блокировку loop
+            reported_beat = beat
+            SLOW_CALLBACKS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=8)) if frame else ""
+            logger.warning(
+                "Event loop blocked for over {:.0f} ms:\n{}", stalled * 1000, stack
+            )
+
+
+async def start_metrics_server(
+    port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY
+) -> asyncio.Server:
+    """
+    Поднимает минимальный HTTP-сервер, отдающий выгрузку реестра на любой
+    GET-запрос. Нужен воркерам, в которых нет FastAPI.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Заголовки запроса не нужны: читаем их до пустой строки и отвечаем
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = registry.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Metrics server listening on {host}:{port}.")
+    return server
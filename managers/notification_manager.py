@@ -2,7 +2,343 @@
 Модуль для управления всеми видами уведомлений.
 
 Отвечает за:
-- Отправку уведомлений в клиентское GUI-приложение.
+- Отправку уведомлений в клиентское GUI-приложение (через поток статусов).
 - Отправку сообщений пользователям через Telegram-бота.
-- Форматирование сообщений для разных каналов.
+- Объединение всплесков однотипных событий в дайджесты: вместо 12 сообщений
+  об исполнениях пользователь получает одно «12 fills on KASUSDT in the last 5s».
+- Очереди пользователей с приоритетами: срочные уведомления (CRITICAL) минуют
+  дайджесты и отправляются первыми, при переполнении очереди первыми
+  отбрасываются неважные (LOW).
+
+Методы notify/alert не блокируют и безопасны для горячего пути: сетевая
+отправка идет в фоновых задачах, по одной на пользователя с непустой очередью.
 """
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Protocol
+
+from loguru import logger
+
+from managers.metrics_manager import REGISTRY
+from managers.telegram_manager import TelegramAPIError, TelegramClient
+from shared.enums import BotStatus, NotificationPriority
+
+if TYPE_CHECKING:
+    from managers.order_manager import Order
+
+# Пользователь однопользовательской установки
+DEFAULT_USER = "default"
+
+NOTIFICATIONS_SENT = REGISTRY.counter(
+    "scalpex_notifications_sent", "Notifications delivered", ("channel",)
+)
+NOTIFICATIONS_DROPPED = REGISTRY.counter(
+    "scalpex_notifications_dropped", "Notifications dropped on queue overflow"
+)
+NOTIFICATIONS_COALESCED = REGISTRY.counter(
+    "scalpex_notifications_coalesced", "Notifications merged into digests"
+)
+
+# Как называть события в тексте дайджеста ("12 fills on KASUSDT ...")
+_DIGEST_NOUNS = {"fill": "fills", "status": "status changes", "info": "events"}
+
+
+class NotificationSink(Protocol):
+    """Получатель уведомлений GUI (например, StatusBroadcaster)."""
+
+    def publish_notification(self, payload: dict[str, Any]): ...
+
+
+@dataclass(slots=True)
+class Notification:
+    """Одно уведомление пользователю."""
+
+    user_id: str
+    text: str
+    priority: NotificationPriority = NotificationPriority.NORMAL
+    # Тип события: уведомления одного типа и пары объединяются в дайджест
+    kind: str = "info"
+    pair: str | None = None
+    created_at: float = field(default_factory=time.time)
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "type": "notification",
+            "user_id": self.user_id,
+            "text": self.text,
+            "priority": self.priority.value,
+            "kind": self.kind,
+            "pair": self.pair,
+            "time": self.created_at,
+        }
+
+
+@dataclass(slots=True)
+class _Digest:
+    """Накопленные за окно уведомления одного пользователя, типа и пары."""
+
+    window_started: float
+    count: int = 0
+    last: Notification | None = None
+
+
+class _UserQueue:
+    """Ограниченная очередь уведомлений пользователя с очередью на каждый приоритет."""
+
+    __slots__ = ("queues", "max_size", "sender")
+
+    def __init__(self, max_size: int):
+        self.queues: tuple[deque[Notification], ...] = tuple(
+            deque() for _ in NotificationPriority
+        )
+        self.max_size = max_size
+        self.sender: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues)
+
+    def push(self, notification: Notification) -> bool:
+        """
+        Добавляет уведомление. При переполнении вытесняет самое старое
+        уведомление низшего приоритета; CRITICAL не вытесняется никогда.
+        Возвращает False, если отброшено само новое уведомление.
+        """
+        rank = notification.priority.rank
+        if len(self) >= self.max_size:
+            for lower in range(len(self.queues) - 1, rank, -1):
+                if self.queues[lower]:
+                    self.queues[lower].popleft()
+                    NOTIFICATIONS_DROPPED.inc()
+                    break
+            else:
+                if rank:
+                    NOTIFICATIONS_DROPPED.inc()
+                    return False
+        self.queues[rank].append(notification)
+        return True
+
+    def pop(self) -> Notification | None:
+        """Самое старое уведомление самого срочного приоритета."""
+        for queue in self.queues:
+            if queue:
+                return queue.popleft()
+        return None
+
+
+class NotificationManager:
+    """
+    Конвейер уведомлений: дайджесты, приоритеты и доставка в каналы.
+
+    GUI получает уведомления сразу после объединения в дайджест (рассылка
+    в процессе, без лимитов). В Telegram уведомления идут через очередь
+    пользователя, которую разбирает его задача-отправитель в темпе лимитов
+    TelegramClient.
+    """
+
+    def __init__(
+        self,
+        telegram: TelegramClient | None = None,
+        gui: NotificationSink | None = None,
+        chat_ids: dict[str, str | int] | None = None,
+        digest_window: float = 5.0,
+        max_queue_size: int = 100,
+    ):
+        """
+        :param telegram: Клиент Telegram. Без него уведомления идут только в GUI.
+        :param gui: Получатель уведомлений для клиентских приложений
+            (получает уведомления пользователя DEFAULT_USER).
+        :param chat_ids: Чаты Telegram пользователей (по умолчанию TELEGRAM_CHAT_ID
+            для пользователя DEFAULT_USER).
+        :param digest_window: Окно объединения однотипных уведомлений, в секундах.
+        :param max_queue_size: Предел очереди Telegram-уведомлений одного пользователя.
+        """
+        self._telegram = telegram
+        self._gui = gui
+        if chat_ids is None:
+            chat_id = os.getenv("TELEGRAM_CHAT_ID")
+            chat_ids = {DEFAULT_USER: chat_id} if chat_id else {}
+        self._chat_ids = dict(chat_ids)
+        self.digest_window = digest_window
+        self._max_queue_size = max_queue_size
+        # Открытые окна дайджестов: (user_id, kind, pair) -> накопленное
+        self._digests: dict[tuple[str, str, str | None], _Digest] = {}
+        self._queues: dict[str, _UserQueue] = {}
+        self._flush_task: asyncio.Task | None = None
+
+        # --- Метрики конвейера ---
+        self.received = 0
+        self.digests_sent = 0
+        self.delivery_errors = 0
+
+    def set_chat_id(self, user_id: str, chat_id: str | int | None):
+        """Привязывает (или отвязывает при None) чат Telegram к пользователю."""
+        if chat_id is None:
+            self._chat_ids.pop(user_id, None)
+        else:
+            self._chat_ids[user_id] = chat_id
+
+    def start(self):
+        """Запускает фоновую отправку дайджестов."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Отправляет накопленные дайджесты и дожидается очередей Telegram."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._flush_digests(force=True)
+        senders = [q.sender for q in self._queues.values() if q.sender is not None]
+        if senders:
+            await asyncio.gather(*senders, return_exceptions=True)
+
+    # --- Прием уведомлений ---
+
+    def notify(
+        self,
+        text: str,
+        user_id: str = DEFAULT_USER,
+        priority: NotificationPriority = NotificationPriority.NORMAL,
+        kind: str = "info",
+        pair: str | None = None,
+    ):
+        """
+        Принимает уведомление. Первое уведомление своего типа отправляется сразу
+        и открывает окно дайджеста; следующие в пределах окна копятся и уходят
+        одним сообщением по его окончании. CRITICAL отправляется сразу всегда.
+        """
+        self.received += 1
+        notification = Notification(user_id, text, priority, kind, pair)
+        if priority is NotificationPriority.CRITICAL:
+            self._dispatch(notification)
+            return
+        key = (user_id, kind, pair)
+        digest = self._digests.get(key)
+        if digest is None:
+            self._digests[key] = _Digest(window_started=time.monotonic())
+            self._dispatch(notification)
+            return
+        digest.count += 1
+        digest.last = notification
+        NOTIFICATIONS_COALESCED.inc()
+
+    def alert(self, text: str, user_id: str = DEFAULT_USER, pair: str | None = None):
+        """Срочное уведомление (ошибка торговли, падение цикла пары)."""
+        self.notify(text, user_id, NotificationPriority.CRITICAL, "alert", pair)
+
+    def on_fill(self, order: "Order", fill: dict[str, Any]):
+        """Слушатель исполнений OrderManager."""
+        self.notify(
+            f"{order.symbol}: {order.side} {fill['qty']:g} @ {fill['price']:g}",
+            order.user_id or DEFAULT_USER,
+            kind="fill",
+            pair=order.symbol,
+        )
+
+    def on_status(self, pair: str, status: BotStatus):
+        """Слушатель изменений статуса пар TradingBot."""
+        status = getattr(status, "value", status)
+        self.notify(f"{pair}: {status}", kind="status", pair=pair)
+
+    # --- Дайджесты ---
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.digest_window / 5)
+            self._flush_digests()
+
+    def _flush_digests(self, force: bool = False):
+        """
+        Закрывает окна, которые длятся дольше digest_window. Если в окне
+        накопились уведомления, отправляет дайджест и открывает новое окно,
+        иначе окно удаляется и следующее уведомление уйдет сразу.
+        """
+        now = time.monotonic()
+        for key, digest in list(self._digests.items()):
+            elapsed = now - digest.window_started
+            if elapsed < self.digest_window and not force:
+                continue
+            if not digest.count:
+                del self._digests[key]
+                continue
+            last = digest.last
+            if digest.count == 1:
+                text = last.text
+            else:
+                noun = _DIGEST_NOUNS.get(last.kind, last.kind)
+                scope = f" on {last.pair}" if last.pair else ""
+                text = (
+                    f"{digest.count} {noun}{scope} in the last {elapsed:.0f}s. "
+                    f"Latest: {last.text}"
+                )
+                self.digests_sent += 1
+            self._dispatch(
+                Notification(last.user_id, text, last.priority, last.kind, last.pair)
+            )
+            digest.window_started = now
+            digest.count = 0
+            digest.last = None
+
+    # --- Доставка ---
+
+    def _dispatch(self, notification: Notification):
+        """Передает готовое уведомление в каналы."""
+        # Клиент GUI — консоль оператора: уведомления остальных пользователей
+        # уходят только в их чаты
+        if self._gui is not None and notification.user_id == DEFAULT_USER:
+            self._gui.publish_notification(notification.to_payload())
+            NOTIFICATIONS_SENT.labels("gui").inc()
+        if self._telegram is None or notification.user_id not in self._chat_ids:
+            return
+        queue = self._queues.get(notification.user_id)
+        if queue is None:
+            queue = self._queues[notification.user_id] = _UserQueue(
+                self._max_queue_size
+            )
+        if queue.push(notification) and queue.sender is None:
+            queue.sender = asyncio.create_task(
+                self._send_queue(notification.user_id, queue)
+            )
+
+    async def _send_queue(self, user_id: str, queue: _UserQueue):
+        """Разбирает очередь пользователя; задача завершается, когда очередь пуста."""
+        try:
+            while (notification := queue.pop()) is not None:
+                chat_id = self._chat_ids.get(user_id)
+                if chat_id is None:
+                    continue
+                try:
+                    await self._telegram.send_message(
+                        chat_id,
+                        notification.text,
+                        urgent=notification.priority is NotificationPriority.CRITICAL,
+                    )
+                    NOTIFICATIONS_SENT.labels("telegram").inc()
+                except TelegramAPIError as e:
+                    self.delivery_errors += 1
+                    logger.warning(f"Telegram delivery to {user_id} failed: {e}")
+        finally:
+            queue.sender = None
+            if not len(queue):
+                self._queues.pop(user_id, None)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Возвращает метрики конвейера и клиента Telegram."""
+        stats = {
+            "received": self.received,
+            "digests_sent": self.digests_sent,
+            "open_digests": len(self._digests),
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "delivery_errors": self.delivery_errors,
+        }
+        if self._telegram is not None:
+            stats["telegram"] = self._telegram.get_stats()
+        return stats
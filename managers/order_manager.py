@@ -0,0 +1,555 @@
+"""
+Модуль для управления ордерами.
+
+Отвечает за:
+- Реестр открытых и ожидающих подтверждения ордеров в памяти процесса,
+  индексированный по клиентскому ID и по ID биржи.
+- Конкурентное выставление и отмену ордеров (и пакетную отмену по символу).
+- Сопоставление событий исполнения из WebSocket-потока пользователя за O(1).
+- Замер задержек submit→ack и submit→fill (гистограммы реестра метрик).
+- Применение состояния ордеров и сделок, полученных сверкой с биржей
+  (ReconciliationManager), с версией и хэшем состояния по каждому символу.
+
+Ордер регистрируется в реестре под клиентским ID еще до отправки запроса
+(статус PENDING). Поэтому исполнение, пришедшее по WebSocket раньше HTTP-ответа
+биржи (ACK), не теряется: оно находит ордер по клиентскому ID.
+
+Клиентский ID несет метку пользователя-владельца (sx<запуск>-<номер>.<метка>):
+по ней ордер, восстановленный сверкой после рестарта, возвращается владельцу.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import httpx
+from loguru import logger
+
+from managers.exchange_manager import ExchangeAPIError, ExchangeClient
+from managers.metrics_manager import REGISTRY
+from shared.enums import OrderStatus
+
+if TYPE_CHECKING:
+    from managers.websocket_manager import WebsocketManager
+
+# Слушатель исполнений: listener(order, fill), где fill — данные последней сделки
+FillListener = Callable[["Order", dict[str, Any]], None]
+
+ORDER_ACK_LATENCY = REGISTRY.histogram(
+    "scalpex_order_ack_seconds", "Latency from order submit to exchange ACK"
+)
+ORDER_FILL_LATENCY = REGISTRY.histogram(
+    "scalpex_order_fill_seconds", "Latency from order submit to first fill"
+)
+ORDERS_PLACED = REGISTRY.counter("scalpex_orders_placed", "Orders sent to exchange")
+ORDERS_REJECTED = REGISTRY.counter(
+    "scalpex_orders_rejected", "Orders rejected by exchange"
+)
+
+# Префикс клиентских ID ордеров бота (по нему сверка находит ордера прошлых запусков)
+CLIENT_ID_PREFIX = "sx"
+# Разделитель метки владельца в клиентском ID (в остальной части ID его нет)
+OWNER_SEPARATOR = "."
+
+
+def owner_tag(user_id: str) -> str:
+    """Короткая метка пользователя для клиентского ID (биржа ограничивает ID 36 символами)."""
+    return hashlib.blake2b(user_id.encode(), digest_size=4).hexdigest()
+
+
+def order_state_digest(states: Iterable[tuple[int, str, float]]) -> str:
+    """
+    Хэш набора состояний ордеров (ID биржи, статус, исполненный объем).
+    Не зависит от порядка: одинаков для локального реестра и ответа биржи,
+    если они согласованы.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for order_id, status, filled_qty in sorted(states):
+        digest.update(f"{order_id}:{status}:{filled_qty:.8f};".encode())
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class OrderRequest:
+    """Параметры нового ордера."""
+
+    symbol: str
+    side: str
+    order_type: str
+    quantity: float
+    price: float | None = None
+    deal_id: int | None = None
+    # Пользователь, от имени стратегии которого выставлен ордер
+    user_id: str | None = None
+
+
+@dataclass(slots=True)
+class Order:
+    """Компактное представление ордера в реестре."""
+
+    client_order_id: str
+    symbol: str
+    side: str
+    order_type: str
+    quantity: float
+    price: float | None = None
+    deal_id: int | None = None
+    user_id: str | None = None
+    exchange_order_id: int | None = None
+    status: OrderStatus = OrderStatus.PENDING
+    filled_qty: float = 0.0
+    filled_quote: float = 0.0
+    # Отметки time.perf_counter() для замера задержек
+    submitted_at: float = 0.0
+    acked_at: float = 0.0
+    first_fill_at: float = 0.0
+
+    @property
+    def owner_tag(self) -> str | None:
+        """Метка владельца из клиентского ID (None у ордеров без метки)."""
+        return self.client_order_id.partition(OWNER_SEPARATOR)[2] or None
+
+    @property
+    def avg_fill_price(self) -> float:
+        """Средняя цена исполнения."""
+        return self.filled_quote / self.filled_qty if self.filled_qty else 0.0
+
+
+class OrderManager:
+    """
+    Менеджер ордеров одного аккаунта биржи.
+
+    Держит индекс открытых и ожидающих ордеров, выставляет и отменяет их через
+    `ExchangeClient` и применяет к ним события `executionReport` из потока пользователя.
+    """
+
+    # Сколько неизвестных событий исполнения хранить до появления ордера
+    _MAX_UNMATCHED_EVENTS = 1000
+    # Сколько ID примененных сделок помнить (чтобы сверка не повторила исполнение)
+    _MAX_SEEN_TRADES = 10000
+    # Период продления listenKey (биржа закрывает поток через 60 минут)
+    _LISTEN_KEY_KEEPALIVE = 30 * 60
+
+    def __init__(self, exchange: ExchangeClient, max_in_flight: int = 20):
+        """
+        :param exchange: REST-клиент биржи.
+        :param max_in_flight: Максимум одновременно выполняющихся запросов place/cancel.
+        """
+        self._exchange = exchange
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        # Префикс клиентских ID уникален для запуска процесса
+        self._id_prefix = f"{CLIENT_ID_PREFIX}{int(time.time() * 1000):x}"
+        self._id_counter = itertools.count(1)
+        # Известные владельцы ордеров: метка -> пользователь
+        self._owners: dict[str, str] = {}
+
+        # Открытые и ожидающие ордера
+        self._orders: dict[str, Order] = {}
+        self._by_exchange_id: dict[int, Order] = {}
+        # События по ордерам, которых еще нет в реестре (ID биржи -> события)
+        self._unmatched: OrderedDict[int, list[dict]] = OrderedDict()
+        self._fill_listeners: list[FillListener] = []
+        self._user_stream_task: asyncio.Task | None = None
+        # Биржа сообщила, что listenKey истек: поток нужно создать заново
+        self._listen_key_expired = asyncio.Event()
+        # Версия состояния ордеров символа: растет при каждом локальном изменении
+        self._versions: dict[str, int] = {}
+        # Примененные сделки: (символ, ID сделки) в порядке поступления
+        self._seen_trades: OrderedDict[tuple[str, int], None] = OrderedDict()
+
+        self.ack_latency = ORDER_ACK_LATENCY
+        self.fill_latency = ORDER_FILL_LATENCY
+
+    # --- Реестр ---
+
+    def new_client_order_id(self, user_id: str | None = None) -> str:
+        """Генерирует уникальный клиентский ID ордера (не длиннее 36 символов)."""
+        client_order_id = f"{self._id_prefix}-{next(self._id_counter):x}"
+        if user_id is None:
+            return client_order_id
+        return f"{client_order_id}{OWNER_SEPARATOR}{owner_tag(user_id)}"
+
+    def register_owner(self, user_id: str):
+        """
+        Запоминает пользователя, чтобы ордера с его меткой, восстановленные
+        сверкой, получили владельца (в том числе уже восстановленные).
+        """
+        tag = owner_tag(user_id)
+        self._owners[tag] = user_id
+        for order in self._orders.values():
+            if order.user_id is None and order.owner_tag == tag:
+                order.user_id = user_id
+
+    def get_order(self, client_order_id: str) -> Order | None:
+        """Ищет открытый ордер по клиентскому ID."""
+        return self._orders.get(client_order_id)
+
+    def get_order_by_exchange_id(self, exchange_order_id: int) -> Order | None:
+        """Ищет открытый ордер по ID биржи."""
+        return self._by_exchange_id.get(exchange_order_id)
+
+    def open_orders(self, symbol: str | None = None) -> list[Order]:
+        """Возвращает открытые и ожидающие ордера (опционально — по символу)."""
+        if symbol is None:
+            return list(self._orders.values())
+        return [o for o in self._orders.values() if o.symbol == symbol]
+
+    def add_fill_listener(self, listener: FillListener):
+        """Регистрирует обработчик исполнений ордеров."""
+        self._fill_listeners.append(listener)
+
+    def symbol_version(self, symbol: str) -> int:
+        """Версия состояния ордеров символа (меняется при любом изменении реестра)."""
+        return self._versions.get(symbol, 0)
+
+    def state_digest(self, symbol: str) -> str:
+        """Хэш состояния открытых ордеров символа, уже подтвержденных биржей."""
+        return order_state_digest(
+            (o.exchange_order_id, o.status.value, o.filled_qty)
+            for o in self._orders.values()
+            if o.symbol == symbol and o.exchange_order_id is not None
+        )
+
+    def _touch(self, symbol: str):
+        self._versions[symbol] = self._versions.get(symbol, 0) + 1
+
+    def _forget(self, order: Order):
+        """Убирает ордер в терминальном статусе из индексов."""
+        self._touch(order.symbol)
+        self._orders.pop(order.client_order_id, None)
+        if order.exchange_order_id is not None:
+            self._by_exchange_id.pop(order.exchange_order_id, None)
+
+    def _bind_exchange_id(self, order: Order, exchange_order_id: int):
+        """Связывает ордер с ID биржи и применяет события, пришедшие раньше."""
+        self._touch(order.symbol)
+        order.exchange_order_id = exchange_order_id
+        if not order.status.is_terminal:
+            self._by_exchange_id[exchange_order_id] = order
+        for event in self._unmatched.pop(exchange_order_id, ()):
+            self._apply_execution_report(order, event)
+
+    # --- Выставление и отмена ---
+
+    async def place_order(self, request: OrderRequest) -> Order:
+        """
+        Выставляет ордер. Ордер попадает в реестр со статусом PENDING до отправки,
+        а после ACK — индексируется еще и по ID биржи.
+        """
+        if request.user_id is not None:
+            self._owners.setdefault(owner_tag(request.user_id), request.user_id)
+        # В реестре ордер хранится с количеством и ценой, приведенными к сетке символа
+        quantity, price = await self._exchange.align_order(
+            request.symbol, request.quantity, request.price
+        )
+        order = Order(
+            client_order_id=self.new_client_order_id(request.user_id),
+            symbol=request.symbol,
+            side=request.side,
+            order_type=request.order_type,
+            quantity=quantity,
+            price=price,
+            deal_id=request.deal_id,
+            user_id=request.user_id,
+        )
+        self._orders[order.client_order_id] = order
+        self._touch(order.symbol)
+
+        # Записи лога во время запроса (включая REST-клиент) получают order_id и deal_id
+        with logger.contextualize(
+            order_id=order.client_order_id,
+            deal_id=order.deal_id,
+            user_id=order.user_id,
+        ):
+            async with self._in_flight:
+                order.submitted_at = time.perf_counter()
+                ORDERS_PLACED.inc()
+                try:
+                    ack = await self._exchange.place_order(
+                        order.symbol,
+                        order.side,
+                        order.order_type,
+                        order.quantity,
+                        price=order.price,
+                        client_order_id=order.client_order_id,
+                    )
+                except ExchangeAPIError:
+                    order.status = OrderStatus.REJECTED
+                    ORDERS_REJECTED.inc()
+                    self._forget(order)
+                    raise
+                # При сетевой ошибке ордер остается PENDING: он мог дойти до биржи,
+                # и его судьбу определит событие исполнения или сверка состояния.
+
+        order.acked_at = time.perf_counter()
+        self.ack_latency.observe(order.acked_at - order.submitted_at)
+        if order.status is OrderStatus.PENDING:
+            order.status = OrderStatus.NEW
+        self._bind_exchange_id(order, ack["orderId"])
+        return order
+
+    async def place_orders(
+        self, requests: list[OrderRequest]
+    ) -> list[Order | BaseException]:
+        """
+        Выставляет несколько ордеров конкурентно (у Binance Spot нет пакетного
+        эндпоинта для выставления). Ошибки возвращаются на месте соответствующих ордеров.
+        """
+        return await asyncio.gather(
+            *(self.place_order(r) for r in requests), return_exceptions=True
+        )
+
+    async def cancel_order(self, order: Order):
+        """Отменяет ордер по клиентскому ID (работает и до получения ACK)."""
+        async with self._in_flight:
+            response = await self._exchange.cancel_order(
+                order.symbol, client_order_id=order.client_order_id
+            )
+        self._apply_status(order, response.get("status"))
+
+    async def cancel_orders(self, orders: list[Order]) -> list[None | BaseException]:
+        """Отменяет несколько ордеров конкурентно."""
+        return await asyncio.gather(
+            *(self.cancel_order(o) for o in orders), return_exceptions=True
+        )
+
+    async def cancel_all(self, symbol: str):
+        """Отменяет все открытые ордера по символу одним пакетным запросом биржи."""
+        async with self._in_flight:
+            responses = await self._exchange.cancel_open_orders(symbol)
+        for response in responses:
+            order = self._orders.get(response.get("origClientOrderId", ""))
+            if order is not None:
+                self._apply_status(order, response.get("status"))
+
+    # --- События исполнения ---
+
+    def _apply_status(self, order: Order, status: str | None):
+        """Устанавливает статус ордера и убирает его из индексов, если он завершен."""
+        if status is None:
+            return
+        try:
+            status = OrderStatus(status)
+        except ValueError:
+            return
+        if status is not order.status:
+            order.status = status
+            self._touch(order.symbol)
+        if order.status.is_terminal:
+            self._forget(order)
+
+    def on_execution_report(self, event: dict[str, Any]):
+        """Применяет событие `executionReport` из потока пользователя к ордеру."""
+        # "c" — клиентский ID запроса; для отмен исходный ID ордера лежит в "C"
+        order = self._orders.get(event.get("C") or event["c"])
+        if order is None:
+            order = self._by_exchange_id.get(event["i"])
+        if order is None:
+            self._park_unmatched(event)
+            return
+        if order.exchange_order_id is None:
+            # Исполнение пришло раньше ACK: связываем ордер с ID биржи сразу
+            self._bind_exchange_id(order, event["i"])
+        self._apply_execution_report(order, event)
+
+    def _apply_execution_report(self, order: Order, event: dict[str, Any]):
+        """Обновляет объем исполнения и статус ордера."""
+        order.filled_qty = float(event["z"])
+        order.filled_quote = float(event["Z"])
+        self._touch(order.symbol)
+        if event["x"] == "TRADE" and self._mark_trade_seen(
+            order.symbol, event.get("t")
+        ):
+            now = time.perf_counter()
+            if not order.first_fill_at and order.submitted_at:
+                order.first_fill_at = now
+                self.fill_latency.observe(now - order.submitted_at)
+            fill = {
+                "price": float(event["L"]),
+                "qty": float(event["l"]),
+                "commission": float(event.get("n") or 0.0),
+                "commission_asset": event.get("N"),
+                "trade_id": event.get("t"),
+                "time": event.get("T"),
+            }
+            for listener in self._fill_listeners:
+                listener(order, fill)
+        self._apply_status(order, event["X"])
+
+    def _mark_trade_seen(self, symbol: str, trade_id: int | None) -> bool:
+        """Запоминает сделку; False, если она уже была применена."""
+        if trade_id is None:
+            return True
+        key = (symbol, trade_id)
+        if key in self._seen_trades:
+            return False
+        self._seen_trades[key] = None
+        while len(self._seen_trades) > self._MAX_SEEN_TRADES:
+            self._seen_trades.popitem(last=False)
+        return True
+
+    def _park_unmatched(self, event: dict[str, Any]):
+        """Сохраняет событие по неизвестному ордеру до его регистрации (ограниченно)."""
+        self._unmatched.setdefault(event["i"], []).append(event)
+        while len(self._unmatched) > self._MAX_UNMATCHED_EVENTS:
+            self._unmatched.popitem(last=False)
+
+    def on_user_event(self, data: dict[str, Any]):
+        """Обработчик потока пользователя из WebsocketManager."""
+        event_type = data.get("e")
+        if event_type == "executionReport":
+            self.on_execution_report(data)
+        elif event_type == "listenKeyExpired":
+            # Биржа больше не шлет события по этому ключу, хотя сокет не закрыт
+            logger.warning("User data stream listenKey expired.")
+            self._listen_key_expired.set()
+
+    # --- Сверка с биржей ---
+
+    def apply_trade(self, trade: dict[str, Any]) -> bool:
+        """
+        Применяет сделку из истории аккаунта (`myTrades`), пропущенную потоком
+        пользователя. Сделки, уже полученные из потока, и сделки чужих ордеров
+        пропускаются. Возвращает True, если исполнение применено.
+        """
+        order = self._by_exchange_id.get(trade["orderId"])
+        if not self._mark_trade_seen(trade["symbol"], trade["id"]) or order is None:
+            return False
+        qty = float(trade["qty"])
+        order.filled_qty += qty
+        order.filled_quote += float(trade["quoteQty"])
+        self._touch(order.symbol)
+        fill = {
+            "price": float(trade["price"]),
+            "qty": qty,
+            "commission": float(trade.get("commission") or 0.0),
+            "commission_asset": trade.get("commissionAsset"),
+            "trade_id": trade["id"],
+            "time": trade.get("time"),
+        }
+        for listener in self._fill_listeners:
+            listener(order, fill)
+        return True
+
+    def apply_exchange_order(self, data: dict[str, Any]) -> Order | None:
+        """
+        Применяет состояние ордера из ответа биржи (openOrders, order).
+
+        Неизвестный открытый ордер бота из прошлого запуска процесса добавляется
+        в реестр. Ордера текущего запуска регистрируются до отправки, поэтому
+        неизвестный ордер с текущим префиксом уже завершен и удален из реестра:
+        устаревший ответ биржи не возвращает его обратно.
+        """
+        client_order_id = data.get("clientOrderId", "")
+        order = self._orders.get(client_order_id) or self._by_exchange_id.get(
+            data["orderId"]
+        )
+        if order is None:
+            if (
+                not client_order_id.startswith(CLIENT_ID_PREFIX)
+                or client_order_id.startswith(self._id_prefix)
+                or OrderStatus(data["status"]).is_terminal
+            ):
+                return None
+            price = float(data.get("price") or 0.0)
+            order = Order(
+                client_order_id=client_order_id,
+                symbol=data["symbol"],
+                side=data["side"],
+                order_type=data["type"],
+                quantity=float(data["origQty"]),
+                price=price or None,
+                status=OrderStatus.NEW,
+            )
+            tag = order.owner_tag
+            if tag is not None:
+                order.user_id = self._owners.get(tag)
+            self._orders[client_order_id] = order
+            self._touch(order.symbol)
+        if order.exchange_order_id is None:
+            self._bind_exchange_id(order, data["orderId"])
+        filled_qty = float(data["executedQty"])
+        # Ответ биржи мог устареть относительно потока пользователя: не откатываем
+        if filled_qty < order.filled_qty:
+            return order
+        if filled_qty != order.filled_qty:
+            order.filled_qty = filled_qty
+            order.filled_quote = float(data["cummulativeQuoteQty"])
+            self._touch(order.symbol)
+        self._apply_status(order, data["status"])
+        return order
+
+    def drop_order(self, order: Order):
+        """Убирает ордер, которого нет на бирже (запрос на выставление не дошел)."""
+        order.status = OrderStatus.REJECTED
+        self._forget(order)
+
+    # --- Поток пользователя ---
+
+    def start_user_stream(self, feed: "WebsocketManager"):
+        """Запускает подписку на поток пользовательских событий по listenKey."""
+        if self._user_stream_task is None or self._user_stream_task.done():
+            self._user_stream_task = asyncio.create_task(self._run_user_stream(feed))
+
+    async def stop_user_stream(self):
+        """Останавливает поток пользовательских событий."""
+        if self._user_stream_task is not None:
+            self._user_stream_task.cancel()
+            try:
+                await self._user_stream_task
+            except asyncio.CancelledError:
+                pass
+            self._user_stream_task = None
+
+    async def _run_user_stream(self, feed: "WebsocketManager"):
+        """
+        Создает listenKey, подписывается на него и периодически продлевает.
+        Истекший ключ (событие listenKeyExpired) заменяется новым сразу.
+        """
+        listen_key = None
+        try:
+            while True:
+                try:
+                    if listen_key is None:
+                        self._listen_key_expired.clear()
+                        listen_key = await self._exchange.create_listen_key()
+                        feed.subscribe_raw(listen_key, self.on_user_event)
+                        logger.info("User data stream subscribed.")
+                    try:
+                        await asyncio.wait_for(
+                            self._listen_key_expired.wait(),
+                            self._LISTEN_KEY_KEEPALIVE,
+                        )
+                    except asyncio.TimeoutError:
+                        await self._exchange.keepalive_listen_key(listen_key)
+                        continue
+                    # Ключ истек: снимаем его поток (опустевшее соединение
+                    # закрывается) и подписываемся на новый без паузы
+                    feed.unsubscribe_raw(listen_key)
+                    listen_key = None
+                # Транспортные ошибки (обрыв, таймаут) ExchangeClient не оборачивает
+                except (ExchangeAPIError, httpx.HTTPError) as e:
+                    logger.error(
+                        f"User data stream error: {e!r}. Recreating listenKey."
+                    )
+                    if listen_key is not None:
+                        feed.unsubscribe_raw(listen_key)
+                        listen_key = None
+                    await asyncio.sleep(5)
+        finally:
+            if listen_key is not None:
+                feed.unsubscribe_raw(listen_key)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Возвращает размер реестра и гистограммы задержек."""
+        return {
+            "open_orders": len(self._orders),
+            "unmatched_events": len(self._unmatched),
+            "submit_to_ack": self.ack_latency.summary(),
+            "submit_to_fill": self.fill_latency.summary(),
+        }
@@ -0,0 +1,364 @@
+"""
+Модуль для хранения стаканов (L2 order book) торговых пар в памяти.
+
+Отвечает за:
+- Хранение уровней цен в компактных отсортированных массивах `array('d')`.
+- Применение снапшота и инкрементальных обновлений (diff) с контролем
+  последовательности и автоматической пересинхронизацией при разрывах.
+  Снапшот (вес 50) загружается не больше одного на пару, а после неудачной
+  или устаревшей загрузки следующая откладывается с экспоненциальной задержкой.
+- Быстрые ответы на вопросы стратегии: лучшие цены, спред, глубина, VWAP для объема.
+
+Обе стороны стакана хранятся по возрастанию ключа, лучший уровень — последний
+элемент массива. Для бидов ключ — сама цена, для асков — цена со знаком минус.
+Благодаря этому лучшие цены читаются за O(1), поиск уровня — бинарный (O(log n)),
+а большинство изменений (возле лучших цен) затрагивают хвост массива.
+"""
+
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from loguru import logger
+
+from managers.loguru_manager import LogThrottle
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+# Загрузчик снапшота стакана: snapshot_loader(pair, limit) -> ответ REST /depth биржи
+SnapshotLoader = Callable[[str, int], Awaitable[dict[str, Any]]]
+
+
+class OrderBookGapError(Exception):
+    """Обнаружен разрыв в последовательности обновлений стакана."""
+
+
+def parse_depth_update(data: dict) -> dict:
+    """
+    Преобразует сообщение потока <symbol>@depth биржи в данные события DEPTH.
+    Цены и объемы приводятся к float один раз, при парсинге.
+    """
+    return {
+        "first_id": data["U"],
+        "last_id": data["u"],
+        "bids": [(float(p), float(q)) for p, q in data["b"]],
+        "asks": [(float(p), float(q)) for p, q in data["a"]],
+        "time": data.get("E", 0),
+    }
+
+
+class _BookSide:
+    """Одна сторона стакана: отсортированные ключи цен и объемы в массивах double."""
+
+    __slots__ = ("_keys", "_qtys", "_sign", "max_levels")
+
+    def __init__(self, is_bid: bool, max_levels: int):
+        self._keys = array("d")
+        self._qtys = array("d")
+        # Для асков храним -price, чтобы лучший уровень тоже был в конце массива
+        self._sign = 1.0 if is_bid else -1.0
+        self.max_levels = max_levels
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        """Удаляет все уровни."""
+        del self._keys[:]
+        del self._qtys[:]
+
+    def update(self, price: float, qty: float):
+        """Устанавливает объем на уровне цены; нулевой объем удаляет уровень."""
+        keys = self._keys
+        key = price * self._sign
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if qty:
+                self._qtys[i] = qty
+            else:
+                del keys[i]
+                del self._qtys[i]
+        elif qty:
+            keys.insert(i, key)
+            self._qtys.insert(i, qty)
+            if len(keys) > self.max_levels:
+                # Ограничиваем память: отбрасываем самые дальние от рынка уровни
+                excess = len(keys) - self.max_levels
+                del keys[:excess]
+                del self._qtys[:excess]
+
+    def best(self) -> tuple[float, float] | None:
+        """Лучший уровень (цена, объем) или None, если сторона пуста."""
+        if not self._keys:
+            return None
+        return self._keys[-1] * self._sign, self._qtys[-1]
+
+    def levels(self, n: int) -> list[tuple[float, float]]:
+        """Первые n уровней от лучшей цены вглубь."""
+        keys, qtys, sign = self._keys, self._qtys, self._sign
+        last = len(keys) - 1
+        return [
+            (keys[last - i] * sign, qtys[last - i]) for i in range(min(n, last + 1))
+        ]
+
+    def vwap(self, size: float) -> float | None:
+        """
+        Средневзвешенная цена исполнения рыночной заявки объемом `size`.
+        Возвращает None, если в стакане недостаточно ликвидности.
+        """
+        keys, qtys, sign = self._keys, self._qtys, self._sign
+        remaining = size
+        notional = 0.0
+        for i in range(len(keys) - 1, -1, -1):
+            qty = qtys[i]
+            if qty >= remaining:
+                notional += remaining * keys[i] * sign
+                return notional / size
+            notional += qty * keys[i] * sign
+            remaining -= qty
+        return None
+
+
+class OrderBook:
+    """Стакан L2 одной торговой пары."""
+
+    def __init__(self, pair: str, max_levels: int = 1000):
+        """
+        :param pair: Символ торговой пары.
+        :param max_levels: Максимум уровней на каждой стороне (ограничивает память).
+        """
+        self.pair = pair
+        self.bids = _BookSide(is_bid=True, max_levels=max_levels)
+        self.asks = _BookSide(is_bid=False, max_levels=max_levels)
+        # ID последнего примененного обновления (lastUpdateId / u биржи)
+        self.last_update_id: int = 0
+        self.synced: bool = False
+        self.exchange_time: int = 0
+
+    def apply_snapshot(self, snapshot: dict[str, Any]):
+        """Полностью заменяет состояние стакана снапшотом из REST /depth."""
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot["bids"]:
+            self.bids.update(float(price), float(qty))
+        for price, qty in snapshot["asks"]:
+            self.asks.update(float(price), float(qty))
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = True
+
+    def apply_diff(self, diff: dict[str, Any]) -> bool:
+        """
+        Применяет инкрементальное обновление (результат `parse_depth_update`).
+
+        :return: False, если обновление устарело и было пропущено.
+        :raises OrderBookGapError: Если обнаружен разрыв последовательности.
+        """
+        last_id = diff["last_id"]
+        if last_id <= self.last_update_id:
+            return False
+        if diff["first_id"] > self.last_update_id + 1:
+            self.synced = False
+            raise OrderBookGapError(
+                f"{self.pair}: expected update {self.last_update_id + 1}, "
+                f"got {diff['first_id']}"
+            )
+
+        update_bid = self.bids.update
+        for price, qty in diff["bids"]:
+            update_bid(price, qty)
+        update_ask = self.asks.update
+        for price, qty in diff["asks"]:
+            update_ask(price, qty)
+        self.last_update_id = last_id
+        self.exchange_time = diff.get("time", self.exchange_time)
+        return True
+
+    def best_bid(self) -> tuple[float, float] | None:
+        """Лучший бид (цена, объем)."""
+        return self.bids.best()
+
+    def best_ask(self) -> tuple[float, float] | None:
+        """Лучший аск (цена, объем)."""
+        return self.asks.best()
+
+    def spread(self) -> float | None:
+        """Разница между лучшим аском и лучшим бидом."""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def depth(self, n: int) -> dict[str, list[tuple[float, float]]]:
+        """Первые n уровней каждой стороны стакана."""
+        return {"bids": self.bids.levels(n), "asks": self.asks.levels(n)}
+
+    def vwap_for_size(self, side: str, size: float) -> float | None:
+        """
+        Средняя цена исполнения рыночного ордера объемом `size`.
+
+        :param side: 'BUY' (съедает аски) или 'SELL' (съедает биды).
+        """
+        book_side = self.asks if side.upper() == "BUY" else self.bids
+        return book_side.vwap(size)
+
+
+class OrderBookManager:
+    """
+    Менеджер стаканов всех пар.
+
+    Является потребителем событий DEPTH из WebsocketManager. Пока стакан пары
+    не синхронизирован со снапшотом, обновления буферизуются; при разрыве
+    последовательности стакан пересинхронизируется автоматически.
+    """
+
+    def __init__(
+        self,
+        snapshot_loader: SnapshotLoader,
+        max_levels: int = 1000,
+        snapshot_limit: int = 1000,
+        max_buffered_updates: int = 5000,
+        resync_min_delay: float = 1.0,
+        resync_max_delay: float = 60.0,
+    ):
+        """
+        :param snapshot_loader: Корутина для загрузки снапшота стакана с биржи.
+        :param max_levels: Максимум уровней на каждой стороне стакана.
+        :param snapshot_limit: Глубина запрашиваемого снапшота.
+        :param max_buffered_updates: Максимум обновлений, буферизуемых во время
+            синхронизации. При переполнении синхронизация начинается заново.
+        :param resync_min_delay: Задержка перед повторной загрузкой снапшота после
+            неудачной, в секундах; удваивается с каждой неудачей подряд.
+        :param resync_max_delay: Верхняя граница задержки, в секундах.
+        """
+        self._snapshot_loader = snapshot_loader
+        self._max_levels = max_levels
+        self._snapshot_limit = snapshot_limit
+        self._max_buffered_updates = max_buffered_updates
+        self._books: dict[str, OrderBook] = {}
+        self._buffers: dict[str, list[dict]] = {}
+        self._sync_tasks: dict[str, asyncio.Task] = {}
+        self._resync_min_delay = resync_min_delay
+        self._resync_max_delay = resync_max_delay
+        # Неудачные загрузки снапшота подряд и момент, до которого новая не начинается
+        self._resync_failures: dict[str, int] = {}
+        self._resync_after: dict[str, float] = {}
+        self.resyncs: int = 0
+        self.failed_resyncs: int = 0
+        # Разрывы и переполнения буфера повторяются на каждом событии DEPTH
+        self._resync_log = LogThrottle()
+
+    def get_book(self, pair: str) -> OrderBook | None:
+        """Возвращает стакан пары, если он синхронизирован."""
+        book = self._books.get(pair)
+        return book if book is not None and book.synced else None
+
+    def remove(self, pair: str):
+        """Перестает вести стакан пары и освобождает его память."""
+        self._books.pop(pair, None)
+        self._buffers.pop(pair, None)
+        self._resync_failures.pop(pair, None)
+        self._resync_after.pop(pair, None)
+        task = self._sync_tasks.pop(pair, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def on_market_event(self, pair: str, event: MarketEvent):
+        """Потребитель рыночных данных: применяет события DEPTH к стакану пары."""
+        if event.type is not MarketEventType.DEPTH:
+            return
+
+        book = self._books.get(pair)
+        if book is None:
+            book = self._books[pair] = OrderBook(pair, max_levels=self._max_levels)
+
+        if not book.synced:
+            buffer = self._buffers.setdefault(pair, [])
+            buffer.append(event.data)
+            if len(buffer) > self._max_buffered_updates:
+                if self._resync_log.allow():
+                    logger.warning(
+                        "Order book buffer overflow for {}, resyncing (+{} skipped).",
+                        pair,
+                        self._resync_log.skipped,
+                    )
+                self._start_resync(pair, restart=True)
+            else:
+                self._start_resync(pair)
+            return
+
+        try:
+            book.apply_diff(event.data)
+        except OrderBookGapError as e:
+            if self._resync_log.allow():
+                logger.warning(
+                    "Order book sequence gap: {}. Resyncing (+{} skipped).",
+                    e,
+                    self._resync_log.skipped,
+                )
+            self._buffers[pair] = [event.data]
+            self._start_resync(pair)
+
+    def _start_resync(self, pair: str, restart: bool = False):
+        """
+        Запускает загрузку снапшота, если она еще не идет и не отложена после
+        неудачи. Пока загрузка отложена, обновления копятся в буфере.
+        """
+        task = self._sync_tasks.get(pair)
+        if task is not None and not task.done():
+            if not restart:
+                return
+            task.cancel()
+        if restart:
+            self._buffers[pair] = []
+        if time.monotonic() < self._resync_after.get(pair, 0.0):
+            return
+        self.resyncs += 1
+        self._sync_tasks[pair] = asyncio.create_task(self._resync(pair))
+
+    def _resync_failed(self, pair: str):
+        """Откладывает следующую загрузку снапшота пары."""
+        self.failed_resyncs += 1
+        failures = self._resync_failures.get(pair, 0) + 1
+        self._resync_failures[pair] = failures
+        delay = min(
+            self._resync_min_delay * 2 ** (failures - 1), self._resync_max_delay
+        )
+        self._resync_after[pair] = time.monotonic() + delay
+        logger.warning(f"Next order book snapshot for {pair} in {delay:.0f}s.")
+
+    async def _resync(self, pair: str):
+        """Синхронизирует стакан: снапшот + накопленные за время загрузки обновления."""
+        try:
+            snapshot = await self._snapshot_loader(pair, self._snapshot_limit)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to load order book snapshot for {pair}: {e!r}")
+            # Первое событие DEPTH после задержки запустит новую попытку
+            self._resync_failed(pair)
+            return
+
+        book = self._books.get(pair)
+        if book is None:
+            return
+        book.apply_snapshot(snapshot)
+        buffered = self._buffers.pop(pair, [])
+        try:
+            for diff in buffered:
+                book.apply_diff(diff)
+        except OrderBookGapError as e:
+            # Снапшот оказался старее буфера обновлений: буфер сохраняем,
+            # событие DEPTH после задержки запустит загрузку более свежего снапшота
+            logger.warning(f"Order book snapshot for {pair} is stale: {e}")
+            self._buffers[pair] = buffered
+            self._resync_failed(pair)
+            return
+        self._resync_failures.pop(pair, None)
+        self._resync_after.pop(pair, None)
+        logger.info(
+            f"Order book for {pair} synced at update {book.last_update_id} "
+            f"({len(buffered)} buffered updates applied)."
+        )
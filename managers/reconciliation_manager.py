@@ -0,0 +1,418 @@
+"""
+Модуль периодической сверки состояния ордеров с биржей.
+
+Отвечает за:
+- Восстановление реестра открытых ордеров при старте процесса одним запросом
+  по всем символам, до того как пары возобновят торговлю.
+- Периодическую сверку: открытые ордера запрашиваются пакетно, их хэш
+  сравнивается с хэшем локального реестра, и согласованные символы пропускаются.
+  Сделки и состояние отдельных ордеров запрашиваются только для разошедшихся.
+- Планирование по приоритетам в рамках бюджета веса запросов на проход:
+  сначала запущенные пары, затем символы с открытыми ордерами, затем остальные,
+  которые без локальных изменений проверяются редко.
+
+Так находятся события, пропущенные потоком пользователя (переподключение,
+рестарт), без опроса каждого ордера и без риска исчерпать лимит биржи.
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from managers.exchange_manager import ExchangeAPIError, ExchangeClient
+from managers.metrics_manager import REGISTRY
+from managers.order_manager import (
+    CLIENT_ID_PREFIX,
+    Order,
+    OrderManager,
+    order_state_digest,
+)
+
+RECONCILE_REPAIRS = REGISTRY.counter(
+    "scalpex_reconcile_repairs",
+    "Order state differences repaired by reconciliation",
+    ("kind",),
+)
+
+# Приоритеты символов при планировании прохода (меньше — раньше)
+PRIORITY_ACTIVE = 0
+PRIORITY_OPEN_ORDERS = 1
+PRIORITY_IDLE = 2
+
+# Код ошибки Binance «ордер не существует»
+_UNKNOWN_ORDER_CODE = -2013
+
+
+@dataclass(slots=True)
+class SymbolSnapshot:
+    """Результат последней успешной сверки символа."""
+
+    # Версия реестра OrderManager по символу на момент сверки
+    version: int = -1
+    # Хэш открытых ордеров биржи
+    digest: str = ""
+    # Последняя полученная сделка (с нее продолжается запрос истории)
+    last_trade_id: int | None = None
+    # Отметка time.monotonic() сверки
+    checked_at: float = 0.0
+
+
+def _group_own_orders(
+    orders: Iterable[dict[str, Any]],
+) -> defaultdict[str, list[dict[str, Any]]]:
+    """
+    Открытые ордера бота из ответа биржи по символам. Ордера, выставленные
+    вручную или другими программами, в реестр не попадают и не сверяются.
+    """
+    by_symbol = defaultdict(list)
+    for data in orders:
+        if data.get("clientOrderId", "").startswith(CLIENT_ID_PREFIX):
+            by_symbol[data["symbol"]].append(data)
+    return by_symbol
+
+
+def _exchange_states(orders: Iterable[dict[str, Any]]) -> list[tuple[int, str, float]]:
+    """Состояния ордеров из ответа биржи в формате order_state_digest."""
+    return [(o["orderId"], o["status"], float(o["executedQty"])) for o in orders]
+
+
+class ReconciliationManager:
+    """
+    Сверка реестра OrderManager с биржей.
+
+    Сверка выполняется под общей блокировкой, поэтому стартовое восстановление
+    и периодические проходы не пересекаются.
+    """
+
+    def __init__(
+        self,
+        orders: OrderManager,
+        exchange: ExchangeClient,
+        interval: float | None = None,
+        weight_budget: int | None = None,
+        idle_interval: float | None = None,
+        pending_timeout: float = 30.0,
+    ):
+        """
+        :param orders: Реестр ордеров, который сверяется с биржей.
+        :param exchange: REST-клиент биржи.
+        :param interval: Период проходов сверки, в секундах (RECONCILE_INTERVAL).
+        :param weight_budget: Вес запросов, который может израсходовать один проход
+            (RECONCILE_WEIGHT_BUDGET). Не уместившиеся символы переносятся
+            на следующий проход и проверяются первыми среди своего приоритета.
+        :param idle_interval: Как часто проверять символы без открытых ордеров
+            и локальных изменений, в секундах (RECONCILE_IDLE_INTERVAL).
+        :param pending_timeout: Через сколько секунд ордер без ACK считается
+            потерянным и его состояние запрашивается у биржи.
+        """
+        self._orders = orders
+        self._exchange = exchange
+        self.interval = interval or float(os.getenv("RECONCILE_INTERVAL", "60"))
+        self.weight_budget = weight_budget or int(
+            os.getenv("RECONCILE_WEIGHT_BUDGET", "300")
+        )
+        self.idle_interval = idle_interval or float(
+            os.getenv("RECONCILE_IDLE_INTERVAL", "600")
+        )
+        self.pending_timeout = pending_timeout
+        self._snapshots: dict[str, SymbolSnapshot] = {}
+        # Запущенные пары: сверяются первыми
+        self._active: set[str] = set()
+        self._ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        # Сделки до старта процесса относятся к прошлому запуску и не применяются
+        self._started_ms = int(time.time() * 1000)
+
+        # --- Метрики сверки ---
+        self.passes = 0
+        self.symbols_checked = 0
+        self.symbols_skipped = 0
+        self.symbols_diverged = 0
+        self.symbols_deferred = 0
+        self.weight_used = 0
+        self.rebuild_seconds = 0.0
+        self.errors = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """True, если реестр восстановлен после старта процесса."""
+        return self._ready.is_set()
+
+    async def wait_ready(self):
+        """Дожидается восстановления реестра после старта процесса."""
+        await self._ready.wait()
+
+    def track(self, symbols: Iterable[str]):
+        """Добавляет символы в сверку (без открытых ордеров — с низким приоритетом)."""
+        for symbol in symbols:
+            self._snapshots.setdefault(symbol, SymbolSnapshot())
+
+    def watch(self, symbol: str):
+        """Отмечает пару как запущенную: она сверяется в первую очередь."""
+        self.track((symbol,))
+        self._active.add(symbol)
+
+    def unwatch(self, symbol: str):
+        """Снимает с пары высший приоритет."""
+        self._active.discard(symbol)
+
+    def start(self, symbols: Iterable[str] = ()):
+        """Запускает восстановление реестра и периодические проходы."""
+        self.track(symbols)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает сверку."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # Любая ошибка прохода только откладывает следующий: иначе задача сверки
+        # завершилась бы, а циклы пар навсегда остались бы в wait_ready()
+        delay = 1.0
+        while not self.is_ready:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                self.errors += 1
+                logger.error(
+                    f"Order state rebuild failed: {e!r}. Retrying in {delay:.0f}s."
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.run_pass()
+            except Exception as e:
+                self.errors += 1
+                delay = min(delay * 2, max(self.interval, self.idle_interval))
+                logger.warning(
+                    f"Order reconciliation pass failed: {e!r}. "
+                    f"Next pass in {delay:.0f}s."
+                )
+            else:
+                delay = self.interval
+
+    # --- Восстановление при старте ---
+
+    async def rebuild(self):
+        """
+        Восстанавливает реестр открытых ордеров по всем символам одним запросом
+        и открывает торговлю (wait_ready).
+        """
+        started = time.perf_counter()
+        async with self._lock:
+            by_symbol = _group_own_orders(await self._exchange.get_open_orders())
+            self.weight_used += self._exchange.OPEN_ORDERS_ALL_WEIGHT
+            for exchange_orders in by_symbol.values():
+                for data in exchange_orders:
+                    self._apply_order(data)
+            for symbol in set(self._snapshots) | set(by_symbol):
+                self._record(symbol, by_symbol.get(symbol, ()))
+        self.rebuild_seconds = time.perf_counter() - started
+        self._ready.set()
+        logger.info(
+            f"Order state rebuilt in {self.rebuild_seconds:.2f}s: "
+            f"{sum(map(len, by_symbol.values()))} open orders "
+            f"on {len(by_symbol)} symbols."
+        )
+
+    # --- Периодическая сверка ---
+
+    def _plan(self) -> list[str]:
+        """
+        Символы прохода в порядке приоритета; внутри приоритета — начиная
+        с давно не проверенных. Символы без открытых ордеров, реестр которых
+        не менялся со сверки, пропускаются до истечения idle_interval.
+        """
+        now = time.monotonic()
+        with_orders = {order.symbol for order in self._orders.open_orders()}
+        self.track(with_orders)
+        plan = []
+        for symbol, snapshot in self._snapshots.items():
+            if symbol in self._active:
+                priority = PRIORITY_ACTIVE
+            elif symbol in with_orders:
+                priority = PRIORITY_OPEN_ORDERS
+            elif (
+                snapshot.version == self._orders.symbol_version(symbol)
+                and now - snapshot.checked_at < self.idle_interval
+            ):
+                self.symbols_skipped += 1
+                continue
+            else:
+                priority = PRIORITY_IDLE
+            plan.append((priority, snapshot.checked_at, symbol))
+        plan.sort()
+        return [symbol for _, _, symbol in plan]
+
+    async def run_pass(self) -> int:
+        """Один проход сверки. Возвращает израсходованный вес запросов."""
+        async with self._lock:
+            plan = self._plan()
+            if not plan:
+                return 0
+            budget = self.weight_budget
+            all_weight = self._exchange.OPEN_ORDERS_ALL_WEIGHT
+            symbol_weight = self._exchange.OPEN_ORDERS_WEIGHT
+            # Один запрос по всем символам дешевле, если символов в проходе много
+            if len(plan) * symbol_weight >= all_weight and budget >= all_weight:
+                by_symbol = _group_own_orders(await self._exchange.get_open_orders())
+                budget -= all_weight
+                fetched = plan
+            else:
+                fetched = plan[: budget // symbol_weight]
+                responses = await asyncio.gather(
+                    *(self._exchange.get_open_orders(s) for s in fetched)
+                )
+                by_symbol = _group_own_orders(
+                    data for response in responses for data in response
+                )
+                budget -= symbol_weight * len(fetched)
+            self.symbols_deferred += len(plan) - len(fetched)
+
+            for symbol in fetched:
+                spent = await self._reconcile_symbol(symbol, by_symbol[symbol], budget)
+                if spent is None:
+                    self.symbols_deferred += 1
+                    continue
+                budget -= spent
+            self.passes += 1
+            used = self.weight_budget - budget
+            self.weight_used += used
+            return used
+
+    def _stale_pending(self, symbol: str) -> list[Order]:
+        """Ордера без ACK дольше pending_timeout: запрос мог не дойти до биржи."""
+        deadline = time.perf_counter() - self.pending_timeout
+        return [
+            order
+            for order in self._orders.open_orders(symbol)
+            if order.exchange_order_id is None and 0 < order.submitted_at < deadline
+        ]
+
+    async def _reconcile_symbol(
+        self, symbol: str, exchange_orders: list[dict[str, Any]], budget: int
+    ) -> int | None:
+        """
+        Сверяет символ с уже полученными открытыми ордерами биржи.
+        Возвращает израсходованный на исправление вес или None, если
+        исправление не уместилось в бюджет и перенесено.
+        """
+        self.symbols_checked += 1
+        digest = order_state_digest(_exchange_states(exchange_orders))
+        pending = self._stale_pending(symbol)
+        if digest == self._orders.state_digest(symbol) and not pending:
+            self._record(symbol, exchange_orders, digest)
+            return 0
+
+        open_ids = {data["orderId"] for data in exchange_orders}
+        # Ордера, закрытые на бирже без события в потоке пользователя
+        closed = [
+            order
+            for order in self._orders.open_orders(symbol)
+            if order.exchange_order_id is not None
+            and order.exchange_order_id not in open_ids
+        ]
+        cost = self._exchange.MY_TRADES_WEIGHT + self._exchange.ORDER_WEIGHT * (
+            len(closed) + len(pending)
+        )
+        if cost > budget:
+            return None
+        self.symbols_diverged += 1
+        logger.warning(f"Order state of {symbol} diverged from exchange, repairing.")
+
+        # Сначала сделки: слушатели исполнений получают пропущенные fills,
+        # затем состояние ордеров биржи задает итоговые объемы и статусы
+        await self._repair_fills(symbol)
+        for data in exchange_orders:
+            self._apply_order(data)
+        for order in closed + pending:
+            try:
+                data = await self._exchange.get_order(
+                    symbol,
+                    order_id=order.exchange_order_id,
+                    client_order_id=order.client_order_id,
+                )
+            except ExchangeAPIError as e:
+                if e.code != _UNKNOWN_ORDER_CODE or order.exchange_order_id is not None:
+                    raise
+                self._orders.drop_order(order)
+                RECONCILE_REPAIRS.labels("dropped").inc()
+                logger.warning(
+                    f"Order {order.client_order_id} never reached the exchange."
+                )
+                continue
+            self._apply_order(data)
+            RECONCILE_REPAIRS.labels("order").inc()
+        self._record(symbol, exchange_orders, digest)
+        return cost
+
+    async def _repair_fills(self, symbol: str):
+        """Запрашивает сделки после последней известной и применяет пропущенные."""
+        snapshot = self._snapshots[symbol]
+        if snapshot.last_trade_id is not None:
+            trades = await self._exchange.get_my_trades(
+                symbol, from_id=snapshot.last_trade_id + 1
+            )
+        else:
+            trades = await self._exchange.get_my_trades(
+                symbol, start_time=self._started_ms
+            )
+        for trade in sorted(trades, key=lambda t: t["id"]):
+            if self._orders.apply_trade(trade):
+                RECONCILE_REPAIRS.labels("fill").inc()
+            snapshot.last_trade_id = trade["id"]
+
+    def _apply_order(self, data: dict[str, Any]):
+        """Применяет состояние ордера биржи, считая ордера, добавленные в реестр."""
+        known = self._orders.get_order(
+            data.get("clientOrderId", "")
+        ) or self._orders.get_order_by_exchange_id(data["orderId"])
+        if self._orders.apply_exchange_order(data) is not None and known is None:
+            RECONCILE_REPAIRS.labels("adopted").inc()
+
+    def _record(
+        self,
+        symbol: str,
+        exchange_orders: Iterable[dict[str, Any]],
+        digest: str | None = None,
+    ):
+        """Сохраняет снапшот сверенного символа."""
+        snapshot = self._snapshots.setdefault(symbol, SymbolSnapshot())
+        snapshot.version = self._orders.symbol_version(symbol)
+        snapshot.digest = digest or order_state_digest(
+            _exchange_states(exchange_orders)
+        )
+        snapshot.checked_at = time.monotonic()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Возвращает метрики сверки."""
+        return {
+            "ready": self.is_ready,
+            "rebuild_seconds": round(self.rebuild_seconds, 3),
+            "symbols": len(self._snapshots),
+            "active": len(self._active),
+            "passes": self.passes,
+            "symbols_checked": self.symbols_checked,
+            "symbols_skipped": self.symbols_skipped,
+            "symbols_diverged": self.symbols_diverged,
+            "symbols_deferred": self.symbols_deferred,
+            "weight_used": self.weight_used,
+            "errors": self.errors,
+        }
@@ -0,0 +1,311 @@
+"""
+Модуль для работы с Redis — "нервной системой" приложения.
+
+Отвечает за:
+- Общий пул соединений для всех компонентов процесса.
+- Автоматическую конвейеризацию (auto-pipelining): команды, отправленные
+  в одной итерации event loop, уходят на сервер одним пакетом за один round trip.
+- Локальный read-through кэш горячих ключей с TTL и инвалидацией через pub/sub.
+- Режим write-behind для часто меняющегося состояния ботов (статус пары,
+  последняя цена): записи схлопываются в памяти и сбрасываются пачками.
+"""
+
+import asyncio
+import os
+import time
+from collections.abc import Awaitable
+from typing import Any
+
+import redis.asyncio as redis
+from loguru import logger
+
+DEFAULT_REDIS_URL = "redis://localhost:6379"
+
+
+class RedisManager:
+    """Асинхронный менеджер Redis с конвейеризацией, кэшем и write-behind."""
+
+    def __init__(
+        self,
+        url: str | None = None,
+        client: redis.Redis | None = None,
+        max_connections: int = 50,
+        cache_ttl: float = 1.0,
+        cache_max_keys: int = 10_000,
+        write_behind_interval: float = 0.05,
+        invalidation_channel: str = "cache:invalidate",
+    ):
+        """
+        :param url: Адрес Redis (по умолчанию из переменной окружения REDIS_URL).
+        :param client: Готовый клиент (например, fakeredis для тестов).
+        :param max_connections: Размер общего пула соединений.
+        :param cache_ttl: Время жизни записи локального кэша, в секундах.
+        :param cache_max_keys: Максимум ключей в локальном кэше.
+        :param write_behind_interval: Период сброса write-behind записей, в секундах.
+        :param invalidation_channel: Канал pub/sub для инвалидации кэшей всех процессов.
+        """
+        if client is None:
+            pool = redis.ConnectionPool.from_url(
+                url or os.getenv("REDIS_URL", DEFAULT_REDIS_URL),
+                max_connections=max_connections,
+                decode_responses=True,
+            )
+            client = redis.Redis(connection_pool=pool)
+        self.redis = client
+        self._cache_ttl = cache_ttl
+        self._cache_max_keys = cache_max_keys
+        self._write_behind_interval = write_behind_interval
+        self._invalidation_channel = invalidation_channel
+
+        # Очередь команд текущей итерации event loop: (args, future)
+        self._pending: list[tuple[tuple, asyncio.Future]] = []
+        self._flush_scheduled = False
+        # Отправляемые пакеты (ссылки держим, чтобы задачи не собрал GC)
+        self._batches: set[asyncio.Task] = set()
+        # Локальный кэш: ключ -> (значение, момент истечения)
+        self._cache: dict[str, tuple[Any, float]] = {}
+        # Загрузки ключей в кэш; инвалидация ключа снимает его загрузку отсюда,
+        # и ее результат (прочитанный до записи) в кэш уже не попадает
+        self._cache_loads: dict[str, asyncio.Task] = {}
+        # Write-behind: ключ хеша -> {поле: значение}
+        self._dirty: dict[str, dict[str, Any]] = {}
+        self._tasks: list[asyncio.Task] = []
+
+        # --- Метрики ---
+        self.pipelines_sent = 0
+        self.commands_sent = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.write_behind_flushes = 0
+        self.invalidation_reconnects = 0
+
+    async def start(self):
+        """Запускает слушателя инвалидаций и фоновый сброс write-behind записей."""
+        self._tasks = [
+            asyncio.create_task(self._listen_invalidations()),
+            asyncio.create_task(self._write_behind_loop()),
+        ]
+        logger.info("RedisManager started.")
+
+    async def close(self):
+        """Сбрасывает накопленные записи, останавливает фоновые задачи и закрывает пул."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush_write_behind()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.redis.aclose()
+        logger.info("RedisManager closed.")
+
+    # --- Конвейеризация ---
+
+    def execute(self, *args: Any) -> Awaitable[Any]:
+        """
+        Ставит команду в пакет текущей итерации event loop и возвращает future
+        с ее результатом. Все команды пакета отправляются одним pipeline.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((args, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._start_flush)
+        return future
+
+    def _start_flush(self):
+        self._flush_scheduled = False
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send_batch(self, batch: list[tuple[tuple, asyncio.Future]]):
+        """Отправляет пакет команд одним pipeline и раздает результаты."""
+        self.pipelines_sent += 1
+        self.commands_sent += len(batch)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for args, _ in batch:
+                    pipe.execute_command(*args)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get(self, key: str) -> Awaitable[Any]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value: Any, ex: float | None = None) -> Awaitable[Any]:
+        if ex is None:
+            return self.execute("SET", key, value)
+        return self.execute("SET", key, value, "PX", int(ex * 1000))
+
+    def delete(self, *keys: str) -> Awaitable[Any]:
+        return self.execute("DEL", *keys)
+
+    def hget(self, key: str, field: str) -> Awaitable[Any]:
+        return self.execute("HGET", key, field)
+
+    def hgetall(self, key: str) -> Awaitable[Any]:
+        return self.execute("HGETALL", key)
+
+    def hset(self, key: str, mapping: dict[str, Any]) -> Awaitable[Any]:
+        args = [item for pair in mapping.items() for item in pair]
+        return self.execute("HSET", key, *args)
+
+    def publish(self, channel: str, message: str) -> Awaitable[Any]:
+        return self.execute("PUBLISH", channel, message)
+
+    # --- Локальный кэш ---
+
+    async def cached(self, key: str, command: str = "GET") -> Any:
+        """
+        Читает ключ через локальный кэш (read-through). Одновременные промахи
+        по одному ключу объединяются в один запрос к Redis.
+
+        :param command: Команда чтения: 'GET' для строк или 'HGETALL' для хешей.
+        """
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self.cache_hits += 1
+            return entry[0]
+
+        self.cache_misses += 1
+        load = self._cache_loads.get(key)
+        if load is None:
+            load = asyncio.create_task(self._load_cached(key, command))
+            self._cache_loads[key] = load
+            load.add_done_callback(lambda task: self._forget_load(key, task))
+        # shield: отмена одного читателя не должна отменять общую загрузку
+        return await asyncio.shield(load)
+
+    async def _load_cached(self, key: str, command: str) -> Any:
+        value = await self.execute(command, key)
+        if self._cache_loads.get(key) is asyncio.current_task():
+            self._store_cached(key, value)
+        return value
+
+    def _forget_load(self, key: str, task: asyncio.Task):
+        if self._cache_loads.get(key) is task:
+            del self._cache_loads[key]
+
+    def _store_cached(self, key: str, value: Any):
+        if len(self._cache) >= self._cache_max_keys:
+            # Вытесняем самую старую запись (порядок вставки в dict)
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (value, time.monotonic() + self._cache_ttl)
+
+    def invalidate_local(self, key: str):
+        """Удаляет ключ из локального кэша этого процесса."""
+        self._cache.pop(key, None)
+        self._cache_loads.pop(key, None)
+
+    def clear_local(self):
+        """Очищает локальный кэш этого процесса."""
+        self._cache.clear()
+        self._cache_loads.clear()
+
+    async def set_and_invalidate(self, key: str, value: Any, ex: float | None = None):
+        """Записывает ключ и рассылает инвалидацию локальных кэшей всем процессам."""
+        self.invalidate_local(key)
+        await asyncio.gather(
+            self.set(key, value, ex=ex),
+            self.publish(self._invalidation_channel, key),
+        )
+
+    async def _listen_invalidations(self):
+        """
+        Слушает канал инвалидации и удаляет устаревшие ключи из локального кэша.
+        После потери соединения переподписывается: инвалидации, пропущенные
+        за это время, не восстановить, поэтому кэш очищается целиком.
+        """
+        delay = 0.5
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(self._invalidation_channel)
+                    self.clear_local()
+                    delay = 0.5
+                    async for message in pubsub.listen():
+                        key = message["data"]
+                        if isinstance(key, bytes):
+                            key = key.decode()
+                        self.invalidate_local(key)
+                    raise ConnectionError("invalidation subscription closed")
+                finally:
+                    await pubsub.aclose()
+            except Exception as e:
+                self.invalidation_reconnects += 1
+                self.clear_local()
+                logger.warning(
+                    f"Cache invalidation listener failed: {e!r}. "
+                    f"Resubscribing in {delay:.1f}s."
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+
+    # --- Write-behind ---
+
+    def write_behind(self, key: str, field: str, value: Any):
+        """
+        Запоминает новое значение поля хеша без обращения к Redis. Повторные записи
+        до ближайшего сброса перезаписывают друг друга в памяти.
+        """
+        self._dirty.setdefault(key, {})[field] = value
+
+    async def flush_write_behind(self):
+        """Сбрасывает накопленные write-behind записи одним pipeline."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        results = await asyncio.gather(
+            *(self.hset(key, mapping) for key, mapping in dirty.items()),
+            return_exceptions=True,
+        )
+        self.write_behind_flushes += 1
+        for (key, mapping), result in zip(dirty.items(), results):
+            if isinstance(result, Exception):
+                # Возвращаем неудачные записи, не затирая более свежие значения
+                newer = self._dirty.setdefault(key, {})
+                for field, value in mapping.items():
+                    newer.setdefault(field, value)
+                logger.warning(f"Write-behind flush failed for {key}: {result!r}")
+
+    async def _write_behind_loop(self):
+        while True:
+            await asyncio.sleep(self._write_behind_interval)
+            try:
+                await self.flush_write_behind()
+            except Exception as e:
+                logger.error(f"Write-behind loop error: {e!r}")
+
+    def get_stats(self) -> dict[str, float | int]:
+        """Возвращает метрики конвейеризации, кэша и write-behind."""
+        return {
+            "pipelines_sent": self.pipelines_sent,
+            "commands_sent": self.commands_sent,
+            "avg_pipeline_size": (
+                round(self.commands_sent / self.pipelines_sent, 2)
+                if self.pipelines_sent
+                else 0.0
+            ),
+            "cache_keys": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "invalidation_reconnects": self.invalidation_reconnects,
+            "write_behind_pending": sum(len(m) for m in self._dirty.values()),
+            "write_behind_flushes": self.write_behind_flushes,
+        }
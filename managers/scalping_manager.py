@@ -0,0 +1,569 @@
+"""
+Модуль индикаторов для скальпинга.
+
+Отвечает за:
+- Инкрементальный расчет индикаторов по каждому рыночному событию пары:
+  EMA (быстрая и медленная), скользящий VWAP, ATR по барам, волатильность,
+  моментум, дисбаланс стакана, micro-price и спред.
+- Пакетный (векторный, NumPy) расчет тех же индикаторов по историческим массивам
+  тиков (TICK_DTYPE архива) для бэктестов и исследований.
+
+В живом режиме каждое обновление стоит O(1): окна хранятся в кольцевых буферах
+array('d') фиксированного размера, суммы окон ведутся нарастающим итогом
+(и раз в полный оборот буфера пересчитываются заново, чтобы не копилась
+погрешность float). Память выделяется только при создании PairIndicators.
+
+При запуске пары живые индикаторы прогреваются историей из архива
+(warm_up_indicators): события прогоняются через PairIndicators в пуле
+вычислений бота, а события, пришедшие за время прогрева, досчитываются
+после него. Пакетный compute_indicators для этого не подходит: он выдает
+значения, а не состояние окон.
+
+Оба режима дают одинаковые значения (с точностью до погрешности float):
+пакетный расчет повторяет определения живого, проверка —
+tests/unit/test_scalping_manager.py.
+"""
+
+import math
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+from managers.archive_manager import KIND_TRADE, MarketArchive
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+# Значения индикаторов после каждого события (результат пакетного расчета)
+INDICATOR_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("ema_fast", "<f8"),
+        ("ema_slow", "<f8"),
+        ("vwap", "<f8"),
+        ("atr", "<f8"),
+        ("volatility_bps", "<f8"),
+        ("momentum_bps", "<f8"),
+        ("imbalance", "<f8"),
+        ("micro_price", "<f8"),
+        ("spread_bps", "<f8"),
+    ]
+)
+INDICATOR_FIELDS = INDICATOR_DTYPE.names[1:]
+
+
+@dataclass(slots=True)
+class IndicatorParams:
+    """Параметры индикаторов. Окна задаются в событиях, если не сказано иное."""
+
+    ema_fast_period: int = 20
+    ema_slow_period: int = 200
+    # Окно VWAP, в сделках
+    vwap_window: int = 500
+    # ATR: период сглаживания Уайлдера (в барах) и длительность бара, в мс
+    atr_period: int = 14
+    atr_bar_ms: int = 1000
+    # Окно волатильности (стандартное отклонение лог-доходностей средней цены)
+    volatility_window: int = 300
+    # Моментум: изменение средней цены за столько обновлений стакана, в б.п.
+    momentum_window: int = 100
+
+
+def _zeros(size: int) -> array:
+    return array("d", bytes(8 * size))
+
+
+class PairIndicators:
+    """
+    Инкрементальные индикаторы одной пары.
+
+    Индикаторы средней цены (EMA, моментум, волатильность) и стакана обновляются
+    по событиям стакана с обеими ценами, VWAP и ATR — по сделкам. Текущие значения
+    доступны как атрибуты с именами из INDICATOR_FIELDS.
+    """
+
+    __slots__ = (
+        "params",
+        "time",
+        "ema_fast",
+        "ema_slow",
+        "vwap",
+        "atr",
+        "volatility_bps",
+        "momentum_bps",
+        "imbalance",
+        "micro_price",
+        "spread_bps",
+        "_fast_alpha",
+        "_slow_alpha",
+        "_atr_alpha",
+        "_mids",
+        "_mid_count",
+        "_last_mid",
+        "_returns",
+        "_return_count",
+        "_return_sum",
+        "_return_sq_sum",
+        "_notionals",
+        "_qtys",
+        "_trade_count",
+        "_notional_sum",
+        "_qty_sum",
+        "_bar_id",
+        "_bar_high",
+        "_bar_low",
+        "_bar_close",
+        "_prev_close",
+        "_bars_closed",
+    )
+
+    def __init__(self, params: IndicatorParams | None = None):
+        params = self.params = params or IndicatorParams()
+        self.time = 0
+        self.ema_fast = 0.0
+        self.ema_slow = 0.0
+        self.vwap = 0.0
+        self.atr = 0.0
+        self.volatility_bps = 0.0
+        self.momentum_bps = 0.0
+        self.imbalance = 0.0
+        self.micro_price = 0.0
+        self.spread_bps = 0.0
+        self._fast_alpha = 2.0 / (params.ema_fast_period + 1)
+        self._slow_alpha = 2.0 / (params.ema_slow_period + 1)
+        self._atr_alpha = 1.0 / params.atr_period
+        # Кольцевые буферы окон
+        self._mids = _zeros(params.momentum_window)
+        self._mid_count = 0
+        self._last_mid = 0.0
+        self._returns = _zeros(params.volatility_window)
+        self._return_count = 0
+        self._return_sum = 0.0
+        self._return_sq_sum = 0.0
+        self._notionals = _zeros(params.vwap_window)
+        self._qtys = _zeros(params.vwap_window)
+        self._trade_count = 0
+        self._notional_sum = 0.0
+        self._qty_sum = 0.0
+        # Текущий (незакрытый) бар ATR
+        self._bar_id = -1
+        self._bar_high = 0.0
+        self._bar_low = 0.0
+        self._bar_close = 0.0
+        self._prev_close = 0.0
+        self._bars_closed = 0
+
+    def on_book(
+        self, bid: float, bid_qty: float, ask: float, ask_qty: float, time_ms: int
+    ):
+        """Обновляет индикаторы средней цены и стакана."""
+        self.time = time_ms
+        if bid <= 0.0 or ask <= 0.0:
+            return
+        mid = (bid + ask) * 0.5
+        self.spread_bps = (ask - bid) / mid * 10_000
+        depth = bid_qty + ask_qty
+        if depth > 0.0:
+            self.imbalance = (bid_qty - ask_qty) / depth
+            self.micro_price = (bid * ask_qty + ask * bid_qty) / depth
+        else:
+            self.imbalance = 0.0
+            self.micro_price = mid
+
+        count = self._mid_count
+        if count:
+            self.ema_fast += self._fast_alpha * (mid - self.ema_fast)
+            self.ema_slow += self._slow_alpha * (mid - self.ema_slow)
+            self._add_return(math.log(mid / self._last_mid))
+        else:
+            self.ema_fast = self.ema_slow = mid
+
+        mids = self._mids
+        window = len(mids)
+        index = count % window
+        self.momentum_bps = (mid / mids[index] - 1) * 10_000 if count >= window else 0.0
+        mids[index] = mid
+        self._mid_count = count + 1
+        self._last_mid = mid
+
+    def _add_return(self, value: float):
+        returns = self._returns
+        window = len(returns)
+        count = self._return_count
+        index = count % window
+        if count >= window:
+            old = returns[index]
+            self._return_sum -= old
+            self._return_sq_sum -= old * old
+        returns[index] = value
+        self._return_sum += value
+        self._return_sq_sum += value * value
+        count += 1
+        self._return_count = count
+        if index == window - 1:
+            # Полный оборот буфера: пересчет сумм убирает накопленную погрешность
+            self._return_sum = math.fsum(returns)
+            self._return_sq_sum = math.fsum(r * r for r in returns)
+        n = count if count < window else window
+        mean = self._return_sum / n
+        variance = self._return_sq_sum / n - mean * mean
+        self.volatility_bps = math.sqrt(variance) * 10_000 if variance > 0.0 else 0.0
+
+    def on_trade(self, price: float, qty: float, time_ms: int):
+        """Обновляет VWAP и бары ATR."""
+        self.time = time_ms
+        notionals, qtys = self._notionals, self._qtys
+        window = len(notionals)
+        count = self._trade_count
+        index = count % window
+        if count >= window:
+            self._notional_sum -= notionals[index]
+            self._qty_sum -= qtys[index]
+        notional = price * qty
+        notionals[index] = notional
+        qtys[index] = qty
+        self._notional_sum += notional
+        self._qty_sum += qty
+        self._trade_count = count + 1
+        if index == window - 1:
+            self._notional_sum = math.fsum(notionals)
+            self._qty_sum = math.fsum(qtys)
+        self.vwap = self._notional_sum / self._qty_sum if self._qty_sum > 0.0 else price
+
+        bar_id = time_ms // self.params.atr_bar_ms
+        if bar_id == self._bar_id:
+            if price > self._bar_high:
+                self._bar_high = price
+            elif price < self._bar_low:
+                self._bar_low = price
+            self._bar_close = price
+            return
+        if self._bar_id != -1:
+            self._close_bar()
+        self._bar_id = bar_id
+        self._bar_high = self._bar_low = self._bar_close = price
+
+    def _close_bar(self):
+        high, low = self._bar_high, self._bar_low
+        true_range = high - low
+        if self._bars_closed:
+            prev_close = self._prev_close
+            true_range = max(true_range, abs(high - prev_close), abs(low - prev_close))
+            self.atr += self._atr_alpha * (true_range - self.atr)
+        else:
+            self.atr = true_range
+        self._prev_close = self._bar_close
+        self._bars_closed += 1
+
+    def as_dict(self) -> dict[str, float]:
+        """Текущие значения индикаторов."""
+        return {name: getattr(self, name) for name in INDICATOR_FIELDS}
+
+
+# --- Пакетный расчет ---
+
+
+def ema_series(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    EMA ряда (первое значение — затравка), вычисленная векторно.
+
+    Рекуррентность e[t] = w*e[t-1] + alpha*x[t] (w = 1 - alpha) раскрывается
+    в e[t] = w^t * (e[0] + alpha * sum(x[k] / w^k)), что считается через cumsum.
+    Ряд делится на блоки, в пределах которых w^-k не выходит за 1e150.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.empty_like(values)
+    if not len(values):
+        return result
+    result[0] = values[0]
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[1:] = values[1:]
+        return result
+    block = max(1, int(150 * math.log(10) / -math.log(decay)))
+    carry = values[0]
+    for start in range(1, len(values), block):
+        chunk = values[start : start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1, dtype=np.float64)
+        result[start : start + len(chunk)] = powers * (
+            carry + alpha * np.cumsum(chunk / powers)
+        )
+        carry = result[start + len(chunk) - 1]
+    return result
+
+
+def _window_sums(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Суммы последних min(i + 1, window) значений и их количество для каждого i."""
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return prefix[ends] - prefix[starts], ends - starts
+
+
+def _forward_fill(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Растягивает значения, посчитанные на строках `mask`, на все строки:
+    каждая строка получает значение последней строки mask до нее (или 0).
+    """
+    positions = np.where(mask, np.arange(len(mask)), -1)
+    last = np.maximum.accumulate(positions) if len(mask) else positions
+    # Порядковый номер строки mask для каждой позиции
+    ordinal = np.cumsum(mask) - 1
+    result = np.zeros(len(mask), dtype=np.float64)
+    has_value = last >= 0
+    result[has_value] = values[ordinal[last[has_value]]]
+    return result
+
+
+def _book_indicators(book: np.ndarray, params: IndicatorParams) -> dict[str, Any]:
+    """Индикаторы средней цены и стакана по строкам стакана с обеими ценами."""
+    bid, ask = book["bid"], book["ask"]
+    bid_qty, ask_qty = book["bid_qty"], book["ask_qty"]
+    mid = (bid + ask) * 0.5
+    depth = bid_qty + ask_qty
+    has_depth = depth > 0.0
+    safe_depth = np.where(has_depth, depth, 1.0)
+
+    returns = np.log(mid[1:] / mid[:-1])
+    volatility = np.zeros(len(mid))
+    if len(returns):
+        # Окно волатильности на строке j — последние min(j, window) доходностей
+        sums, counts = _window_sums(returns, params.volatility_window)
+        sq_sums, _ = _window_sums(returns * returns, params.volatility_window)
+        mean = sums / counts
+        variance = sq_sums / counts - mean * mean
+        volatility[1:] = np.sqrt(np.maximum(variance, 0.0)) * 10_000
+
+    window = params.momentum_window
+    momentum = np.zeros(len(mid))
+    momentum[window:] = (mid[window:] / mid[:-window] - 1) * 10_000
+
+    return {
+        "ema_fast": ema_series(mid, 2.0 / (params.ema_fast_period + 1)),
+        "ema_slow": ema_series(mid, 2.0 / (params.ema_slow_period + 1)),
+        "volatility_bps": volatility,
+        "momentum_bps": momentum,
+        "imbalance": np.where(has_depth, (bid_qty - ask_qty) / safe_depth, 0.0),
+        "micro_price": np.where(
+            has_depth, (bid * ask_qty + ask * bid_qty) / safe_depth, mid
+        ),
+        "spread_bps": (ask - bid) / mid * 10_000,
+    }
+
+
+def _trade_indicators(trades: np.ndarray, params: IndicatorParams) -> dict[str, Any]:
+    """VWAP и ATR по строкам сделок."""
+    price, qty = trades["price"], trades["qty"]
+    notional_sums, _ = _window_sums(price * qty, params.vwap_window)
+    qty_sums, _ = _window_sums(qty, params.vwap_window)
+    has_qty = qty_sums > 0.0
+    vwap = np.where(has_qty, notional_sums / np.where(has_qty, qty_sums, 1.0), price)
+
+    atr = np.zeros(len(price))
+    if len(price):
+        bar_ids = trades["time"] // params.atr_bar_ms
+        new_bar = np.concatenate(([True], bar_ids[1:] != bar_ids[:-1]))
+        starts = np.flatnonzero(new_bar)
+        # Последний бар еще не закрыт и в ATR не входит
+        closed = len(starts) - 1
+        if closed:
+            high = np.maximum.reduceat(price, starts)[:closed]
+            low = np.minimum.reduceat(price, starts)[:closed]
+            close = price[starts[1:] - 1]
+            true_range = high - low
+            prev_close = close[:-1]
+            true_range[1:] = np.maximum.reduce(
+                [
+                    true_range[1:],
+                    np.abs(high[1:] - prev_close),
+                    np.abs(low[1:] - prev_close),
+                ]
+            )
+            bar_atr = ema_series(true_range, 1.0 / params.atr_period)
+            # Сделка в баре k видит ATR по закрытым барам 0..k-1
+            bar_of_trade = np.cumsum(new_bar) - 1
+            seen = bar_of_trade > 0
+            atr[seen] = bar_atr[bar_of_trade[seen] - 1]
+    return {"vwap": vwap, "atr": atr}
+
+
+def compute_indicators(
+    ticks: np.ndarray, params: IndicatorParams | None = None
+) -> np.ndarray:
+    """
+    Векторно считает индикаторы по массиву событий TICK_DTYPE.
+    Строка i результата — значения индикаторов после применения события i,
+    как их видел бы PairIndicators в живом режиме.
+    """
+    params = params or IndicatorParams()
+    result = np.zeros(len(ticks), dtype=INDICATOR_DTYPE)
+    result["time"] = ticks["time"]
+    is_trade = ticks["kind"] == KIND_TRADE
+    is_book = ~is_trade & (ticks["bid"] > 0.0) & (ticks["ask"] > 0.0)
+    if is_book.any():
+        for name, values in _book_indicators(ticks[is_book], params).items():
+            result[name] = _forward_fill(is_book, values)
+    if is_trade.any():
+        for name, values in _trade_indicators(ticks[is_trade], params).items():
+            result[name] = _forward_fill(is_trade, values)
+    return result
+
+
+def replay_indicators(
+    ticks: np.ndarray, params: IndicatorParams | None = None
+) -> np.ndarray:
+    """Прогоняет массив событий через живой PairIndicators (для сверки режимов)."""
+    indicators = PairIndicators(params)
+    result = np.zeros(len(ticks), dtype=INDICATOR_DTYPE)
+    on_trade, on_book = indicators.on_trade, indicators.on_book
+    rows = []
+    for t, kind, price, qty, bid, bid_qty, ask, ask_qty in zip(
+        ticks["time"].tolist(),
+        ticks["kind"].tolist(),
+        ticks["price"].tolist(),
+        ticks["qty"].tolist(),
+        ticks["bid"].tolist(),
+        ticks["bid_qty"].tolist(),
+        ticks["ask"].tolist(),
+        ticks["ask_qty"].tolist(),
+    ):
+        if kind == KIND_TRADE:
+            on_trade(price, qty, t)
+        else:
+            on_book(bid, bid_qty, ask, ask_qty, t)
+        rows.append(
+            (
+                t,
+                indicators.ema_fast,
+                indicators.ema_slow,
+                indicators.vwap,
+                indicators.atr,
+                indicators.volatility_bps,
+                indicators.momentum_bps,
+                indicators.imbalance,
+                indicators.micro_price,
+                indicators.spread_bps,
+            )
+        )
+    result[:] = rows
+    return result
+
+
+def warm_up_indicators(
+    root: str | Path,
+    pair: str,
+    start_ms: int,
+    end_ms: int,
+    params: IndicatorParams | None = None,
+) -> PairIndicators:
+    """
+    Восстанавливает состояние живых индикаторов пары по архиву за [start_ms, end_ms).
+    Цикл по событиям тяжелый, поэтому бот выполняет его через TradingBot.offload.
+    """
+    indicators = PairIndicators(params)
+    on_trade, on_book = indicators.on_trade, indicators.on_book
+    for chunk in MarketArchive(root).read(pair, start_ms, end_ms, chunk_size=100_000):
+        for t, kind, price, qty, bid, bid_qty, ask, ask_qty in zip(
+            chunk["time"].tolist(),
+            chunk["kind"].tolist(),
+            chunk["price"].tolist(),
+            chunk["qty"].tolist(),
+            chunk["bid"].tolist(),
+            chunk["bid_qty"].tolist(),
+            chunk["ask"].tolist(),
+            chunk["ask_qty"].tolist(),
+        ):
+            if kind == KIND_TRADE:
+                on_trade(price, qty, t)
+            else:
+                on_book(bid, bid_qty, ask, ask_qty, t)
+    return indicators
+
+
+def _apply_event(indicators: PairIndicators, event: MarketEvent):
+    data = event.data
+    if event.type is MarketEventType.TICK:
+        indicators.on_trade(
+            data["price"], data.get("qty", 0.0), data.get("time", indicators.time)
+        )
+    elif event.type is MarketEventType.BOOK:
+        indicators.on_book(
+            data["bid"],
+            data.get("bid_qty", 0.0),
+            data["ask"],
+            data.get("ask_qty", 0.0),
+            data.get("time", indicators.time),
+        )
+
+
+class ScalpingManager:
+    """Индикаторы запущенных пар, обновляемые на каждое рыночное событие."""
+
+    # Сколько событий пары копить за время прогрева; при переполнении прогрев отменяется
+    _MAX_WARM_UP_EVENTS = 100_000
+
+    def __init__(self, params: IndicatorParams | None = None):
+        """
+        :param params: Параметры индикаторов, общие для всех пар.
+        """
+        self.params = params or IndicatorParams()
+        self._pairs: dict[str, PairIndicators] = {}
+        # События пар, индикаторы которых прогреваются по архиву
+        self._warming: dict[str, list[MarketEvent]] = {}
+
+    def add_pair(self, pair: str):
+        """Начинает вести индикаторы пары (с чистого состояния)."""
+        self._pairs[pair] = PairIndicators(self.params)
+
+    def remove_pair(self, pair: str):
+        """Прекращает вести индикаторы пары и освобождает ее буферы."""
+        self._pairs.pop(pair, None)
+        self._warming.pop(pair, None)
+
+    def begin_warm_up(self, pair: str):
+        """Начинает копить события пары, чтобы применить их к прогретым индикаторам."""
+        if pair in self._pairs:
+            self._warming[pair] = []
+
+    def cancel_warm_up(self, pair: str):
+        self._warming.pop(pair, None)
+
+    def finish_warm_up(self, pair: str, warmed: PairIndicators) -> bool:
+        """
+        Заменяет индикаторы пары прогретыми, досчитав события, пришедшие за время
+        прогрева. Возвращает False, если пара уже не ведется или прогрев отменен.
+        """
+        events = self._warming.pop(pair, None)
+        if events is None or pair not in self._pairs:
+            return False
+        for event in events:
+            _apply_event(warmed, event)
+        self._pairs[pair] = warmed
+        return True
+
+    def get(self, pair: str) -> PairIndicators | None:
+        """Индикаторы пары или None, если пара не ведется."""
+        return self._pairs.get(pair)
+
+    def on_market_event(self, pair: str, event: MarketEvent):
+        """Потребитель WebsocketManager: обновляет индикаторы пары."""
+        indicators = self._pairs.get(pair)
+        if indicators is None:
+            return
+        _apply_event(indicators, event)
+        if self._warming:
+            events = self._warming.get(pair)
+            if events is not None:
+                events.append(event)
+                if len(events) > self._MAX_WARM_UP_EVENTS:
+                    logger.warning(
+                        f"Indicator warm-up of {pair} is too slow, cancelled."
+                    )
+                    del self._warming[pair]
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """Текущие значения индикаторов по парам."""
+        return {pair: ind.as_dict() for pair, ind in self._pairs.items()}
@@ -1,8 +1,163 @@
 """
-Модуль для управления основным Telegram-ботом для пользователей.
+Модуль для взаимодействия с Telegram Bot API.
 
 Отвечает за:
-- Обработку команд от пользователей.
-- Отображение статуса и статистики.
-- Предоставление базовых функций управления ботом через Telegram.
+- Отправку сообщений пользователям через один пул keep-alive соединений.
+- Соблюдение лимитов Telegram: token bucket на весь бот (~30 сообщений в секунду)
+  и на каждый чат (1 сообщение в секунду, 20 в минуту для групп).
+- Обработку ответа 429: отправка в чат приостанавливается на retry_after.
+
+Адрес API настраивается (TELEGRAM_API_URL), поэтому клиент можно направить
+на локальный мок-сервер Telegram.
 """
+
+import asyncio
+import os
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from managers.exchange_manager import TokenBucket
+
+DEFAULT_TELEGRAM_URL = "https://api.telegram.org"
+
+
+class TelegramAPIError(Exception):
+    """Telegram отклонил запрос (чат не найден, бот заблокирован и т.п.)."""
+
+    def __init__(self, status_code: int, description: str):
+        super().__init__(f"HTTP {status_code}: {description}")
+        self.status_code = status_code
+        self.description = description
+
+
+class TelegramClient:
+    """
+    Асинхронный клиент Telegram Bot API для отправки сообщений.
+
+    Один экземпляр рассчитан на весь процесс: все уведомления бота делят
+    общий пул соединений и общий лимит на число сообщений.
+    """
+
+    # Лимиты Telegram: сообщений в секунду на бота и на один чат
+    GLOBAL_LIMIT_PER_SECOND = 30
+    CHAT_LIMIT_PER_SECOND = 1
+    GROUP_LIMIT_PER_MINUTE = 20
+    # Токены глобального лимита, которые обычные сообщения оставляют срочным
+    URGENT_RESERVE = 5
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(
+        self,
+        token: str | None = None,
+        base_url: str | None = None,
+        max_retries: int = 3,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        :param token: Токен бота (по умолчанию — TELEGRAM_BOT_TOKEN).
+        :param base_url: Адрес Bot API (для тестов — адрес локального мок-сервера).
+        :param max_retries: Сколько раз повторять отправку после 429 или сетевой ошибки.
+        :param transport: Альтернативный транспорт httpx (например, для тестов).
+        """
+        token = token or os.getenv("TELEGRAM_BOT_TOKEN", "")
+        self.base_url = base_url or os.getenv("TELEGRAM_API_URL", DEFAULT_TELEGRAM_URL)
+        self.max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            base_url=f"{self.base_url}/bot{token}",
+            http2=transport is None,
+            limits=httpx.Limits(
+                max_connections=20, max_keepalive_connections=10, keepalive_expiry=60
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            transport=transport,
+        )
+        self.global_limiter = TokenBucket(self.GLOBAL_LIMIT_PER_SECOND, period=1)
+        self._chat_limiters: dict[str, TokenBucket] = {}
+
+        # --- Метрики клиента ---
+        self.messages_sent = 0
+        self.rate_limit_hits = 0
+        self.errors = 0
+
+    async def close(self):
+        """Закрывает пул соединений."""
+        await self._client.aclose()
+
+    def _chat_limiter(self, chat_id: str) -> TokenBucket:
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            # ID групп и каналов отрицательные, для них действует минутный лимит
+            if chat_id.startswith("-"):
+                limiter = TokenBucket(self.GROUP_LIMIT_PER_MINUTE, period=60)
+            else:
+                limiter = TokenBucket(self.CHAT_LIMIT_PER_SECOND, period=1)
+            self._chat_limiters[chat_id] = limiter
+        return limiter
+
+    async def send_message(
+        self, chat_id: str | int, text: str, urgent: bool = False
+    ) -> dict[str, Any]:
+        """
+        Отправляет текстовое сообщение в чат с учетом лимитов.
+
+        :param urgent: Срочное сообщение: может использовать резерв глобального лимита.
+        :raises TelegramAPIError: Telegram отклонил сообщение или повторы исчерпаны.
+        """
+        chat_id = str(chat_id)
+        if len(text) > self.MAX_MESSAGE_LENGTH:
+            text = text[: self.MAX_MESSAGE_LENGTH - 1] + "…"
+        payload = {"chat_id": chat_id, "text": text, "disable_web_page_preview": True}
+        chat_limiter = self._chat_limiter(chat_id)
+        reserve = 0.0 if urgent else self.URGENT_RESERVE
+
+        for attempt in range(self.max_retries + 1):
+            await chat_limiter.acquire(1)
+            await self.global_limiter.acquire(1, reserve=reserve)
+            try:
+                response = await self._client.post("/sendMessage", json=payload)
+            except httpx.HTTPError as e:
+                self.errors += 1
+                if attempt == self.max_retries:
+                    raise TelegramAPIError(0, repr(e)) from e
+                await asyncio.sleep(2**attempt)
+                continue
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"description": response.text}
+            if response.status_code == 429:
+                self.rate_limit_hits += 1
+                retry_after = float(
+                    body.get("parameters", {}).get("retry_after", 1 + attempt)
+                )
+                chat_limiter.block_for(retry_after)
+                logger.warning(
+                    f"Telegram rate limit hit for chat {chat_id}, "
+                    f"backing off for {retry_after}s."
+                )
+                if attempt < self.max_retries:
+                    continue
+            elif response.status_code >= 500 and attempt < self.max_retries:
+                self.errors += 1
+                await asyncio.sleep(2**attempt)
+                continue
+            if response.is_error or not body.get("ok", False):
+                self.errors += 1
+                raise TelegramAPIError(
+                    response.status_code, body.get("description", response.text)
+                )
+            self.messages_sent += 1
+            return body.get("result", {})
+
+    def get_stats(self) -> dict[str, int | float]:
+        """Возвращает метрики клиента и остаток глобального лимита."""
+        return {
+            "messages_sent": self.messages_sent,
+            "rate_limit_hits": self.rate_limit_hits,
+            "errors": self.errors,
+            "chats": len(self._chat_limiters),
+            "global_tokens_available": round(self.global_limiter.available, 1),
+        }
@@ -6,4 +6,462 @@
 - Подписку на необходимые потоки данных (цены, ордера, баланс).
 - Парсинг и предварительную обработку входящих сообщений.
 - Распределение данных по другим компонентам системы.
+
+Все пары обслуживаются несколькими общими (мультиплексированными) соединениями
+в формате combined streams биржи Binance: подписки добавляются и снимаются
+на лету сообщениями SUBSCRIBE/UNSUBSCRIBE, без переподключения.
 """
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections.abc import Callable
+
+import websockets
+from loguru import logger
+
+from managers.loguru_manager import LogThrottle
+from managers.metrics_manager import REGISTRY
+from managers.orderbook_manager import parse_depth_update
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+# Потребитель рыночных данных: вызывается синхронно как consumer(pair, event)
+MarketConsumer = Callable[[str, MarketEvent], None]
+# Обработчик "сырого" потока (например, пользовательского): handler(data)
+RawStreamHandler = Callable[[dict], None]
+
+DEFAULT_WS_URL = "wss://stream.binance.com:9443/stream"
+
+WS_MESSAGES = REGISTRY.counter(
+    "scalpex_ws_messages", "Market data messages received from exchange"
+)
+WS_ERRORS = REGISTRY.counter(
+    "scalpex_ws_errors",
+    "Market data messages that failed to parse or to be handled by a consumer",
+    ("kind",),
+)
+
+# Каналы, на которые подписывается каждая пара, и тип события, в который они парсятся
+STREAM_CHANNELS: dict[str, MarketEventType] = {
+    "trade": MarketEventType.TICK,
+    "bookTicker": MarketEventType.BOOK,
+    "depth@100ms": MarketEventType.DEPTH,
+}
+
+
+def _parse_trade(data: dict) -> dict:
+    """Преобразует сообщение потока <symbol>@trade в данные события TICK."""
+    return {"price": float(data["p"]), "qty": float(data["q"]), "time": data["T"]}
+
+
+def _parse_book_ticker(data: dict) -> dict:
+    """
+    Преобразует сообщение потока <symbol>@bookTicker в данные события BOOK.
+    В сообщении нет времени биржи, поэтому событие помечается временем получения (мс).
+    """
+    return {
+        "bid": float(data["b"]),
+        "bid_qty": float(data["B"]),
+        "ask": float(data["a"]),
+        "ask_qty": float(data["A"]),
+        "time": int(time.time() * 1000),
+    }
+
+
+_PARSERS: dict[MarketEventType, Callable[[dict], dict]] = {
+    MarketEventType.TICK: _parse_trade,
+    MarketEventType.BOOK: _parse_book_ticker,
+    MarketEventType.DEPTH: parse_depth_update,
+}
+
+
+class _ExchangeConnection:
+    """Одно мультиплексированное WebSocket-соединение, обслуживающее набор потоков."""
+
+    # Максимум потоков в одном сообщении SUBSCRIBE/UNSUBSCRIBE
+    _CONTROL_BATCH_SIZE = 200
+
+    def __init__(self, manager: "WebsocketManager", conn_id: int):
+        self._manager = manager
+        self.conn_id = conn_id
+        self.streams: set[str] = set()
+        self._ws = None
+        self._task: asyncio.Task | None = None
+        self._request_id = 0
+        # Изменения подписок, накопленные за текущую итерацию event loop
+        self._pending_subscribe: set[str] = set()
+        self._pending_unsubscribe: set[str] = set()
+        self._flush_scheduled = False
+        # Задачи отправки SUBSCRIBE/UNSUBSCRIBE (ссылки держим, чтобы их не собрал GC)
+        self._control_tasks: set[asyncio.Task] = set()
+
+        # --- Метрики соединения ---
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self.parse_errors = 0
+        self._error_log = LogThrottle()
+        self.parse_time = 0.0
+        self.messages_per_sec = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+
+    def start(self):
+        """Запускает фоновую задачу соединения."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Останавливает задачу соединения и закрывает сокет."""
+        for task in self._control_tasks:
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def add_streams(self, streams: list[str]):
+        """Добавляет потоки в соединение; подписка отправляется пачкой."""
+        self.streams.update(streams)
+        self._pending_unsubscribe.difference_update(streams)
+        self._pending_subscribe.update(streams)
+        self._schedule_flush()
+
+    def remove_streams(self, streams: list[str]):
+        """Убирает потоки из соединения; отписка отправляется пачкой."""
+        self.streams.difference_update(streams)
+        self._pending_subscribe.difference_update(streams)
+        self._pending_unsubscribe.update(streams)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Откладывает отправку изменений подписок до конца текущей итерации loop."""
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_pending)
+
+    def _flush_pending(self):
+        """Отправляет накопленные изменения подписок одним набором сообщений."""
+        self._flush_scheduled = False
+        if not self.connected:
+            # После подключения будет отправлена подписка на все self.streams
+            self._pending_subscribe.clear()
+            self._pending_unsubscribe.clear()
+            return
+        if self._pending_unsubscribe:
+            self._spawn_control(
+                self._send_control("UNSUBSCRIBE", sorted(self._pending_unsubscribe))
+            )
+            self._pending_unsubscribe.clear()
+        if self._pending_subscribe:
+            self._spawn_control(
+                self._send_control("SUBSCRIBE", sorted(self._pending_subscribe))
+            )
+            self._pending_subscribe.clear()
+
+    def _spawn_control(self, coro):
+        task = asyncio.create_task(coro)
+        self._control_tasks.add(task)
+        task.add_done_callback(self._control_tasks.discard)
+
+    async def _send_control(self, method: str, streams: list[str]):
+        """Отправляет управляющее сообщение бирже, разбивая его на пачки."""
+        ws = self._ws
+        if ws is None:
+            return
+        for i in range(0, len(streams), self._CONTROL_BATCH_SIZE):
+            self._request_id += 1
+            payload = {
+                "method": method,
+                "params": streams[i : i + self._CONTROL_BATCH_SIZE],
+                "id": self._request_id,
+            }
+            try:
+                await ws.send(json.dumps(payload))
+            except websockets.ConnectionClosed:
+                # Переподключение восстановит подписки автоматически
+                return
+
+    async def _run(self):
+        """Цикл жизни соединения: подключение, чтение, переподключение с backoff."""
+        manager = self._manager
+        delay = manager.reconnect_min_delay
+        while True:
+            try:
+                async with websockets.connect(
+                    manager.url, ping_interval=20, ping_timeout=20, max_queue=4096
+                ) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    logger.info(
+                        f"WS connection #{self.conn_id} established "
+                        f"({len(self.streams)} streams)."
+                    )
+                    if self.streams:
+                        await self._send_control("SUBSCRIBE", sorted(self.streams))
+                    delay = manager.reconnect_min_delay
+                    await self._read_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, websockets.WebSocketException) as e:
+                logger.warning(f"WS connection #{self.conn_id} lost: {e!r}")
+            finally:
+                self._ws = None
+                self.connected = False
+
+            self.reconnects += 1
+            # Экспоненциальная задержка с джиттером, чтобы не штурмовать биржу
+            sleep_for = delay * random.uniform(0.5, 1.0)
+            logger.info(
+                f"WS connection #{self.conn_id} reconnecting in {sleep_for:.2f}s..."
+            )
+            await asyncio.sleep(sleep_for)
+            delay = min(delay * 2, manager.reconnect_max_delay)
+
+    async def _read_loop(self, ws):
+        """Читает сообщения, парсит их и раздает потребителям."""
+        dispatch = self._manager._dispatch
+        perf_counter = time.perf_counter
+        loads = json.loads
+        parse_errors = WS_ERRORS.labels("parse")
+        async for raw in ws:
+            started = perf_counter()
+            try:
+                message = loads(raw)
+                stream = message.get("stream")
+                if stream is None:
+                    # Ответ на SUBSCRIBE/UNSUBSCRIBE или ошибка биржи
+                    if message.get("error"):
+                        logger.error(f"WS connection #{self.conn_id} error: {message}")
+                    continue
+                dispatch(stream, message["data"], started)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # Одно некорректное сообщение не должно рвать соединение всех пар
+                self.parse_errors += 1
+                parse_errors.inc()
+                if self._error_log.allow():
+                    logger.warning(
+                        f"WS connection #{self.conn_id} skipped malformed message: "
+                        f"{e!r} (+{self._error_log.skipped} more)"
+                    )
+                continue
+            WS_MESSAGES.inc()
+
+            finished = perf_counter()
+            self.parse_time += finished - started
+            self.messages += 1
+            self._window_count += 1
+            elapsed = finished - self._window_start
+            if elapsed >= 1.0:
+                self.messages_per_sec = self._window_count / elapsed
+                self._window_start = finished
+                self._window_count = 0
+
+    def get_stats(self) -> dict[str, float | int | bool]:
+        """Возвращает метрики соединения: сообщения/сек и время парсинга."""
+        avg_parse_us = self.parse_time / self.messages * 1e6 if self.messages else 0.0
+        return {
+            "connected": self.connected,
+            "streams": len(self.streams),
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "parse_errors": self.parse_errors,
+            "messages_per_sec": round(self.messages_per_sec, 1),
+            "avg_parse_us": round(avg_parse_us, 2),
+        }
+
+
+class WebsocketManager:
+    """
+    Менеджер рыночных данных биржи.
+
+    Распределяет потоки всех пар по нескольким общим соединениям, подписывает
+    и отписывает пары на лету, а распарсенные сообщения передает потребителям
+    этой пары (например, `TradingBot.publish_market_event`).
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        max_streams_per_connection: int | None = None,
+        reconnect_min_delay: float = 0.5,
+        reconnect_max_delay: float = 30.0,
+    ):
+        """
+        :param url: Адрес combined-stream эндпоинта биржи.
+        :param max_streams_per_connection: Сколько потоков держать в одном соединении.
+        :param reconnect_min_delay: Начальная задержка перед переподключением (сек).
+        :param reconnect_max_delay: Максимальная задержка перед переподключением (сек).
+        """
+        self.url = url or os.getenv("EXCHANGE_WS_URL", DEFAULT_WS_URL)
+        self.max_streams_per_connection = max_streams_per_connection or int(
+            os.getenv("WS_MAX_STREAMS_PER_CONNECTION", "200")
+        )
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self._is_running = False
+        self._connections: list[_ExchangeConnection] = []
+        self._next_conn_id = 0
+        # Маршрутизация: имя потока -> (пара, тип события)
+        self._routes: dict[str, tuple[str, MarketEventType]] = {}
+        # Потребители по парам: {"KASUSDT": [consumer, ...]}
+        self._consumers: dict[str, list[MarketConsumer]] = {}
+        # В каком соединении обслуживается пара
+        self._pair_connections: dict[str, _ExchangeConnection] = {}
+        # Потоки без парсинга в MarketEvent (например, listenKey пользователя)
+        self._raw_handlers: dict[str, RawStreamHandler] = {}
+        self._raw_connections: dict[str, _ExchangeConnection] = {}
+        # Закрытие опустевших соединений идет в фоне; ссылки держим до завершения
+        self._closing: set[asyncio.Task] = set()
+        self.consumer_errors = 0
+        self._error_log = LogThrottle()
+
+    @staticmethod
+    def streams_for_pair(pair: str) -> list[str]:
+        """Возвращает имена потоков биржи для пары, например 'kasusdt@trade'."""
+        symbol = pair.lower()
+        return [f"{symbol}@{channel}" for channel in STREAM_CHANNELS]
+
+    async def start(self):
+        """Запускает соединения для уже зарегистрированных подписок."""
+        self._is_running = True
+        for connection in self._connections:
+            connection.start()
+        logger.info(f"WebsocketManager started ({self.url}).")
+
+    async def stop(self):
+        """Закрывает все соединения."""
+        self._is_running = False
+        await asyncio.gather(*(c.close() for c in self._connections), *self._closing)
+        logger.info("WebsocketManager stopped.")
+
+    def subscribe(self, pair: str, consumer: MarketConsumer):
+        """Подписывает потребителя на рыночные данные пары."""
+        consumers = self._consumers.setdefault(pair, [])
+        if consumer not in consumers:
+            consumers.append(consumer)
+        if pair in self._pair_connections:
+            return
+
+        streams = self.streams_for_pair(pair)
+        for stream, event_type in zip(streams, STREAM_CHANNELS.values()):
+            self._routes[stream] = (pair, event_type)
+        connection = self._pick_connection(len(streams))
+        self._pair_connections[pair] = connection
+        connection.add_streams(streams)
+        logger.info(f"Subscribed {pair} on WS connection #{connection.conn_id}.")
+
+    def unsubscribe(self, pair: str, consumer: MarketConsumer | None = None):
+        """
+        Отписывает потребителя от пары. Когда у пары не остается потребителей,
+        ее потоки снимаются с соединения.
+        """
+        consumers = self._consumers.get(pair)
+        if not consumers:
+            return
+        if consumer is not None and consumer in consumers:
+            consumers.remove(consumer)
+        if consumer is None:
+            consumers.clear()
+        if consumers:
+            return
+
+        del self._consumers[pair]
+        connection = self._pair_connections.pop(pair, None)
+        streams = self.streams_for_pair(pair)
+        for stream in streams:
+            self._routes.pop(stream, None)
+        if connection is not None:
+            connection.remove_streams(streams)
+            logger.info(
+                f"Unsubscribed {pair} from WS connection #{connection.conn_id}."
+            )
+            self._close_if_empty(connection)
+
+    def subscribe_raw(self, stream: str, handler: RawStreamHandler):
+        """
+        Подписывает обработчик на поток, данные которого не являются рыночными
+        событиями пары (например, поток пользователя по listenKey).
+        """
+        self._raw_handlers[stream] = handler
+        if stream in self._raw_connections:
+            return
+        connection = self._pick_connection(1)
+        self._raw_connections[stream] = connection
+        connection.add_streams([stream])
+
+    def unsubscribe_raw(self, stream: str):
+        """Снимает подписку на "сырой" поток."""
+        self._raw_handlers.pop(stream, None)
+        connection = self._raw_connections.pop(stream, None)
+        if connection is not None:
+            connection.remove_streams([stream])
+            self._close_if_empty(connection)
+
+    def _close_if_empty(self, connection: _ExchangeConnection):
+        """Закрывает в фоне соединение, на котором не осталось потоков."""
+        if connection.streams:
+            return
+        self._connections.remove(connection)
+        task = asyncio.create_task(connection.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _pick_connection(self, needed: int) -> _ExchangeConnection:
+        """Выбирает наименее загруженное соединение со свободным местом или создает новое."""
+        candidates = [
+            c
+            for c in self._connections
+            if len(c.streams) + needed <= self.max_streams_per_connection
+        ]
+        if candidates:
+            return min(candidates, key=lambda c: len(c.streams))
+
+        connection = _ExchangeConnection(self, self._next_conn_id)
+        self._next_conn_id += 1
+        self._connections.append(connection)
+        if self._is_running:
+            connection.start()
+        return connection
+
+    def _dispatch(self, stream: str, data: dict, received_at: float):
+        """Парсит сообщение потока и раздает одно и то же событие всем потребителям пары."""
+        route = self._routes.get(stream)
+        if route is None:
+            handler = self._raw_handlers.get(stream)
+            if handler is not None:
+                try:
+                    handler(data)
+                except Exception as e:
+                    self._consumer_failed(stream, e)
+            # Иначе это сообщение по потоку, от которого мы уже отписались
+            return
+        pair, event_type = route
+        event = MarketEvent(event_type, _PARSERS[event_type](data), received_at)
+        for consumer in self._consumers.get(pair, ()):
+            try:
+                consumer(pair, event)
+            except Exception as e:
+                # Ошибка одного потребителя не мешает остальным и не рвет соединение
+                self._consumer_failed(pair, e)
+
+    def _consumer_failed(self, name: str, error: Exception):
+        self.consumer_errors += 1
+        WS_ERRORS.labels("consumer").inc()
+        # Потребитель, падающий на каждом сообщении, не должен забивать лог
+        if self._error_log.allow():
+            logger.opt(exception=error).error(
+                f"WS consumer of {name} failed: {error!r} "
+                f"(+{self._error_log.skipped} more)"
+            )
+
+    def get_stats(self) -> dict[int, dict[str, float | int | bool]]:
+        """Возвращает метрики по каждому соединению."""
+        return {c.conn_id: c.get_stats() for c in self._connections}
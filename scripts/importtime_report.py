@@ -0,0 +1,187 @@
+"""
+Отчет о времени импорта модулей по выводу `python -X importtime`.
+
+Каждый модуль импортируется в отдельном чистом интерпретаторе (несколько раз,
+берется минимум для каждого импортированного модуля, чтобы убрать шум).
+Отчет показывает общее время и самые тяжелые импорты. С `--baseline` время
+сравнивается с сохраненными результатами, и скрипт завершается с кодом 1,
+если импорт стал медленнее порога. Так регрессии холодного старта ловятся в CI:
+
+    python scripts/importtime_report.py server.run_bot server.run_worker --save importtime.json
+    python scripts/importtime_report.py server.run_bot server.run_worker --baseline importtime.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass(slots=True)
+class ImportRecord:
+    """Одна строка вывода -X importtime (время в микросекундах)."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """
+    Разбирает stderr интерпретатора, запущенного с -X importtime.
+    Строки вида `import time:   331 |   25179 |     numpy.__config__`,
+    вложенность модуля определяется отступом имени.
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # Заголовок таблицы: self [us] | cumulative | imported package
+            continue
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        records.append(
+            ImportRecord(
+                name=name,
+                self_us=int(parts[0]),
+                cumulative_us=int(parts[1]),
+                depth=(len(raw_name) - len(name) - 1) // 2,
+            )
+        )
+    return records
+
+
+def module_subtree(records: list[ImportRecord], module: str) -> list[ImportRecord]:
+    """
+    Записи, относящиеся к импорту `module`, без модулей старта интерпретатора
+    (site, encodings и т.п.). Вложенные импорты выводятся перед родителем,
+    поэтому поддерево — непрерывный блок строк, заканчивающийся строкой модуля.
+    """
+    for end in range(len(records) - 1, -1, -1):
+        if records[end].name == module and records[end].depth == 0:
+            break
+    else:
+        return []
+    start = end
+    while start > 0 and records[start - 1].depth > 0:
+        start -= 1
+    return records[start : end + 1]
+
+
+def measure(module: str, runs: int = 3) -> dict[str, ImportRecord]:
+    """Импортирует модуль `runs` раз и возвращает минимальные времена по модулям."""
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    best: dict[str, ImportRecord] = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=PROJECT_ROOT,
+            env=env,
+        )
+        if result.returncode:
+            raise SystemExit(f"Import of {module} failed:\n{result.stderr[-2000:]}")
+        for record in module_subtree(parse_importtime(result.stderr), module):
+            known = best.get(record.name)
+            if known is None or record.cumulative_us < known.cumulative_us:
+                best[record.name] = record
+    return best
+
+
+def summarize(module: str, records: dict[str, ImportRecord], top: int) -> dict:
+    """Итоги по модулю: общее время и самые тяжелые импорты."""
+    root = records.get(module)
+    by_self = sorted(records.values(), key=lambda r: r.self_us, reverse=True)
+    # Самые тяжелые импорты, выполненные непосредственно модулем
+    direct = [r for r in records.values() if r.depth == 1]
+    direct.sort(key=lambda r: r.cumulative_us, reverse=True)
+    return {
+        "module": module,
+        "total_ms": round(root.cumulative_us / 1000, 1) if root else 0.0,
+        "modules_imported": len(records),
+        "heaviest_direct": [asdict(r) for r in direct[:top]],
+        "heaviest_self": [asdict(r) for r in by_self[:top]],
+    }
+
+
+def compare(
+    results: list[dict], baseline: dict[str, float], threshold: float, min_ms: float
+) -> list[str]:
+    """Возвращает описания регрессий относительно базовых значений."""
+    regressions = []
+    for result in results:
+        before = baseline.get(result["module"])
+        after = result["total_ms"]
+        if before is None:
+            continue
+        if after > before * (1 + threshold) and after - before >= min_ms:
+            regressions.append(
+                f"{result['module']}: {before:.1f} ms -> {after:.1f} ms "
+                f"(+{(after / before - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def _print_report(result: dict):
+    print(
+        f"\n{result['module']}: {result['total_ms']:.1f} ms, "
+        f"{result['modules_imported']} modules"
+    )
+    print("  heaviest imports (cumulative):")
+    for record in result["heaviest_direct"]:
+        print(f"    {record['cumulative_us'] / 1000:8.1f} ms  {record['name']}")
+    print("  heaviest modules (self):")
+    for record in result["heaviest_self"]:
+        print(f"    {record['self_us'] / 1000:8.1f} ms  {record['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=["server.run_bot"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Вывести отчет в JSON")
+    parser.add_argument("--save", help="Сохранить итоги как базовые значения")
+    parser.add_argument("--baseline", help="Файл базовых значений для сравнения")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Допустимый рост (0.2 = 20%%)"
+    )
+    parser.add_argument(
+        "--min-ms", type=float, default=5.0, help="Игнорировать рост меньше, мс"
+    )
+    args = parser.parse_args()
+
+    results = [
+        summarize(module, measure(module, args.runs), args.top)
+        for module in args.modules
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            _print_report(result)
+
+    totals = {result["module"]: result["total_ms"] for result in results}
+    if args.save:
+        Path(args.save).write_text(json.dumps(totals, indent=2) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print("\nImport time regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
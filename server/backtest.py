@@ -0,0 +1,316 @@
+"""
+Бэктест торговой стратегии на записанных рыночных данных.
+
+Источник данных — архив рыночных данных (каталог MarketRecorder, таблица ticks)
+или отдельный бинарный файл из записей TICK_DTYPE фиксированной ширины.
+Данные читаются через np.memmap кусками по `chunk_size` записей и никогда
+не загружаются целиком.
+Каждое событие применяется к PairMarketState и передается той же
+ScalpingStrategy, что работает в TradingBot.
+
+Рыночные ордера стратегии исполняются на следующем событии (задержка отправки)
+по лучшей цене стакана в пределах ее объема, остаток — с проскальзыванием.
+PnL, комиссии и просадка считаются векторно по массиву исполнений.
+Перебор параметров идет параллельно в пуле процессов:
+
+    python -m server.backtest market_data --pair KASUSDT --grid entry_bps=3,5,8 take_profit_bps=5,8,12
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+
+from managers.archive_manager import KIND_BOOK, TICK_DTYPE, MarketArchive
+from .pair_engine import PairMarketState
+from .strategy import OrderIntent, ScalpingStrategy, StrategyParams
+
+FILL_DTYPE = np.dtype(
+    [("time", "<i8"), ("side", "i1"), ("price", "<f8"), ("qty", "<f8")]
+)
+
+
+@dataclass(slots=True)
+class BacktestConfig:
+    """Параметры симуляции исполнения."""
+
+    # Комиссия биржи как доля объема сделки (0.001 = 0.1%)
+    fee_rate: float = 0.001
+    # Проскальзывание для объема сверх лучшего уровня стакана, в б.п.
+    slippage_bps: float = 2.0
+    # Сколько записей читать из файла за раз
+    chunk_size: int = 1_000_000
+    # Диапазон времени (мс) при чтении из архива
+    start_ms: int = 0
+    end_ms: int = 2**62
+
+
+def open_ticks(path: str | Path) -> np.memmap:
+    """Открывает файл тиков как memory-mapped массив TICK_DTYPE."""
+    if not os.path.getsize(path):
+        # Пустой файл нельзя отобразить в память
+        return np.empty(0, dtype=TICK_DTYPE)
+    return np.memmap(path, dtype=TICK_DTYPE, mode="r")
+
+
+def write_ticks(path: str | Path, ticks: np.ndarray):
+    """Дописывает тики (массив TICK_DTYPE) в конец файла."""
+    with open(path, "ab") as f:
+        np.ascontiguousarray(ticks, dtype=TICK_DTYPE).tofile(f)
+
+
+class FillSimulator:
+    """Исполняет рыночные ордера стратегии по лучшим ценам стакана."""
+
+    __slots__ = ("config", "pending", "times", "sides", "prices", "qtys")
+
+    def __init__(self, config: BacktestConfig):
+        self.config = config
+        self.pending: OrderIntent | None = None
+        # Исполнения копятся в списках и превращаются в массивы в конце прогона
+        self.times: list[int] = []
+        self.sides: list[int] = []
+        self.prices: list[float] = []
+        self.qtys: list[float] = []
+
+    def execute(self, state: PairMarketState) -> tuple[str, float, float] | None:
+        """Исполняет ожидающий ордер по текущему состоянию рынка."""
+        intent = self.pending
+        if intent is None:
+            return None
+        if intent.side == "BUY":
+            level_price, level_qty, direction = state.best_ask, state.best_ask_qty, 1
+        else:
+            level_price, level_qty, direction = state.best_bid, state.best_bid_qty, -1
+        if not level_price:
+            level_price, level_qty = state.last_price, 0.0
+        if not level_price:
+            return None
+
+        qty = intent.quantity
+        at_level = min(qty, level_qty)
+        rest = qty - at_level
+        slipped = level_price * (1 + direction * self.config.slippage_bps / 10_000)
+        price = (at_level * level_price + rest * slipped) / qty
+
+        self.pending = None
+        self.times.append(state.exchange_time)
+        self.sides.append(direction)
+        self.prices.append(price)
+        self.qtys.append(qty)
+        return intent.side, qty, price
+
+    def fills(self) -> np.ndarray:
+        result = np.empty(len(self.times), dtype=FILL_DTYPE)
+        result["time"] = self.times
+        result["side"] = self.sides
+        result["price"] = self.prices
+        result["qty"] = self.qtys
+        return result
+
+
+def compute_performance(
+    fills: np.ndarray, fee_rate: float, last_price: float
+) -> dict[str, float | int]:
+    """
+    Считает итоги по массиву исполнений (FILL_DTYPE) векторно:
+    PnL с учетом комиссий, максимальную просадку и число закрытых сделок.
+    Открытая позиция оценивается по `last_price`.
+    """
+    if not len(fills):
+        return {
+            "pnl": 0.0,
+            "fees": 0.0,
+            "max_drawdown": 0.0,
+            "fills": 0,
+            "round_trips": 0,
+            "volume": 0.0,
+        }
+    signed_qty = fills["side"] * fills["qty"]
+    notional = fills["price"] * fills["qty"]
+    fees = notional * fee_rate
+    cash = np.cumsum(-signed_qty * fills["price"] - fees)
+    position = np.cumsum(signed_qty)
+    # Капитал после каждого исполнения, позиция оценена по цене исполнения
+    equity = cash + position * fills["price"]
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    final_equity = cash[-1] + position[-1] * last_price
+    return {
+        "pnl": float(final_equity),
+        "fees": float(fees.sum()),
+        "max_drawdown": float((peak - equity).max()),
+        "fills": int(len(fills)),
+        "round_trips": int(np.count_nonzero(np.abs(position) < 1e-12)),
+        "volume": float(notional.sum()),
+    }
+
+
+def iter_chunks(path: str | Path, pair: str, config: BacktestConfig):
+    """Куски тиков пары из каталога архива или из отдельного файла TICK_DTYPE."""
+    if Path(path).is_dir():
+        yield from MarketArchive(path).read(
+            pair, config.start_ms, config.end_ms, "ticks", config.chunk_size
+        )
+        return
+    ticks = open_ticks(path)
+    for start in range(0, len(ticks), config.chunk_size):
+        yield ticks[start : start + config.chunk_size]
+
+
+def run_backtest(
+    path: str | Path,
+    pair: str,
+    params: StrategyParams | None = None,
+    config: BacktestConfig | None = None,
+) -> dict[str, float | int]:
+    """Прогоняет записанные события пары через стратегию и возвращает итоги."""
+    config = config or BacktestConfig()
+    state = PairMarketState(pair=pair)
+    strategy = ScalpingStrategy(pair, params)
+    simulator = FillSimulator(config)
+    apply_trade = state.apply_trade
+    apply_book = state.apply_book
+    on_market_update = strategy.on_market_update
+
+    events = 0
+    started = time.perf_counter()
+    for chunk in iter_chunks(path, pair, config):
+        events += len(chunk["time"])
+        # tolist() переводит колонки куска в Python-объекты одним вызовом,
+        # что намного быстрее поэлементного доступа к numpy-массиву
+        for t, kind, price, qty, bid, bid_qty, ask, ask_qty in zip(
+            chunk["time"].tolist(),
+            chunk["kind"].tolist(),
+            chunk["price"].tolist(),
+            chunk["qty"].tolist(),
+            chunk["bid"].tolist(),
+            chunk["bid_qty"].tolist(),
+            chunk["ask"].tolist(),
+            chunk["ask_qty"].tolist(),
+        ):
+            if kind == KIND_BOOK:
+                apply_book(bid, bid_qty, ask, ask_qty, t)
+            else:
+                apply_trade(price, qty, t)
+            if simulator.pending is not None:
+                fill = simulator.execute(state)
+                if fill is not None:
+                    strategy.on_fill(*fill)
+            intent = on_market_update(state)
+            if intent is not None:
+                simulator.pending = intent
+
+    last_price = state.last_price or (state.best_bid + state.best_ask) / 2
+    result = compute_performance(simulator.fills(), config.fee_rate, last_price)
+    result["events"] = events
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _run_point(
+    args: tuple[str, str, dict, BacktestConfig],
+) -> dict[str, float | int | dict]:
+    path, pair, overrides, config = args
+    result = run_backtest(path, pair, StrategyParams(**overrides), config)
+    result["params"] = overrides
+    return result
+
+
+def parameter_grid(grid: dict[str, list]) -> list[dict]:
+    """Декартово произведение значений параметров."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def run_sweep(
+    path: str | Path,
+    pair: str,
+    grid: dict[str, list],
+    config: BacktestConfig | None = None,
+    processes: int | None = None,
+) -> list[dict]:
+    """
+    Прогоняет бэктест по всем точкам сетки параметров в пуле процессов.
+    Данные открываются в каждом процессе через memmap, поэтому данные
+    не копируются между процессами, а делят страничный кэш ОС.
+    Результаты отсортированы по убыванию PnL. Пустая сетка, параметр
+    без значений или неизвестный параметр — ValueError.
+    """
+    if not grid:
+        raise ValueError("Parameter grid is empty.")
+    names = {f.name for f in fields(StrategyParams)}
+    for name, values in grid.items():
+        if name not in names:
+            raise ValueError(f"Unknown strategy parameter: {name}")
+        if not values:
+            raise ValueError(f"No values for strategy parameter {name}.")
+    if processes is not None and processes < 1:
+        raise ValueError("processes must be at least 1.")
+    config = config or BacktestConfig()
+    points = parameter_grid(grid)
+    tasks = [(str(path), pair, point, config) for point in points]
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as pool:
+        results = list(pool.map(_run_point, tasks))
+    return sorted(results, key=lambda r: r["pnl"], reverse=True)
+
+
+def _parse_grid(items: list[str]) -> dict[str, list]:
+    """Разбирает аргументы вида name=1,2,3 с типами полей StrategyParams."""
+    types = {
+        f.name: type(getattr(StrategyParams(), f.name)) for f in fields(StrategyParams)
+    }
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in types:
+            raise SystemExit(f"Unknown strategy parameter: {name}")
+        try:
+            grid[name] = [types[name](v) for v in values.split(",")]
+        except ValueError:
+            raise SystemExit(
+                f"Invalid values for {name}: {values!r} "
+                f"(expected comma-separated {types[name].__name__} values)"
+            ) from None
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="Каталог архива или файл тиков (TICK_DTYPE)")
+    parser.add_argument("--pair", default="KASUSDT")
+    parser.add_argument("--grid", nargs="*", default=[], help="name=v1,v2,...")
+    parser.add_argument("--fee-rate", type=float, default=BacktestConfig().fee_rate)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    config = BacktestConfig(fee_rate=args.fee_rate)
+    if not args.grid:
+        result = run_backtest(args.path, args.pair, config=config)
+        for key, value in result.items():
+            print(f"{key:>14}: {value}")
+        return
+
+    started = time.perf_counter()
+    try:
+        results = run_sweep(
+            args.path, args.pair, _parse_grid(args.grid), config, args.processes
+        )
+    except ValueError as e:
+        raise SystemExit(str(e)) from None
+    print(f"{len(results)} runs in {time.perf_counter() - started:.1f}s")
+    for result in results[: args.top]:
+        print(
+            f"pnl={result['pnl']:.4f} dd={result['max_drawdown']:.4f} "
+            f"fills={result['fills']} {result['params']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
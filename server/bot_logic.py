@@ -1,13 +1,77 @@
 """
 Основной модуль, содержащий бизнес-логику торгового бота.
+
+Бот многопользовательский: рыночные данные, стакан, движок и цикл ведутся
+по символу один раз, а стратегии пользователей — компактные записи внутри
+символа. Тысяча пользователей на SOLUSDT стоит одной подписки и одного цикла.
+Пары из TRADING_PAIRS, которыми управляет API, принадлежат пользователю
+DEFAULT_USER; остальных пользователей подключает TenantManager (server.tenants).
 """
 
 import asyncio
 import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
-from shared.enums import BotStatus
+from shared.enums import BotStatus, ComputeMode
 from loguru import logger
 
+from managers.loguru_manager import LogThrottle
+from managers.metrics_manager import REGISTRY
+from managers.notification_manager import DEFAULT_USER
+from managers.order_manager import OrderRequest
+
+from .pair_engine import MarketEvent, PairEngine, PairMarketState
+from .strategy import OrderIntent, ScalpingStrategy, StrategyParams
+from .supervisor import ComputePool, LoopWatchdog, TaskSupervisor
+
+# Слушатель изменений статуса пары: listener(pair, status)
+StatusListener = Callable[[str, BotStatus], None]
+
+PAIR_ITERATION_TIME = REGISTRY.histogram(
+    "scalpex_pair_iteration_seconds",
+    "Time spent in one trading logic iteration of a pair",
+    ("pair",),
+)
+PAIR_EVENT_LATENCY = REGISTRY.histogram(
+    "scalpex_pair_event_latency_seconds",
+    "Delay from market event receipt to its processing by the pair loop",
+    ("pair",),
+)
+
+# Срочное оповещение о неудачных ордерах повторяется на каждую N-ю неудачу подряд
+ORDER_FAILURE_ALERT_EVERY = 10
+
+if TYPE_CHECKING:
+    from managers.archive_manager import MarketRecorder
+    from managers.notification_manager import NotificationManager
+    from managers.scalping_manager import ScalpingManager
+    from managers.order_manager import Order, OrderManager
+    from managers.orderbook_manager import OrderBookManager
+    from managers.reconciliation_manager import ReconciliationManager
+    from managers.redis_manager import RedisManager
+    from managers.websocket_manager import WebsocketManager
+
+
+def load_trading_pairs() -> list[str]:
+    """Загружает и парсит список торговых пар из переменной окружения TRADING_PAIRS."""
+    pairs_str = os.getenv("TRADING_PAIRS", "")
+    if not pairs_str:
+        return []
+    # Разделяем строку по запятой и убираем лишние пробелы у каждой пары
+    return [pair.strip().upper() for pair in pairs_str.split(",")]
+
+
+@dataclass(slots=True)
+class OrderBackoff:
+    """Серия неудачных ордеров стратегии и время, до которого новые не выставляются."""
+
+    failures: int = 0
+    # Время (monotonic), до которого намерения стратегии откладываются
+    retry_at: float = 0.0
+
 
 class TradingBot:
     """
@@ -15,13 +79,86 @@ class TradingBot:
     Он управляет своим состоянием и основными задачами.
     """
 
-    def __init__(self):
-        """Инициализирует экземпляр торгового бота."""
+    def __init__(
+        self,
+        market_feed: "WebsocketManager | None" = None,
+        order_books: "OrderBookManager | None" = None,
+        state_store: "RedisManager | None" = None,
+        orders: "OrderManager | None" = None,
+        strategy_params: StrategyParams | None = None,
+        recorder: "MarketRecorder | None" = None,
+        notifications: "NotificationManager | None" = None,
+        indicators: "ScalpingManager | None" = None,
+        reconciler: "ReconciliationManager | None" = None,
+        supervisor: TaskSupervisor | None = None,
+        watchdog: LoopWatchdog | None = None,
+        compute: ComputePool | None = None,
+    ):
+        """
+        Инициализирует экземпляр торгового бота.
+
+        :param market_feed: Источник рыночных данных. Если задан, при запуске пары
+            бот подписывается на ее потоки, а при остановке — отписывается.
+        :param order_books: Менеджер стаканов, который ведется для запущенных пар.
+        :param state_store: Хранилище состояния пар в Redis (запись в режиме write-behind).
+        :param orders: Менеджер ордеров. Без него бот работает в режиме наблюдения:
+            стратегия считает сигналы, но ордера не выставляются.
+        :param strategy_params: Параметры стратегии, общие для всех пар.
+        :param recorder: Архив рыночных данных, в который пишутся данные запущенных пар.
+        :param notifications: Менеджер уведомлений для срочных оповещений об ошибках.
+        :param indicators: Индикаторы, которые ведутся для запущенных пар по каждому
+            рыночному событию (до схлопывания событий в движке пары).
+        :param reconciler: Сверка ордеров с биржей. Цикл пары начинает торговлю
+            только после восстановления реестра ордеров при старте процесса.
+        :param supervisor: Надзор за циклами пар (перезапуск после падения).
+            По умолчанию настраивается из переменных окружения PAIR_RESTART_*.
+        :param watchdog: Учет итераций циклов пар, блокирующих event loop.
+        :param compute: Пул для тяжелых вычислений пар (см. `offload`).
+            По умолчанию вычисления выполняются в цикле пары.
+        """
         self._is_running: bool = False
-        self.trading_pairs: list[str] = self._load_trading_pairs()
-        # Словарь для хранения задач для каждой торговой пары
-        # {"KASUSDT": <Task>, "SOLUSDT": <Task>}
-        self._pair_tasks: dict[str, asyncio.Task] = {}
+        self._market_feed = market_feed
+        self.order_books = order_books
+        self._recorder = recorder
+        self._notifications = notifications
+        self.indicators = indicators
+        self._reconciler = reconciler
+        self._state_store = state_store
+        self._orders = orders
+        self.strategy_params = strategy_params or StrategyParams()
+        self.trading_pairs: list[str] = load_trading_pairs()
+        # Циклы запущенных пар исполняются как задачи под надзором
+        self.supervisor = supervisor or TaskSupervisor()
+        self.supervisor.add_listener(self._on_supervisor_status)
+        self.watchdog = watchdog or LoopWatchdog()
+        self.compute = compute or ComputePool()
+        # Событийные движки запущенных пар, в которые поступают рыночные данные
+        # {"KASUSDT": <PairEngine>, "SOLUSDT": <PairEngine>}
+        self._pair_engines: dict[str, PairEngine] = {}
+        self._engine_queue_size: int = int(os.getenv("PAIR_QUEUE_SIZE", "1024"))
+        # Глубина прогрева индикаторов по архиву при запуске пары (0 — без прогрева)
+        self._warm_up_seconds: float = float(
+            os.getenv("INDICATOR_WARMUP_SECONDS", "600")
+        )
+        self._warm_ups: dict[str, asyncio.Task] = {}
+        # Выставляемые ордера пар: отменяются при остановке пары
+        self._intent_tasks: dict[str, set[asyncio.Task]] = {}
+        # После неудачного ордера стратегия выставляет следующий не раньше чем
+        # через экспоненциальную задержку (иначе биржа получит запрос на каждом тике)
+        self._order_retry_min: float = float(os.getenv("ORDER_RETRY_MIN_DELAY", "1"))
+        self._order_retry_max: float = float(os.getenv("ORDER_RETRY_MAX_DELAY", "60"))
+        # {("SOLUSDT", "alice"): <OrderBackoff>} — только стратегии с неудачами подряд
+        self._order_backoffs: dict[tuple[str, str], OrderBackoff] = {}
+        # Стратегии пользователей по символам: движок символа запущен, пока
+        # на нем есть хотя бы одна стратегия
+        # {"SOLUSDT": {"default": <ScalpingStrategy>, "alice": <ScalpingStrategy>}}
+        self._strategies: dict[str, dict[str, ScalpingStrategy]] = {}
+        self._status_listeners: list[StatusListener] = []
+        # Сигналы режима наблюдения приходят на каждом тике
+        self._dry_run_log = LogThrottle()
+        if orders is not None:
+            orders.add_fill_listener(self._on_fill)
+            orders.register_owner(DEFAULT_USER)
 
         logger.info("TradingBot instance created.")
         if self.trading_pairs:
@@ -29,58 +166,449 @@ class TradingBot:
         else:
             logger.warning("No trading pairs configured.")
 
-    def _load_trading_pairs(self) -> list[str]:
-        """Загружает и парсит список торговых пар из переменной окружения TRADING_PAIRS."""
-        pairs_str = os.getenv("TRADING_PAIRS", "")
-        if not pairs_str:
-            return []
-        # Разделяем строку по запятой и убираем лишние пробелы у каждой пары
-        return [pair.strip().upper() for pair in pairs_str.split(",")]
-
     def start_for_pair(self, pair: str):
         """Запускает логику для указанной торговой пары."""
         if pair not in self.trading_pairs:
             logger.error(f"Attempted to start an unconfigured pair: {pair}")
             raise ValueError(f"Pair {pair} is not configured.")
 
-        if pair in self._pair_tasks and not self._pair_tasks[pair].done():
+        if self.supervisor.is_active(pair) and self.has_strategy(pair, DEFAULT_USER):
             logger.info(f"Bot is already running for {pair}. No action taken.")
             return
 
-        # Создаем и запускаем задачу для конкретной пары
-        task = asyncio.create_task(self._run_logic_for_pair(pair))
-        self._pair_tasks[pair] = task
+        self.set_strategy(pair, DEFAULT_USER, self.strategy_params)
+        self._store_pair_state(pair, status=BotStatus.RUNNING.value, error="")
+        self._notify_status(pair, BotStatus.RUNNING)
         logger.success(f"Bot has been started for {pair}.")
 
     def stop_for_pair(self, pair: str):
         """Останавливает логику для указанной торговой пары."""
-        if pair not in self._pair_tasks:
+        if not self.remove_strategy(pair, DEFAULT_USER):
             logger.warning(f"Attempted to stop a bot that is not running for {pair}.")
             return
 
-        task = self._pair_tasks.pop(pair)
-        if not task.done():
-            task.cancel()
+        self._store_pair_state(pair, status=BotStatus.STOPPED.value, error="")
+        self._notify_status(pair, BotStatus.STOPPED)
         logger.success(f"Bot has been stopped for {pair}.")
 
-    async def _run_logic_for_pair(self, pair: str):
-        """Основной асинхронный цикл работы для одной пары."""
-        logger.info(f"Starting logic loop for {pair}...")
+    @property
+    def live_trading(self) -> bool:
+        """Выставляет ли бот ордера (иначе сигналы только логируются)."""
+        return self._orders is not None
+
+    def has_strategy(self, pair: str, user_id: str) -> bool:
+        """True, если у пользователя есть стратегия на символе."""
+        return user_id in self._strategies.get(pair, ())
+
+    def set_strategy(self, pair: str, user_id: str, params: StrategyParams):
+        """
+        Добавляет стратегию пользователя на символ или обновляет ее параметры.
+        Обновление не перезапускает цикл символа и не сбрасывает позицию.
+        """
+        if user_id != DEFAULT_USER and self.live_trading:
+            # Все ордера идут через один ключ API: пользователи торговали бы
+            # на счете оператора
+            raise RuntimeError(
+                f"Strategies of user {user_id} require separate exchange "
+                f"credentials, which live trading does not support."
+            )
+        self._ensure_pair(pair)
+        strategies = self._strategies.setdefault(pair, {})
+        strategy = strategies.get(user_id)
+        if strategy is None:
+            strategies[user_id] = ScalpingStrategy(pair, params)
+        elif strategy.params is not params:
+            strategy.update_params(params)
+
+    def remove_strategy(self, pair: str, user_id: str) -> bool:
+        """
+        Убирает стратегию пользователя с символа; последняя стратегия
+        останавливает движок символа. Возвращает False, если стратегии не было.
+        """
+        strategies = self._strategies.get(pair)
+        if strategies is None or strategies.pop(user_id, None) is None:
+            return False
+        self._order_backoffs.pop((pair, user_id), None)
+        if not strategies:
+            del self._strategies[pair]
+            self.supervisor.stop(pair)
+            self._detach_pair(pair)
+        return True
+
+    def _ensure_pair(self, pair: str):
+        """Запускает движок, цикл и подписки символа, если они еще не работают."""
+        if self.supervisor.is_active(pair):
+            return
+        if pair in self._pair_engines:
+            # Символ, остановленный надзором: движок и подписки создаются заново,
+            # стратегии пользователей (и их позиции) сохраняются
+            self._detach_pair(pair)
+
+        # Создаем движок и запускаем цикл символа под надзором
+        engine = PairEngine(pair, max_queue_size=self._engine_queue_size)
+        self._pair_engines[pair] = engine
+        self.supervisor.start(pair, lambda: self._run_logic_for_pair(pair, engine))
+        if self._reconciler is not None:
+            self._reconciler.watch(pair)
+        if self._market_feed is not None:
+            self._market_feed.subscribe(pair, self.publish_market_event)
+            if self.order_books is not None:
+                self._market_feed.subscribe(pair, self.order_books.on_market_event)
+            if self._recorder is not None:
+                self._market_feed.subscribe(pair, self._recorder.on_market_event)
+            if self.indicators is not None:
+                self.indicators.add_pair(pair)
+                self._market_feed.subscribe(pair, self.indicators.on_market_event)
+                if self._recorder is not None and self._warm_up_seconds > 0:
+                    self._start_warm_up(pair)
+
+    def _detach_pair(self, pair: str):
+        """Отписывает символ от рыночных данных и освобождает его движок."""
+        self._pair_engines.pop(pair, None)
+        if self._reconciler is not None:
+            self._reconciler.unwatch(pair)
+        if self._market_feed is not None:
+            self._market_feed.unsubscribe(pair, self.publish_market_event)
+            if self.order_books is not None:
+                self._market_feed.unsubscribe(pair, self.order_books.on_market_event)
+                self.order_books.remove(pair)
+            if self._recorder is not None:
+                self._market_feed.unsubscribe(pair, self._recorder.on_market_event)
+            if self.indicators is not None:
+                self._market_feed.unsubscribe(pair, self.indicators.on_market_event)
+                self.indicators.remove_pair(pair)
+        warm_up = self._warm_ups.pop(pair, None)
+        if warm_up is not None:
+            warm_up.cancel()
+        for task in self._intent_tasks.pop(pair, ()):
+            task.cancel()
+        # Гистограммы остановленной пары не экспортируются и не держат память
+        PAIR_ITERATION_TIME.remove(pair)
+        PAIR_EVENT_LATENCY.remove(pair)
+        self.watchdog.forget(pair)
+
+    def _start_warm_up(self, pair: str):
+        """
+        Прогревает индикаторы пары по архиву в пуле вычислений
+        (без пула — в отдельном потоке).
+        """
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - int(self._warm_up_seconds * 1000)
+        self.indicators.begin_warm_up(pair)
+        task = asyncio.create_task(self._warm_up(pair, start_ms, end_ms))
+        self._warm_ups[pair] = task
+
+    async def _warm_up(self, pair: str, start_ms: int, end_ms: int):
+        # Импорт здесь: модуль индикаторов тянет numpy
+        from managers.scalping_manager import warm_up_indicators
+
+        args = (self._recorder.root, pair, start_ms, end_ms, self.indicators.params)
         try:
-            while True:
-                logger.debug(f"Processing logic for pair {pair}...")
-                await asyncio.sleep(5)  # Имитация асинхронной работы
-        except asyncio.CancelledError:
-            logger.info(f"Logic loop for {pair} was cancelled.")
-        finally:
-            logger.info(f"Main logic loop for {pair} has finished.")
+            if self.compute.mode is ComputeMode.INLINE:
+                # Без пула прогрев по архиву занял бы event loop всех пар
+                warmed = await asyncio.to_thread(warm_up_indicators, *args)
+            else:
+                warmed = await self.offload(warm_up_indicators, *args)
+        except Exception as e:
+            logger.warning(f"Indicator warm-up of {pair} failed: {e!r}")
+            warmed = None
+        if self._warm_ups.get(pair) is not asyncio.current_task():
+            # Пара остановлена или перезапущена за время прогрева
+            return
+        del self._warm_ups[pair]
+        if warmed is None:
+            self.indicators.cancel_warm_up(pair)
+        elif self.indicators.finish_warm_up(pair, warmed):
+            logger.info(f"Indicators of {pair} warmed up from the archive.")
+
+    def add_status_listener(self, listener: StatusListener):
+        """Регистрирует слушателя изменений статуса пар."""
+        self._status_listeners.append(listener)
+
+    def _notify_status(self, pair: str, status: BotStatus):
+        """Сообщает слушателям о новом статусе пары."""
+        for listener in self._status_listeners:
+            listener(pair, status)
+
+    def _on_supervisor_status(self, pair: str, status: BotStatus, error: str | None):
+        """Слушатель надзора: падения, перезапуски и отказы циклов пар."""
+        if status is BotStatus.RESTARTING and self._notifications is not None:
+            self._notifications.alert(
+                f"{pair}: trading loop crashed, restarting: {error}", pair=pair
+            )
+        elif status is BotStatus.FAILED and self._notifications is not None:
+            self._notifications.alert(
+                f"{pair}: trading loop stopped by supervisor: {error}", pair=pair
+            )
+        self._store_pair_state(pair, status=status.value, error=error or "")
+        self._notify_status(pair, status)
+
+    def publish_market_event(self, pair: str, event: MarketEvent):
+        """
+        Передает рыночное событие в движок пары. Не блокирует вызывающего.
+        События для незапущенных пар молча игнорируются.
+        """
+        engine = self._pair_engines.get(pair)
+        if engine is not None:
+            engine.push(event)
+
+    async def _run_logic_for_pair(self, pair: str, engine: PairEngine):
+        """
+        Основной асинхронный цикл работы для одной пары.
+        Цикл просыпается только при поступлении новых рыночных данных.
+        """
+        # Все записи лога цикла пары (и порожденных им задач) получают поле pair
+        with logger.contextualize(pair=pair):
+            logger.info(f"Starting logic loop for {pair}...")
+            iteration_time = PAIR_ITERATION_TIME.labels(pair)
+            event_latency = PAIR_EVENT_LATENCY.labels(pair)
+            check_block = self.watchdog.check
+            perf_counter = time.perf_counter
+            try:
+                if self._reconciler is not None and not self._reconciler.is_ready:
+                    # Пока реестр ордеров не восстановлен, стратегия не знает о
+                    # выставленных до рестарта ордерах; события копятся в движке
+                    logger.info(
+                        f"Waiting for order state rebuild before trading {pair}."
+                    )
+                    await self._reconciler.wait_ready()
+                while True:
+                    state = await engine.wait_for_update()
+                    started = perf_counter()
+                    event_latency.observe(engine.last_latency)
+                    self._process_market_update(pair, state)
+                    elapsed = perf_counter() - started
+                    iteration_time.observe(elapsed)
+                    if check_block(pair, elapsed):
+                        self.supervisor.fail(
+                            pair,
+                            f"blocked the event loop for {elapsed * 1000:.0f} ms "
+                            f"{self.watchdog.block_limit} times in a row",
+                        )
+            except asyncio.CancelledError:
+                logger.info(f"Logic loop for {pair} was cancelled.")
+                raise
+            finally:
+                logger.info(f"Main logic loop for {pair} has finished.")
+
+    def _process_market_update(self, pair: str, state: PairMarketState):
+        """
+        Торговая логика пары, вызываемая на каждое обновление состояния рынка.
+
+        Упавшая стратегия пользователя отключается, не мешая остальным. Ошибка
+        стратегии пары API (DEFAULT_USER) пробрасывается: цикл символа падает и
+        перезапускается надзором с задержкой, а после PAIR_MAX_FAILURES падений
+        подряд пара помечается как Failed с причиной.
+        """
+        if self._state_store is not None and state.last_price:
+            self._state_store.write_behind(
+                f"pair_state:{pair}", "last_price", state.last_price
+            )
+        strategies = self._strategies.get(pair)
+        if not strategies:
+            return
+        failed = None
+        for user_id, strategy in strategies.items():
+            try:
+                intent = strategy.on_market_update(state)
+            except Exception as e:
+                # Ошибка стратегии одного пользователя не должна останавливать символ
+                # для остальных: ее стратегия отключается после обхода
+                failed = failed or []
+                failed.append((user_id, e))
+                continue
+            if intent is None:
+                continue
+            if self._orders is None:
+                if self._dry_run_log.allow():
+                    logger.debug(
+                        "{}: {} {} {} (dry run, +{} skipped)",
+                        user_id,
+                        pair,
+                        intent.side,
+                        intent.quantity,
+                        self._dry_run_log.skipped,
+                    )
+                strategy.on_order_failed()
+                continue
+            backoff = self._order_backoffs.get((pair, user_id))
+            if backoff is not None and time.monotonic() < backoff.retry_at:
+                # Предыдущий ордер не прошел: намерение откладывается до retry_at
+                strategy.on_order_failed()
+                continue
+            task = asyncio.create_task(
+                self._execute_intent(pair, user_id, strategy, intent)
+            )
+            tasks = self._intent_tasks.setdefault(pair, set())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if failed:
+            default_error = None
+            for user_id, error in failed:
+                if user_id == DEFAULT_USER:
+                    default_error = error
+                else:
+                    self._disable_strategy(pair, user_id, error)
+            if default_error is not None:
+                raise default_error
+
+    def _disable_strategy(self, pair: str, user_id: str, error: Exception):
+        """Отключает стратегию пользователя, упавшую при обработке рынка."""
+        logger.opt(exception=error).error(
+            f"Strategy of {user_id} on {pair} failed and was disabled: {error!r}"
+        )
+        self.remove_strategy(pair, user_id)
+        if self._notifications is not None:
+            self._notifications.alert(
+                f"{pair}: strategy disabled after error: {error!r}",
+                user_id=user_id,
+                pair=pair,
+            )
+
+    async def _execute_intent(
+        self, pair: str, user_id: str, strategy: ScalpingStrategy, intent: OrderIntent
+    ):
+        """Выставляет рыночный ордер по намерению стратегии пользователя."""
+        try:
+            order = await self._orders.place_order(
+                OrderRequest(
+                    pair, intent.side, "MARKET", intent.quantity, user_id=user_id
+                )
+            )
+        except Exception as e:
+            self._on_order_failed(
+                pair, user_id, strategy, f"failed to place {intent.side} order: {e!r}"
+            )
+            return
+        if order.status.is_terminal and order.filled_qty < order.quantity:
+            self._on_order_failed(
+                pair,
+                user_id,
+                strategy,
+                f"{intent.side} order {order.status.value.lower()} with "
+                f"{order.filled_qty:g} of {order.quantity:g} filled",
+            )
+        else:
+            self._order_backoffs.pop((pair, user_id), None)
+
+    def _on_order_failed(
+        self, pair: str, user_id: str, strategy: ScalpingStrategy, reason: str
+    ):
+        """
+        Откладывает следующий ордер стратегии с экспоненциальной задержкой.
+        Срочное оповещение уходит на первую неудачу серии и далее на каждую
+        ORDER_FAILURE_ALERT_EVERY-ю, а не на каждый повтор.
+        """
+        strategy.on_order_failed()
+        if not self.has_strategy(pair, user_id):
+            return
+        backoff = self._order_backoffs.setdefault((pair, user_id), OrderBackoff())
+        backoff.failures += 1
+        delay = min(
+            self._order_retry_min * 2 ** (backoff.failures - 1), self._order_retry_max
+        )
+        backoff.retry_at = time.monotonic() + delay
+        logger.error(
+            f"{pair} ({user_id}): {reason}. Next order in {delay:g} s "
+            f"({backoff.failures} failures in a row)."
+        )
+        if self._notifications is not None and (
+            backoff.failures == 1 or backoff.failures % ORDER_FAILURE_ALERT_EVERY == 0
+        ):
+            self._notifications.alert(
+                f"{pair}: {reason} ({backoff.failures} failures in a row)",
+                user_id=user_id,
+                pair=pair,
+            )
+
+    async def close(self):
+        """
+        Останавливает циклы пар, выставляемые ордера, прогрев индикаторов
+        и пул вычислений.
+        """
+        for task in self._warm_ups.values():
+            task.cancel()
+        self._warm_ups.clear()
+        for tasks in self._intent_tasks.values():
+            for task in tasks:
+                task.cancel()
+        self._intent_tasks.clear()
+        await self.supervisor.close()
+        self.compute.close()
+
+    async def offload(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет тяжелое вычисление пары (пересчет индикаторов по истории,
+        прогон сетки параметров) в пуле вычислений, не блокируя циклы других пар.
+        """
+        return await self.compute.run(func, *args)
+
+    def _on_fill(self, order: "Order", fill: dict):
+        """Слушатель исполнений OrderManager: передает их стратегии владельца ордера."""
+        user_id = order.user_id
+        if user_id is None:
+            if order.owner_tag is not None:
+                # Владелец восстановленного сверкой ордера не зарегистрирован:
+                # исполнение не должно менять позицию чужой стратегии
+                logger.warning(
+                    f"Fill of order {order.client_order_id} on {order.symbol} "
+                    f"has unknown owner, ignored by strategies."
+                )
+                return
+            # Ордера без метки владельца выставлялись пользователем по умолчанию
+            user_id = DEFAULT_USER
+        strategy = self._strategies.get(order.symbol, {}).get(user_id)
+        if strategy is not None:
+            strategy.on_fill(order.side, fill["qty"], fill["price"])
+
+    def _store_pair_state(self, pair: str, **fields):
+        """Записывает поля состояния пары в Redis в режиме write-behind."""
+        if self._state_store is None:
+            return
+        key = f"pair_state:{pair}"
+        for field, value in fields.items():
+            self._state_store.write_behind(key, field, value)
+
+    def get_engine_stats(self) -> dict[str, dict[str, float | int]]:
+        """Возвращает метрики событийных движков (задержка, очередь) по запущенным парам."""
+        return {pair: engine.get_stats() for pair, engine in self._pair_engines.items()}
+
+    def get_strategy_counts(self) -> dict[str, int]:
+        """Число стратегий пользователей по запущенным символам."""
+        return {pair: len(strategies) for pair, strategies in self._strategies.items()}
+
+    def get_indicators(self) -> dict[str, dict[str, float]]:
+        """Текущие значения индикаторов по запущенным парам."""
+        return self.indicators.get_stats() if self.indicators is not None else {}
+
+    def get_prices(self, pairs: set[str]) -> dict[str, float]:
+        """Последние цены запущенных пар из указанных (для отображения клиентам)."""
+        prices = {}
+        for pair in pairs:
+            engine = self._pair_engines.get(pair)
+            if engine is not None and engine.state.last_price:
+                prices[pair] = engine.state.last_price
+        return prices
+
+    def get_supervisor_stats(self) -> dict[str, Any]:
+        """Перезапуски, ошибки и блокировки event loop по парам, состояние пула вычислений."""
+        pairs = self.supervisor.get_stats()
+        for pair, blocks in self.watchdog.get_stats().items():
+            if pair in pairs:
+                pairs[pair].update(blocks)
+        return {"pairs": pairs, "compute": self.compute.get_stats()}
 
     def get_status(self) -> dict[str, str]:
-        """Возвращает статус работы ('Running' или 'Stopped') по всем настроенным парам."""
+        """
+        Возвращает статус работы по всем настроенным парам: 'Running', 'Stopped',
+        'Restarting' (цикл упал и ждет перезапуска) или 'Failed'.
+        """
         status = {}
         for pair in self.trading_pairs:
-            task = self._pair_tasks.get(pair)
+            # Символ может работать ради других пользователей, а пара API остановлена
             status[pair] = (
-                BotStatus.RUNNING if task and not task.done() else BotStatus.STOPPED
+                self.supervisor.status(pair)
+                if self.has_strategy(pair, DEFAULT_USER)
+                else BotStatus.STOPPED
             )
         return status
@@ -0,0 +1,172 @@
+"""
+Модуль событийного движка для одной торговой пары.
+
+Каждая пара получает собственную ограниченную очередь рыночных событий
+(сделки и обновления стакана). Цикл пары не просыпается по таймеру, а ждет
+новых данных. Если цикл отстает от рынка, накопившаяся пачка событий
+схлопывается в одно, самое свежее, состояние рынка.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from shared.enums import MarketEventType
+
+
+@dataclass(slots=True)
+class MarketEvent:
+    """Одно рыночное событие, полученное из потока данных биржи."""
+
+    type: MarketEventType
+    data: dict[str, Any]
+    # Момент получения события (time.perf_counter()), нужен для замера задержки цикла
+    received_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass(slots=True)
+class PairMarketState:
+    """Последнее известное состояние рынка по паре (результат слияния событий)."""
+
+    pair: str
+    last_price: float = 0.0
+    last_qty: float = 0.0
+    best_bid: float = 0.0
+    best_bid_qty: float = 0.0
+    best_ask: float = 0.0
+    best_ask_qty: float = 0.0
+    # Время биржи (мс) последнего примененного события
+    exchange_time: int = 0
+    # Количество событий, примененных к состоянию с момента запуска
+    updates: int = 0
+
+    def apply(self, event: MarketEvent):
+        """Применяет событие к состоянию, перезаписывая устаревшие поля."""
+        data = event.data
+        time_ms = data.get("time", self.exchange_time)
+        if event.type is MarketEventType.TICK:
+            self.apply_trade(data["price"], data.get("qty", 0.0), time_ms)
+        elif event.type is MarketEventType.BOOK:
+            self.apply_book(
+                data["bid"],
+                data.get("bid_qty", 0.0),
+                data["ask"],
+                data.get("ask_qty", 0.0),
+                time_ms,
+            )
+        else:
+            self.exchange_time = time_ms
+            self.updates += 1
+
+    def apply_trade(self, price: float, qty: float, time_ms: int):
+        """Применяет сделку (используется и бэктестом, без создания MarketEvent)."""
+        self.last_price = price
+        self.last_qty = qty
+        self.exchange_time = time_ms
+        self.updates += 1
+
+    def apply_book(
+        self, bid: float, bid_qty: float, ask: float, ask_qty: float, time_ms: int
+    ):
+        """Применяет обновление лучших цен стакана."""
+        self.best_bid = bid
+        self.best_bid_qty = bid_qty
+        self.best_ask = ask
+        self.best_ask_qty = ask_qty
+        self.exchange_time = time_ms
+        self.updates += 1
+
+
+class PairEngine:
+    """
+    Событийный движок одной торговой пары.
+
+    Производитель (WebSocket-менеджер) кладет события через `push`, не блокируясь.
+    Потребитель (цикл пары в TradingBot) ждет их через `wait_for_update`.
+    """
+
+    # Коэффициент сглаживания для средней задержки цикла (EWMA)
+    _LATENCY_ALPHA = 0.1
+
+    def __init__(self, pair: str, max_queue_size: int = 1024):
+        """
+        :param pair: Символ торговой пары.
+        :param max_queue_size: Максимальная длина очереди событий. При переполнении
+            отбрасываются самые старые события, так как они все равно будут
+            перекрыты более свежими при слиянии.
+        """
+        self.pair = pair
+        self.state = PairMarketState(pair=pair)
+        self._queue: asyncio.Queue[MarketEvent] = asyncio.Queue(maxsize=max_queue_size)
+
+        # --- Метрики движка ---
+        self.processed_events: int = 0
+        self.coalesced_events: int = 0
+        self.dropped_events: int = 0
+        self.iterations: int = 0
+        self.last_latency: float = 0.0
+        self.avg_latency: float = 0.0
+        self.max_latency: float = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Текущее количество необработанных событий в очереди."""
+        return self._queue.qsize()
+
+    def push(self, event: MarketEvent):
+        """
+        Неблокирующе добавляет событие в очередь пары.
+        При переполнении очереди самое старое событие отбрасывается.
+        """
+        queue = self._queue
+        if queue.full():
+            queue.get_nowait()
+            self.dropped_events += 1
+        queue.put_nowait(event)
+
+    async def wait_for_update(self) -> PairMarketState:
+        """
+        Ждет хотя бы одно новое событие, затем забирает все накопившиеся события
+        и сливает их в состояние пары. Возвращает обновленное состояние.
+        """
+        queue = self._queue
+        event = await queue.get()
+        oldest_received_at = event.received_at
+        state = self.state
+        state.apply(event)
+        batch_size = 1
+
+        # Отстали от рынка: схлопываем всю пачку в последнее состояние
+        while not queue.empty():
+            state.apply(queue.get_nowait())
+            batch_size += 1
+
+        self.processed_events += batch_size
+        self.coalesced_events += batch_size - 1
+        self.iterations += 1
+        self._record_latency(time.perf_counter() - oldest_received_at)
+        return state
+
+    def _record_latency(self, latency: float):
+        """Обновляет метрики задержки между получением события и его обработкой."""
+        self.last_latency = latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        if self.iterations == 1:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self._LATENCY_ALPHA * (latency - self.avg_latency)
+
+    def get_stats(self) -> dict[str, float | int]:
+        """Возвращает метрики движка: задержку цикла (мс) и глубину очереди."""
+        return {
+            "queue_depth": self.queue_depth,
+            "iterations": self.iterations,
+            "processed_events": self.processed_events,
+            "coalesced_events": self.coalesced_events,
+            "dropped_events": self.dropped_events,
+            "last_latency_ms": round(self.last_latency * 1000, 3),
+            "avg_latency_ms": round(self.avg_latency * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+        }
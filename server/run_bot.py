@@ -1,18 +1,40 @@
 """
 Основной файл для запуска веб-сервера (API) на FastAPI.
+
+Сервер начинает принимать соединения сразу: тяжелые модули (клиенты биржи,
+Redis, PostgreSQL, numpy) импортируются и инициализируются в фоновой задаче
+после старта. Пока она не завершилась, /health/ready и /api/* отвечают 503,
+а /health/live — 200, поэтому балансировщик направляет трафик только
+в готовые процессы, а оркестратор не перезапускает стартующие. Если
+инициализация завершилась ошибкой, /health/live отвечает 503: процесс
+с наполовину запущенными менеджерами не чинится сам, его перезапускают.
 """
 
+import asyncio
+import inspect
+import os
+import time
 from contextlib import asynccontextmanager
 
 # Стандартные и сторонние импорты
-import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 from loguru import logger
 
-# Импорты из нашего приложения
-from .bot_logic import TradingBot
+# Импорты из нашего приложения. Менеджеры импортируются лениво в _initialize.
+from .status_stream import StatusBroadcaster, StatusSubscriber, parse_watch_message
 from managers.loguru_manager import setup_logger
+from managers.metrics_manager import REGISTRY, LoopMonitor
+
+HTTP_REQUEST_TIME = REGISTRY.histogram(
+    "scalpex_http_request_seconds",
+    "API request handling time",
+    ("method", "route", "status"),
+)
+STARTUP_TIME = REGISTRY.gauge(
+    "scalpex_startup_seconds", "Time from process start to readiness"
+)
 
 
 @asynccontextmanager
@@ -21,15 +43,188 @@ async def lifespan(app: FastAPI):
     Управляет жизненным циклом приложения FastAPI.
     Код перед `yield` выполняется при старте, код после `yield` - при остановке.
     """
-    # --- Код при старте ---
+    # --- Код при старте: только то, что нужно для ответа на health-запросы ---
     setup_logger("server")
     load_dotenv()
-    logger.info("Initializing TradingBot...")
-    app.state.bot = TradingBot()
-    logger.info("Server startup complete.")
+    app.state.loop_monitor = LoopMonitor()
+    app.state.loop_monitor.start()
+    # embedded — пары исполняются в процессе API; sharded — в воркерах (server.run_worker)
+    app.state.mode = os.getenv("BOT_MODE", "embedded").lower()
+    app.state.status_stream = StatusBroadcaster()
+    app.state.ready = asyncio.Event()
+    app.state.init_error = None
+    for name in (
+        "bot",
+        "exchange",
+        "order_books",
+        "market_feed",
+        "orders",
+        "db",
+        "redis",
+        "recorder",
+        "telegram",
+        "notifications",
+        "reconciler",
+        "tenants",
+    ):
+        setattr(app.state, name, None)
+    init_task = asyncio.create_task(_initialize(app))
     yield
     # --- Код при остановке ---
     logger.info("Server shutting down.")
+    if not init_task.done():
+        init_task.cancel()
+        try:
+            await init_task
+        except asyncio.CancelledError:
+            pass
+    await app.state.status_stream.stop()
+    if app.state.tenants is not None:
+        await app.state.tenants.stop()
+    if app.state.reconciler is not None:
+        await app.state.reconciler.stop()
+    # Циклы пар останавливаются до менеджеров, которыми они пользуются
+    if app.state.bot is not None:
+        await app.state.bot.close()
+    if app.state.mode != "sharded":
+        if app.state.orders is not None:
+            await app.state.orders.stop_user_stream()
+        if app.state.market_feed is not None:
+            await app.state.market_feed.stop()
+    if app.state.notifications is not None:
+        await app.state.notifications.stop()
+    if app.state.telegram is not None:
+        await app.state.telegram.close()
+    if app.state.exchange is not None:
+        await app.state.exchange.close()
+    if app.state.recorder is not None:
+        await app.state.recorder.close()
+    if app.state.redis is not None:
+        await app.state.redis.close()
+    if app.state.db is not None:
+        await app.state.db.close()
+    await app.state.loop_monitor.stop()
+
+
+async def _initialize(app: FastAPI):
+    """Фоновая инициализация менеджеров и бота; по завершении процесс готов."""
+    started = time.perf_counter()
+    try:
+        from managers.notification_manager import NotificationManager
+        from managers.telegram_manager import TelegramClient
+
+        # В режиме sharded в Telegram пишут воркеры, API уведомляет только клиентов GUI
+        if os.getenv("TELEGRAM_BOT_TOKEN") and app.state.mode != "sharded":
+            app.state.telegram = TelegramClient()
+        app.state.notifications = NotificationManager(
+            telegram=app.state.telegram, gui=app.state.status_stream
+        )
+        app.state.notifications.start()
+        if app.state.mode == "sharded":
+            await _start_sharded(app)
+        else:
+            await _start_embedded(app)
+        app.state.status_stream.reset(await _maybe_await(app.state.bot.get_status()))
+        app.state.bot.add_status_listener(app.state.status_stream.publish)
+        app.state.status_stream.start_prices(app.state.bot.get_prices)
+        if app.state.telegram is not None:
+            app.state.bot.add_status_listener(app.state.notifications.on_status)
+    except Exception as e:
+        app.state.init_error = repr(e)
+        logger.exception("Server initialization failed.")
+        return
+    app.state.ready.set()
+    STARTUP_TIME.set(time.perf_counter() - started)
+    logger.info(
+        f"Server startup complete ({app.state.mode} mode) "
+        f"in {time.perf_counter() - started:.2f}s."
+    )
+
+
+async def _start_sharded(app: FastAPI):
+    """API без торговой логики: пары исполняют воркеры, координация через Redis."""
+    from managers.redis_manager import RedisManager
+    from .sharding import ShardedBotClient
+
+    logger.info("Initializing sharded bot client...")
+    app.state.redis = RedisManager()
+    await app.state.redis.start()
+    app.state.bot = ShardedBotClient(app.state.redis)
+    await app.state.bot.start()
+
+
+async def _start_embedded(app: FastAPI):
+    """Все пары исполняются в event loop процесса API."""
+    from managers.exchange_manager import ExchangeClient
+    from managers.order_manager import OrderManager
+    from managers.orderbook_manager import OrderBookManager
+    from managers.scalping_manager import ScalpingManager
+    from managers.websocket_manager import WebsocketManager
+    from .bot_logic import TradingBot
+
+    logger.info("Initializing exchange client and market data feed...")
+    app.state.exchange = ExchangeClient()
+    app.state.order_books = OrderBookManager(
+        snapshot_loader=app.state.exchange.get_depth
+    )
+    app.state.market_feed = WebsocketManager()
+    await app.state.market_feed.start()
+    app.state.orders = OrderManager(app.state.exchange)
+    if os.getenv("BINANCE_API_KEY"):
+        app.state.orders.start_user_stream(app.state.market_feed)
+    if os.getenv("DB_URL"):
+        from managers.database_manager import DatabaseManager
+
+        app.state.db = DatabaseManager()
+        await app.state.db.start()
+        await app.state.db.init_schema()
+        app.state.orders.add_fill_listener(app.state.db.on_fill)
+    app.state.orders.add_fill_listener(app.state.notifications.on_fill)
+    if os.getenv("REDIS_URL"):
+        from managers.redis_manager import RedisManager
+
+        app.state.redis = RedisManager()
+        await app.state.redis.start()
+    if os.getenv("MARKET_ARCHIVE_DIR"):
+        # numpy нужен только архиву: не импортируем его без необходимости
+        from managers.archive_manager import MarketRecorder
+
+        app.state.recorder = MarketRecorder()
+        app.state.recorder.start()
+    live_trading = os.getenv("LIVE_TRADING") == "1"
+    if live_trading:
+        from managers.reconciliation_manager import ReconciliationManager
+
+        app.state.reconciler = ReconciliationManager(
+            app.state.orders, app.state.exchange
+        )
+    logger.info("Initializing TradingBot...")
+    app.state.bot = TradingBot(
+        market_feed=app.state.market_feed,
+        order_books=app.state.order_books,
+        state_store=app.state.redis,
+        orders=app.state.orders if live_trading else None,
+        recorder=app.state.recorder,
+        notifications=app.state.notifications,
+        indicators=ScalpingManager(),
+        reconciler=app.state.reconciler,
+    )
+    if app.state.reconciler is not None:
+        app.state.reconciler.start(app.state.bot.trading_pairs)
+    if os.getenv("USERS_FILE"):
+        from .tenants import TenantManager
+
+        app.state.tenants = TenantManager(
+            app.state.bot, app.state.notifications, exchange=app.state.exchange
+        )
+        await app.state.tenants.start()
+
+
+async def _maybe_await(value):
+    """Методы TradingBot синхронные, а ShardedBotClient — асинхронные."""
+    if inspect.isawaitable(value):
+        return await value
+    return value
 
 
 app = FastAPI(
@@ -40,12 +235,67 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def require_ready(request: Request, call_next):
+    """Пока процесс не готов, запросы к API получают 503 вместо ошибок менеджеров."""
+    if request.url.path.startswith("/api/") and not request.app.state.ready.is_set():
+        return JSONResponse(
+            {"status": "starting", "error": request.app.state.init_error},
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def measure_request_time(request: Request, call_next):
+    """Записывает время обработки каждого HTTP-запроса в гистограмму."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Шаблон маршрута (/api/pairs/{pair_symbol}/start), а не путь: ограниченное число меток
+    route = request.scope.get("route")
+    HTTP_REQUEST_TIME.labels(
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code),
+    ).observe(time.perf_counter() - started)
+    return response
+
+
 @app.get("/")
 async def read_root():
     """Корневой эндпоинт для проверки доступности сервера."""
     return {"status": "ok", "message": "ScalpEX Bot Server is running"}
 
 
+@app.get("/health/live")
+async def liveness(request: Request):
+    """
+    Процесс жив и обслуживает event loop (не требует готовности менеджеров).
+    После неудачной инициализации отвечает 503, чтобы оркестратор перезапустил процесс.
+    """
+    init_error = request.app.state.init_error
+    if init_error:
+        return JSONResponse({"status": "failed", "error": init_error}, 503)
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness(request: Request):
+    """Процесс готов принимать трафик: менеджеры и бот инициализированы."""
+    state = request.app.state
+    if state.ready.is_set():
+        return {"status": "ready", "mode": state.mode}
+    status = "failed" if state.init_error else "starting"
+    return JSONResponse({"status": status, "error": state.init_error}, 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/pairs")
 async def get_configured_pairs(request: Request):
     """Возвращает список торговых пар, настроенных на сервере."""
@@ -55,7 +305,111 @@ async def get_configured_pairs(request: Request):
 @app.get("/api/status")
 async def get_bot_status(request: Request):
     """Возвращает текущий статус работы бота по всем парам."""
-    return request.app.state.bot.get_status()
+    return await _maybe_await(request.app.state.bot.get_status())
+
+
+@app.websocket("/ws/status")
+async def status_stream(
+    websocket: WebSocket, since: int | None = None, epoch: str | None = None
+):
+    """
+    Push-поток статусов пар: снапшот при подключении, затем дельты и heartbeat.
+    Параметры `since` и `epoch` позволяют продолжить поток после переподключения.
+    Клиент может прислать список видимых пар и получать их цены.
+    """
+    broadcaster = websocket.app.state.status_stream
+    await websocket.accept()
+    # Снапшот статусов появляется после инициализации бота: до нее клиент
+    # получает 1013 (Try Again Later) и переподключается позже
+    if not websocket.app.state.ready.is_set():
+        await websocket.close(code=1013, reason="Server is starting")
+        return
+    subscriber = broadcaster.subscribe(since, epoch)
+    receiver = asyncio.create_task(_receive_watch(websocket, subscriber))
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscriber.get(), timeout=broadcaster.heartbeat_interval
+                )
+            except asyncio.TimeoutError:
+                message = broadcaster.heartbeat_message()
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        broadcaster.unsubscribe(subscriber)
+
+
+async def _receive_watch(websocket: WebSocket, subscriber: StatusSubscriber):
+    """Читает сообщения клиента и обновляет набор пар, цены которых он видит."""
+    try:
+        while True:
+            pairs = parse_watch_message(await websocket.receive_text())
+            if pairs is not None:
+                subscriber.watch(pairs)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/api/engine")
+async def get_engine_stats(request: Request):
+    """Возвращает метрики событийных движков пар: задержку цикла и глубину очереди."""
+    return request.app.state.bot.get_engine_stats()
+
+
+@app.get("/api/supervisor")
+async def get_supervisor_stats(request: Request):
+    """Возвращает перезапуски, ошибки и блокировки event loop циклов пар."""
+    return request.app.state.bot.get_supervisor_stats()
+
+
+@app.get("/api/indicators")
+async def get_indicators(request: Request):
+    """Возвращает текущие значения индикаторов по запущенным парам."""
+    return request.app.state.bot.get_indicators()
+
+
+@app.get("/api/market-feed")
+async def get_market_feed_stats(request: Request):
+    """Возвращает метрики WebSocket-соединений с биржей: сообщения/сек и время парсинга."""
+    market_feed = request.app.state.market_feed
+    return market_feed.get_stats() if market_feed is not None else {}
+
+
+@app.get("/api/exchange")
+async def get_exchange_stats(request: Request):
+    """Возвращает метрики REST-клиента биржи и остаток лимитов запросов."""
+    exchange = request.app.state.exchange
+    return exchange.get_stats() if exchange is not None else {}
+
+
+@app.get("/api/orders")
+async def get_order_stats(request: Request):
+    """Возвращает размер реестра ордеров и задержки submit→ack / submit→fill."""
+    orders = request.app.state.orders
+    return orders.get_stats() if orders is not None else {}
+
+
+@app.get("/api/reconciliation")
+async def get_reconciliation_stats(request: Request):
+    """Возвращает метрики сверки ордеров с биржей: проходы, расхождения, вес запросов."""
+    reconciler = request.app.state.reconciler
+    return reconciler.get_stats() if reconciler is not None else {}
+
+
+@app.get("/api/users")
+async def get_user_stats(request: Request):
+    """Возвращает число пользователей, их стратегий и состояние загрузки конфигурации."""
+    tenants = request.app.state.tenants
+    return tenants.get_stats() if tenants is not None else {}
+
+
+@app.get("/api/notifications")
+async def get_notification_stats(request: Request):
+    """Возвращает метрики уведомлений: дайджесты, очереди и лимиты Telegram."""
+    return request.app.state.notifications.get_stats()
 
 
 @app.post("/api/pairs/{pair_symbol}/start")
@@ -64,7 +418,7 @@ async def start_bot_for_pair(pair_symbol: str, request: Request):
     bot = request.app.state.bot
     logger.info(f"Received a command to start the bot for {pair_symbol}.")
     try:
-        bot.start_for_pair(pair_symbol.upper())
+        await _maybe_await(bot.start_for_pair(pair_symbol.upper()))
         return {"status": "ok", "message": f"Bot started for {pair_symbol}"}
     except ValueError as e:
         logger.error(f"Failed to start bot for {pair_symbol}: {e}")
@@ -76,11 +430,13 @@ async def stop_bot_for_pair(pair_symbol: str, request: Request):
     """Останавливает торговую логику для указанной пары."""
     bot = request.app.state.bot
     logger.info(f"Received a command to stop the bot for {pair_symbol}.")
-    bot.stop_for_pair(pair_symbol.upper())
+    await _maybe_await(bot.stop_for_pair(pair_symbol.upper()))
     return {"status": "ok", "message": f"Bot stopped for {pair_symbol}"}
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     # Запускаем веб-сервер
     # host="0.0.0.0" делает сервер доступным в локальной сети
     # reload=True автоматически перезагружает сервер при изменениях в коде (удобно для разработки)
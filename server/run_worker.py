@@ -0,0 +1,140 @@
+"""
+Точка входа торгового воркера.
+
+Воркер исполняет свою долю торговых пар, распределяемых между процессами через
+аренды в Redis (см. server/sharding.py). Для использования нескольких ядер или
+серверов достаточно запустить несколько воркеров с общим REDIS_URL:
+
+    python -m server.run_worker
+"""
+
+import asyncio
+import os
+import signal
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from .bot_logic import TradingBot
+from .sharding import PairLeaseCoordinator
+from managers.exchange_manager import ExchangeClient
+from managers.loguru_manager import setup_logger
+from managers.metrics_manager import LoopMonitor, start_metrics_server
+from managers.notification_manager import NotificationManager
+from managers.order_manager import OrderManager
+from managers.orderbook_manager import OrderBookManager
+from managers.redis_manager import RedisManager
+from managers.telegram_manager import TelegramClient
+from managers.websocket_manager import WebsocketManager
+
+
+async def run_worker():
+    """Поднимает менеджеры и торгового бота воркера и работает до сигнала остановки."""
+    load_dotenv()
+    if not os.getenv("REDIS_URL"):
+        raise RuntimeError("REDIS_URL is required to run a trade worker.")
+
+    loop_monitor = LoopMonitor()
+    loop_monitor.start()
+    metrics_server = None
+    if os.getenv("METRICS_PORT"):
+        metrics_server = await start_metrics_server(int(os.getenv("METRICS_PORT")))
+
+    exchange = ExchangeClient()
+    order_books = OrderBookManager(snapshot_loader=exchange.get_depth)
+    market_feed = WebsocketManager()
+    await market_feed.start()
+    orders = OrderManager(exchange)
+    if os.getenv("BINANCE_API_KEY"):
+        orders.start_user_stream(market_feed)
+    db = None
+    if os.getenv("DB_URL"):
+        from managers.database_manager import DatabaseManager
+
+        db = DatabaseManager()
+        await db.start()
+        await db.init_schema()
+        orders.add_fill_listener(db.on_fill)
+    telegram = TelegramClient() if os.getenv("TELEGRAM_BOT_TOKEN") else None
+    notifications = NotificationManager(telegram=telegram)
+    notifications.start()
+    if telegram is not None:
+        orders.add_fill_listener(notifications.on_fill)
+    redis = RedisManager()
+    await redis.start()
+    recorder = None
+    if os.getenv("MARKET_ARCHIVE_DIR"):
+        from managers.archive_manager import MarketRecorder
+
+        recorder = MarketRecorder()
+        recorder.start()
+
+    reconciler = None
+    live_trading = os.getenv("LIVE_TRADING") == "1"
+    if live_trading:
+        from managers.reconciliation_manager import ReconciliationManager
+
+        reconciler = ReconciliationManager(orders, exchange)
+    # numpy подгружается здесь, а не при импорте модуля
+    from managers.scalping_manager import ScalpingManager
+
+    bot = TradingBot(
+        market_feed=market_feed,
+        order_books=order_books,
+        state_store=redis,
+        orders=orders if live_trading else None,
+        recorder=recorder,
+        notifications=notifications,
+        indicators=ScalpingManager(),
+        reconciler=reconciler,
+    )
+    if reconciler is not None:
+        reconciler.start(bot.trading_pairs)
+    if telegram is not None:
+        bot.add_status_listener(notifications.on_status)
+    coordinator = PairLeaseCoordinator(bot, redis)
+    await coordinator.start()
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_requested.set)
+        except NotImplementedError:
+            # Windows: остановка по KeyboardInterrupt
+            pass
+    try:
+        await stop_requested.wait()
+    finally:
+        logger.info(f"Worker {coordinator.worker_id} shutting down.")
+        await coordinator.stop()
+        await bot.close()
+        if reconciler is not None:
+            await reconciler.stop()
+        await orders.stop_user_stream()
+        await market_feed.stop()
+        await exchange.close()
+        await notifications.stop()
+        if telegram is not None:
+            await telegram.close()
+        if recorder is not None:
+            await recorder.close()
+        await redis.close()
+        if db is not None:
+            await db.close()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        await loop_monitor.stop()
+
+
+def main():
+    setup_logger("worker")
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
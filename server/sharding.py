@@ -0,0 +1,525 @@
+"""
+Модуль горизонтального шардирования торговых пар между процессами-воркерами.
+
+Схема координации через Redis:
+- `scalpex:pairs:desired` (SET) — пары, которые должны работать. Его меняет API.
+- `scalpex:workers` (ZSET) — живые воркеры и время их последнего heartbeat.
+- `scalpex:lease:<PAIR>` — аренда пары: id воркера-владельца с TTL. Пару
+  исполняет только воркер, удерживающий ее аренду, поэтому одна пара никогда
+  не работает дважды.
+- Канал `scalpex:rebalance` — сигнал воркерам пересчитать распределение сразу,
+  не дожидаясь очередного heartbeat.
+- Канал `scalpex:status` — изменения статусов пар для API (push клиентам).
+
+Владелец пары среди живых воркеров определяется rendezvous-хешированием (HRW):
+при появлении или уходе воркера переезжает только минимально необходимая часть пар.
+Передача пары: старый владелец сначала останавливает ее у себя и только потом
+освобождает аренду; новый владелец забирает аренду через SET NX.
+
+Время heartbeat берется из Redis (TIME), а не из часов воркеров: расхождение
+часов узлов не исключает живых воркеров и не оставляет мертвых. Команды Redis
+ограничены таймаутом, а отдельная задача следит за сроком продления аренд и
+останавливает пары до истечения TTL, даже если запрос к Redis завис.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from hashlib import blake2b
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from shared.enums import BotStatus
+
+from .bot_logic import StatusListener, load_trading_pairs
+
+if TYPE_CHECKING:
+    from managers.redis_manager import RedisManager
+
+    from .bot_logic import TradingBot
+
+DESIRED_PAIRS_KEY = "scalpex:pairs:desired"
+WORKERS_KEY = "scalpex:workers"
+LEASE_KEY_PREFIX = "scalpex:lease:"
+REBALANCE_CHANNEL = "scalpex:rebalance"
+STATUS_CHANNEL = "scalpex:status"
+
+# Продление аренды только если она все еще принадлежит этому воркеру
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+# Захват свободной аренды; аренда, уже принадлежащая воркеру, продлевается
+# (ответ на предыдущий захват мог не дойти из-за таймаута)
+ACQUIRE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+# Heartbeat по часам Redis: отметка воркера, удаление устаревших и список живых
+HEARTBEAT_SCRIPT = """
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+redis.call('ZADD', KEYS[1], now, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+return redis.call('ZRANGE', KEYS[1], 0, -1)
+"""
+# Освобождение аренды только ее владельцем
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def lease_key(pair: str) -> str:
+    return f"{LEASE_KEY_PREFIX}{pair}"
+
+
+def pick_owner(pair: str, workers: list[str]) -> str | None:
+    """Выбирает воркера-владельца пары rendezvous-хешированием (HRW)."""
+    if not workers:
+        return None
+    return max(
+        workers,
+        key=lambda worker: blake2b(f"{pair}:{worker}".encode(), digest_size=8).digest(),
+    )
+
+
+class PairLeaseCoordinator:
+    """
+    Координатор воркера: держит heartbeat, захватывает и продлевает аренды
+    своих пар и запускает/останавливает их в локальном TradingBot.
+    """
+
+    def __init__(
+        self,
+        bot: "TradingBot",
+        redis: "RedisManager",
+        worker_id: str | None = None,
+        lease_ttl: float | None = None,
+        heartbeat_interval: float | None = None,
+        command_timeout: float | None = None,
+    ):
+        """
+        :param bot: Локальный торговый бот, исполняющий пары этого воркера.
+        :param redis: Менеджер Redis (общий для координации и состояния пар).
+        :param worker_id: Идентификатор воркера (по умолчанию host:pid:random).
+        :param lease_ttl: Время жизни аренды и heartbeat воркера, в секундах.
+        :param heartbeat_interval: Период heartbeat и продления аренд, в секундах.
+        :param command_timeout: Таймаут шага координации (команд Redis), в секундах.
+            По умолчанию четверть TTL аренды.
+        """
+        self.bot = bot
+        self._redis = redis
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        )
+        self.lease_ttl = lease_ttl or float(os.getenv("WORKER_LEASE_TTL", "10"))
+        self.heartbeat_interval = heartbeat_interval or float(
+            os.getenv("WORKER_HEARTBEAT_INTERVAL", "2")
+        )
+        self.command_timeout = command_timeout or self.lease_ttl / 4
+        # Пары, аренду которых удерживает этот воркер
+        self._leases: set[str] = set()
+        # Пары, которые останавливаются из-за передачи другому воркеру:
+        # их STOPPED не публикуется, чтобы не перетереть статус нового владельца
+        self._handing_over: set[str] = set()
+        self._last_renewal: float = time.monotonic()
+        self._rebalance_requested = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        # Публикации статусов в полете (ссылки держим, чтобы задачи не собрал GC)
+        self._status_tasks: set[asyncio.Task] = set()
+        self.bot.add_status_listener(self._on_status)
+
+        # --- Метрики ---
+        self.rebalances = 0
+        self.leases_acquired = 0
+        self.leases_lost = 0
+
+    @property
+    def owned_pairs(self) -> set[str]:
+        return set(self._leases)
+
+    async def start(self):
+        """Регистрирует воркера и запускает цикл координации."""
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._listen_rebalance()),
+            asyncio.create_task(self._watch_leases()),
+        ]
+        logger.info(f"Worker {self.worker_id} joined the cluster.")
+
+    async def stop(self):
+        """Останавливает свои пары, освобождает аренды и выходит из кластера."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for pair in list(self._leases):
+            self._stop_locally(pair)
+        released = list(self._leases)
+        self._leases.clear()
+        try:
+            async with asyncio.timeout(self.command_timeout):
+                await asyncio.gather(
+                    *(
+                        self._redis.execute(
+                            "EVAL",
+                            RELEASE_LEASE_SCRIPT,
+                            1,
+                            lease_key(pair),
+                            self.worker_id,
+                        )
+                        for pair in released
+                    ),
+                    self._redis.execute("ZREM", WORKERS_KEY, self.worker_id),
+                )
+                await self._redis.publish(REBALANCE_CHANNEL, self.worker_id)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed to release leases: {e!r}")
+        logger.info(f"Worker {self.worker_id} left the cluster.")
+
+    async def _run(self):
+        announced = False
+        while True:
+            try:
+                # Зависший запрос не должен задерживать продление дольше таймаута
+                async with asyncio.timeout(self.command_timeout):
+                    if not announced:
+                        # Сообщаем остальным воркерам о присоединении, чтобы они
+                        # отдали наши пары (повторяем, пока Redis недоступен)
+                        await self._redis.publish(REBALANCE_CHANNEL, self.worker_id)
+                        announced = True
+                    await self.rebalance()
+            except Exception as e:
+                logger.error(f"Rebalance failed on {self.worker_id}: {e!r}")
+                self._check_lease_deadline()
+            self._rebalance_requested.clear()
+            try:
+                await asyncio.wait_for(
+                    self._rebalance_requested.wait(), timeout=self.heartbeat_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _listen_rebalance(self):
+        """
+        Слушает канал rebalance и будит цикл координации. После потери
+        соединения переподписывается; сигналы, пропущенные за это время,
+        заменяет внеочередной шаг координации.
+        """
+        delay = 0.5
+        while True:
+            try:
+                pubsub = self._redis.redis.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(REBALANCE_CHANNEL)
+                    self._rebalance_requested.set()
+                    delay = 0.5
+                    async for _ in pubsub.listen():
+                        self._rebalance_requested.set()
+                    raise ConnectionError("rebalance subscription closed")
+                finally:
+                    await pubsub.aclose()
+            except Exception as e:
+                logger.warning(
+                    f"Rebalance listener of {self.worker_id} failed: {e!r}. "
+                    f"Resubscribing in {delay:.1f}s."
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+
+    async def _watch_leases(self):
+        """Проверяет срок продления аренд независимо от запросов к Redis."""
+        while True:
+            await asyncio.sleep(self.lease_ttl / 10)
+            self._check_lease_deadline()
+
+    def _check_lease_deadline(self):
+        """
+        Если аренды давно не продлевались (Redis недоступен), они могут истечь и
+        достаться другому воркеру. Останавливаем пары заранее, до истечения TTL.
+        """
+        if not self._leases:
+            return
+        if time.monotonic() - self._last_renewal > self.lease_ttl * 0.5:
+            logger.warning(
+                f"Worker {self.worker_id} could not renew leases in time. "
+                f"Stopping {len(self._leases)} pairs."
+            )
+            for pair in list(self._leases):
+                self._stop_locally(pair)
+            self.leases_lost += len(self._leases)
+            self._leases.clear()
+
+    async def rebalance(self):
+        """Один шаг координации: heartbeat, продление, передача и захват аренд."""
+        self._check_lease_deadline()
+        self.rebalances += 1
+        # Срок аренд отсчитывается от отправки продления: Redis продлит их не раньше
+        started = time.monotonic()
+        ttl_ms = int(self.lease_ttl * 1000)
+        workers, desired = await asyncio.gather(
+            self._redis.execute(
+                "EVAL", HEARTBEAT_SCRIPT, 1, WORKERS_KEY, self.worker_id, ttl_ms
+            ),
+            self._redis.execute("SMEMBERS", DESIRED_PAIRS_KEY),
+        )
+        configured = set(self.bot.trading_pairs)
+        owned = {
+            pair
+            for pair in desired
+            if pair in configured and pick_owner(pair, workers) == self.worker_id
+        }
+
+        # 1. Продлеваем удерживаемые аренды; потерянные пары останавливаем
+        held = sorted(self._leases)
+        renewed = await asyncio.gather(
+            *(
+                self._redis.execute(
+                    "EVAL",
+                    RENEW_LEASE_SCRIPT,
+                    1,
+                    lease_key(pair),
+                    self.worker_id,
+                    ttl_ms,
+                )
+                for pair in held
+            )
+        )
+        self._last_renewal = started
+        for pair, ok in zip(held, renewed):
+            if not ok:
+                logger.warning(f"Worker {self.worker_id} lost the lease for {pair}.")
+                self.leases_lost += 1
+                self._leases.discard(pair)
+                self._stop_locally(pair, handover=True)
+
+        # 2. Отдаем пары, которые больше не наши: сначала стоп, потом освобождение
+        to_release = sorted(self._leases - owned)
+        for pair in to_release:
+            self._stop_locally(pair, handover=pair in desired)
+            self._leases.discard(pair)
+        if to_release:
+            await asyncio.gather(
+                *(
+                    self._redis.execute(
+                        "EVAL",
+                        RELEASE_LEASE_SCRIPT,
+                        1,
+                        lease_key(pair),
+                        self.worker_id,
+                    )
+                    for pair in to_release
+                )
+            )
+            await self._redis.publish(REBALANCE_CHANNEL, self.worker_id)
+
+        # 3. Захватываем свободные аренды своих пар
+        to_acquire = sorted(owned - self._leases)
+        acquired = await asyncio.gather(
+            *(
+                self._redis.execute(
+                    "EVAL",
+                    ACQUIRE_LEASE_SCRIPT,
+                    1,
+                    lease_key(pair),
+                    self.worker_id,
+                    ttl_ms,
+                )
+                for pair in to_acquire
+            )
+        )
+        for pair, ok in zip(to_acquire, acquired):
+            # Если аренду еще держит прежний владелец, попробуем на следующем шаге
+            if not ok:
+                continue
+            self._leases.add(pair)
+            self.leases_acquired += 1
+            self.bot.start_for_pair(pair)
+
+    def _stop_locally(self, pair: str, handover: bool = False):
+        """Останавливает пару в локальном боте."""
+        if handover:
+            self._handing_over.add(pair)
+        try:
+            self.bot.stop_for_pair(pair)
+        finally:
+            self._handing_over.discard(pair)
+
+    def _on_status(self, pair: str, status: BotStatus):
+        """Слушатель статусов локального бота: публикует их для API."""
+        if pair in self._handing_over:
+            return
+        task = asyncio.create_task(self._publish_status(pair, status))
+        self._status_tasks.add(task)
+        task.add_done_callback(self._status_tasks.discard)
+
+    async def _publish_status(self, pair: str, status: BotStatus):
+        message = json.dumps(
+            {"pair": pair, "status": status.value, "worker": self.worker_id}
+        )
+        try:
+            await self._redis.publish(STATUS_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish status of {pair}: {e!r}")
+
+    def get_stats(self) -> dict[str, str | int | list[str]]:
+        """Возвращает метрики координатора воркера."""
+        return {
+            "worker_id": self.worker_id,
+            "pairs": sorted(self._leases),
+            "rebalances": self.rebalances,
+            "leases_acquired": self.leases_acquired,
+            "leases_lost": self.leases_lost,
+        }
+
+
+class ShardedBotClient:
+    """
+    Фасад TradingBot для API-сервера в режиме шардирования: пары исполняются
+    воркерами, а API лишь меняет желаемый набор пар и читает аренды.
+    """
+
+    def __init__(self, redis: "RedisManager"):
+        """
+        :param redis: Менеджер Redis, через который идет координация с воркерами.
+        """
+        self._redis = redis
+        self.trading_pairs: list[str] = load_trading_pairs()
+        self._status_listeners: list[StatusListener] = []
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        """Запускает слушателя статусов, публикуемых воркерами."""
+        self._task = asyncio.create_task(self._listen_status())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def start_for_pair(self, pair: str):
+        """Добавляет пару в желаемый набор; ее подхватит воркер-владелец."""
+        if pair not in self.trading_pairs:
+            logger.error(f"Attempted to start an unconfigured pair: {pair}")
+            raise ValueError(f"Pair {pair} is not configured.")
+        await self._redis.execute("SADD", DESIRED_PAIRS_KEY, pair)
+        await self._redis.publish(REBALANCE_CHANNEL, "api")
+        logger.success(f"Pair {pair} scheduled to run on workers.")
+
+    async def stop_for_pair(self, pair: str):
+        """Убирает пару из желаемого набора; воркер-владелец ее остановит."""
+        await self._redis.execute("SREM", DESIRED_PAIRS_KEY, pair)
+        await self._redis.publish(REBALANCE_CHANNEL, "api")
+        logger.success(f"Pair {pair} scheduled to stop on workers.")
+
+    async def get_owners(self) -> dict[str, str | None]:
+        """Возвращает воркера, удерживающего аренду, по каждой настроенной паре."""
+        if not self.trading_pairs:
+            return {}
+        owners = await self._redis.execute(
+            "MGET", *(lease_key(pair) for pair in self.trading_pairs)
+        )
+        return dict(zip(self.trading_pairs, owners))
+
+    async def get_status(self) -> dict[str, str]:
+        """
+        Пара работает, если она в желаемом наборе и ее аренду держит воркер.
+        Перезапуск и отказ цикла пары воркер записывает в pair_state:<PAIR>.
+        """
+        desired, owners = await asyncio.gather(
+            self._redis.execute("SMEMBERS", DESIRED_PAIRS_KEY), self.get_owners()
+        )
+        running = [
+            pair for pair in self.trading_pairs if pair in desired and owners.get(pair)
+        ]
+        states = await asyncio.gather(
+            *(
+                self._redis.execute("HGET", f"pair_state:{pair}", "status")
+                for pair in running
+            )
+        )
+        status = {pair: BotStatus.STOPPED for pair in self.trading_pairs}
+        for pair, state in zip(running, states):
+            supervised = state in (BotStatus.RESTARTING.value, BotStatus.FAILED.value)
+            status[pair] = BotStatus(state) if supervised else BotStatus.RUNNING
+        return status
+
+    async def get_prices(self, pairs: set[str]) -> dict[str, float]:
+        """Последние цены пар, которые воркеры пишут в pair_state:<PAIR>."""
+        pairs = sorted(pairs)
+        values = await asyncio.gather(
+            *(
+                self._redis.execute("HGET", f"pair_state:{pair}", "last_price")
+                for pair in pairs
+            )
+        )
+        return {pair: float(value) for pair, value in zip(pairs, values) if value}
+
+    def get_indicators(self) -> dict[str, dict[str, float]]:
+        """Индикаторы ведутся в процессах воркеров, в API их нет."""
+        return {}
+
+    def get_engine_stats(self) -> dict[str, dict[str, float | int]]:
+        """Движки пар работают в процессах воркеров, в API их метрик нет."""
+        return {}
+
+    def get_supervisor_stats(self) -> dict:
+        """Надзор за циклами пар ведется в процессах воркеров, в API его нет."""
+        return {}
+
+    def add_status_listener(self, listener: StatusListener):
+        """Регистрирует слушателя изменений статуса пар."""
+        self._status_listeners.append(listener)
+
+    async def _listen_status(self):
+        """
+        Раздает слушателям статусы, публикуемые воркерами. После потери
+        соединения переподписывается; статусы, опубликованные за это время,
+        не восстановить.
+        """
+        delay = 0.5
+        while True:
+            try:
+                pubsub = self._redis.redis.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(STATUS_CHANNEL)
+                    delay = 0.5
+                    async for message in pubsub.listen():
+                        self._dispatch_status(message["data"])
+                    raise ConnectionError("status subscription closed")
+                finally:
+                    await pubsub.aclose()
+            except Exception as e:
+                logger.warning(
+                    f"Status listener failed: {e!r}. Resubscribing in {delay:.1f}s."
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+
+    def _dispatch_status(self, raw: str | bytes):
+        try:
+            data = json.loads(raw)
+            status = BotStatus(data["status"])
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Malformed status message: {e!r}")
+            return
+        for listener in self._status_listeners:
+            listener(data["pair"], status)
@@ -0,0 +1,259 @@
+"""
+Модуль push-рассылки статусов бота клиентам по WebSocket.
+
+Клиент при подключении получает полный снапшот статусов, затем — только
+изменения (дельты) с монотонно растущей версией. При переподключении клиент
+передает последнюю полученную версию и получает пропущенные дельты из истории
+(или новый снапшот, если история уже не покрывает разрыв).
+
+Каждое сообщение сериализуется в JSON один раз и раздается всем подписчикам,
+поэтому один процесс обслуживает тысячи подписчиков.
+
+Тем же потоком клиентам доставляются уведомления (тип "notification") и цены
+пар (тип "prices"). Они не версионируются и не попадают в историю: пропущенное
+сообщение не повторяется. Цены отправляются только для пар, которые клиент
+видит на экране: их список он присылает сообщением {"type": "watch", "pairs": [...]}.
+Цены читаются один раз за период для всех подписчиков сразу (в режиме sharded —
+одно чтение из Redis на всех), каждому отправляется его часть.
+"""
+
+import asyncio
+import inspect
+import json
+import uuid
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from loguru import logger
+
+from managers.loguru_manager import LogThrottle
+
+# Сколько пар клиент может отслеживать одновременно (видимые строки списка)
+MAX_WATCHED_PAIRS = 100
+
+PriceSource = Callable[[set[str]], "dict[str, float] | Awaitable[dict[str, float]]"]
+
+
+class StatusSubscriber:
+    """Один подписчик потока статусов с ограниченной очередью сообщений."""
+
+    __slots__ = ("_queue", "_broadcaster", "watched", "_sent_prices")
+
+    def __init__(self, broadcaster: "StatusBroadcaster", queue_size: int):
+        self._broadcaster = broadcaster
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        # Пары, цены которых клиент видит на экране, и последние отправленные цены
+        self.watched: frozenset[str] = frozenset()
+        self._sent_prices: dict[str, float] = {}
+
+    def watch(self, pairs: set[str]):
+        """Задает видимые клиенту пары; цены вновь видимых пар будут отправлены."""
+        self.watched = frozenset(pairs)
+        self._sent_prices = {
+            pair: price
+            for pair, price in self._sent_prices.items()
+            if pair in self.watched
+        }
+
+    def offer(self, message: str):
+        """
+        Неблокирующе кладет сообщение в очередь. Если подписчик не успевает
+        читать, накопленные дельты заменяются одним свежим снапшотом.
+        """
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(self._broadcaster.snapshot_message())
+
+    async def get(self) -> str:
+        """Ждет следующее сообщение для отправки клиенту."""
+        return await self._queue.get()
+
+
+class StatusBroadcaster:
+    """Хранит текущие статусы пар и рассылает их изменения подписчикам."""
+
+    def __init__(
+        self,
+        history_size: int = 1000,
+        subscriber_queue_size: int = 256,
+        heartbeat_interval: float = 15.0,
+        price_interval: float = 0.5,
+    ):
+        """
+        :param history_size: Сколько последних дельт хранить для возобновления потока.
+        :param subscriber_queue_size: Размер очереди каждого подписчика.
+        :param heartbeat_interval: Период heartbeat-сообщений при отсутствии изменений (сек).
+        :param price_interval: Период рассылки цен отслеживаемых пар (сек).
+        """
+        self.heartbeat_interval = heartbeat_interval
+        self.price_interval = price_interval
+        self._price_task: asyncio.Task | None = None
+        # Эпоха меняется при каждом запуске процесса: версии разных эпох несравнимы
+        self.epoch: str = uuid.uuid4().hex[:12]
+        self.version: int = 0
+        self._statuses: dict[str, str] = {}
+        self._history: deque[tuple[int, str]] = deque(maxlen=history_size)
+        self._subscriber_queue_size = subscriber_queue_size
+        self._subscribers: set[StatusSubscriber] = set()
+        # Изменения текущей итерации event loop, отправляемые одной дельтой
+        self._pending_changes: dict[str, str] = {}
+        self._flush_scheduled = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def reset(self, statuses: dict[str, str]):
+        """Задает начальное состояние статусов (без рассылки)."""
+        self._statuses = {
+            pair: getattr(status, "value", status) for pair, status in statuses.items()
+        }
+
+    def publish(self, pair: str, status: str):
+        """Регистрирует новый статус пары. Неизменившиеся статусы игнорируются."""
+        status = getattr(status, "value", status)
+        if self._statuses.get(pair) == status and pair not in self._pending_changes:
+            return
+        self._statuses[pair] = status
+        self._pending_changes[pair] = status
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        """Рассылает все изменения текущей итерации одной дельтой."""
+        self._flush_scheduled = False
+        changes, self._pending_changes = self._pending_changes, {}
+        if not changes:
+            return
+        self.version += 1
+        message = json.dumps(
+            {"type": "delta", "version": self.version, "changes": changes}
+        )
+        self._history.append((self.version, message))
+        for subscriber in self._subscribers:
+            subscriber.offer(message)
+
+    def publish_notification(self, payload: dict):
+        """Рассылает уведомление всем подписчикам (вне версий статусов)."""
+        message = json.dumps(payload)
+        for subscriber in self._subscribers:
+            subscriber.offer(message)
+
+    def snapshot_message(self) -> str:
+        """Полный снапшот статусов с текущей версией."""
+        return json.dumps(
+            {
+                "type": "snapshot",
+                "epoch": self.epoch,
+                "version": self.version,
+                "statuses": self._statuses,
+            }
+        )
+
+    def heartbeat_message(self) -> str:
+        """Heartbeat с текущей версией: по нему клиент замечает пропущенные дельты."""
+        return json.dumps({"type": "heartbeat", "version": self.version})
+
+    def subscribe(
+        self, since: int | None = None, epoch: str | None = None
+    ) -> StatusSubscriber:
+        """
+        Создает подписчика. Если `since` той же эпохи покрывается историей,
+        подписчик получит только пропущенные дельты, иначе — полный снапшот.
+        """
+        subscriber = StatusSubscriber(self, self._subscriber_queue_size)
+        oldest = self._history[0][0] if self._history else self.version + 1
+        can_resume = since is not None and epoch == self.epoch
+        if can_resume and oldest - 1 <= since <= self.version:
+            for version, message in self._history:
+                if version > since:
+                    subscriber.offer(message)
+        else:
+            subscriber.offer(self.snapshot_message())
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StatusSubscriber):
+        """Удаляет подписчика."""
+        self._subscribers.discard(subscriber)
+
+    def start_prices(self, get_prices: PriceSource):
+        """Запускает рассылку цен пар, отслеживаемых подписчиками."""
+        if self._price_task is None or self._price_task.done():
+            self._price_task = asyncio.create_task(self._price_loop(get_prices))
+
+    async def stop(self):
+        """Останавливает рассылку цен."""
+        if self._price_task is not None:
+            self._price_task.cancel()
+            try:
+                await self._price_task
+            except asyncio.CancelledError:
+                pass
+            self._price_task = None
+
+    async def _price_loop(self, get_prices: PriceSource):
+        """
+        Раз в `price_interval` секунд читает цены всех отслеживаемых пар одним
+        запросом и кладет каждому подписчику изменившиеся цены его пар, поэтому
+        тихий рынок не создает трафика. Ошибка источника цен (например, Redis
+        в режиме sharded) пропускает один опрос, а не завершает рассылку.
+        """
+        error_log = LogThrottle(30.0)
+        while True:
+            await asyncio.sleep(self.price_interval)
+            subscribers = [s for s in self._subscribers if s.watched]
+            if not subscribers:
+                continue
+            try:
+                prices = get_prices(set().union(*(s.watched for s in subscribers)))
+                if inspect.isawaitable(prices):
+                    prices = await prices
+            except Exception as e:
+                if error_log.allow():
+                    logger.warning(
+                        f"Failed to read prices for the status stream: {e!r} "
+                        f"(+{error_log.skipped} more)."
+                    )
+                continue
+            self._offer_prices(subscribers, prices)
+
+    @staticmethod
+    def _offer_prices(subscribers: list[StatusSubscriber], prices: dict[str, float]):
+        # Подписчики с одинаковыми изменениями получают одно сериализованное сообщение
+        messages: dict[tuple, str] = {}
+        for subscriber in subscribers:
+            sent = subscriber._sent_prices
+            changed = {
+                pair: prices[pair]
+                for pair in subscriber.watched
+                if pair in prices and sent.get(pair) != prices[pair]
+            }
+            if not changed:
+                continue
+            sent.update(changed)
+            key = tuple(sorted(changed.items()))
+            message = messages.get(key)
+            if message is None:
+                message = messages[key] = json.dumps(
+                    {"type": "prices", "prices": dict(key)}
+                )
+            subscriber.offer(message)
+
+
+def parse_watch_message(raw: str) -> set[str] | None:
+    """Разбирает сообщение клиента со списком видимых пар (None — не watch)."""
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or message.get("type") != "watch":
+        return None
+    pairs = message.get("pairs")
+    if not isinstance(pairs, list):
+        return None
+    return {str(pair).upper() for pair in pairs[:MAX_WATCHED_PAIRS]}
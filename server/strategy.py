@@ -0,0 +1,128 @@
+"""
+Модуль торговой стратегии одной пары.
+
+Стратегия не знает, откуда приходят данные и куда уходят ордера: она получает
+состояние рынка пары (PairMarketState) и возвращает намерение выставить ордер.
+Поэтому один и тот же код исполняется и в TradingBot (живые данные, ордера через
+OrderManager), и в бэктесте (записанные тики, симуляция исполнений).
+"""
+
+from dataclasses import dataclass
+
+from .pair_engine import PairMarketState
+
+
+@dataclass(slots=True)
+class StrategyParams:
+    """Настраиваемые параметры скальпинговой стратегии."""
+
+    # Период EMA средней цены, в обновлениях рынка
+    ema_period: int = 200
+    # Отклонение средней цены ниже EMA для входа, в б.п.
+    entry_bps: float = 5.0
+    take_profit_bps: float = 8.0
+    stop_loss_bps: float = 15.0
+    # Вход только при спреде не шире этого значения, в б.п.
+    max_spread_bps: float = 5.0
+    order_qty: float = 1.0
+
+
+@dataclass(slots=True)
+class OrderIntent:
+    """Намерение стратегии выставить рыночный ордер."""
+
+    side: str
+    quantity: float
+
+
+class ScalpingStrategy:
+    """
+    Скальпинг на возврате к средней: покупка, когда средняя цена опускается
+    ниже EMA на `entry_bps`, выход по тейк-профиту или стоп-лоссу.
+    Пока предыдущий ордер не исполнен, новые намерения не выдаются.
+    """
+
+    __slots__ = (
+        "pair",
+        "params",
+        "position",
+        "entry_price",
+        "_ema",
+        "_alpha",
+        "_pending_qty",
+    )
+
+    # Остатки объема меньше этого значения считаются нулем (погрешность float)
+    _QTY_EPSILON = 1e-12
+
+    def __init__(self, pair: str, params: StrategyParams | None = None):
+        self.pair = pair
+        self.params = params or StrategyParams()
+        self.position = 0.0
+        self.entry_price = 0.0
+        self._ema = 0.0
+        self._alpha = 2.0 / (self.params.ema_period + 1)
+        # Объем ордера, исполнения которого ждет стратегия
+        self._pending_qty = 0.0
+
+    def update_params(self, params: StrategyParams):
+        """Применяет новые параметры, сохраняя позицию и EMA (горячая перезагрузка)."""
+        self.params = params
+        self._alpha = 2.0 / (params.ema_period + 1)
+
+    def on_market_update(self, state: PairMarketState) -> OrderIntent | None:
+        """Обновляет индикаторы и решает, нужен ли ордер."""
+        bid, ask = state.best_bid, state.best_ask
+        if not bid or not ask:
+            return None
+        mid = (bid + ask) * 0.5
+        if self._ema:
+            self._ema += self._alpha * (mid - self._ema)
+        else:
+            self._ema = mid
+        if self._pending_qty:
+            return None
+
+        params = self.params
+        if self.position:
+            change_bps = (mid - self.entry_price) / self.entry_price * 10_000
+            if (
+                change_bps >= params.take_profit_bps
+                or change_bps <= -params.stop_loss_bps
+            ):
+                return self._intent("SELL", self.position)
+            return None
+
+        spread_bps = (ask - bid) / mid * 10_000
+        if spread_bps <= params.max_spread_bps and mid <= self._ema * (
+            1 - params.entry_bps / 10_000
+        ):
+            return self._intent("BUY", params.order_qty)
+        return None
+
+    def _intent(self, side: str, quantity: float) -> OrderIntent:
+        self._pending_qty = quantity
+        return OrderIntent(side, quantity)
+
+    def on_fill(self, side: str, qty: float, price: float):
+        """Учитывает исполнение ордера стратегии."""
+        if side == "BUY":
+            total = self.position + qty
+            self.entry_price = (
+                (self.entry_price * self.position + price * qty) / total
+                if total
+                else 0.0
+            )
+            self.position = total
+        else:
+            self.position -= qty
+            if self.position <= self._QTY_EPSILON:
+                self.position = 0.0
+                self.entry_price = 0.0
+        self._pending_qty -= qty
+        if self._pending_qty <= self._QTY_EPSILON:
+            self._pending_qty = 0.0
+
+    def on_order_failed(self):
+        """Ордер отклонен или не отправлен: разрешаем новые намерения."""
+        self._pending_qty = 0.0
@@ -0,0 +1,404 @@
+"""
+Модуль надзора за циклами торговых пар.
+
+- TaskSupervisor запускает цикл пары как задачу под надзором: упавший цикл
+  перезапускается по политике перезапуска с экспоненциальной задержкой,
+  причина падения сохраняется и попадает в статус пары. Если цикл падает
+  слишком часто, надзор прекращает попытки и помечает пару как Failed.
+- LoopWatchdog учитывает итерации циклов пар, занявшие event loop дольше
+  порога: пока одна пара выполняет синхронный код, остальные пары не
+  обрабатывают события. Пару, блокирующую loop раз за разом, можно остановить.
+- ComputePool выносит тяжелые вычисления (пересчет индикаторов, прогоны
+  сеток параметров) из event loop в пул потоков или процессов. Пул включается
+  явно (COMPUTE_POOL), по умолчанию вычисления идут в вызывающей задаче.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from managers.metrics_manager import REGISTRY
+from shared.enums import BotStatus, ComputeMode, RestartPolicy
+
+# Слушатель изменений статуса задачи: listener(name, status, error)
+SupervisorListener = Callable[[str, BotStatus, str | None], None]
+
+TASK_RESTARTS = REGISTRY.counter(
+    "scalpex_pair_restarts", "Pair loop restarts after a failure", ("pair",)
+)
+LOOP_BLOCKS = REGISTRY.counter(
+    "scalpex_pair_loop_blocks",
+    "Pair loop iterations that blocked the event loop longer than the threshold",
+    ("pair",),
+)
+OFFLOAD_TIME = REGISTRY.histogram(
+    "scalpex_offload_seconds", "Time of computations offloaded to the compute pool"
+)
+
+
+@dataclass(slots=True, eq=False)
+class SupervisedTask:
+    """Задача под надзором и история ее падений."""
+
+    name: str
+    factory: Callable[[], Awaitable[Any]]
+    status: BotStatus = BotStatus.RUNNING
+    task: asyncio.Task | None = None
+    # Перезапуски с момента старта и падения подряд (сбрасываются после стабильной работы)
+    restarts: int = 0
+    failures: int = 0
+    last_error: str | None = None
+    # Время последнего падения (unix) и запланированного перезапуска (monotonic)
+    failed_at: float | None = None
+    restart_at: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        restart_in = None
+        if self.restart_at is not None:
+            restart_in = round(max(self.restart_at - time.monotonic(), 0.0), 3)
+        return {
+            "status": self.status.value,
+            "restarts": self.restarts,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "failed_at": self.failed_at,
+            "restart_in": restart_in,
+        }
+
+
+class TaskSupervisor:
+    """
+    Надзор за долгоживущими задачами (циклами пар), по одной на имя.
+
+    Задача создается фабрикой корутин, поэтому после падения ее можно запустить
+    заново. Между перезапусками выдерживается экспоненциальная задержка
+    с джиттером; если задача проработала дольше `stable_after`, счетчик
+    падений подряд и задержка сбрасываются.
+    """
+
+    def __init__(
+        self,
+        policy: RestartPolicy | str | None = None,
+        min_delay: float | None = None,
+        max_delay: float | None = None,
+        max_failures: int | None = None,
+        stable_after: float = 60.0,
+    ):
+        """
+        :param policy: Политика перезапуска (PAIR_RESTART_POLICY, по умолчанию on-failure).
+        :param min_delay: Задержка перед первым перезапуском, сек (PAIR_RESTART_MIN_DELAY).
+        :param max_delay: Предел экспоненциальной задержки, сек (PAIR_RESTART_MAX_DELAY).
+        :param max_failures: Сколько падений подряд допускается, прежде чем задача
+            будет помечена как Failed; 0 — без ограничения (PAIR_MAX_FAILURES).
+        :param stable_after: Время работы (сек), после которого задача считается
+            стабильной и счетчик падений подряд сбрасывается.
+        """
+        self.policy = RestartPolicy(
+            policy or os.getenv("PAIR_RESTART_POLICY", RestartPolicy.ON_FAILURE.value)
+        )
+        self.min_delay = min_delay or float(os.getenv("PAIR_RESTART_MIN_DELAY", "1"))
+        self.max_delay = max_delay or float(os.getenv("PAIR_RESTART_MAX_DELAY", "60"))
+        self.max_failures = (
+            max_failures
+            if max_failures is not None
+            else int(os.getenv("PAIR_MAX_FAILURES", "5"))
+        )
+        self.stable_after = stable_after
+        self._tasks: dict[str, SupervisedTask] = {}
+        self._listeners: list[SupervisorListener] = []
+
+    def add_listener(self, listener: SupervisorListener):
+        """Регистрирует слушателя изменений статуса задач (перезапуск, отказ, остановка)."""
+        self._listeners.append(listener)
+
+    def start(self, name: str, factory: Callable[[], Awaitable[Any]]) -> SupervisedTask:
+        """Запускает задачу под надзором. Если задача с таким именем активна, возвращает ее."""
+        if self.is_active(name):
+            return self._tasks[name]
+        entry = SupervisedTask(name, factory)
+        entry.task = asyncio.create_task(self._supervise(entry), name=name)
+        self._tasks[name] = entry
+        return entry
+
+    def stop(self, name: str) -> bool:
+        """Останавливает задачу и забывает ее. Возвращает False, если задачи не было."""
+        entry = self._tasks.pop(name, None)
+        if entry is None:
+            return False
+        if not entry.task.done():
+            entry.task.cancel()
+        return True
+
+    def fail(self, name: str, reason: str):
+        """Принудительно останавливает задачу и помечает ее как Failed с причиной."""
+        entry = self._tasks.get(name)
+        if entry is None or entry.status is BotStatus.FAILED:
+            return
+        entry.last_error = reason
+        entry.failed_at = time.time()
+        entry.restart_at = None
+        if not entry.task.done():
+            entry.task.cancel()
+        self._set_status(entry, BotStatus.FAILED)
+
+    def is_active(self, name: str) -> bool:
+        """True, если задача работает или ждет перезапуска."""
+        entry = self._tasks.get(name)
+        return entry is not None and entry.status in (
+            BotStatus.RUNNING,
+            BotStatus.RESTARTING,
+        )
+
+    def status(self, name: str) -> BotStatus:
+        """Статус задачи; задача, которой нет под надзором, считается остановленной."""
+        entry = self._tasks.get(name)
+        return entry.status if entry is not None else BotStatus.STOPPED
+
+    async def close(self):
+        """Останавливает все задачи и дожидается их завершения."""
+        tasks = [entry.task for entry in self._tasks.values()]
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _set_status(self, entry: SupervisedTask, status: BotStatus):
+        if entry.status is status:
+            return
+        entry.status = status
+        # Остановленная через stop задача уже забыта: ее статус никому не интересен
+        if self._tasks.get(entry.name) is not entry:
+            return
+        for listener in self._listeners:
+            listener(entry.name, status, entry.last_error)
+
+    async def _supervise(self, entry: SupervisedTask):
+        """Цикл надзора: запуск, ожидание завершения, перезапуск с backoff."""
+        delay = self.min_delay
+        while True:
+            started = time.monotonic()
+            entry.restart_at = None
+            self._set_status(entry, BotStatus.RUNNING)
+            try:
+                await entry.factory()
+                error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+
+            if time.monotonic() - started >= self.stable_after:
+                entry.failures = 0
+                delay = self.min_delay
+            if error is None:
+                if self.policy is not RestartPolicy.ALWAYS:
+                    logger.info(f"Supervised task {entry.name} has finished.")
+                    self._set_status(entry, BotStatus.STOPPED)
+                    return
+            else:
+                entry.failures += 1
+                entry.last_error = repr(error)
+                entry.failed_at = time.time()
+                logger.opt(exception=error).error(
+                    f"Supervised task {entry.name} crashed "
+                    f"({entry.failures} failures in a row): {error!r}"
+                )
+                if self.policy is RestartPolicy.NEVER or (
+                    self.max_failures and entry.failures >= self.max_failures
+                ):
+                    logger.error(f"Supervised task {entry.name} will not be restarted.")
+                    self._set_status(entry, BotStatus.FAILED)
+                    return
+
+            # Экспоненциальная задержка с джиттером: падающие вместе пары не рестартуют разом
+            sleep_for = delay * random.uniform(0.5, 1.0)
+            entry.restart_at = time.monotonic() + sleep_for
+            logger.info(f"Restarting {entry.name} in {sleep_for:.2f}s...")
+            self._set_status(entry, BotStatus.RESTARTING)
+            await asyncio.sleep(sleep_for)
+            delay = min(delay * 2, self.max_delay)
+            entry.restarts += 1
+            TASK_RESTARTS.labels(entry.name).inc()
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Статус, перезапуски и последняя ошибка по задачам под надзором."""
+        return {name: entry.to_dict() for name, entry in self._tasks.items()}
+
+
+@dataclass(slots=True)
+class _BlockStats:
+    """Блокировки event loop одной парой."""
+
+    blocks: int = 0
+    consecutive: int = 0
+    max_block: float = 0.0
+    last_block: float = 0.0
+    # Момент последнего предупреждения в лог и число блокировок после него
+    reported_at: float = 0.0
+    unreported: int = 0
+
+
+class LoopWatchdog:
+    """
+    Учет итераций циклов пар, занявших event loop дольше порога.
+
+    Цикл пары передает длительность каждой итерации в `check`. Общий
+    LoopMonitor замечает сам факт блокировки loop; здесь блокировка
+    приписывается конкретной паре. Предупреждения в лог ограничены одним
+    на пару за `report_interval`, чтобы медленная пара не засыпала лог.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float | None = None,
+        block_limit: int | None = None,
+        report_interval: float = 10.0,
+    ):
+        """
+        :param threshold_ms: Порог длительности итерации, мс (PAIR_BLOCK_THRESHOLD_MS).
+        :param block_limit: Сколько блокировок подряд допускается, прежде чем
+            пара будет остановлена; 0 — только предупреждать (PAIR_BLOCK_LIMIT).
+        :param report_interval: Минимальный интервал между предупреждениями по паре, сек.
+        """
+        self.threshold = (
+            threshold_ms or float(os.getenv("PAIR_BLOCK_THRESHOLD_MS", "50"))
+        ) / 1000
+        self.block_limit = (
+            block_limit
+            if block_limit is not None
+            else int(os.getenv("PAIR_BLOCK_LIMIT", "0"))
+        )
+        self.report_interval = report_interval
+        self._pairs: dict[str, _BlockStats] = {}
+
+    def check(self, pair: str, elapsed: float) -> bool:
+        """
+        Учитывает итерацию цикла пары длительностью `elapsed` сек.
+        Возвращает True, если пара превысила лимит блокировок подряд.
+        """
+        if elapsed < self.threshold:
+            stats = self._pairs.get(pair)
+            if stats is not None:
+                stats.consecutive = 0
+            return False
+
+        stats = self._pairs.get(pair)
+        if stats is None:
+            stats = self._pairs[pair] = _BlockStats()
+        stats.blocks += 1
+        stats.consecutive += 1
+        stats.last_block = elapsed
+        stats.max_block = max(stats.max_block, elapsed)
+        LOOP_BLOCKS.labels(pair).inc()
+        now = time.monotonic()
+        if now - stats.reported_at >= self.report_interval:
+            logger.warning(
+                f"{pair} blocked the event loop for {elapsed * 1000:.1f} ms "
+                f"({stats.unreported + 1} times since last report)."
+            )
+            stats.reported_at = now
+            stats.unreported = 0
+        else:
+            stats.unreported += 1
+        return bool(self.block_limit) and stats.consecutive >= self.block_limit
+
+    def forget(self, pair: str):
+        """Сбрасывает учет пары (при ее остановке)."""
+        self._pairs.pop(pair, None)
+
+    def get_stats(self) -> dict[str, dict[str, float | int]]:
+        """Число блокировок и их длительность (мс) по парам, блокировавшим loop."""
+        return {
+            pair: {
+                "blocks": stats.blocks,
+                "consecutive_blocks": stats.consecutive,
+                "max_block_ms": round(stats.max_block * 1000, 3),
+                "last_block_ms": round(stats.last_block * 1000, 3),
+            }
+            for pair, stats in self._pairs.items()
+        }
+
+
+class ComputePool:
+    """
+    Пул для тяжелых вычислений, вынесенных из циклов пар.
+
+    В режиме process функция и аргументы передаются в другой процесс, поэтому
+    функция должна быть объявлена на уровне модуля, а аргументы — сериализуемы
+    pickle. Пул создается при первом вызове: процессы не запускаются, если
+    тяжелых вычислений нет.
+    """
+
+    def __init__(
+        self, mode: ComputeMode | str | None = None, workers: int | None = None
+    ):
+        """
+        :param mode: inline, thread или process (COMPUTE_POOL, по умолчанию inline).
+        :param workers: Размер пула (COMPUTE_WORKERS, по умолчанию число ядер).
+        """
+        self.mode = ComputeMode(
+            mode or os.getenv("COMPUTE_POOL", ComputeMode.INLINE.value)
+        )
+        self.workers = workers or int(os.getenv("COMPUTE_WORKERS", "0")) or None
+        self._executor: Executor | None = None
+        self.submitted: int = 0
+        self.failed: int = 0
+        self.inflight: int = 0
+
+    @property
+    def executor(self) -> Executor | None:
+        """Пул исполнителей; None в режиме inline."""
+        if self._executor is None and self.mode is not ComputeMode.INLINE:
+            if self.mode is ComputeMode.THREAD:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="compute"
+                )
+            else:
+                # spawn: процесс сервера многопоточный, fork скопировал бы захваченные блокировки
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            logger.info(f"Compute pool started ({self.mode.value}).")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет func(*args) в пуле и возвращает результат."""
+        self.submitted += 1
+        self.inflight += 1
+        started = time.perf_counter()
+        try:
+            executor = self.executor
+            if executor is None:
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, func, *args
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.inflight -= 1
+            OFFLOAD_TIME.observe(time.perf_counter() - started)
+
+    def close(self):
+        """Останавливает пул, отменяя еще не начатые вычисления."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode.value,
+            "workers": self.workers or os.cpu_count(),
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "inflight": self.inflight,
+        }
@@ -0,0 +1,286 @@
+"""
+Многопользовательский режим: пользователи со своими парами и параметрами
+стратегии поверх общих движков символов TradingBot.
+
+Конфигурация пользователей читается из JSON-файла USERS_FILE:
+
+    {
+        "alice": {"pairs": ["SOLUSDT", "KASUSDT"], "params": {"entry_bps": 6}},
+        "bob": {"pairs": ["SOLUSDT"], "telegram_chat_id": 123456789}
+    }
+
+Пары проверяются по формату символа и, если передан ExchangeClient, по списку
+торгуемых символов биржи: опечатка в конфигурации не должна запускать движок
+и подписки на несуществующий символ.
+
+Пользователи работают только в режиме наблюдения (без LIVE_TRADING): ордера
+бот выставляет одним ключом API оператора, и стратегии пользователей
+торговали бы на его счете. При включенной торговле TenantManager не создается.
+
+Файл перечитывается при изменении (проверка раз в USERS_RELOAD_INTERVAL
+секунд), и изменения применяются без перезапуска циклов символов: новые
+пары подключаются к уже работающим движкам, новые параметры подменяются
+в стратегиях с сохранением позиций.
+
+Бюджет памяти. Пользователь без позиций и ордеров хранит только запись
+конфигурации и по записи стратегии (ScalpingStrategy со __slots__) на пару:
+подписки, стаканы, движки и индикаторы общие для символа. Одинаковые наборы
+параметров делят один объект StrategyParams, имена пар интернируются.
+Простаивающий пользователь с IDLE_USER_PAIRS парами должен укладываться
+в IDLE_USER_MEMORY_BUDGET байт; это проверяет tests/unit/test_tenants.py.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+from dataclasses import astuple, dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from managers.notification_manager import DEFAULT_USER
+
+from .strategy import StrategyParams
+
+if TYPE_CHECKING:
+    from managers.exchange_manager import ExchangeClient
+    from managers.notification_manager import NotificationManager
+
+    from .bot_logic import TradingBot
+
+# Бюджет памяти простаивающего пользователя (байт) и число пар, для которого он задан
+IDLE_USER_MEMORY_BUDGET = 1024
+IDLE_USER_PAIRS = 3
+
+# Формат символа биржи: базовый и котируемый активы без разделителя
+_SYMBOL_PATTERN = re.compile(r"[A-Z0-9]{5,20}")
+
+
+@dataclass(slots=True)
+class UserConfig:
+    """Настройки одного пользователя."""
+
+    pairs: tuple[str, ...]
+    params: StrategyParams
+    telegram_chat_id: str | int | None = None
+
+
+class TenantManager:
+    """Реестр пользователей: загрузка конфигурации и подключение стратегий к боту."""
+
+    def __init__(
+        self,
+        bot: "TradingBot",
+        notifications: "NotificationManager | None" = None,
+        path: str | Path | None = None,
+        reload_interval: float | None = None,
+        exchange: "ExchangeClient | None" = None,
+    ):
+        """
+        :param bot: Бот, на символах которого работают стратегии пользователей.
+        :param notifications: Менеджер уведомлений, которому передаются чаты
+            Telegram пользователей.
+        :param path: Файл конфигурации пользователей (USERS_FILE).
+        :param reload_interval: Период проверки изменений файла, сек (USERS_RELOAD_INTERVAL).
+        :param exchange: REST-клиент, по метаданным которого проверяются символы пар.
+        """
+        if bot.live_trading:
+            raise RuntimeError(
+                "Multi-tenant users are not supported with LIVE_TRADING=1: "
+                "all orders would be placed on the operator's account."
+            )
+        self.bot = bot
+        self._notifications = notifications
+        self.path = Path(path or os.getenv("USERS_FILE", "users.json"))
+        self.reload_interval = reload_interval or float(
+            os.getenv("USERS_RELOAD_INTERVAL", "5")
+        )
+        self._users: dict[str, UserConfig] = {}
+        # Общие объекты параметров: пользователи с одинаковыми настройками делят один
+        self._params: dict[tuple, StrategyParams] = {}
+        self._mtime: int | None = None
+        self._exchange = exchange
+        # Торгуемые символы биржи (None — проверяется только формат)
+        self._symbols: frozenset[str] | None = None
+        self._exchange_info: dict[str, Any] | None = None
+        self._task: asyncio.Task | None = None
+        self.reloads: int = 0
+        self.reload_errors: int = 0
+        self.last_error: str | None = None
+
+    async def start(self):
+        """Загружает пользователей и запускает отслеживание изменений файла."""
+        await self.reload()
+        self._task = asyncio.create_task(self._reload_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload()
+
+    async def reload(self) -> bool:
+        """Перечитывает файл, если он изменился. Возвращает True, если конфигурация применена."""
+        try:
+            if self._exchange is not None:
+                # Метаданные кэшируются клиентом: запрос к бирже раз в их TTL
+                info = await self._exchange.get_exchange_info()
+                if info is not self._exchange_info:
+                    self._exchange_info = info
+                    self._symbols = frozenset(
+                        s["symbol"]
+                        for s in info.get("symbols", ())
+                        if s.get("status") == "TRADING"
+                    )
+            # Разбор файла на тысячи пользователей не должен занимать event loop
+            loaded = await asyncio.to_thread(self._read)
+            if loaded is None:
+                return False
+            mtime, users = loaded
+            changes = self.apply(users)
+        except Exception as e:
+            self.reload_errors += 1
+            # Одна и та же ошибка не повторяется в логе на каждой проверке
+            if repr(e) != self.last_error:
+                logger.error(f"Failed to load users from {self.path}: {e!r}")
+            self.last_error = repr(e)
+            return False
+        # Файл считается загруженным только после применения: иначе он перечитывается
+        self._mtime = mtime
+        self.reloads += 1
+        self.last_error = None
+        logger.info(
+            f"Users config loaded from {self.path}: {len(users)} users "
+            f"({changes['added']} added, {changes['updated']} updated, "
+            f"{changes['removed']} removed)."
+        )
+        return True
+
+    def _read(self) -> tuple[int, dict[str, UserConfig]] | None:
+        """Читает и разбирает файл, если он изменился с прошлой загрузки."""
+        mtime = self.path.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return None
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("users file must contain a JSON object")
+        return mtime, self.parse(data)
+
+    def parse(self, data: dict[str, Any]) -> dict[str, UserConfig]:
+        """Разбирает конфигурацию пользователей; пользователи с ошибками пропускаются."""
+        users = {}
+        for user_id, raw in data.items():
+            if user_id == DEFAULT_USER:
+                # Пары DEFAULT_USER задаются TRADING_PAIRS и управляются через API
+                logger.warning(f"User id '{DEFAULT_USER}' is reserved, skipped.")
+                continue
+            try:
+                users[sys.intern(user_id)] = self._parse_user(raw)
+            except (TypeError, ValueError, KeyError, AttributeError) as e:
+                logger.error(f"Invalid config of user {user_id}, skipped: {e!r}")
+        return users
+
+    def _parse_user(self, raw: dict[str, Any]) -> UserConfig:
+        pairs = raw["pairs"]
+        if not isinstance(pairs, list) or not all(isinstance(p, str) for p in pairs):
+            raise TypeError("'pairs' must be a list of symbols")
+        # Имена пар интернируются: тысячи пользователей ссылаются на одну строку
+        pairs = tuple(dict.fromkeys(self._symbol(pair) for pair in pairs))
+        params = raw.get("params", {})
+        if not isinstance(params, dict):
+            raise TypeError("'params' must be an object")
+        base = self.bot.strategy_params
+        overrides = {
+            name: type(getattr(base, name))(value) for name, value in params.items()
+        }
+        params = replace(base, **overrides)
+        self._check_params(params)
+        params = self._params.setdefault(astuple(params), params)
+        return UserConfig(pairs, params, raw.get("telegram_chat_id"))
+
+    @staticmethod
+    def _check_params(params: StrategyParams):
+        """Проверяет диапазоны параметров: ошибка не должна дойти до стратегий бота."""
+        if params.ema_period < 1:
+            raise ValueError("'ema_period' must be at least 1")
+        for name in ("entry_bps", "take_profit_bps", "stop_loss_bps", "max_spread_bps"):
+            if not getattr(params, name) >= 0:
+                raise ValueError(f"'{name}' must not be negative")
+        if not params.order_qty > 0:
+            raise ValueError("'order_qty' must be positive")
+
+    def _symbol(self, pair: str) -> str:
+        symbol = pair.strip().upper()
+        if not _SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"invalid symbol {pair!r}")
+        if self._symbols is not None and symbol not in self._symbols:
+            raise ValueError(f"symbol {symbol} is not traded on the exchange")
+        return sys.intern(symbol)
+
+    def apply(self, users: dict[str, UserConfig]) -> dict[str, int]:
+        """
+        Приводит стратегии бота к новой конфигурации: подключает новых
+        пользователей, отключает удаленных и обновляет измененных на месте.
+        Стратегии, отключенные ботом после ошибки, подключаются заново.
+        """
+        bot = self.bot
+        changes = {"added": 0, "updated": 0, "removed": 0}
+        for user_id in self._users.keys() - users.keys():
+            for pair in self._users.pop(user_id).pairs:
+                bot.remove_strategy(pair, user_id)
+            if self._notifications is not None:
+                self._notifications.set_chat_id(user_id, None)
+            changes["removed"] += 1
+
+        for user_id, config in users.items():
+            old = self._users.get(user_id)
+            # Неизменившийся пользователь пропускается, если бот не отключил
+            # какую-то из его стратегий после ошибки
+            if old == config and all(
+                bot.has_strategy(pair, user_id) for pair in config.pairs
+            ):
+                continue
+            if old is not None:
+                for pair in old.pairs:
+                    if pair not in config.pairs:
+                        bot.remove_strategy(pair, user_id)
+            for pair in config.pairs:
+                bot.set_strategy(pair, user_id, config.params)
+            if self._notifications is not None and (
+                old is None or old.telegram_chat_id != config.telegram_chat_id
+            ):
+                self._notifications.set_chat_id(user_id, config.telegram_chat_id)
+            self._users[user_id] = config
+            changes["added" if old is None else "updated"] += 1
+
+        # Наборы параметров, которыми больше никто не пользуется, не держим
+        self._params = {astuple(c.params): c.params for c in self._users.values()}
+        return changes
+
+    def get(self, user_id: str) -> UserConfig | None:
+        return self._users.get(user_id)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Число пользователей, их стратегий и символов, состояние загрузки конфигурации."""
+        counts = self.bot.get_strategy_counts()
+        return {
+            "users": len(self._users),
+            "strategies": sum(len(c.pairs) for c in self._users.values()),
+            "symbols": len(counts),
+            "max_users_per_symbol": max(counts.values(), default=0),
+            "param_sets": len(self._params),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error,
+        }
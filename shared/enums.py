@@ -10,4 +10,76 @@ class BotStatus(str, Enum):
 
     RUNNING = "Running"
     STOPPED = "Stopped"
+    # Цикл пары упал и будет перезапущен после задержки
+    RESTARTING = "Restarting"
+    # Цикл пары остановлен надзором: исчерпаны перезапуски или блокирует event loop
+    FAILED = "Failed"
     UNKNOWN = "Unknown"
+
+
+class RestartPolicy(str, Enum):
+    """Политика перезапуска задачи под надзором TaskSupervisor."""
+
+    NEVER = "never"  # Упавшая задача помечается как Failed
+    ON_FAILURE = "on-failure"  # Перезапуск только после исключения
+    ALWAYS = "always"  # Перезапуск и после штатного завершения
+
+
+class ComputeMode(str, Enum):
+    """Где выполняются тяжелые вычисления, вынесенные из циклов пар."""
+
+    INLINE = "inline"  # В event loop (без пула)
+    THREAD = "thread"  # Пул потоков: numpy и ввод-вывод отпускают GIL
+    PROCESS = "process"  # Пул процессов: чистый Python без конкуренции за GIL
+
+
+class MarketEventType(str, Enum):
+    """Перечисление типов рыночных событий, поступающих в движок пары."""
+
+    TICK = "tick"  # Новая сделка (последняя цена)
+    BOOK = "book"  # Обновление лучших цен стакана
+    DEPTH = "depth"  # Инкрементальное обновление (diff) стакана L2
+
+
+class OrderStatus(str, Enum):
+    """Перечисление статусов ордера (совпадают со статусами биржи Binance)."""
+
+    PENDING = "PENDING"  # Запрос отправлен, подтверждение (ACK) еще не получено
+    NEW = "NEW"
+    PARTIALLY_FILLED = "PARTIALLY_FILLED"
+    FILLED = "FILLED"
+    CANCELED = "CANCELED"
+    REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
+    EXPIRED_IN_MATCH = "EXPIRED_IN_MATCH"  # Отменен биржей защитой от self-trade
+
+    @property
+    def is_terminal(self) -> bool:
+        """True, если ордер больше не может измениться."""
+        return self in (
+            OrderStatus.FILLED,
+            OrderStatus.CANCELED,
+            OrderStatus.REJECTED,
+            OrderStatus.EXPIRED,
+            OrderStatus.EXPIRED_IN_MATCH,
+        )
+
+
+class NotificationPriority(str, Enum):
+    """Перечисление приоритетов уведомлений (в порядке убывания срочности)."""
+
+    CRITICAL = "critical"  # Отправляется сразу, минуя дайджесты
+    NORMAL = "normal"
+    LOW = "low"  # Отбрасывается первым при переполнении очереди
+
+    @property
+    def rank(self) -> int:
+        """Порядковый номер приоритета: 0 — самый срочный."""
+        return _NOTIFICATION_RANKS[self]
+
+
+_NOTIFICATION_RANKS = {
+    NotificationPriority.CRITICAL: 0,
+    NotificationPriority.NORMAL: 1,
+    NotificationPriority.LOW: 2,
+}
@@ -0,0 +1,8 @@
+"""Общие настройки pytest: корень проекта в sys.path для импорта managers, server, shared."""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
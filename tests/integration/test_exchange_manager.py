@@ -0,0 +1,152 @@
+"""REST-клиент биржи против мок-сервера: параметры ордера на сетке символа
+и кэш метаданных символов."""
+
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from managers.exchange_manager import ExchangeClient, InvalidOrderError
+from managers.order_manager import OrderManager, OrderRequest
+
+
+class MockExchange:
+    """Мок-сервер Binance Spot: метаданные символа и прием ордеров."""
+
+    def __init__(self):
+        self.orders: list[dict[str, str]] = []
+        self.info_requests = 0
+        self.info_fails = False
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        params = {k: v[0] for k, v in parse_qs(request.url.query.decode()).items()}
+        if request.url.path == "/api/v3/exchangeInfo":
+            self.info_requests += 1
+            if self.info_fails:
+                return httpx.Response(503, text="Service Unavailable")
+            symbols = [
+                {
+                    "symbol": "SOLUSDT",
+                    "filters": [
+                        {"filterType": "PRICE_FILTER", "tickSize": "0.01000000"},
+                        {
+                            "filterType": "LOT_SIZE",
+                            "stepSize": "0.00100000",
+                            "minQty": "0.00100000",
+                        },
+                        {"filterType": "NOTIONAL", "minNotional": "5.00000000"},
+                    ],
+                },
+                {
+                    "symbol": "SHIBUSDT",
+                    "filters": [
+                        {"filterType": "PRICE_FILTER", "tickSize": "0.00000001"},
+                        {"filterType": "LOT_SIZE", "stepSize": "1.00000000"},
+                    ],
+                },
+            ]
+            symbols = [
+                s for s in symbols if params.get("symbol", s["symbol"]) == s["symbol"]
+            ]
+            return httpx.Response(200, json={"symbols": symbols})
+        if request.url.path == "/api/v3/order":
+            self.orders.append(params)
+            return httpx.Response(200, json={"orderId": len(self.orders)})
+        return httpx.Response(404, json={"code": -1, "msg": "Unknown endpoint."})
+
+
+def _client(mock: MockExchange, **kwargs) -> ExchangeClient:
+    return ExchangeClient(
+        base_url="https://mock",
+        api_key="key",
+        api_secret="secret",
+        transport=httpx.MockTransport(mock.handle),
+        **kwargs,
+    )
+
+
+def test_order_params_are_aligned_to_symbol_grid():
+    async def scenario():
+        mock = MockExchange()
+        client = _client(mock)
+        try:
+            await client.place_order("SOLUSDT", "BUY", "LIMIT", 0.1 + 0.2, 151.23456)
+            await client.place_order(
+                "SHIBUSDT", "SELL", "LIMIT", 1_234_567.9, 1.234e-05
+            )
+            await client.place_order("SOLUSDT", "BUY", "MARKET", 1.9999)
+        finally:
+            await client.close()
+        return mock
+
+    mock = asyncio.run(scenario())
+
+    assert [(o["quantity"], o.get("price")) for o in mock.orders] == [
+        ("0.300", "151.23"),
+        # f"{1.234e-05:f}" дал бы 0.000012
+        ("1234567", "0.00001234"),
+        # Количество округляется вниз: больше доступного не продаем
+        ("1.999", None),
+    ]
+    # Метаданные запрашиваются по символу один раз, дальше берутся из кэша
+    assert mock.info_requests == 2
+
+
+def test_order_registry_keeps_aligned_quantity():
+    async def scenario():
+        mock = MockExchange()
+        client = _client(mock)
+        orders = OrderManager(exchange=client)
+        try:
+            return await orders.place_order(
+                OrderRequest("SOLUSDT", "BUY", "LIMIT", 2.0005, price=99.999)
+            )
+        finally:
+            await client.close()
+
+    order = asyncio.run(scenario())
+
+    assert (order.quantity, order.price) == (2.0, 100.0)
+
+
+def test_orders_below_symbol_minimums_are_not_sent():
+    async def scenario():
+        mock = MockExchange()
+        client = _client(mock)
+        try:
+            # Округление вниз дает 0
+            with pytest.raises(InvalidOrderError):
+                await client.place_order("SOLUSDT", "BUY", "MARKET", 0.0009)
+            with pytest.raises(InvalidOrderError):
+                await client.place_order("SOLUSDT", "BUY", "LIMIT", 0.01, 100.0)
+        finally:
+            await client.close()
+        return mock
+
+    assert asyncio.run(scenario()).orders == []
+
+
+def test_stale_symbol_metadata_is_refreshed_in_background():
+    async def scenario():
+        mock = MockExchange()
+        client = _client(mock, metadata_ttl=0.01)
+        try:
+            await client.place_order("SOLUSDT", "BUY", "MARKET", 1.0)
+            await asyncio.sleep(0.02)
+            # Обновление не удалось: ордер уходит по устаревшим метаданным
+            mock.info_fails = True
+            await client.place_order("SOLUSDT", "BUY", "MARKET", 1.0)
+            await asyncio.gather(*client._symbol_refreshes.values())
+            assert mock.info_requests == 2
+            await client.place_order("SOLUSDT", "BUY", "MARKET", 1.0)
+            assert not client._symbol_refreshes
+            # После неудачи обновление не повторяется на каждом ордере
+            assert mock.info_requests == 2
+        finally:
+            await client.close()
+        return mock
+
+    mock = asyncio.run(scenario())
+
+    assert [o["quantity"] for o in mock.orders] == ["1.000"] * 3
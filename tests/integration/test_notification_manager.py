@@ -0,0 +1,94 @@
+"""Конвейер уведомлений против мок-сервера Telegram: дайджесты, приоритеты, переполнение."""
+
+import asyncio
+import json
+
+import httpx
+
+from managers.notification_manager import DEFAULT_USER, NotificationManager
+from managers.telegram_manager import TelegramClient
+from shared.enums import NotificationPriority
+
+# Групповой чат: минутный лимит не задерживает несколько сообщений подряд
+CHAT_ID = "-100123"
+
+
+class MockTelegram:
+    """Мок-сервер Bot API: запоминает тексты отправленных сообщений."""
+
+    def __init__(self):
+        self.texts: list[str] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.texts.append(json.loads(request.content)["text"])
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+
+def _run(scenario, **kwargs) -> list[str]:
+    """Выполняет scenario(manager) и возвращает тексты, дошедшие до Telegram."""
+    mock = MockTelegram()
+
+    async def main():
+        telegram = TelegramClient(
+            token="token",
+            base_url="https://mock",
+            transport=httpx.MockTransport(mock.handle),
+        )
+        manager = NotificationManager(
+            telegram, chat_ids={DEFAULT_USER: CHAT_ID}, **kwargs
+        )
+        try:
+            scenario(manager)
+            await manager.stop()
+        finally:
+            await telegram.close()
+
+    asyncio.run(main())
+    return mock.texts
+
+
+def test_burst_of_fills_is_coalesced_into_digest():
+    def scenario(manager):
+        for i in range(12):
+            manager.notify(f"KASUSDT: BUY {i + 1}", kind="fill", pair="KASUSDT")
+
+    texts = _run(scenario, digest_window=60)
+
+    # Первое исполнение уходит сразу, остальные — одним дайджестом при остановке
+    assert texts[0] == "KASUSDT: BUY 1"
+    assert len(texts) == 2
+    assert texts[1].startswith("11 fills on KASUSDT")
+    assert texts[1].endswith("Latest: KASUSDT: BUY 12")
+
+
+def test_critical_notification_skips_digest():
+    def scenario(manager):
+        manager.notify("KASUSDT: BUY 1", kind="fill", pair="KASUSDT")
+        manager.notify("KASUSDT: BUY 2", kind="fill", pair="KASUSDT")
+        manager.notify(
+            "KASUSDT: fill rejected",
+            priority=NotificationPriority.CRITICAL,
+            kind="fill",
+            pair="KASUSDT",
+        )
+        # Срочное уведомление не попало в окно дайджеста
+        assert manager._digests[(DEFAULT_USER, "fill", "KASUSDT")].count == 1
+
+    texts = _run(scenario, digest_window=60)
+
+    assert texts == ["KASUSDT: fill rejected", "KASUSDT: BUY 1", "KASUSDT: BUY 2"]
+
+
+def test_queue_overflow_drops_lowest_priority_first():
+    def scenario(manager):
+        # Отправитель еще не запущен: уведомления копятся в очереди
+        manager.notify("low 1", priority=NotificationPriority.LOW, pair="A")
+        manager.notify("low 2", priority=NotificationPriority.LOW, pair="B")
+        manager.notify("normal 1", pair="C")
+        manager.notify("normal 2", pair="D")
+        manager.alert("critical", pair="E")
+        assert manager.get_stats()["queued"] == 3
+
+    texts = _run(scenario, max_queue_size=3)
+
+    assert texts == ["critical", "normal 1", "normal 2"]
@@ -0,0 +1,108 @@
+"""Локальный кэш RedisManager: инвалидация через pub/sub (fakeredis)."""
+
+import asyncio
+
+import fakeredis
+
+from managers.redis_manager import RedisManager
+
+
+async def _manager(server: fakeredis.FakeServer) -> RedisManager:
+    manager = RedisManager(
+        client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+    await manager.start()
+    return manager
+
+
+async def _until(condition, timeout: float = 2.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+class BrokenPubSub:
+    """Подписка, соединение которой обрывается на первом чтении."""
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def subscribe(self, channel: str):
+        await self._pubsub.subscribe(channel)
+
+    async def listen(self):
+        raise ConnectionError("connection reset")
+        yield
+
+    async def aclose(self):
+        await self._pubsub.aclose()
+
+
+def test_listener_resubscribes_and_clears_cache():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        writer = await _manager(server)
+        reader = RedisManager(
+            client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+            cache_ttl=60,
+        )
+        pubsub = reader.redis.pubsub
+        calls = 0
+
+        def flaky_pubsub(**kwargs):
+            nonlocal calls
+            calls += 1
+            return BrokenPubSub(pubsub(**kwargs)) if calls == 1 else pubsub(**kwargs)
+
+        reader.redis.pubsub = flaky_pubsub
+        await writer.set("price", "1")
+        assert await reader.cached("price") == "1"
+        await reader.start()
+        try:
+            await _until(lambda: reader.invalidation_reconnects == 1)
+            # Инвалидации, пропущенные без подписки, не восстановить: кэш очищен
+            assert reader.get_stats()["cache_keys"] == 0
+            await _until(lambda: calls == 2)
+            assert await reader.cached("price") == "1"
+            await asyncio.sleep(0.05)
+
+            await writer.set_and_invalidate("price", "2")
+            await _until(lambda: reader.get_stats()["cache_keys"] == 0)
+            assert await reader.cached("price") == "2"
+        finally:
+            await reader.close()
+            await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_load_in_flight_during_invalidation_is_not_cached():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        manager = RedisManager(
+            client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+            cache_ttl=60,
+        )
+        await manager.set("price", "1")
+        execute = manager.execute
+        release = asyncio.Event()
+
+        async def slow_execute(*args):
+            value = await execute(*args)
+            await release.wait()
+            return value
+
+        manager.execute = slow_execute
+        load = asyncio.create_task(manager.cached("price"))
+        await asyncio.sleep(0.01)
+        # Запись и инвалидация пришли, пока чтение старого значения в пути
+        manager.execute = execute
+        await manager.set("price", "2")
+        manager.invalidate_local("price")
+        release.set()
+
+        assert await load == "1"
+        assert await manager.cached("price") == "2"
+        await manager.redis.aclose()
+
+    asyncio.run(scenario())
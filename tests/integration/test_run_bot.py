@@ -0,0 +1,50 @@
+"""Проверки здоровья и поток статусов API до готовности процесса."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from server import run_bot
+from server.run_bot import app
+from server.status_stream import StatusBroadcaster
+
+
+@pytest.fixture(autouse=True)
+def log_to_tmp(monkeypatch, tmp_path):
+    # Lifespan настраивает логгер: файлы логов тестов не должны попадать в ./logs
+    setup_logger = run_bot.setup_logger
+    monkeypatch.setattr(
+        run_bot,
+        "setup_logger",
+        lambda name, **kwargs: setup_logger(name, log_dir=tmp_path, **kwargs),
+    )
+
+
+@pytest.fixture
+def client():
+    # Без lifespan: состояние процесса задается тестом, менеджеры не запускаются
+    app.state.mode = "embedded"
+    app.state.ready = asyncio.Event()
+    app.state.init_error = None
+    app.state.status_stream = StatusBroadcaster()
+    return TestClient(app)
+
+
+def test_liveness_fails_after_initialization_error(client):
+    assert client.get("/health/live").status_code == 200
+    assert client.get("/health/ready").json()["status"] == "starting"
+
+    app.state.init_error = "ConnectError('redis')"
+
+    response = client.get("/health/live")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+
+
+def test_status_stream_asks_to_retry_until_ready(client):
+    with client.websocket_connect("/ws/status") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_text()
+    assert closed.value.code == 1013
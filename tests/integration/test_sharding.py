@@ -0,0 +1,169 @@
+"""Шардирование пар между воркерами через общий Redis (fakeredis)."""
+
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from managers.redis_manager import RedisManager
+from server.bot_logic import TradingBot
+from server.sharding import (
+    DESIRED_PAIRS_KEY,
+    STATUS_CHANNEL,
+    PairLeaseCoordinator,
+    ShardedBotClient,
+    lease_key,
+)
+
+PAIRS = [f"P{i}USDT" for i in range(12)]
+
+
+@pytest.fixture(autouse=True)
+def trading_pairs(monkeypatch):
+    monkeypatch.setenv("TRADING_PAIRS", ",".join(PAIRS))
+
+
+class Cluster:
+    """Воркеры с отдельными ботами и соединениями к одному серверу Redis."""
+
+    def __init__(self):
+        self.server = fakeredis.FakeServer()
+        self.workers: list[PairLeaseCoordinator] = []
+
+    async def redis(self) -> RedisManager:
+        manager = RedisManager(
+            client=fakeredis.FakeAsyncRedis(server=self.server, decode_responses=True)
+        )
+        await manager.start()
+        return manager
+
+    async def add_worker(self, **kwargs) -> PairLeaseCoordinator:
+        redis = await self.redis()
+        worker = PairLeaseCoordinator(
+            TradingBot(), redis, worker_id=f"w{len(self.workers)}", **kwargs
+        )
+        self.workers.append(worker)
+        return worker
+
+    def running(self) -> list[str]:
+        """Пары, исполняемые ботами всех воркеров (с повторами)."""
+        return [pair for w in self.workers for pair in w.bot._pair_engines]
+
+
+async def _desire(cluster: Cluster, pairs: list[str]):
+    redis = await cluster.redis()
+    await redis.execute("SADD", DESIRED_PAIRS_KEY, *pairs)
+
+
+async def _rounds(workers: list[PairLeaseCoordinator], count: int = 3):
+    for _ in range(count):
+        for worker in workers:
+            await worker.rebalance()
+
+
+def test_each_pair_runs_on_exactly_one_worker():
+    async def scenario():
+        cluster = Cluster()
+        await _desire(cluster, PAIRS)
+        workers = [await cluster.add_worker() for _ in range(3)]
+        await _rounds(workers)
+
+        running = cluster.running()
+        assert sorted(running) == sorted(PAIRS)
+        assert all(w.owned_pairs for w in workers)
+        redis = await cluster.redis()
+        for worker in workers:
+            for pair in worker.owned_pairs:
+                assert await redis.execute("GET", lease_key(pair)) == worker.worker_id
+
+        # Ушедший воркер отдает аренды, остальные забирают его пары
+        await workers[0].stop()
+        cluster.workers.remove(workers[0])
+        await _rounds(workers[1:])
+        assert sorted(cluster.running()) == sorted(PAIRS)
+        for worker in workers[1:]:
+            await worker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_hung_redis_stops_pairs_before_lease_expires():
+    async def scenario():
+        cluster = Cluster()
+        await _desire(cluster, PAIRS)
+        # Большой таймаут команд: пары должна остановить проверка срока аренд
+        hung = await cluster.add_worker(
+            lease_ttl=1.0, heartbeat_interval=0.1, command_timeout=30
+        )
+        await hung.start()
+        await asyncio.sleep(0.3)
+        assert sorted(hung.bot._pair_engines) == sorted(PAIRS)
+
+        async def hang(*args):
+            await asyncio.Event().wait()
+
+        hung._redis.execute = hang
+        other = await cluster.add_worker(lease_ttl=1.0, heartbeat_interval=0.1)
+        await other.start()
+
+        deadline = asyncio.get_running_loop().time() + 3
+        stopped_after = None
+        while asyncio.get_running_loop().time() < deadline:
+            running = cluster.running()
+            # Ни в один момент пара не исполняется дважды
+            assert len(running) == len(set(running))
+            if stopped_after is None and not hung.bot._pair_engines:
+                stopped_after = asyncio.get_running_loop().time()
+            if sorted(other.bot._pair_engines) == sorted(PAIRS):
+                break
+            await asyncio.sleep(0.02)
+
+        assert stopped_after is not None
+        assert sorted(other.bot._pair_engines) == sorted(PAIRS)
+        assert hung.leases_lost == len(PAIRS)
+        for task in hung._tasks:
+            task.cancel()
+        await other.stop()
+
+    asyncio.run(scenario())
+
+
+def test_status_listener_resubscribes_after_disconnect():
+    async def scenario():
+        cluster = Cluster()
+        api_redis = await cluster.redis()
+        pubsub = api_redis.redis.pubsub
+        failures = []
+
+        class BrokenPubSub:
+            async def subscribe(self, *channels):
+                raise ConnectionError("connection reset")
+
+            async def aclose(self):
+                pass
+
+        def flaky_pubsub(**kwargs):
+            # Первая подписка падает, как при обрыве соединения с Redis
+            if not failures:
+                failures.append(True)
+                return BrokenPubSub()
+            return pubsub(**kwargs)
+
+        api_redis.redis.pubsub = flaky_pubsub
+        client = ShardedBotClient(api_redis)
+        received = asyncio.Event()
+        client.add_status_listener(lambda pair, status: received.set())
+        await client.start()
+
+        publisher = await cluster.redis()
+        message = json.dumps({"pair": PAIRS[0], "status": "Running", "worker": "w0"})
+        deadline = asyncio.get_running_loop().time() + 3
+        while not received.is_set() and asyncio.get_running_loop().time() < deadline:
+            await publisher.publish(STATUS_CHANNEL, message)
+            await asyncio.sleep(0.05)
+
+        await client.close()
+        return failures, received.is_set()
+
+    assert asyncio.run(scenario()) == ([True], True)
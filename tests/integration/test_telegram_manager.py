@@ -0,0 +1,90 @@
+"""Клиент Telegram против мок-сервера Bot API: 429 с retry_after и повтор после 5xx."""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from managers.telegram_manager import TelegramClient
+
+CHAT_ID = "123456789"
+# Групповой чат: минутный лимит не задерживает повтор отправки
+GROUP_CHAT_ID = "-100123"
+
+
+class MockTelegram:
+    """Мок-сервер Bot API: отвечает заданными ответами, затем принимает сообщения."""
+
+    def __init__(self, *responses: httpx.Response):
+        self.responses = list(responses)
+        self.requests = 0
+        self.messages: list[dict] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.responses:
+            return self.responses.pop(0)
+        message = json.loads(request.content)
+        self.messages.append(message)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+
+def _client(mock: MockTelegram) -> TelegramClient:
+    return TelegramClient(
+        token="token",
+        base_url="https://mock",
+        transport=httpx.MockTransport(mock.handle),
+    )
+
+
+def test_rate_limit_blocks_chat_for_retry_after():
+    mock = MockTelegram(
+        httpx.Response(
+            429,
+            json={
+                "ok": False,
+                "description": "Too Many Requests: retry after 0.2",
+                "parameters": {"retry_after": 0.2},
+            },
+        )
+    )
+
+    async def scenario():
+        client = _client(mock)
+        try:
+            started = time.monotonic()
+            await client.send_message(CHAT_ID, "hello")
+            return time.monotonic() - started, client.get_stats()
+        finally:
+            await client.close()
+
+    elapsed, stats = asyncio.run(scenario())
+
+    # Повтор ушел только после паузы, которую потребовал Telegram
+    assert elapsed >= 0.2
+    assert stats["rate_limit_hits"] == 1
+    assert [m["text"] for m in mock.messages] == ["hello"]
+
+
+def test_server_error_is_retried(monkeypatch):
+    mock = MockTelegram(httpx.Response(502, text="Bad Gateway"))
+
+    async def scenario():
+        sleep = asyncio.sleep
+        # Задержки повторов не ждем по-настоящему
+        monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(0))
+        client = _client(mock)
+        try:
+            await client.send_message(GROUP_CHAT_ID, "hello")
+            return client.get_stats()
+        finally:
+            monkeypatch.undo()
+            await client.close()
+
+    stats = asyncio.run(scenario())
+
+    assert mock.requests == 2
+    assert stats["errors"] == 1
+    assert stats["messages_sent"] == 1
+    assert [m["text"] for m in mock.messages] == ["hello"]
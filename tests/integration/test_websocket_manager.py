@@ -0,0 +1,179 @@
+"""WebsocketManager против локального WebSocket-сервера combined streams."""
+
+import asyncio
+import json
+import time
+
+import websockets
+
+from managers.websocket_manager import WebsocketManager
+
+
+class FakeStreamServer:
+    """Сервер, запоминающий SUBSCRIBE и отправляющий заданные кадры после подписки."""
+
+    def __init__(self, frames: list[str]):
+        self.frames = frames
+        self.subscribed: list[str] = []
+        # Подписанные потоки каждого принятого соединения
+        self.sessions: list[set[str]] = []
+        self._clients = []
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/stream"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def drop_clients(self):
+        """Разрывает все соединения, как биржа при сбое или обслуживании."""
+        for ws in self._clients:
+            await ws.close()
+
+    async def _handle(self, ws):
+        session: set[str] = set()
+        self.sessions.append(session)
+        self._clients.append(ws)
+        async for raw in ws:
+            request = json.loads(raw)
+            if request["method"] == "UNSUBSCRIBE":
+                session.difference_update(request["params"])
+            if request["method"] == "SUBSCRIBE":
+                session.update(request["params"])
+                self.subscribed.extend(request["params"])
+                await ws.send(json.dumps({"result": None, "id": request["id"]}))
+                for frame in self.frames:
+                    await ws.send(frame)
+
+
+def _trade(price: str, **fields) -> str:
+    data = {"p": price, "q": "1", "T": 1, **fields}
+    return json.dumps({"stream": "kasusdt@trade", "data": data})
+
+
+def _run_feed(frames: list[str], consumers: list, received: int) -> tuple:
+    """Подписывает потребителей на KASUSDT и ждет `received` событий."""
+
+    async def scenario():
+        server = FakeStreamServer(frames)
+        feed = WebsocketManager(url=await server.start())
+        events = []
+        for consumer in consumers:
+            feed.subscribe("KASUSDT", consumer)
+        feed.subscribe("KASUSDT", lambda pair, event: events.append(event))
+        await feed.start()
+        try:
+            async with asyncio.timeout(5):
+                while len(events) < received:
+                    await asyncio.sleep(0.01)
+            connection = feed._connections[0]
+            alive = not connection._task.done()
+            return server, feed, events, connection.get_stats(), alive
+        finally:
+            await feed.stop()
+            await server.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_subscribes_and_dispatches_trades():
+    server, _, events, stats, _ = _run_feed([_trade("0.5")], [], 1)
+
+    assert set(server.subscribed) == set(WebsocketManager.streams_for_pair("KASUSDT"))
+    assert events[0].data == {"price": 0.5, "qty": 1.0, "time": 1}
+    assert stats["messages"] == 1
+
+
+def test_book_ticker_is_stamped_with_receive_time():
+    # В bookTicker нет времени биржи (поля E)
+    data = {"u": 1, "s": "KASUSDT", "b": "0.49", "B": "10", "a": "0.51", "A": "20"}
+    frame = json.dumps({"stream": "kasusdt@bookTicker", "data": data})
+    before = int(time.time() * 1000)
+
+    _, _, events, _, _ = _run_feed([frame], [], 1)
+
+    book = dict(events[0].data)
+    received_at = book.pop("time")
+    assert book == {"bid": 0.49, "bid_qty": 10.0, "ask": 0.51, "ask_qty": 20.0}
+    assert before <= received_at <= int(time.time() * 1000)
+
+
+def test_malformed_frames_do_not_break_connection():
+    trade_without_time = json.dumps(
+        {"stream": "kasusdt@trade", "data": {"p": "0.4", "q": "1"}}
+    )
+    frames = ["not json", trade_without_time, '{"stream": "x"}', _trade("0.5")]
+
+    _, _, events, stats, alive = _run_feed(frames, [], 1)
+
+    assert [event.data["price"] for event in events] == [0.5]
+    assert stats["parse_errors"] == 3
+    assert stats["reconnects"] == 0
+    assert alive
+
+
+def test_failing_consumer_does_not_affect_others():
+    def broken(pair, event):
+        raise RuntimeError("consumer bug")
+
+    _, feed, events, stats, alive = _run_feed(
+        [_trade("0.5"), _trade("0.6")], [broken], 2
+    )
+
+    assert [event.data["price"] for event in events] == [0.5, 0.6]
+    assert feed.consumer_errors == 2
+    assert stats["reconnects"] == 0
+    assert alive
+
+
+def test_reconnect_resubscribes_all_streams():
+    async def wait_for(condition):
+        async with asyncio.timeout(5):
+            while not condition():
+                await asyncio.sleep(0.01)
+
+    async def scenario():
+        server = FakeStreamServer([])
+        feed = WebsocketManager(url=await server.start(), reconnect_min_delay=0.01)
+        feed.subscribe("KASUSDT", lambda pair, event: None)
+        feed.subscribe_raw("listenkey", lambda data: None)
+        await feed.start()
+        expected = {*WebsocketManager.streams_for_pair("KASUSDT"), "listenkey"}
+        try:
+            await wait_for(lambda: server.sessions and server.sessions[0] == expected)
+            await server.drop_clients()
+            await wait_for(lambda: len(server.sessions) == 2 and server.sessions[1])
+            return server.sessions, expected, feed.get_stats()
+        finally:
+            await feed.stop()
+            await server.stop()
+
+    sessions, expected, stats = asyncio.run(scenario())
+
+    assert sessions[1] == expected
+    (connection,) = stats.values()
+    assert connection["reconnects"] == 1
+    assert connection["streams"] == len(expected)
+
+
+def test_unsubscribe_raw_closes_empty_connection():
+    async def scenario():
+        feed = WebsocketManager(url="ws://127.0.0.1:1/stream")
+        feed.subscribe_raw("listenkey", lambda data: None)
+        connection = feed._connections[0]
+        await feed.start()
+
+        feed.unsubscribe_raw("listenkey")
+        closing = set(feed._closing)
+        await feed.stop()
+        return feed._connections, closing, connection
+
+    connections, closing, connection = asyncio.run(scenario())
+
+    assert connections == []
+    assert len(closing) == 1
+    assert connection._task is None
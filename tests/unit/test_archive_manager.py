@@ -0,0 +1,179 @@
+"""Архив рыночных данных: запись, чтение по диапазону, разбиение по суткам, восстановление."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from managers.archive_manager import (
+    DAY_MS,
+    INDEX_DTYPE,
+    INDEX_STRIDE,
+    KIND_BOOK,
+    KIND_TRADE,
+    TICK_DTYPE,
+    MarketArchive,
+    MarketRecorder,
+    _Segment,
+    day_of,
+)
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+PAIR = "SOLUSDT"
+# 2024-01-01 00:00:00 UTC
+DAY_START_MS = 1_704_067_200_000
+
+
+def _ticks(times) -> np.ndarray:
+    batch = np.zeros(len(times), dtype=TICK_DTYPE)
+    batch["time"] = times
+    batch["price"] = np.arange(len(times), dtype=float)
+    return batch
+
+
+def _read_times(archive: MarketArchive, start_ms: int, end_ms: int, **kwargs):
+    chunks = list(archive.read(PAIR, start_ms, end_ms, **kwargs))
+    if not chunks:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([chunk["time"] for chunk in chunks])
+
+
+def test_recorder_writes_events_readable_from_archive(tmp_path):
+    async def scenario():
+        recorder = MarketRecorder(tmp_path, batch_size=4)
+        recorder.start()
+        for i in range(10):
+            recorder.on_market_event(
+                PAIR,
+                MarketEvent(
+                    MarketEventType.TICK,
+                    {"price": 100.0 + i, "qty": 1.0, "time": DAY_START_MS + i},
+                ),
+            )
+        recorder.on_market_event(
+            PAIR,
+            MarketEvent(
+                MarketEventType.BOOK,
+                {"bid": 99.0, "ask": 101.0, "time": DAY_START_MS + 10},
+            ),
+        )
+        recorder.on_market_event(
+            PAIR,
+            MarketEvent(
+                MarketEventType.DEPTH,
+                {
+                    "first_id": 1,
+                    "last_id": 2,
+                    "bids": [(99.0, 5.0)],
+                    "asks": [(101.0, 3.0), (102.0, 0.0)],
+                    "time": DAY_START_MS + 11,
+                },
+            ),
+        )
+        await recorder.close()
+        return recorder.get_stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["written_rows"] == stats["recorded_rows"] == 14
+    archive = MarketArchive(tmp_path)
+    assert archive.pairs() == [PAIR]
+    (ticks,) = archive.read(PAIR, DAY_START_MS, DAY_START_MS + DAY_MS)
+    assert list(ticks["kind"]) == [KIND_TRADE] * 10 + [KIND_BOOK]
+    assert list(ticks["price"][:3]) == [100.0, 101.0, 102.0]
+    assert (ticks["bid"][-1], ticks["ask"][-1]) == (99.0, 101.0)
+    (depth,) = archive.read(PAIR, DAY_START_MS, DAY_START_MS + DAY_MS, table="depth")
+    assert list(depth["side"]) == [1, -1, -1]
+    assert list(depth["price"]) == [99.0, 101.0, 102.0]
+
+
+def test_range_read_uses_block_index(tmp_path):
+    rows = INDEX_STRIDE * 3 + 100
+    # Повторяющиеся отметки времени, как у пачки сделок в одну миллисекунду
+    times = DAY_START_MS + np.arange(rows) // 2
+    segment = _Segment(tmp_path / PAIR / day_of(DAY_START_MS) / "ticks", TICK_DTYPE)
+    segment.append(_ticks(times[:5000]))
+    segment.append(_ticks(times[5000:]))
+    segment.close()
+    archive = MarketArchive(tmp_path)
+
+    _, index = archive.open_segment(PAIR, day_of(DAY_START_MS))
+    assert list(index["row"]) == [0, INDEX_STRIDE, 2 * INDEX_STRIDE, 3 * INDEX_STRIDE]
+    assert list(index["time"]) == list(times[index["row"]])
+    for start, end in [
+        (DAY_START_MS, DAY_START_MS + 1),
+        (int(times[INDEX_STRIDE]), int(times[INDEX_STRIDE]) + 10),
+        (int(times[4000]), int(times[9000])),
+        (int(times[-1]), int(times[-1]) + 5),
+        (DAY_START_MS - 10, DAY_START_MS),
+    ]:
+        expected = times[(times >= start) & (times < end)]
+        assert np.array_equal(_read_times(archive, start, end), expected)
+    chunks = list(archive.read(PAIR, DAY_START_MS, int(times[-1]) + 1, chunk_size=1000))
+    assert sum(len(chunk["time"]) for chunk in chunks) == rows
+    assert max(len(chunk["time"]) for chunk in chunks) == 1000
+
+
+def test_batch_crossing_midnight_is_split_by_day(tmp_path):
+    recorder = MarketRecorder(tmp_path)
+    midnight = DAY_START_MS + DAY_MS
+    times = [midnight - 2, midnight - 1, midnight, midnight + 1]
+
+    recorder._write(PAIR, "ticks", _ticks(times))
+    for segment in recorder._segments.values():
+        segment.close()
+
+    archive = MarketArchive(tmp_path)
+    assert archive.days(PAIR) == [day_of(DAY_START_MS), day_of(midnight)]
+    assert list(_read_times(archive, DAY_START_MS, midnight)) == times[:2]
+    assert list(_read_times(archive, midnight, midnight + DAY_MS)) == times[2:]
+
+
+def test_segment_rebuilds_index_lost_in_a_crash(tmp_path):
+    path = tmp_path / PAIR / day_of(DAY_START_MS) / "ticks"
+    times = DAY_START_MS + np.arange(INDEX_STRIDE * 2 + 10)
+    segment = _Segment(path, TICK_DTYPE)
+    segment.append(_ticks(times[:100]))
+    segment.append(_ticks(times[100:]))
+    segment.close()
+    # Колонки записаны, а метки второй пачки в индекс не попали
+    (path / "index.bin").write_bytes((path / "index.bin").read_bytes()[:16])
+    # Колонка цены записана не до конца
+    price = (path / "price.bin").read_bytes()
+    (path / "price.bin").write_bytes(price[:-12])
+
+    segment = _Segment(path, TICK_DTYPE)
+    segment.close()
+
+    assert segment.rows == len(times) - 2
+    index = np.fromfile(path / "index.bin", dtype=INDEX_DTYPE)
+    assert list(index["row"]) == [0, INDEX_STRIDE, 2 * INDEX_STRIDE]
+    assert list(index["time"]) == list(times[index["row"]])
+    archive = MarketArchive(tmp_path)
+    start = int(times[INDEX_STRIDE + 5])
+    assert list(_read_times(archive, start, start + 3)) == [start, start + 1, start + 2]
+
+
+def test_failed_append_keeps_columns_aligned(tmp_path):
+    path = tmp_path / PAIR / day_of(DAY_START_MS) / "ticks"
+    segment = _Segment(path, TICK_DTYPE)
+    segment.append(_ticks(DAY_START_MS + np.arange(10)))
+    batch = _ticks(DAY_START_MS + np.arange(10, 20))
+    # Запись в колонку bid падает, когда предыдущие колонки пачки уже дописаны
+    bid = segment._files["bid"]
+    with open(path / "bid.bin", "rb") as read_only:
+        segment._files["bid"] = read_only
+        with pytest.raises(OSError):
+            segment.append(batch)
+    segment._files["bid"] = bid
+    segment.append(batch)
+    segment.close()
+
+    sizes = {
+        name: (path / f"{name}.bin").stat().st_size // TICK_DTYPE[name].itemsize
+        for name in TICK_DTYPE.names
+    }
+    assert set(sizes.values()) == {20}
+    times = _read_times(MarketArchive(tmp_path), DAY_START_MS, DAY_START_MS + 100)
+    assert list(times) == list(DAY_START_MS + np.arange(20))
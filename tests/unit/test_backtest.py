@@ -0,0 +1,166 @@
+"""Бэктест: итоги по исполнениям, симуляция исполнения, перебор сетки параметров."""
+
+import math
+
+import numpy as np
+import pytest
+
+from managers.archive_manager import KIND_BOOK, KIND_TRADE, TICK_DTYPE
+from server.backtest import (
+    FILL_DTYPE,
+    BacktestConfig,
+    FillSimulator,
+    _parse_grid,
+    compute_performance,
+    run_backtest,
+    run_sweep,
+    write_ticks,
+)
+from server.pair_engine import PairMarketState
+from server.strategy import OrderIntent, StrategyParams
+
+
+def _fills(*rows) -> np.ndarray:
+    return np.array(list(rows), dtype=FILL_DTYPE)
+
+
+def _book_ticks(mids: list[float]) -> np.ndarray:
+    ticks = np.zeros(len(mids), dtype=TICK_DTYPE)
+    ticks["time"] = np.arange(len(mids))
+    ticks["kind"] = KIND_BOOK
+    ticks["bid"] = np.array(mids) - 0.01
+    ticks["ask"] = np.array(mids) + 0.01
+    ticks["bid_qty"] = ticks["ask_qty"] = 10.0
+    return ticks
+
+
+def test_performance_of_round_trip():
+    fills = _fills((1, 1, 100.0, 1.0), (2, -1, 110.0, 1.0))
+
+    result = compute_performance(fills, fee_rate=0.001, last_price=120.0)
+
+    assert math.isclose(result["pnl"], 10.0 - 0.1 - 0.11)
+    assert math.isclose(result["fees"], 0.21)
+    # После покупки капитал ниже нуля на комиссию
+    assert math.isclose(result["max_drawdown"], 0.1)
+    assert result["fills"] == 2
+    assert result["round_trips"] == 1
+    assert math.isclose(result["volume"], 210.0)
+
+
+def test_performance_values_open_position_at_last_price():
+    fills = _fills((1, 1, 100.0, 2.0), (2, -1, 90.0, 1.0))
+
+    result = compute_performance(fills, fee_rate=0.0, last_price=80.0)
+
+    # Убыток 10 по закрытой части и 20 по открытой
+    assert math.isclose(result["pnl"], -30.0)
+    # Просадка считается по ценам исполнений: 2 по 100 оценены по 90
+    assert math.isclose(result["max_drawdown"], 20.0)
+    assert result["round_trips"] == 0
+
+
+def test_performance_without_fills():
+    result = compute_performance(_fills(), fee_rate=0.001, last_price=100.0)
+
+    assert result == {
+        "pnl": 0.0,
+        "fees": 0.0,
+        "max_drawdown": 0.0,
+        "fills": 0,
+        "round_trips": 0,
+        "volume": 0.0,
+    }
+
+
+def test_fill_simulator_slips_beyond_best_level():
+    simulator = FillSimulator(BacktestConfig(slippage_bps=10.0))
+    state = PairMarketState("SOLUSDT")
+    state.apply_book(99.0, 5.0, 100.0, 1.0, 7)
+    simulator.pending = OrderIntent("BUY", 3.0)
+
+    side, qty, price = simulator.execute(state)
+
+    # 1 по лучшей цене, 2 — на 10 б.п. хуже
+    assert (side, qty) == ("BUY", 3.0)
+    assert math.isclose(price, (100.0 + 2 * 100.1) / 3)
+    assert simulator.pending is None
+
+    simulator.pending = OrderIntent("SELL", 2.0)
+    assert simulator.execute(state)[2] == 99.0
+    fills = simulator.fills()
+    assert list(fills["side"]) == [1, -1]
+    assert list(fills["time"]) == [7, 7]
+
+
+def test_fill_simulator_waits_for_price():
+    simulator = FillSimulator(BacktestConfig(slippage_bps=10.0))
+    state = PairMarketState("SOLUSDT")
+    simulator.pending = OrderIntent("SELL", 1.0)
+
+    assert simulator.execute(state) is None
+    assert simulator.pending is not None
+
+    # Без стакана — по цене последней сделки, весь объем с проскальзыванием
+    state.apply_trade(50.0, 1.0, 1)
+    assert math.isclose(simulator.execute(state)[2], 50.0 * (1 - 0.001))
+
+
+def test_sweep_matches_single_runs_sorted_by_pnl(tmp_path):
+    path = tmp_path / "ticks.bin"
+    # Падение ниже EMA и возврат: вход и выход стратегии
+    mids = [100.0] * 10 + [99.0] * 3 + [100.0] * 3 + [98.0] * 3 + [97.0] * 3
+    write_ticks(path, _book_ticks(mids * 5))
+    trade = np.zeros(1, dtype=TICK_DTYPE)
+    trade["kind"] = KIND_TRADE
+    trade["price"] = 97.0
+    trade["time"] = len(mids) * 5
+    write_ticks(path, trade)
+    grid = {
+        "ema_period": [5],
+        "stop_loss_bps": [50.0, 500.0],
+        "take_profit_bps": [20.0],
+    }
+    config = BacktestConfig(chunk_size=7)
+
+    results = run_sweep(path, "SOLUSDT", grid, config, processes=2)
+
+    assert [r["pnl"] for r in results] == sorted(
+        (r["pnl"] for r in results), reverse=True
+    )
+    for result in results:
+        single = run_backtest(
+            path, "SOLUSDT", StrategyParams(**result["params"]), config
+        )
+        assert result["events"] == single["events"] == len(mids) * 5 + 1
+        assert result["fills"] == single["fills"] > 0
+        assert result["pnl"] == single["pnl"]
+    assert {r["params"]["stop_loss_bps"] for r in results} == {50.0, 500.0}
+
+
+@pytest.mark.parametrize(
+    "grid, error",
+    [
+        ({}, "grid is empty"),
+        ({"entry_bps": []}, "No values"),
+        ({"leverage": [1]}, "Unknown strategy parameter"),
+    ],
+)
+def test_sweep_rejects_invalid_grid(tmp_path, grid, error):
+    with pytest.raises(ValueError, match=error):
+        run_sweep(tmp_path / "ticks.bin", "SOLUSDT", grid)
+
+
+def test_sweep_rejects_invalid_process_count(tmp_path):
+    with pytest.raises(ValueError, match="processes"):
+        run_sweep(tmp_path / "ticks.bin", "SOLUSDT", {"entry_bps": [1.0]}, processes=0)
+
+
+def test_parse_grid():
+    assert _parse_grid(["ema_period=5,10", "entry_bps=3"]) == {
+        "ema_period": [5, 10],
+        "entry_bps": [3.0],
+    }
+    for items in (["ema_period="], ["entry_bps=3,,5"], ["ema_period=1.5"], ["ema"]):
+        with pytest.raises(SystemExit):
+            _parse_grid(items)
@@ -0,0 +1,230 @@
+"""
+TradingBot: задачи выставления ордеров привязаны к запущенной паре, неудачные
+ордера повторяются с задержкой, прогрев индикаторов не занимает event loop,
+ошибки стратегий отключают стратегию пользователя или перезапускают цикл пары.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from managers import scalping_manager
+from managers.notification_manager import DEFAULT_USER
+from managers.metrics_manager import REGISTRY
+from server import bot_logic
+from server.bot_logic import TradingBot
+from server.pair_engine import MarketEvent, PairMarketState
+from server.strategy import OrderIntent
+from server.supervisor import TaskSupervisor
+from shared.enums import BotStatus, ComputeMode, MarketEventType
+
+PAIR = "SOLUSDT"
+
+
+@pytest.fixture(autouse=True)
+def trading_pairs(monkeypatch):
+    monkeypatch.setenv("TRADING_PAIRS", PAIR)
+
+
+class HangingOrders:
+    """Менеджер ордеров, запрос на выставление которого не завершается."""
+
+    def __init__(self):
+        self.placing = 0
+        self.cancelled = 0
+
+    def add_fill_listener(self, listener):
+        pass
+
+    def register_owner(self, user_id: str):
+        pass
+
+    async def place_order(self, request):
+        self.placing += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class FailingOrders(HangingOrders):
+    """Менеджер ордеров, биржа которого недоступна."""
+
+    async def place_order(self, request):
+        self.placing += 1
+        raise ConnectionError("exchange is down")
+
+
+class Alerts:
+    def __init__(self):
+        self.texts: list[str] = []
+
+    def alert(self, text: str, user_id: str = DEFAULT_USER, pair: str | None = None):
+        self.texts.append(text)
+
+
+class SignalStrategy:
+    def __init__(self):
+        self.failed = 0
+
+    def on_market_update(self, state: PairMarketState) -> OrderIntent:
+        return OrderIntent("BUY", 1.0)
+
+    def on_order_failed(self):
+        self.failed += 1
+
+
+class BrokenStrategy:
+    def __init__(self):
+        self.updates = 0
+
+    def on_market_update(self, state: PairMarketState) -> OrderIntent:
+        self.updates += 1
+        raise KeyError("strategy bug")
+
+
+def test_stopping_pair_cancels_orders_in_flight():
+    async def scenario():
+        orders = HangingOrders()
+        bot = TradingBot(orders=orders)
+        bot.start_for_pair(PAIR)
+        bot._strategies[PAIR][DEFAULT_USER] = SignalStrategy()
+        bot._process_market_update(PAIR, PairMarketState(PAIR))
+        await asyncio.sleep(0)
+        assert orders.placing == 1
+
+        bot.stop_for_pair(PAIR)
+        await asyncio.sleep(0)
+        assert orders.cancelled == 1
+        await bot.close()
+
+    asyncio.run(scenario())
+
+
+def test_stopped_pair_metrics_are_not_exported():
+    async def scenario():
+        bot = TradingBot()
+        bot.start_for_pair(PAIR)
+        bot.publish_market_event(
+            PAIR, MarketEvent(MarketEventType.TICK, {"price": 100.0, "time": 0})
+        )
+        await asyncio.sleep(0.01)
+        assert f'pair="{PAIR}"' in REGISTRY.render()
+
+        bot.stop_for_pair(PAIR)
+        await bot.close()
+
+    asyncio.run(scenario())
+
+    assert f'pair="{PAIR}"' not in REGISTRY.render()
+
+
+def test_failed_orders_back_off_and_coalesce_alerts(monkeypatch):
+    monkeypatch.setattr(bot_logic, "ORDER_FAILURE_ALERT_EVERY", 3)
+
+    async def scenario():
+        orders = FailingOrders()
+        alerts = Alerts()
+        bot = TradingBot(orders=orders, notifications=alerts)
+        bot._order_retry_min = 0.01
+        bot.start_for_pair(PAIR)
+        bot._strategies[PAIR][DEFAULT_USER] = SignalStrategy()
+        state = PairMarketState(PAIR)
+        for _ in range(3):
+            # Тики сразу после неудачи не выставляют ордер повторно
+            for _ in range(5):
+                bot._process_market_update(PAIR, state)
+                await asyncio.sleep(0)
+            await asyncio.sleep(
+                bot._order_backoffs[(PAIR, DEFAULT_USER)].retry_at
+                - time.monotonic()
+                + 0.001
+            )
+        backoff = bot._order_backoffs[(PAIR, DEFAULT_USER)]
+        bot.stop_for_pair(PAIR)
+        await bot.close()
+        return orders.placing, alerts.texts, backoff.failures
+
+    placing, alerts, failures = asyncio.run(scenario())
+
+    assert placing == failures == 3
+    assert len(alerts) == 2
+    assert "3 failures in a row" in alerts[1]
+
+
+def test_inline_warm_up_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def warm_up_indicators(root, pair, start_ms, end_ms, params):
+        threads.append(threading.get_ident())
+        return "warmed"
+
+    monkeypatch.setattr(scalping_manager, "warm_up_indicators", warm_up_indicators)
+
+    class Recorder:
+        root = "archive"
+
+    class Indicators:
+        params = None
+        warmed = None
+
+        def begin_warm_up(self, pair):
+            pass
+
+        def finish_warm_up(self, pair, warmed):
+            self.warmed = warmed
+            return True
+
+    async def scenario():
+        bot = TradingBot()
+        assert bot.compute.mode is ComputeMode.INLINE
+        bot._recorder = Recorder()
+        bot.indicators = Indicators()
+        bot._start_warm_up(PAIR)
+        await bot._warm_ups[PAIR]
+        return bot.indicators.warmed
+
+    assert asyncio.run(scenario()) == "warmed"
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_failing_strategy_of_api_pair_is_restarted_by_supervisor():
+    tick = MarketEvent(MarketEventType.TICK, {"price": 100.0, "time": 0})
+
+    async def scenario():
+        supervisor = TaskSupervisor(min_delay=0.01, max_delay=0.01, max_failures=2)
+        bot = TradingBot(supervisor=supervisor)
+        bot.start_for_pair(PAIR)
+        broken = bot._strategies[PAIR][DEFAULT_USER] = BrokenStrategy()
+        tenant = bot._strategies[PAIR]["alice"] = BrokenStrategy()
+        statuses = []
+        bot.add_status_listener(lambda pair, status: statuses.append(status))
+
+        bot.publish_market_event(PAIR, tick)
+        await asyncio.sleep(0.005)
+        # Стратегия пользователя отключена, стратегия пары API ждет перезапуска
+        restarting = bot.get_status()[PAIR]
+        stats = bot.get_supervisor_stats()["pairs"][PAIR]
+        assert not bot.has_strategy(PAIR, "alice")
+        assert tenant.updates == 1
+
+        await asyncio.sleep(0.02)
+        bot.publish_market_event(PAIR, tick)
+        await asyncio.sleep(0.005)
+        failed = bot.get_status()[PAIR]
+        final = bot.get_supervisor_stats()["pairs"][PAIR]
+        await bot.close()
+        return restarting, stats, failed, final, broken.updates, statuses
+
+    restarting, stats, failed, final, updates, statuses = asyncio.run(scenario())
+
+    assert restarting is BotStatus.RESTARTING
+    assert stats["last_error"] == repr(KeyError("strategy bug"))
+    assert failed is BotStatus.FAILED
+    assert final["status"] == BotStatus.FAILED.value
+    assert final["failures"] == 2
+    assert updates == 2
+    assert statuses == [BotStatus.RESTARTING, BotStatus.RUNNING, BotStatus.FAILED]
@@ -0,0 +1,211 @@
+"""Буфер записи COPY: ограничение памяти, отсев строк, которые отвергает база,
+исполнения, ждущие места в буфере, и постраничная история сделок."""
+
+import asyncio
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+
+from managers.database_manager import (
+    DEAL_COLUMNS,
+    DEAL_HISTORY_FIRST_PAGE,
+    DEAL_HISTORY_NEXT_PAGE,
+    FILL_COLUMNS,
+    CopyBuffer,
+    DatabaseManager,
+)
+from managers.order_manager import Order
+
+
+class FakePool:
+    """Пул, COPY которого отвергает пачки со строкой None и падает, пока база «лежит»."""
+
+    def __init__(self):
+        self.down = False
+        self.copied: list[tuple] = []
+        self.copies = 0
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copies += 1
+        if self.down:
+            raise ConnectionRefusedError("database is down")
+        if any(row[0] is None for row in records):
+            raise asyncpg.NotNullViolationError("null value in column")
+        self.copied += records
+
+
+class FakeDealsPool:
+    """Пул, выполняющий запросы истории сделок над строками в памяти."""
+
+    def __init__(self, deals: list[dict]):
+        self.deals = deals
+        self.queries: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def fetch(self, query, user_id, limit, *cursor):
+        self.queries.append(query)
+        rows = [deal for deal in self.deals if deal["user_id"] == user_id]
+        if query is DEAL_HISTORY_NEXT_PAGE:
+            rows = [deal for deal in rows if (deal["closed_at"], deal["id"]) < cursor]
+        else:
+            assert query is DEAL_HISTORY_FIRST_PAGE and not cursor
+        rows.sort(key=lambda deal: (deal["closed_at"], deal["id"]), reverse=True)
+        return rows[:limit]
+
+
+def test_rejected_rows_are_dropped_and_the_rest_written():
+    pool = FakePool()
+    buffer = CopyBuffer(pool, "fills", ("trade_id",), batch_size=100)
+    rows = [(i,) for i in range(100)]
+    rows[17] = rows[60] = (None,)
+    for row in rows:
+        buffer.add_nowait(row)
+
+    asyncio.run(buffer.flush())
+
+    assert pool.copied == [row for row in rows if row[0] is not None]
+    assert buffer.rows_dropped == 2
+    assert buffer.pending_rows == 0
+    # Отвергнутая пачка не ставится на повтор
+    asyncio.run(buffer.flush())
+    assert buffer.rows_written == 98
+
+
+def test_add_nowait_is_bounded_while_database_is_down():
+    pool = FakePool()
+    pool.down = True
+    buffer = CopyBuffer(pool, "fills", ("trade_id",), batch_size=10, max_rows=50)
+    for i in range(80):
+        buffer.add_nowait((i,))
+
+    assert buffer.pending_rows == 50
+    assert buffer.rows_dropped == 30
+
+    pool.down = False
+    while buffer.pending_rows:
+        asyncio.run(buffer.flush())
+    assert pool.copied == [(i,) for i in range(50)]
+
+
+def test_fills_wait_for_space_instead_of_being_dropped():
+    async def scenario():
+        pool = FakePool()
+        pool.down = True
+        db = DatabaseManager()
+        db.fills = CopyBuffer(pool, "fills", FILL_COLUMNS, batch_size=2, max_rows=4)
+        order = Order("sx1-1", "SOLUSDT", "BUY", "MARKET", 10.0, exchange_order_id=7)
+        for trade_id in range(10):
+            db.on_fill(order, {"trade_id": trade_id, "price": 100.0, "qty": 1.0})
+        # Задачи кладут строки в буфер, затем снимаются с учета
+        for _ in range(2):
+            await asyncio.sleep(0)
+        stats = db.get_stats()["fills"]
+        assert (stats["pending_rows"], stats["waiting_rows"]) == (4, 6)
+
+        pool.down = False
+        while db.fills.pending_rows or db._fill_writes:
+            await db.fills.flush()
+            await asyncio.sleep(0)
+        return pool.copied, db.fills.rows_dropped
+
+    copied, dropped = asyncio.run(scenario())
+
+    assert [row[0] for row in copied] == list(range(10))
+    assert dropped == 0
+
+
+def test_fills_waiting_for_space_are_bounded():
+    async def scenario():
+        pool = FakePool()
+        pool.down = True
+        db = DatabaseManager(max_fill_waiters=3)
+        db.fills = CopyBuffer(pool, "fills", FILL_COLUMNS, batch_size=2, max_rows=4)
+        order = Order("sx1-1", "SOLUSDT", "BUY", "MARKET", 10.0, exchange_order_id=7)
+        for trade_id in range(10):
+            db.on_fill(order, {"trade_id": trade_id, "price": 100.0, "qty": 1.0})
+        for _ in range(2):
+            await asyncio.sleep(0)
+        stats = db.get_stats()["fills"]
+        for task in db._fill_writes:
+            task.cancel()
+        await asyncio.sleep(0)
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["pending_rows"] == 4
+    assert stats["waiting_rows"] == 3
+    assert stats["rows_dropped"] == 3
+
+
+def test_deal_history_pages_by_keyset_cursor():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    deals = [
+        # Несколько сделок закрыты в одну секунду: курсор различает их по id
+        {"id": i, "user_id": "alice", "closed_at": start + timedelta(seconds=i // 3)}
+        for i in range(1, 11)
+    ]
+    deals.append({"id": 11, "user_id": "bob", "closed_at": start})
+    pool = FakeDealsPool(deals)
+    db = DatabaseManager()
+    db.pool = pool
+
+    async def scenario():
+        pages = []
+        cursor = None
+        while True:
+            rows, cursor = await db.get_deal_history("alice", limit=4, cursor=cursor)
+            pages.append([row["id"] for row in rows])
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(scenario())
+
+    assert pages == [[10, 9, 8, 7], [6, 5, 4, 3], [2, 1]]
+    assert pool.queries == [
+        DEAL_HISTORY_FIRST_PAGE,
+        DEAL_HISTORY_NEXT_PAGE,
+        DEAL_HISTORY_NEXT_PAGE,
+    ]
+    assert all("OFFSET" not in query for query in pool.queries)
+
+
+def test_deals_are_buffered_separately_from_fills():
+    async def scenario():
+        pool = FakePool()
+        db = DatabaseManager()
+        db.fills = CopyBuffer(pool, "fills", FILL_COLUMNS)
+        db.deals = CopyBuffer(pool, "deals", DEAL_COLUMNS, batch_size=2)
+        closed_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i in range(3):
+            await db.add_deal(
+                (
+                    "alice",
+                    "SOLUSDT",
+                    "BUY",
+                    1.0,
+                    100.0,
+                    101.0,
+                    1.0,
+                    closed_at,
+                    closed_at,
+                )
+            )
+        stats = db.get_stats()
+        await db.deals.flush()
+        return stats, len(pool.copied)
+
+    stats, copied = asyncio.run(scenario())
+
+    assert stats["deals"]["pending_rows"] == 3
+    assert "waiting_rows" not in stats["deals"]
+    assert stats["fills"]["pending_rows"] == 0
+    assert copied == 2
@@ -0,0 +1,56 @@
+"""Профиль prod: ограничение частоты по приемникам и хранение ротированных файлов."""
+
+import json
+import time
+
+from loguru import logger
+
+from managers.loguru_manager import JsonLinesSink, RateLimitFilter
+
+
+def _tick(i: int):
+    logger.info("tick {}", i)
+
+
+def test_each_sink_reports_its_own_suppressed_count(tmp_path):
+    console_records = []
+    console_filter = RateLimitFilter(1, interval=60, field="console_suppressed")
+    file_filter = RateLimitFilter(3, interval=60)
+    sink = JsonLinesSink(tmp_path / "app.jsonl")
+    # Запись общая для приемников, а пропускают они разное число сообщений
+    console = logger.add(
+        lambda message: console_records.append(dict(message.record["extra"])),
+        filter=console_filter,
+    )
+    file = logger.add(sink, format="{message}", filter=file_filter)
+    try:
+        for i in range(10):
+            _tick(i)
+        # Следующее сообщение открывает новое окно обоих фильтров
+        for log_filter in (console_filter, file_filter):
+            for site in log_filter._sites.values():
+                site[0] -= 60
+        _tick(10)
+    finally:
+        logger.remove(console)
+        logger.remove(file)
+
+    entries = [json.loads(line) for line in (tmp_path / "app.jsonl").open()]
+    assert console_records[-1] == {"console_suppressed": 9}
+    assert entries[-1]["suppressed"] == 7
+
+
+def test_rotated_files_are_pruned(tmp_path):
+    sink = JsonLinesSink(tmp_path / "app.jsonl", max_bytes=200, retention=2)
+    handler = logger.add(sink, format="{message}")
+    try:
+        for i in range(5):
+            for j in range(5):
+                logger.info("message {} {}", i, j)
+            # Каждая пачка записывается фоновым потоком отдельно и ротирует файл
+            while sink._queue or (tmp_path / "app.jsonl").stat().st_size >= 200:
+                time.sleep(0.01)
+    finally:
+        logger.remove(handler)
+
+    assert len(list(tmp_path.glob("app_*.jsonl"))) == 2
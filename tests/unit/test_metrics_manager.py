@@ -0,0 +1,115 @@
+"""Гистограммы метрик: индекс корзины, процентили, текстовая выгрузка Prometheus."""
+
+import math
+
+import pytest
+
+from managers.metrics_manager import HistogramChild, MetricsRegistry
+
+
+def _bucket_of(value: float) -> int | None:
+    child = HistogramChild()
+    child.observe(value)
+    indexes = [index for index, count in enumerate(child.counts) if count]
+    return indexes[0] if indexes else None
+
+
+@pytest.mark.parametrize(
+    "value", [1e-6, 3.3e-5, 0.0123, 0.05, 0.75, 1.0, 1.5, 2.0, 3.0, 17.2, 200.0]
+)
+def test_value_falls_into_bucket_with_bound_just_above_it(value):
+    index = _bucket_of(value)
+
+    upper = HistogramChild.bucket_upper_bound(index)
+    lower = HistogramChild.bucket_upper_bound(index - 1)
+    assert lower < value <= upper
+    # Ширина корзины — 1/16 октавы, погрешность ~3%
+    assert (upper - lower) / upper <= 1 / 16
+
+
+def test_values_outside_range_are_bounded():
+    # Меньше нижней границы и нулевые — в первую корзину
+    assert _bucket_of(1e-9) == 0
+    assert _bucket_of(0.0) == 0
+    # Ровно 256 с — последняя корзина, больше — ни в одну
+    last = _bucket_of(256.0)
+    assert last == len(HistogramChild().counts) - 1
+    assert HistogramChild.bucket_upper_bound(last) == 256.0
+    assert _bucket_of(256.5) is None
+    assert _bucket_of(1e6) is None
+
+
+def test_percentile():
+    child = HistogramChild()
+    assert child.percentile(50) == 0.0
+    for ms in range(1, 101):
+        child.observe(ms / 1000)
+
+    assert math.isclose(child.percentile(50), 0.05, rel_tol=1 / 16)
+    assert math.isclose(child.percentile(99), 0.099, rel_tol=1 / 16)
+    # Процентиль не выше наблюдавшегося максимума
+    assert child.percentile(100) == child.max == 0.1
+    summary = child.summary()
+    assert summary["count"] == 100
+    assert summary["avg_ms"] == 50.5
+    assert summary["max_ms"] == 100.0
+
+
+def test_percentile_of_overflow_is_max():
+    child = HistogramChild()
+    child.observe(0.01)
+    child.observe(300.0)
+    child.observe(1000.0)
+
+    assert math.isclose(child.percentile(30), 0.01, rel_tol=1 / 16)
+    assert child.percentile(99) == 1000.0
+
+
+def test_prometheus_text_output():
+    registry = MetricsRegistry()
+    orders = registry.counter("orders", "Orders sent", ("side",))
+    orders.labels("BUY").inc()
+    orders.labels('S"ELL').inc(2)
+    queue = registry.gauge("queue", "Queue size")
+    queue.set_function(lambda: 7)
+    latency = registry.histogram("latency_seconds", "Latency", ("pair",))
+    child = latency.labels("KASUSDT")
+    for value in (0.5, 1.0, 2.0, 300.0):
+        child.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:4] == [
+        "# HELP orders Orders sent",
+        "# TYPE orders counter",
+        'orders_total{side="BUY"} 1',
+        'orders_total{side="S\\"ELL"} 2',
+    ]
+    assert lines[4:7] == ["# HELP queue Queue size", "# TYPE queue gauge", "queue 7"]
+    assert "# TYPE latency_seconds histogram" in lines
+    buckets = {
+        line.split('le="')[1].split('"')[0]: int(line.rsplit(" ", 1)[1])
+        for line in lines
+        if line.startswith("latency_seconds_bucket")
+    }
+    # Значение на границе входит в le этой границы (le включительно)
+    assert buckets["0.5"] == 1
+    assert buckets["1"] == 2
+    assert buckets["2"] == 3
+    # 300 с выше диапазона: учтено только в +Inf
+    assert buckets["256"] == 3
+    assert buckets["+Inf"] == 4
+    assert list(buckets.values()) == sorted(buckets.values())
+    assert 'latency_seconds_sum{pair="KASUSDT"} 303.5' in lines
+    assert 'latency_seconds_count{pair="KASUSDT"} 4' in lines
+
+
+def test_registry_rejects_conflicting_registration():
+    registry = MetricsRegistry()
+    registry.counter("orders", "Orders sent", ("side",))
+
+    assert registry.counter("orders", "Orders sent", ("side",)) is not None
+    with pytest.raises(ValueError):
+        registry.gauge("orders", "Orders sent", ("side",))
+    with pytest.raises(ValueError):
+        registry.counter("orders", "Orders sent")
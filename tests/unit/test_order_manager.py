@@ -0,0 +1,125 @@
+"""Реестр ордеров: метка владельца в клиентском ID, восстановление ордеров сверкой
+и поток пользовательских событий."""
+
+import asyncio
+
+import httpx
+
+from managers.order_manager import CLIENT_ID_PREFIX, OrderManager
+
+
+def _exchange_order(client_order_id: str) -> dict:
+    return {
+        "clientOrderId": client_order_id,
+        "orderId": 42,
+        "symbol": "SOLUSDT",
+        "side": "BUY",
+        "type": "LIMIT",
+        "origQty": "1",
+        "price": "100",
+        "executedQty": "0",
+        "cummulativeQuoteQty": "0",
+        "status": "NEW",
+    }
+
+
+def test_client_order_id_carries_owner():
+    orders = OrderManager(exchange=None)
+
+    client_order_id = orders.new_client_order_id("alice")
+
+    assert client_order_id.startswith(CLIENT_ID_PREFIX)
+    assert len(client_order_id) <= 36
+    assert orders.new_client_order_id().count(".") == 0
+
+
+def test_reconciled_order_restores_owner():
+    previous_run = OrderManager(exchange=None)
+    previous_run._id_prefix = f"{CLIENT_ID_PREFIX}1"
+    client_order_id = previous_run.new_client_order_id("alice")
+    orders = OrderManager(exchange=None)
+
+    # Сверка может восстановить ордер раньше, чем владелец зарегистрирован
+    order = orders.apply_exchange_order(_exchange_order(client_order_id))
+    assert order.user_id is None
+    orders.register_owner("alice")
+
+    assert order.user_id == "alice"
+
+
+class FlakyListenKeyExchange:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def create_listen_key(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise httpx.ConnectError("connection refused")
+        return f"listen-key-{self.calls}"
+
+    async def keepalive_listen_key(self, listen_key: str):
+        pass
+
+
+class RecordingFeed:
+    def __init__(self):
+        self.subscribed = asyncio.Event()
+        self.raw_keys: set[str] = set()
+        self.handlers = {}
+
+    def subscribe_raw(self, stream: str, callback):
+        self.raw_keys.add(stream)
+        self.handlers[stream] = callback
+        self.subscribed.set()
+
+    def unsubscribe_raw(self, stream: str):
+        self.raw_keys.discard(stream)
+
+
+def test_user_stream_survives_transport_error(monkeypatch):
+    async def scenario():
+        sleep = asyncio.sleep
+        # Задержки повторов не ждем по-настоящему
+        monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(0))
+        exchange = FlakyListenKeyExchange(failures=2)
+        feed = RecordingFeed()
+        orders = OrderManager(exchange=exchange)
+        orders.start_user_stream(feed)
+        try:
+            await asyncio.wait_for(feed.subscribed.wait(), 1.0)
+            subscribed = set(feed.raw_keys)
+        finally:
+            monkeypatch.undo()
+            await orders.stop_user_stream()
+        return exchange, feed, subscribed
+
+    exchange, feed, subscribed = asyncio.run(scenario())
+
+    assert exchange.calls == 3
+    assert subscribed == {"listen-key-3"}
+    assert feed.raw_keys == set()
+
+
+def test_expired_listen_key_is_recreated():
+    async def scenario():
+        exchange = FlakyListenKeyExchange(failures=0)
+        feed = RecordingFeed()
+        orders = OrderManager(exchange=exchange)
+        orders.start_user_stream(feed)
+        try:
+            await asyncio.wait_for(feed.subscribed.wait(), 1.0)
+            feed.subscribed.clear()
+            feed.handlers["listen-key-1"](
+                {"e": "listenKeyExpired", "E": 1, "listenKey": "listen-key-1"}
+            )
+            # Новый ключ без ожидания периода продления
+            await asyncio.wait_for(feed.subscribed.wait(), 1.0)
+            return set(feed.raw_keys), exchange.calls
+        finally:
+            await orders.stop_user_stream()
+
+    subscribed, calls = asyncio.run(scenario())
+
+    assert calls == 2
+    assert subscribed == {"listen-key-2"}
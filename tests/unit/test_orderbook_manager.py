@@ -0,0 +1,64 @@
+"""Пересинхронизация стакана: одна загрузка снапшота на пару и задержка после неудачи."""
+
+import asyncio
+
+from managers.orderbook_manager import OrderBookManager
+from server.pair_engine import MarketEvent
+from shared.enums import MarketEventType
+
+PAIR = "SOLUSDT"
+
+
+def _depth(update_id: int) -> MarketEvent:
+    data = {
+        "first_id": update_id,
+        "last_id": update_id,
+        "bids": [(100.0, 1.0)],
+        "asks": [(100.1, 1.0)],
+        "time": 0,
+    }
+    return MarketEvent(MarketEventType.DEPTH, data)
+
+
+class SnapshotLoader:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, pair: str, limit: int) -> dict:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("snapshot unavailable")
+        return {"lastUpdateId": 0, "bids": [], "asks": []}
+
+
+def test_failed_snapshot_is_retried_with_backoff():
+    async def scenario():
+        loader = SnapshotLoader(failures=2)
+        books = OrderBookManager(loader, resync_min_delay=0.1)
+        update_id = 1
+
+        async def feed(events: int):
+            nonlocal update_id
+            for _ in range(events):
+                books.on_market_event(PAIR, _depth(update_id))
+                update_id += 1
+                await asyncio.sleep(0)
+
+        await feed(50)
+        # Пока идет первая загрузка и действует задержка — ни одной новой
+        assert loader.calls == 1
+        await asyncio.sleep(0.15)
+        await feed(50)
+        assert loader.calls == 2
+        # Вторая неудача подряд: задержка удваивается
+        await asyncio.sleep(0.15)
+        await feed(10)
+        assert loader.calls == 2
+        await asyncio.sleep(0.1)
+        await feed(10)
+        assert loader.calls == 3
+        assert books.get_book(PAIR) is not None
+        assert books.failed_resyncs == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,129 @@
+"""Событийный движок пары: переполнение очереди, схлопывание событий, слияние состояния."""
+
+import asyncio
+import time
+
+from server.pair_engine import MarketEvent, PairEngine, PairMarketState
+from shared.enums import MarketEventType
+
+
+def _tick(price: float, time_ms: int, received_at: float | None = None) -> MarketEvent:
+    event = MarketEvent(
+        MarketEventType.TICK, {"price": price, "qty": 1.0, "time": time_ms}
+    )
+    if received_at is not None:
+        event.received_at = received_at
+    return event
+
+
+def test_full_queue_drops_oldest_events():
+    engine = PairEngine("SOLUSDT", max_queue_size=3)
+    for i in range(5):
+        engine.push(_tick(100.0 + i, i))
+
+    assert engine.queue_depth == 3
+    assert engine.dropped_events == 2
+
+    state = asyncio.run(engine.wait_for_update())
+
+    # Остались три самых свежих события, последнее определяет состояние
+    assert engine.processed_events == 3
+    assert state.last_price == 104.0
+    assert state.exchange_time == 4
+    assert engine.get_stats()["dropped_events"] == 2
+
+
+def test_pending_events_are_coalesced_into_one_wake_up():
+    engine = PairEngine("SOLUSDT")
+
+    async def scenario():
+        wake_ups = []
+
+        async def loop():
+            while True:
+                state = await engine.wait_for_update()
+                wake_ups.append((state.last_price, state.best_bid, state.updates))
+
+        task = asyncio.create_task(loop())
+        await asyncio.sleep(0)
+        # Пачка событий между итерациями цикла будит его один раз
+        engine.push(_tick(100.0, 1))
+        engine.push(
+            MarketEvent(MarketEventType.BOOK, {"bid": 99.5, "ask": 100.5, "time": 2})
+        )
+        engine.push(_tick(101.0, 3))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        engine.push(_tick(102.0, 4))
+        await asyncio.sleep(0)
+        task.cancel()
+        return wake_ups
+
+    wake_ups = asyncio.run(scenario())
+
+    assert wake_ups == [(101.0, 99.5, 3), (102.0, 99.5, 4)]
+    stats = engine.get_stats()
+    assert stats["iterations"] == 2
+    assert stats["processed_events"] == 4
+    assert stats["coalesced_events"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_latency_is_measured_from_oldest_event_of_batch():
+    engine = PairEngine("SOLUSDT")
+
+    async def scenario():
+        # Первое событие пачки пролежало в очереди 5 с
+        engine.push(_tick(100.0, 1, received_at=time.perf_counter() - 5.0))
+        engine.push(_tick(101.0, 2))
+        await engine.wait_for_update()
+        first = engine.last_latency
+        engine.push(_tick(102.0, 3))
+        await engine.wait_for_update()
+        return first
+
+    first = asyncio.run(scenario())
+
+    # Задержка пачки считается от самого старого события в ней
+    assert first >= 5.0
+    assert engine.max_latency == first
+    assert engine.last_latency < 1.0
+    # EWMA: вторая итерация сдвигает среднее на 10% к новому значению
+    expected = first + PairEngine._LATENCY_ALPHA * (engine.last_latency - first)
+    assert abs(engine.avg_latency - expected) < 1e-9
+
+
+def test_market_state_applies_trades_and_book_updates():
+    state = PairMarketState("SOLUSDT")
+
+    state.apply_trade(100.0, 2.0, 1_000)
+    state.apply_book(99.5, 10.0, 100.5, 20.0, 1_001)
+
+    assert (state.last_price, state.last_qty) == (100.0, 2.0)
+    assert (state.best_bid, state.best_bid_qty) == (99.5, 10.0)
+    assert (state.best_ask, state.best_ask_qty) == (100.5, 20.0)
+    assert state.exchange_time == 1_001
+    assert state.updates == 2
+
+    # Сделка не трогает стакан, обновление стакана — последнюю сделку
+    state.apply_trade(101.0, 1.0, 1_002)
+    state.apply(
+        MarketEvent(MarketEventType.BOOK, {"bid": 100.5, "ask": 101.5, "time": 1_003})
+    )
+    assert (state.last_price, state.best_bid, state.best_ask) == (101.0, 100.5, 101.5)
+    assert state.best_bid_qty == state.best_ask_qty == 0.0
+    assert state.exchange_time == 1_003
+    assert state.updates == 4
+
+
+def test_event_without_time_keeps_previous_exchange_time():
+    state = PairMarketState("SOLUSDT")
+    state.apply(_tick(100.0, 5_000))
+
+    state.apply(MarketEvent(MarketEventType.TICK, {"price": 101.0}))
+    state.apply(MarketEvent(MarketEventType.DEPTH, {"bids": [], "asks": []}))
+
+    assert state.last_price == 101.0
+    assert state.last_qty == 0.0
+    assert state.exchange_time == 5_000
+    assert state.updates == 3
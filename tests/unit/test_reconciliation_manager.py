@@ -0,0 +1,41 @@
+"""Сверка ордеров: восстановление реестра переживает любые ошибки биржи."""
+
+import asyncio
+
+from managers.order_manager import OrderManager
+from managers.reconciliation_manager import ReconciliationManager
+
+
+class FlakyExchange:
+    OPEN_ORDERS_ALL_WEIGHT = 40
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def get_open_orders(self, symbol: str | None = None) -> list[dict]:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ValueError("malformed response")
+        return []
+
+
+def test_rebuild_retries_after_unexpected_error(monkeypatch):
+    async def scenario():
+        sleep = asyncio.sleep
+        # Задержки повторов не ждем по-настоящему
+        monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(0))
+        exchange = FlakyExchange(failures=2)
+        reconciler = ReconciliationManager(OrderManager(exchange=None), exchange)
+        reconciler.start()
+        try:
+            await asyncio.wait_for(reconciler.wait_ready(), 1.0)
+        finally:
+            monkeypatch.undo()
+            await reconciler.stop()
+        return exchange, reconciler
+
+    exchange, reconciler = asyncio.run(scenario())
+
+    assert exchange.calls == 3
+    assert reconciler.get_stats()["errors"] == 2
@@ -0,0 +1,96 @@
+import numpy as np
+
+from managers.archive_manager import KIND_BOOK, TICK_DTYPE, _Segment, day_of
+from managers.scalping_manager import (
+    INDICATOR_FIELDS,
+    ScalpingManager,
+    compute_indicators,
+    replay_indicators,
+    warm_up_indicators,
+)
+from server.pair_engine import MarketEvent, MarketEventType
+
+PAIR = "SOLUSDT"
+START_MS = 1_700_000_000_000
+
+
+def _ticks(count: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    mids = 150.0 + np.cumsum(rng.choice((-1, 0, 1), size=count)) * 0.01
+    ticks = np.zeros(count, dtype=TICK_DTYPE)
+    ticks["time"] = START_MS + np.arange(count) * 100
+    is_book = rng.random(count) < 0.5
+    ticks["kind"] = np.where(is_book, KIND_BOOK, 0)
+    ticks["bid"] = np.where(is_book, mids - 0.005, 0.0)
+    ticks["ask"] = np.where(is_book, mids + 0.005, 0.0)
+    ticks["bid_qty"] = np.where(is_book, rng.uniform(1, 50, size=count), 0.0)
+    ticks["ask_qty"] = np.where(is_book, rng.uniform(1, 50, size=count), 0.0)
+    ticks["price"] = np.where(is_book, 0.0, mids)
+    ticks["qty"] = np.where(is_book, 0.0, rng.uniform(1, 100, size=count))
+    return ticks
+
+
+def test_live_and_batch_indicators_match_on_every_event():
+    ticks = _ticks(20_000)
+    # Пустые стороны стакана и сделки с нулевым объемом тоже должны совпадать
+    ticks["bid"][100:110] = 0.0
+    ticks["qty"][200:210] = 0.0
+
+    live = replay_indicators(ticks)
+    batch = compute_indicators(ticks)
+
+    assert np.array_equal(live["time"], batch["time"])
+    for name in INDICATOR_FIELDS:
+        np.testing.assert_allclose(
+            live[name], batch[name], rtol=1e-9, atol=1e-6, err_msg=name
+        )
+
+
+def _event(row) -> MarketEvent:
+    if row["kind"] == KIND_BOOK:
+        data = {
+            "bid": float(row["bid"]),
+            "bid_qty": float(row["bid_qty"]),
+            "ask": float(row["ask"]),
+            "ask_qty": float(row["ask_qty"]),
+            "time": int(row["time"]),
+        }
+        return MarketEvent(MarketEventType.BOOK, data)
+    data = {
+        "price": float(row["price"]),
+        "qty": float(row["qty"]),
+        "time": int(row["time"]),
+    }
+    return MarketEvent(MarketEventType.TICK, data)
+
+
+def test_warm_up_matches_live_replay_and_applies_buffered_events(tmp_path):
+    ticks = _ticks(5000)
+    archived, live = ticks[:4000], ticks[4000:]
+    segment = _Segment(tmp_path / PAIR / day_of(START_MS) / "ticks", TICK_DTYPE)
+    segment.append(archived)
+    segment.close()
+    end_ms = int(live["time"][0])
+
+    manager = ScalpingManager()
+    manager.add_pair(PAIR)
+    manager.begin_warm_up(PAIR)
+    for row in live:
+        manager.on_market_event(PAIR, _event(row))
+    warmed = warm_up_indicators(tmp_path, PAIR, START_MS, end_ms, manager.params)
+    assert manager.finish_warm_up(PAIR, warmed)
+
+    expected = replay_indicators(ticks)[-1]
+    values = manager.get(PAIR).as_dict()
+    for name in INDICATOR_FIELDS:
+        assert np.isclose(values[name], expected[name], rtol=1e-9, atol=1e-9), name
+
+
+def test_warm_up_of_removed_pair_is_discarded(tmp_path):
+    manager = ScalpingManager()
+    manager.add_pair(PAIR)
+    manager.begin_warm_up(PAIR)
+    manager.remove_pair(PAIR)
+    warmed = warm_up_indicators(tmp_path, PAIR, START_MS, START_MS + 1000)
+    assert not manager.finish_warm_up(PAIR, warmed)
+    assert manager.get(PAIR) is None
@@ -0,0 +1,78 @@
+"""
+Цены статусного WebSocket: один опрос источника на всех подписчиков,
+каждому — только его пары, ошибки источника не останавливают рассылку.
+"""
+
+import asyncio
+import json
+
+from server.status_stream import StatusBroadcaster
+
+
+def test_price_stream_survives_source_errors():
+    async def scenario():
+        broadcaster = StatusBroadcaster(price_interval=0.01)
+        subscriber = broadcaster.subscribe(None, None)
+        subscriber.watch({"SOLUSDT"})
+        # Снапшот при подключении
+        await subscriber.get()
+        calls = 0
+
+        async def get_prices(pairs: set[str]) -> dict[str, float]:
+            nonlocal calls
+            calls += 1
+            if calls <= 2:
+                raise ConnectionError("redis is unavailable")
+            return {pair: 100.0 for pair in pairs}
+
+        broadcaster.start_prices(get_prices)
+        try:
+            message = await asyncio.wait_for(subscriber.get(), 1.0)
+        finally:
+            await broadcaster.stop()
+        return json.loads(message)
+
+    assert asyncio.run(scenario()) == {"type": "prices", "prices": {"SOLUSDT": 100.0}}
+
+
+def test_prices_are_read_once_per_tick_for_all_subscribers():
+    async def scenario():
+        broadcaster = StatusBroadcaster(price_interval=0.01)
+        sol, both, idle = (broadcaster.subscribe(None, None) for _ in range(3))
+        sol.watch({"SOLUSDT"})
+        both.watch({"SOLUSDT", "KASUSDT"})
+        for subscriber in (sol, both, idle):
+            await subscriber.get()
+        requests = []
+        prices = {"SOLUSDT": 100.0, "KASUSDT": 0.1, "BTCUSDT": 60_000.0}
+
+        def get_prices(pairs: set[str]) -> dict[str, float]:
+            requests.append(pairs)
+            return {pair: prices[pair] for pair in pairs}
+
+        broadcaster.start_prices(get_prices)
+        try:
+            first = [json.loads(await s.get()) for s in (sol, both)]
+            # Изменилась только цена KASUSDT: ее получает только тот, кто ее видит
+            prices["KASUSDT"] = 0.2
+            second = json.loads(await asyncio.wait_for(both.get(), 1.0))
+            # Пара, снова ставшая видимой, получает цену заново
+            sol.watch(set())
+            await asyncio.sleep(0.03)
+            sol.watch({"SOLUSDT"})
+            third = json.loads(await asyncio.wait_for(sol.get(), 1.0))
+        finally:
+            await broadcaster.stop()
+        return requests, first, second, third, idle._queue.qsize()
+
+    requests, first, second, third, idle_queue = asyncio.run(scenario())
+
+    assert all(pairs <= {"SOLUSDT", "KASUSDT"} for pairs in requests)
+    assert requests[0] == {"SOLUSDT", "KASUSDT"}
+    assert [message["prices"] for message in first] == [
+        {"SOLUSDT": 100.0},
+        {"SOLUSDT": 100.0, "KASUSDT": 0.1},
+    ]
+    assert second == {"type": "prices", "prices": {"KASUSDT": 0.2}}
+    assert third == {"type": "prices", "prices": {"SOLUSDT": 100.0}}
+    assert idle_queue == 0
@@ -0,0 +1,177 @@
+"""Надзор за циклами пар: перезапуск с задержкой, отказ, сторожевой таймер, пул вычислений."""
+
+import asyncio
+import math
+import os
+import random
+import threading
+
+import pytest
+
+from server.supervisor import ComputePool, LoopWatchdog, TaskSupervisor
+from shared.enums import BotStatus, ComputeMode, RestartPolicy
+
+
+async def _crash():
+    raise KeyError("loop bug")
+
+
+def _run_until_failed(supervisor: TaskSupervisor, monkeypatch) -> list[float]:
+    """Запускает падающую задачу до отказа; возвращает задержки перезапусков."""
+    delays = []
+
+    async def scenario():
+        sleep = asyncio.sleep
+
+        def fake_sleep(delay):
+            delays.append(delay)
+            return sleep(0)
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        try:
+            entry = supervisor.start("SOLUSDT", _crash)
+            await asyncio.wait_for(entry.task, 1)
+        finally:
+            monkeypatch.undo()
+
+    asyncio.run(scenario())
+    return delays
+
+
+def test_restart_delay_grows_exponentially_with_jitter(monkeypatch):
+    jitter = []
+
+    def uniform(low, high):
+        jitter.append((low, high))
+        return 0.75
+
+    monkeypatch.setattr(random, "uniform", uniform)
+    supervisor = TaskSupervisor(min_delay=1, max_delay=3, max_failures=5)
+
+    delays = _run_until_failed(supervisor, monkeypatch)
+
+    # Четыре перезапуска: 1, 2, 4 -> 3 (предел), 3; каждый умножен на джиттер
+    assert delays == [0.75, 1.5, 2.25, 2.25]
+    assert jitter == [(0.5, 1.0)] * 4
+    assert supervisor.get_stats()["SOLUSDT"]["restarts"] == 4
+
+
+def test_jitter_keeps_delay_within_half_to_full(monkeypatch):
+    supervisor = TaskSupervisor(min_delay=2, max_delay=2, max_failures=20)
+
+    delays = _run_until_failed(supervisor, monkeypatch)
+
+    assert len(delays) == 19
+    assert all(1.0 <= delay <= 2.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_max_failures_marks_task_failed_with_last_error(monkeypatch):
+    supervisor = TaskSupervisor(min_delay=1, max_failures=3)
+    events = []
+    supervisor.add_listener(lambda *event: events.append(event))
+
+    _run_until_failed(supervisor, monkeypatch)
+
+    stats = supervisor.get_stats()["SOLUSDT"]
+    assert stats["status"] == BotStatus.FAILED.value
+    assert stats["failures"] == 3
+    assert stats["restarts"] == 2
+    assert stats["last_error"] == repr(KeyError("loop bug"))
+    assert stats["restart_in"] is None
+    assert stats["failed_at"] is not None
+    assert events[-1] == ("SOLUSDT", BotStatus.FAILED, repr(KeyError("loop bug")))
+    assert not supervisor.is_active("SOLUSDT")
+
+
+def test_never_policy_does_not_restart(monkeypatch):
+    supervisor = TaskSupervisor(policy=RestartPolicy.NEVER, min_delay=1)
+
+    delays = _run_until_failed(supervisor, monkeypatch)
+
+    assert delays == []
+    assert supervisor.status("SOLUSDT") is BotStatus.FAILED
+
+
+def test_fail_cancels_running_task():
+    cancelled = []
+
+    async def loop():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        supervisor = TaskSupervisor()
+        entry = supervisor.start("SOLUSDT", loop)
+        await asyncio.sleep(0)
+        supervisor.fail("SOLUSDT", "blocked the event loop")
+        with pytest.raises(asyncio.CancelledError):
+            await entry.task
+        return supervisor
+
+    supervisor = asyncio.run(scenario())
+
+    assert cancelled == [True]
+    assert supervisor.status("SOLUSDT") is BotStatus.FAILED
+    assert not supervisor.is_active("SOLUSDT")
+    assert supervisor.get_stats()["SOLUSDT"]["last_error"] == "blocked the event loop"
+
+
+def test_watchdog_trips_after_block_limit():
+    watchdog = LoopWatchdog(threshold_ms=10, block_limit=3)
+
+    assert not watchdog.check("SOLUSDT", 0.02)
+    assert not watchdog.check("SOLUSDT", 0.03)
+    # Быстрая итерация сбрасывает счетчик блокировок подряд
+    assert not watchdog.check("SOLUSDT", 0.001)
+    assert [watchdog.check("SOLUSDT", 0.02) for _ in range(3)] == [False, False, True]
+
+    stats = watchdog.get_stats()["SOLUSDT"]
+    assert stats["blocks"] == 5
+    assert stats["consecutive_blocks"] == 3
+    assert stats["max_block_ms"] == 30.0
+    watchdog.forget("SOLUSDT")
+    assert watchdog.get_stats() == {}
+
+
+def test_watchdog_without_limit_only_counts():
+    watchdog = LoopWatchdog(threshold_ms=10, block_limit=0)
+
+    assert not any(watchdog.check("SOLUSDT", 1.0) for _ in range(100))
+    assert watchdog.get_stats()["SOLUSDT"]["blocks"] == 100
+
+
+def _call_info():
+    return os.getpid(), threading.get_ident()
+
+
+@pytest.mark.parametrize(
+    "mode, same_process, same_thread",
+    [
+        (ComputeMode.INLINE, True, True),
+        (ComputeMode.THREAD, True, False),
+        (ComputeMode.PROCESS, False, False),
+    ],
+)
+def test_compute_pool_dispatch(mode, same_process, same_thread):
+    pool = ComputePool(mode, workers=1)
+
+    async def scenario():
+        try:
+            result = await pool.run(_call_info)
+            with pytest.raises(ValueError):
+                await pool.run(math.sqrt, -1.0)
+            return result
+        finally:
+            pool.close()
+
+    pid, thread = asyncio.run(scenario())
+
+    assert (pid == os.getpid()) is same_process
+    assert (thread == threading.get_ident()) is same_thread
+    stats = pool.get_stats()
+    assert (stats["mode"], stats["submitted"], stats["failed"]) == (mode.value, 2, 1)
+    assert stats["inflight"] == 0
@@ -0,0 +1,196 @@
+"""Многопользовательский режим: бюджет памяти, проверка конфигурации, горячая перезагрузка."""
+
+import asyncio
+import gc
+import json
+import tracemalloc
+
+import pytest
+
+from server.bot_logic import TradingBot
+from server.tenants import IDLE_USER_MEMORY_BUDGET, IDLE_USER_PAIRS, TenantManager
+
+SYMBOLS = [f"PAIR{i:03d}USDT" for i in range(50)]
+
+
+def _users(start: int, count: int) -> dict[str, dict]:
+    return {
+        f"user{i}": {
+            "pairs": [SYMBOLS[(i * 7 + k * 13) % 50] for k in range(IDLE_USER_PAIRS)],
+            "params": {"entry_bps": 5 + i % 3},
+        }
+        for i in range(start, start + count)
+    }
+
+
+def _with_bot(scenario, **bot_kwargs):
+    """Выполняет scenario(bot) в event loop (движкам символов нужен запущенный loop)."""
+
+    async def main():
+        bot = TradingBot(**bot_kwargs)
+        try:
+            return scenario(bot)
+        finally:
+            for pair in list(bot._strategies):
+                for user_id in list(bot._strategies[pair]):
+                    bot.remove_strategy(pair, user_id)
+            await asyncio.sleep(0)
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def no_default_pairs(monkeypatch):
+    monkeypatch.setenv("TRADING_PAIRS", "")
+
+
+def test_idle_user_fits_memory_budget():
+    def scenario(bot):
+        tenants = TenantManager(bot)
+        # Символы уже работают: считаем только записи новых пользователей
+        config = _users(0, 1000)
+        tenants.apply(tenants.parse(config))
+        extra = _users(1000, 2000)
+        raw = json.dumps({**config, **extra})
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            tenants.apply(tenants.parse(json.loads(raw)))
+            gc.collect()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        assert tenants.get_stats()["users"] == 3000
+        return (after - before) / len(extra)
+
+    assert _with_bot(scenario) <= IDLE_USER_MEMORY_BUDGET
+
+
+def test_invalid_users_are_skipped():
+    def scenario(bot):
+        tenants = TenantManager(bot)
+        return tenants.parse(
+            {
+                "ok": {"pairs": ["solusdt", "SOLUSDT"]},
+                "string_pairs": {"pairs": "SOLUSDT"},
+                "bad_symbol": {"pairs": ["SOL/USDT"]},
+                "bad_params": {"pairs": ["SOLUSDT"], "params": {"no_such": 1}},
+                "not_object": ["SOLUSDT"],
+                "zero_ema": {"pairs": ["SOLUSDT"], "params": {"ema_period": -1}},
+                "negative_bps": {"pairs": ["SOLUSDT"], "params": {"entry_bps": -5}},
+                "zero_qty": {"pairs": ["SOLUSDT"], "params": {"order_qty": 0}},
+            }
+        )
+
+    users = _with_bot(scenario)
+
+    assert list(users) == ["ok"]
+    assert users["ok"].pairs == ("SOLUSDT",)
+
+
+def test_unknown_exchange_symbols_are_rejected(tmp_path):
+    class Exchange:
+        async def get_exchange_info(self):
+            return {
+                "symbols": [
+                    {"symbol": "SOLUSDT", "status": "TRADING"},
+                    {"symbol": "OLDUSDT", "status": "BREAK"},
+                ]
+            }
+
+    path = tmp_path / "users.json"
+    path.write_text(
+        json.dumps({"alice": {"pairs": ["SOLUSDT"]}, "bob": {"pairs": ["OLDUSDT"]}})
+    )
+
+    async def main():
+        bot = TradingBot()
+        tenants = TenantManager(bot, path=path, exchange=Exchange())
+        await tenants.reload()
+        counts = bot.get_strategy_counts()
+        tenants.apply({})
+        await asyncio.sleep(0)
+        return counts
+
+    assert asyncio.run(main()) == {"SOLUSDT": 1}
+
+
+def test_live_trading_is_refused():
+    class Orders:
+        def add_fill_listener(self, listener):
+            pass
+
+        def register_owner(self, user_id):
+            pass
+
+    def scenario(bot):
+        with pytest.raises(RuntimeError):
+            TenantManager(bot)
+        with pytest.raises(RuntimeError):
+            bot.set_strategy("SOLUSDT", "alice", bot.strategy_params)
+
+    _with_bot(scenario, orders=Orders())
+
+
+def test_reload_updates_params_in_place():
+    def scenario(bot):
+        tenants = TenantManager(bot)
+        tenants.apply(tenants.parse({"alice": {"pairs": ["SOLUSDT", "KASUSDT"]}}))
+        strategy = bot._strategies["SOLUSDT"]["alice"]
+        strategy.position = 2.0
+
+        changes = tenants.apply(
+            tenants.parse(
+                {"alice": {"pairs": ["SOLUSDT"], "params": {"ema_period": 50}}}
+            )
+        )
+
+        assert changes == {"added": 0, "updated": 1, "removed": 0}
+        assert bot._strategies["SOLUSDT"]["alice"] is strategy
+        assert strategy.position == 2.0
+        assert strategy.params.ema_period == 50
+        assert not bot.has_strategy("KASUSDT", "alice")
+
+    _with_bot(scenario)
+
+
+def test_reload_reattaches_disabled_strategy():
+    def scenario(bot):
+        tenants = TenantManager(bot)
+        config = {"alice": {"pairs": ["SOLUSDT", "KASUSDT"]}}
+        tenants.apply(tenants.parse(config))
+        # Бот отключил стратегию после ошибки
+        bot.remove_strategy("SOLUSDT", "alice")
+
+        changes = tenants.apply(tenants.parse(config))
+
+        assert changes == {"added": 0, "updated": 1, "removed": 0}
+        assert bot.has_strategy("SOLUSDT", "alice")
+        assert tenants.apply(tenants.parse(config))["updated"] == 0
+
+    _with_bot(scenario)
+
+
+def test_failed_apply_keeps_reload_alive(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps({"alice": {"pairs": ["SOLUSDT"]}}))
+
+    async def main():
+        bot = TradingBot()
+        tenants = TenantManager(bot, path=path)
+
+        def broken_apply(users):
+            raise RuntimeError("strategy rejected params")
+
+        tenants.apply = broken_apply
+        assert not await tenants.reload()
+        # Файл не помечен загруженным: после исправления он применяется
+        del tenants.apply
+        applied = await tenants.reload()
+        counts = bot.get_strategy_counts()
+        tenants.apply({})
+        await asyncio.sleep(0)
+        return applied, counts, tenants.get_stats()["reload_errors"]
+
+    assert asyncio.run(main()) == (True, {"SOLUSDT": 1}, 1)